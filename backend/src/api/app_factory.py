@@ -4,9 +4,18 @@ Enhanced with new architecture and service management
 """
 import asyncio
 import logging
+import os
+import time
 from typing import Optional
 
+from ..core.startup_profiler import startup_profiler
+
+# Import timing is opt-in and has to start before the heavy imports below
+if os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "yes"):
+    startup_profiler.enable_import_timing()
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from .dependencies.container import container
@@ -17,10 +26,15 @@ from ..utils.environment import load_project_env, is_development
 from ..config import get_settings
 from ..services.service_factory import service_factory, initialize_services, cleanup_services
 from ..services.enhanced_redis_cache import cache_manager
+from ..core import codec
+from ..core.event_loop import event_loop_watchdog
+from ..core.tracing import tracer
 from ..core.middleware import (
     CorrelationIdMiddleware,
     RequestLoggingMiddleware,
     ErrorHandlingMiddleware as EnhancedErrorHandlingMiddleware,
+    MetricsMiddleware,
+    TracingMiddleware,
     RateLimitMiddleware,
     SecurityHeadersMiddleware,
     RequestValidationMiddleware
@@ -42,6 +56,8 @@ def create_app(config: Optional[object] = None) -> FastAPI:
     Returns:
         Configured FastAPI application
     """
+    started = time.perf_counter()
+
     # Use new configuration system
     settings = get_settings()
 
@@ -64,10 +80,11 @@ def create_app(config: Optional[object] = None) -> FastAPI:
         description=settings.api.description,
         docs_url=settings.api.docs_url if settings.api.docs_enabled else None,
         redoc_url=settings.api.redoc_url if settings.api.docs_enabled else None,
-        openapi_url=settings.api.openapi_url if settings.api.docs_enabled else None
+        openapi_url=settings.api.openapi_url if settings.api.docs_enabled else None,
+        default_response_class=ORJSONResponse if codec.ORJSON_AVAILABLE else JSONResponse
     )
 
-    # Initialize service container (legacy)
+    # Register services with the container (legacy); each is built on first use or during warm-up
     container.initialize(config)
 
     # Add enhanced middleware
@@ -75,6 +92,8 @@ def create_app(config: Optional[object] = None) -> FastAPI:
 
     # Add routes
     _configure_routes(app)
+    if settings.metrics_enabled:
+        _configure_metrics(app)
 
     # Set up error handlers
     setup_error_handlers(app)
@@ -82,6 +101,7 @@ def create_app(config: Optional[object] = None) -> FastAPI:
     # Add startup/shutdown events
     _configure_enhanced_events(app, settings)
 
+    startup_profiler.record_phase("create_app", (time.perf_counter() - started) * 1000)
     logger.info("Enhanced FastAPI application created successfully")
 
     return app
@@ -91,6 +111,7 @@ def _configure_enhanced_middleware(app: FastAPI, settings) -> None:
     """Configure enhanced application middleware"""
 
     # Add enhanced middleware stack (order matters!)
+    app.add_middleware(TracingMiddleware)
     app.add_middleware(CorrelationIdMiddleware)
     app.add_middleware(SecurityHeadersMiddleware)
     app.add_middleware(RequestValidationMiddleware)
@@ -102,6 +123,10 @@ def _configure_enhanced_middleware(app: FastAPI, settings) -> None:
     app.add_middleware(RequestLoggingMiddleware)
     app.add_middleware(EnhancedErrorHandlingMiddleware)
 
+    # Outside error handling so failed requests are timed with their final status
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+
     # Configure CORS with enhanced settings
     if settings.api.cors_enabled:
         app.add_middleware(
@@ -165,12 +190,21 @@ def _configure_routes(app: FastAPI) -> None:
     logger.info("Routes configured")
 
 
+def _configure_metrics(app: FastAPI) -> None:
+    """Expose Prometheus metrics at /metrics"""
+    from .routes import metrics
+
+    app.include_router(metrics.router)
+    logger.info("Metrics endpoint configured at /metrics")
+
+
 def _configure_enhanced_events(app: FastAPI, settings) -> None:
     """Configure enhanced startup and shutdown events"""
 
     @app.on_event("startup")
     async def enhanced_startup_event():
         """Enhanced application startup tasks"""
+        started = time.perf_counter()
         log_startup_info(
             settings.api.title,
             settings.api.host,
@@ -189,6 +223,10 @@ def _configure_enhanced_events(app: FastAPI, settings) -> None:
             else:
                 logger.warning("Redis cache not available - continuing without caching")
             
+            if settings.event_loop_watchdog_enabled:
+                event_loop_watchdog.threshold_ms = settings.event_loop_block_ms
+                event_loop_watchdog.start()
+
             # Initialize new service system
             await initialize_services()
             logger.info("Enhanced service system initialized")
@@ -217,6 +255,10 @@ def _configure_enhanced_events(app: FastAPI, settings) -> None:
             logger.error(f"Enhanced startup failed: {e}")
             # Continue with basic startup for backward compatibility
 
+        # Build the remaining services in the background; /api/health/ready reports 503 until done
+        app.state.warm_up_task = asyncio.create_task(container.warm_up())
+        startup_profiler.record_phase("startup", (time.perf_counter() - started) * 1000)
+
         logger.info("Enhanced application startup complete")
 
     @app.on_event("shutdown")
@@ -225,6 +267,14 @@ def _configure_enhanced_events(app: FastAPI, settings) -> None:
         logger.info("Enhanced application shutting down...")
 
         try:
+            warm_up_task = getattr(app.state, "warm_up_task", None)
+            if warm_up_task and not warm_up_task.done():
+                warm_up_task.cancel()
+
+            await event_loop_watchdog.stop()
+            if settings.is_development or settings.debug:
+                logger.info(event_loop_watchdog.format_report())
+
             # Cleanup Redis connection
             await cache_manager.disconnect()
             logger.info("Redis cache manager disconnected")
@@ -232,6 +282,9 @@ def _configure_enhanced_events(app: FastAPI, settings) -> None:
             # Cleanup new service system
             await cleanup_services()
             logger.info("Enhanced service system cleaned up")
+
+            # Write out traces still queued for the exporter
+            await asyncio.to_thread(tracer.shutdown)
         except Exception as e:
             logger.error(f"Service cleanup failed: {e}")
 
@@ -1,29 +1,64 @@
 """
 Dependency injection container for services
+Services are registered as providers and built on first use, so a worker
+does not import the heavy client libraries (LLM SDKs, reportlab, PyMuPDF,
+googlemaps) of every service before it can start; warm_up() builds them
+in the background after startup and then marks the worker ready.
 """
+import asyncio
+import importlib
+import inspect
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Any, Callable, Optional
 from functools import lru_cache
 
-from ...services.pdf_processor import PDFProcessor
-from ...services.llm_extractor import LLMExtractor
-from ...services.enhanced_guide_service import EnhancedGuideService
-from ...services.fast_guide_service import FastGuideService
-from ...services.optimized_guide_service import OptimizedGuideService
-from ...services.immediate_guide_generator import ImmediateGuideGenerator
-from ...services.cleanup_service import CleanupService
-from ...services.enhanced_database_service import EnhancedDatabaseService
-from ...services.luxury_guide_service import LuxuryGuideService
-from ...database import TripDatabase
+from ...core.startup_profiler import startup_profiler
 from ...utils.environment import load_project_env
 from ...utils.error_handling import ConfigurationError
 
+if TYPE_CHECKING:
+    from ...services.pdf_processor import PDFProcessor
+    from ...services.llm_extractor import LLMExtractor
+    from ...services.enhanced_guide_service import EnhancedGuideService
+    from ...services.fast_guide_service import FastGuideService
+    from ...services.optimized_guide_service import OptimizedGuideService
+    from ...services.immediate_guide_generator import ImmediateGuideGenerator
+    from ...services.cleanup_service import CleanupService
+    from ...services.enhanced_database_service import EnhancedDatabaseService
+    from ...database import TripDatabase
+
 # Load environment
 load_project_env()
 
 logger = logging.getLogger(__name__)
 
 
+class ServiceProvider:
+    """Builds one service; its module is imported on first use"""
+    __slots__ = ("module", "attr", "factory", "optional")
+
+    def __init__(
+        self,
+        module: str,
+        attr: str,
+        factory: Optional[Callable[[type], Any]] = None,
+        optional: bool = False
+    ):
+        self.module = module        # relative to this package
+        self.attr = attr
+        self.factory = factory      # cls -> instance, when the constructor needs arguments
+        self.optional = optional    # unavailable (None) instead of an error when construction fails
+
+    def load(self) -> type:
+        return getattr(importlib.import_module(self.module, __package__), self.attr)
+
+    def build(self) -> Any:
+        cls = self.load()
+        return self.factory(cls) if self.factory else cls()
+
+
 class ServiceContainer:
     """
     Dependency injection container for managing service instances
@@ -31,12 +66,15 @@ class ServiceContainer:
 
     def __init__(self):
         self._services: Dict[str, Any] = {}
+        self._providers: Dict[str, ServiceProvider] = {}
         self._initialized = False
         self._locked_services: set = set()
+        # Sync dependencies run on the threadpool, so two requests can ask for the same unbuilt service
+        self._build_lock = threading.RLock()
 
     def initialize(self, config: Any) -> None:
         """
-        Initialize all services with configuration
+        Register all services with configuration; nothing is imported or built yet
 
         Args:
             config: Application configuration object
@@ -44,46 +82,35 @@ class ServiceContainer:
         if self._initialized:
             return
 
-        try:
+        self._providers = {
             # Core services
-            self._services['pdf_processor'] = PDFProcessor()
-            self._services['llm_extractor'] = LLMExtractor()
-            self._services['enhanced_guide_service'] = EnhancedGuideService()
-            self._services['fast_guide_service'] = FastGuideService()
-            self._services['optimized_guide_service'] = OptimizedGuideService()
-            
-            # Optional services - only initialize if API keys are available
-            try:
-                self._services['immediate_guide_generator'] = ImmediateGuideGenerator()
-                logger.info("Immediate guide generator initialized")
-            except Exception as e:
-                logger.warning(f"Immediate guide generator not available: {e}")
-                self._services['immediate_guide_generator'] = None
-            
+            'pdf_processor': ServiceProvider('...services.pdf_processor', 'PDFProcessor'),
+            'llm_extractor': ServiceProvider('...services.llm_extractor', 'LLMExtractor'),
+            'enhanced_guide_service': ServiceProvider('...services.enhanced_guide_service', 'EnhancedGuideService'),
+            'fast_guide_service': ServiceProvider('...services.fast_guide_service', 'FastGuideService'),
+            'optimized_guide_service': ServiceProvider('...services.optimized_guide_service', 'OptimizedGuideService'),
+            # Optional services - only available if API keys are
+            'immediate_guide_generator': ServiceProvider(
+                '...services.immediate_guide_generator', 'ImmediateGuideGenerator', optional=True
+            ),
             # Use enhanced database service but keep legacy for compatibility
-            self._services['database_service'] = EnhancedDatabaseService()
-            # Lock the database service to prevent override
-            self._locked_services = {'database_service'}
-            self._services['trip_database'] = TripDatabase()
-            self._services['luxury_guide_service'] = LuxuryGuideService()
-
+            'database_service': ServiceProvider('...services.enhanced_database_service', 'EnhancedDatabaseService'),
+            'trip_database': ServiceProvider('...database', 'TripDatabase'),
+            'luxury_guide_service': ServiceProvider('...services.luxury_guide_service', 'LuxuryGuideService'),
             # Cleanup service with configuration
-            self._services['cleanup_service'] = CleanupService(
-                uploads_dir=config.UPLOAD_DIR,
-                outputs_dir=config.OUTPUT_DIR,
-                ttl_hours=24
-            )
-
-            self._initialized = True
-            logger.info("Service container initialized successfully")
-
-        except Exception as e:
-            logger.error(f"Failed to initialize service container: {e}")
-            raise ConfigurationError(f"Service initialization failed: {e}")
+            'cleanup_service': ServiceProvider(
+                '...services.cleanup_service', 'CleanupService',
+                lambda cls: cls(uploads_dir=config.UPLOAD_DIR, outputs_dir=config.OUTPUT_DIR, ttl_hours=24)
+            ),
+        }
+        # Lock the database service to prevent override
+        self._locked_services = {'database_service'}
+        self._initialized = True
+        logger.info(f"Service container initialized with {len(self._providers)} lazy services")
 
     def get_service(self, service_name: str) -> Any:
         """
-        Get service instance by name
+        Get service instance by name, building it on first use
 
         Args:
             service_name: Name of the service
@@ -92,16 +119,38 @@ class ServiceContainer:
             Service instance
 
         Raises:
-            ConfigurationError: If service not found or container not initialized
+            ConfigurationError: If service not found, fails to build or container not initialized
         """
         if not self._initialized:
             raise ConfigurationError("Service container not initialized")
 
-        if service_name not in self._services:
+        if service_name in self._services:
+            return self._services[service_name]
+
+        if service_name not in self._providers:
             raise ConfigurationError(f"Service not found: {service_name}")
 
+        with self._build_lock:
+            if service_name not in self._services:
+                self._services[service_name] = self._build(service_name)
         return self._services[service_name]
 
+    def _build(self, service_name: str) -> Any:
+        provider = self._providers[service_name]
+        started = time.perf_counter()
+        try:
+            service = provider.build()
+        except Exception as e:
+            startup_profiler.record_service(service_name, (time.perf_counter() - started) * 1000, str(e))
+            if provider.optional:
+                logger.warning(f"{provider.attr} not available: {e}")
+                return None
+            logger.error(f"Failed to initialize {service_name}: {e}")
+            raise ConfigurationError(f"Service initialization failed: {service_name}: {e}")
+        startup_profiler.record_service(service_name, (time.perf_counter() - started) * 1000)
+        logger.info(f"{provider.attr} initialized")
+        return service
+
     def set_service(self, service_name: str, service: Any) -> None:
         """Set a service (with lock protection)"""
         if service_name in self._locked_services:
@@ -109,46 +158,78 @@ class ServiceContainer:
             return
         self._services[service_name] = service
 
-    def get_pdf_processor(self) -> PDFProcessor:
+    async def warm_up(self) -> bool:
+        """
+        Build every service not built yet and run its async initialize(),
+        then mark the worker ready. Module imports run on the default
+        executor so the loop keeps serving meanwhile; constructors run on
+        the loop, as some of them create loop-bound clients. Returns False
+        (and the worker stays unready) if a required service failed.
+        """
+        loop = asyncio.get_running_loop()
+        failed = []
+        with startup_profiler.phase("warm_up"):
+            for service_name, provider in self._providers.items():
+                if service_name not in self._services:
+                    try:
+                        await loop.run_in_executor(None, provider.load)
+                    except Exception:
+                        pass  # reported by get_service() below
+                try:
+                    service = self.get_service(service_name)
+                    initialize = getattr(service, "initialize", None)
+                    if inspect.iscoroutinefunction(initialize):
+                        await initialize()
+                except Exception as e:
+                    logger.error(f"Warm-up failed for {service_name}: {e}")
+                    failed.append(service_name)
+        if failed:
+            logger.error(f"Worker not ready, services failed to warm up: {', '.join(failed)}")
+            return False
+        startup_profiler.mark_ready()
+        return True
+
+    def get_pdf_processor(self) -> "PDFProcessor":
         """Get PDF processor service"""
         return self.get_service('pdf_processor')
 
-    def get_llm_extractor(self) -> LLMExtractor:
+    def get_llm_extractor(self) -> "LLMExtractor":
         """Get LLM extractor service"""
         return self.get_service('llm_extractor')
 
-    def get_enhanced_guide_service(self) -> EnhancedGuideService:
+    def get_enhanced_guide_service(self) -> "EnhancedGuideService":
         """Get enhanced guide service"""
         return self.get_service('enhanced_guide_service')
 
-    def get_fast_guide_service(self) -> FastGuideService:
+    def get_fast_guide_service(self) -> "FastGuideService":
         """Get fast guide service"""
         return self.get_service('fast_guide_service')
 
-    def get_optimized_guide_service(self) -> OptimizedGuideService:
+    def get_optimized_guide_service(self) -> "OptimizedGuideService":
         """Get optimized guide service"""
         return self.get_service('optimized_guide_service')
 
-    def get_immediate_guide_generator(self) -> ImmediateGuideGenerator:
+    def get_immediate_guide_generator(self) -> "ImmediateGuideGenerator":
         """Get immediate guide generator"""
         return self.get_service('immediate_guide_generator')
 
-    def get_cleanup_service(self) -> CleanupService:
+    def get_cleanup_service(self) -> "CleanupService":
         """Get cleanup service"""
         return self.get_service('cleanup_service')
 
-    def get_database_service(self):
+    def get_database_service(self) -> "EnhancedDatabaseService":
         """Get database service"""
+        from ...services.enhanced_database_service import EnhancedDatabaseService
+
         service = self.get_service('database_service')
-        # Ensure we're getting the correct DatabaseService instance
-        from ...services.database_service import DatabaseService
-        if not isinstance(service, DatabaseService):
-            logger.error(f"Database service type mismatch: expected DatabaseService, got {type(service)}")
+        # Ensure we're getting the correct EnhancedDatabaseService instance
+        if not isinstance(service, EnhancedDatabaseService):
+            logger.error(f"Database service type mismatch: expected EnhancedDatabaseService, got {type(service)}")
             # Force return the correct service
             return self._services['database_service']
         return service
 
-    def get_trip_database(self) -> TripDatabase:
+    def get_trip_database(self) -> "TripDatabase":
         """Get trip database"""
         return self.get_service('trip_database')
 
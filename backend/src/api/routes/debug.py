@@ -2,7 +2,9 @@
 Debug route for testing service injection
 """
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from ..dependencies.services import DatabaseServiceDep
+from ...core.event_loop import event_loop_watchdog
 
 router = APIRouter(prefix="/api", tags=["debug"])
 
@@ -16,3 +18,10 @@ async def debug_database_service(database_service: DatabaseServiceDep):
         "methods": [attr for attr in dir(database_service) if not attr.startswith('_')],
         "save_methods": [attr for attr in dir(database_service) if 'save' in attr.lower()]
     }
+
+@router.get("/debug/blocking-calls")
+async def debug_blocking_calls(limit: int = 20, format: str = "json"):
+    """Blocking call sites with the stack captured while the loop was blocked"""
+    if format == "text":
+        return PlainTextResponse(event_loop_watchdog.format_report(limit))
+    return event_loop_watchdog.report(limit=limit, include_stacks=True)
@@ -17,10 +17,16 @@ from ..dependencies.services import (
     OptimizedGuideServiceDep,
     LuxuryGuideServiceDep
 )
-from ...services.magazine_pdf_service import MagazinePDFService
+from ...models.database_models import ProcessingStatus
 from ...utils.validation import validate_trip_id
 from ...utils.error_handling import create_error_response, safe_execute
 from ...services.enhanced_redis_cache import cache_manager
+from ...services.guide_sections import (
+    IncrementalGuideRegenerator,
+    merge_sections,
+    section_inputs,
+    stamp_sections
+)
 
 logger = logging.getLogger(__name__)
 
@@ -66,7 +72,7 @@ async def get_enhanced_guide(
             return cached_guide
         
         # Get trip data from database
-        trip_data = await database_service.get_trip_data(validated_trip_id)
+        trip_data = await database_service.get_trip_data(validated_trip_id, sections=("enhanced_guide",))
         
         if not trip_data:
             raise HTTPException(
@@ -151,7 +157,7 @@ async def generate_enhanced_guide(
                 preferences=request.preferences,
                 extracted_data=request.extracted_data,
                 progress_callback=lambda progress, message:
-                    database_service.update_processing_state(trip_id, message, progress)
+                    database_service.update_processing_state(trip_id, message=message, progress=progress)
             )
         elif request.use_fast_generation:
             # Fast generation (10-20 seconds)
@@ -162,7 +168,7 @@ async def generate_enhanced_guide(
                 hotel_info=request.hotel_info,
                 preferences=request.preferences,
                 progress_callback=lambda progress, message:
-                    database_service.update_processing_state(trip_id, message, progress),
+                    database_service.update_processing_state(trip_id, message=message, progress=progress),
                 timeout=45
             )
         else:
@@ -175,14 +181,14 @@ async def generate_enhanced_guide(
                 preferences=request.preferences,
                 extracted_data=request.extracted_data,
                 progress_callback=lambda progress, message:
-                    database_service.update_processing_state(trip_id, message, progress),
+                    database_service.update_processing_state(trip_id, message=message, progress=progress),
                 single_pass=True
             )
         
         # Check for errors
         if guide.get("error"):
             await database_service.update_processing_state(
-                trip_id, f"Generation failed: {guide['error']}"
+                trip_id, status=ProcessingStatus.ERROR, message=f"Generation failed: {guide['error']}"
             )
             return {
                 "trip_id": trip_id,
@@ -191,6 +197,11 @@ async def generate_enhanced_guide(
                 "message": guide.get("message", "Guide generation failed")
             }
         
+        # Record section inputs so a later regeneration can be incremental
+        stamp_sections(guide, section_inputs(
+            request.destination, request.start_date, request.end_date, request.hotel_info, request.preferences
+        ))
+
         # QUALITY TEST: Log guide data for analysis before saving
         logger.info("=== GUIDE QUALITY ANALYSIS ===")
         
@@ -244,7 +255,12 @@ async def generate_enhanced_guide(
         #     logger.error(f"Failed to save guide: {save_result.error}")
         #     raise HTTPException(status_code=500, detail=f"Failed to save guide: {save_result.error}")
         # logger.info(f"Enhanced guide saved successfully for trip {trip_id}")
-        await database_service.update_processing_state(trip_id, "Guide generation complete", 100)
+        await database_service.update_processing_state(
+            trip_id,
+            status=ProcessingStatus.COMPLETED,
+            message="Guide generation complete",
+            progress=100
+        )
         
         return {
             "trip_id": trip_id,
@@ -258,7 +274,7 @@ async def generate_enhanced_guide(
     except Exception as e:
         logger.error(f"Enhanced guide generation failed for trip {trip_id}: {e}")
         await database_service.update_processing_state(
-            trip_id, f"Generation failed: {str(e)}"
+            trip_id, status=ProcessingStatus.ERROR, message=f"Generation failed: {str(e)}"
         )
         
         raise HTTPException(
@@ -274,10 +290,13 @@ async def regenerate_enhanced_guide(
     database_service: DatabaseServiceDep,
     enhanced_guide_service: EnhancedGuideServiceDep,
     fast_guide_service: FastGuideServiceDep,
-    use_fast: bool = True
+    use_fast: bool = True,
+    full_refresh: bool = False
 ) -> Dict[str, Any]:
     """
-    Regenerate enhanced guide for existing trip
+    Regenerate enhanced guide for existing trip. Fast guides with section
+    metadata are refreshed incrementally: only sections whose inputs changed
+    or expired are refetched and merged into the stored guide.
     
     Args:
         trip_id: Trip ID to regenerate guide for
@@ -286,6 +305,7 @@ async def regenerate_enhanced_guide(
         enhanced_guide_service: Enhanced guide service
         fast_guide_service: Fast guide service
         use_fast: Whether to use fast generation
+        full_refresh: Rerun the whole pipeline even if sections are fresh
         
     Returns:
         Regenerated guide or processing status
@@ -295,7 +315,7 @@ async def regenerate_enhanced_guide(
         logger.info(f"Guide regeneration requested", extra={"trip_id": validated_trip_id})
         
         # Get existing trip data
-        trip_data = await database_service.get_trip_data(validated_trip_id)
+        trip_data = await database_service.get_trip_data(validated_trip_id, sections=("itinerary", "preferences", "enhanced_guide"))
         
         if not trip_data:
             raise HTTPException(
@@ -352,9 +372,45 @@ async def regenerate_enhanced_guide(
         
         # Update processing state
         await database_service.update_processing_state(
-            validated_trip_id, "Regenerating enhanced guide..."
+            validated_trip_id, message="Regenerating enhanced guide..."
         )
         
+        stored_guide = trip_data.enhanced_guide or {}
+        inputs = section_inputs(destination, start_date, end_date, hotel_info, preferences)
+
+        # Incremental path: refetch only stale sections
+        if use_fast and not full_refresh and stored_guide.get("section_meta"):
+            regenerator = IncrementalGuideRegenerator(fast_guide_service)
+            updates, refreshed = await regenerator.regenerate(
+                stored_guide, destination, start_date, end_date, hotel_info, preferences
+            )
+            if refreshed:
+                save_result = await database_service.save_enhanced_guide_data(
+                    validated_trip_id, updates, merge=True
+                )
+                if not save_result.success:
+                    logger.error(f"Failed to save updated guide sections: {save_result.error}")
+                    raise HTTPException(status_code=500, detail=f"Failed to save updated guide: {save_result.error}")
+                await cache_manager.delete("enhanced_guide", {"trip_id": validated_trip_id})
+            logger.info(f"Guide sections refreshed for trip {validated_trip_id}: {refreshed or 'none'}")
+            await database_service.update_processing_state(
+                validated_trip_id,
+                status=ProcessingStatus.COMPLETED,
+                message="Guide regeneration complete",
+                progress=100
+            )
+
+            guide = merge_sections(stored_guide, updates)
+            return {
+                "trip_id": validated_trip_id,
+                "status": "success",
+                "message": "Enhanced guide regenerated successfully" if refreshed else "Enhanced guide is up to date",
+                "guide": guide,
+                "refreshed_sections": refreshed,
+                "generation_time": guide.get("generation_time"),
+                "validation_passed": guide.get("validation_passed", False)
+            }
+
         # Generate new guide
         if use_fast:
             guide = await fast_guide_service.generate_fast_guide(
@@ -364,7 +420,7 @@ async def regenerate_enhanced_guide(
                 hotel_info=hotel_info,
                 preferences=preferences,
                 progress_callback=lambda progress, message: 
-                    database_service.update_processing_state(validated_trip_id, message, progress),
+                    database_service.update_processing_state(validated_trip_id, message=message, progress=progress),
                 timeout=45
             )
         else:
@@ -376,14 +432,14 @@ async def regenerate_enhanced_guide(
                 preferences=preferences,
                 extracted_data=extracted_data,
                 progress_callback=lambda progress, message: 
-                    database_service.update_processing_state(validated_trip_id, message, progress),
+                    database_service.update_processing_state(validated_trip_id, message=message, progress=progress),
                 single_pass=True
             )
         
         # Check for errors
         if guide.get("error"):
             await database_service.update_processing_state(
-                validated_trip_id, f"Regeneration failed: {guide['error']}"
+                validated_trip_id, status=ProcessingStatus.ERROR, message=f"Regeneration failed: {guide['error']}"
             )
             return {
                 "trip_id": validated_trip_id,
@@ -392,6 +448,9 @@ async def regenerate_enhanced_guide(
                 "message": guide.get("message", "Guide regeneration failed")
             }
         
+        # Record section inputs so the next regeneration can be incremental
+        stamp_sections(guide, inputs)
+
         # Save updated guide - using direct method to avoid runtime loading issue
         # Save guide - using new method to avoid caching issues
         logger.info("Saving updated enhanced guide data using new method")
@@ -400,7 +459,12 @@ async def regenerate_enhanced_guide(
             logger.error(f"Failed to save updated guide: {save_result.error}")
             raise HTTPException(status_code=500, detail=f"Failed to save updated guide: {save_result.error}")
         logger.info(f"Enhanced guide updated successfully for trip {validated_trip_id}")
-        await database_service.update_processing_state(validated_trip_id, "Guide regeneration complete", 100)
+        await database_service.update_processing_state(
+            validated_trip_id,
+            status=ProcessingStatus.COMPLETED,
+            message="Guide regeneration complete",
+            progress=100
+        )
         
         return {
             "trip_id": validated_trip_id,
@@ -416,7 +480,7 @@ async def regenerate_enhanced_guide(
     except Exception as e:
         logger.error(f"Enhanced guide regeneration failed for trip {trip_id}: {e}")
         await database_service.update_processing_state(
-            trip_id, f"Regeneration failed: {str(e)}"
+            trip_id, status=ProcessingStatus.ERROR, message=f"Regeneration failed: {str(e)}"
         )
         
         raise HTTPException(
@@ -450,7 +514,7 @@ async def generate_luxury_guide(
         logger.info(f"Luxury guide generation requested", extra={"trip_id": validated_trip_id})
         
         # Get trip data
-        trip_data = await database_service.get_trip_data(validated_trip_id)
+        trip_data = await database_service.get_trip_data(validated_trip_id, sections=("itinerary", "preferences"))
         
         if not trip_data:
             raise HTTPException(
@@ -507,7 +571,7 @@ async def generate_luxury_guide(
         
         # Update processing state
         await database_service.update_processing_state(
-            validated_trip_id, "Creating your luxury travel experience..."
+            validated_trip_id, message="Creating your luxury travel experience..."
         )
         
         # Generate luxury guide
@@ -519,9 +583,13 @@ async def generate_luxury_guide(
             preferences=preferences,
             extracted_data=extracted_data,
             progress_callback=lambda progress, message: 
-                database_service.update_processing_state(validated_trip_id, message, progress)
+                database_service.update_processing_state(validated_trip_id, message=message, progress=progress)
         )
         
+        # Record section inputs so a later regeneration can be incremental
+        if not guide.get("error"):
+            stamp_sections(guide, section_inputs(destination, start_date, end_date, hotel_info, preferences))
+
         # Save guide - using new method to avoid caching issues
         logger.info("Saving luxury enhanced guide data using new method")
         save_result = await database_service.save_enhanced_guide_data(validated_trip_id, guide)
@@ -529,7 +597,12 @@ async def generate_luxury_guide(
             logger.error(f"Failed to save luxury guide: {save_result.error}")
             raise HTTPException(status_code=500, detail=f"Failed to save luxury guide: {save_result.error}")
         logger.info(f"Luxury enhanced guide saved successfully for trip {validated_trip_id}")
-        await database_service.update_processing_state(validated_trip_id, "Luxury guide complete", 100)
+        await database_service.update_processing_state(
+            validated_trip_id,
+            status=ProcessingStatus.COMPLETED,
+            message="Luxury guide complete",
+            progress=100
+        )
         
         return {
             "trip_id": validated_trip_id,
@@ -579,6 +652,8 @@ async def generate_magazine_pdf(
             )
         
         # Generate PDF
+        from ...services.magazine_pdf_service import MagazinePDFService  # reportlab, loaded on first PDF
+
         pdf_service = MagazinePDFService()
         output_path = f"output/travel_pack_{validated_trip_id}.pdf"
         
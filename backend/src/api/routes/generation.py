@@ -17,6 +17,7 @@ from ...models.database_models import ProcessingStatus
 from ...utils.error_handling import safe_execute, create_error_response
 from ...utils.trip_data_extractor import extract_trip_info, extract_hotel_info
 from ...services.enhanced_redis_cache import cache_manager
+from ...services.guide_sections import section_inputs, stamp_sections
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +43,7 @@ async def get_generation_status(
     
     try:
         # Get trip data to check if guide exists
-        trip_data = await database_service.get_trip_data(trip_id)
+        trip_data = await database_service.get_trip_data(trip_id, sections=("enhanced_guide",))
         
         if not trip_data:
             logger.warning(f"Trip not found: {trip_id}")
@@ -69,12 +70,16 @@ async def get_generation_status(
             if hasattr(status_value, 'value'):
                 status_value = status_value.value
                 
-            return {
+            response = {
                 "status": status_value,
                 "message": processing_state.message or "Processing...",
                 "progress": processing_state.progress or 0,
                 "has_guide": False
             }
+            # Items streamed in so far, so the client can render them early
+            if getattr(processing_state, "partial_results", None):
+                response["partial_results"] = processing_state.partial_results
+            return response
         
         # No generation started yet
         return {
@@ -95,6 +100,33 @@ async def get_generation_status(
 # SSE streaming route removed to prevent screen refresh issues
 
 
+# Streamed items are written to the processing state in steps of this many
+PARTIAL_RESULTS_STEP = 5
+
+
+def partial_results_publisher(database_service, trip_id: str):
+    """
+    Item callback that accumulates streamed guide items per section and
+    saves them on the processing state, on each section's first item and
+    then every PARTIAL_RESULTS_STEP items, for generation-status polling
+    """
+    partial: Dict[str, list] = {}
+
+    async def publish(section: str, item: Dict[str, Any]) -> None:
+        items = partial.setdefault(section, [])
+        items.append(item)
+        if len(items) != 1 and len(items) % PARTIAL_RESULTS_STEP:
+            return
+        found = ", ".join(f"{len(v)} {k.replace('_', ' ')}" for k, v in partial.items())
+        await database_service.update_processing_state(
+            trip_id,
+            message=f"Found {found}...",
+            partial_results=partial
+        )
+
+    return publish
+
+
 @router.post("/generate-guide/{trip_id}")
 async def generate_guide(
     trip_id: str,
@@ -116,7 +148,7 @@ async def generate_guide(
     
     try:
         # Get trip data
-        trip_data = await database_service.get_trip_data(trip_id)
+        trip_data = await database_service.get_trip_data(trip_id, sections=("itinerary", "preferences"))
         
         if not trip_data:
             raise HTTPException(
@@ -145,16 +177,22 @@ async def generate_guide(
         # Get hotel info with smart defaults
         hotel_info = extract_hotel_info(itinerary, destination)
         
-        # Generate the guide
+        # Generate the guide, publishing streamed items as they arrive
+        preferences = trip_data.preferences or {}
         enhanced_guide = await guide_service.generate_optimized_guide(
             destination=destination,
             start_date=start_date,
             end_date=end_date,
             hotel_info=hotel_info,
-            preferences=trip_data.preferences or {},
-            extracted_data=itinerary
+            preferences=preferences,
+            extracted_data=itinerary,
+            item_callback=partial_results_publisher(database_service, trip_id)
         )
         
+        # Record section inputs so a later regeneration can be incremental
+        if not enhanced_guide.get("error"):
+            stamp_sections(enhanced_guide, section_inputs(destination, start_date, end_date, hotel_info, preferences))
+
         # Save the guide
         trip_data.enhanced_guide = enhanced_guide
         await database_service.save_trip_data(trip_data)
@@ -6,8 +6,12 @@ import logging
 from typing import Any, Dict
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
+from ...core.event_loop import event_loop_watchdog
+from ...core.startup_profiler import process_uptime_ms, startup_profiler
 from ...services.enhanced_redis_cache import cache_manager
+from ...services.llm_cache import llm_response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -48,5 +52,32 @@ async def health_secrets() -> Dict[str, Any]:
             "total_keys": cache_stats.get("total_keys"),
             "hit_rate": cache_stats.get("hit_rate"),
             "namespaces": cache_stats.get("namespaces", {}),
-        }
+        },
+        "llm_cache": llm_response_cache.get_stats()
     }
+
+
+@router.get("/health/event-loop")
+async def health_event_loop(limit: int = 10) -> Dict[str, Any]:
+    """
+    Event loop lag percentiles and the call sites that blocked it longest.
+    """
+    return event_loop_watchdog.report(limit=limit)
+
+
+@router.get("/health/ready")
+async def health_ready():
+    """
+    Readiness probe: 503 until service warm-up has completed, then 200.
+    """
+    body = {"ready": startup_profiler.ready, "uptime_ms": round(process_uptime_ms() or 0.0, 1)}
+    return JSONResponse(body, status_code=200 if startup_profiler.ready else 503)
+
+
+@router.get("/health/startup")
+async def health_startup(limit: int = 20) -> Dict[str, Any]:
+    """
+    Cold start profile: startup phases, construction time per service and,
+    with STARTUP_PROFILE=1, the slowest module imports.
+    """
+    return startup_profiler.report(limit=limit)
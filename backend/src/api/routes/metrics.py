@@ -0,0 +1,75 @@
+"""
+Prometheus metrics endpoint
+Scrapeable /metrics exposition of request, upstream, cache, event-loop and
+job metrics. Enabled with METRICS_ENABLED.
+"""
+import logging
+from typing import Dict, Iterable, Mapping
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ...core.event_loop import event_loop_watchdog
+from ...core.metrics import MetricType
+from ...core.performance import performance_optimizer
+from ...core.prometheus import prometheus_exporter, MetricFamily, CONTENT_TYPE
+from ...services.enhanced_redis_cache import cache_manager
+from ...services.guide_engine import guide_engine
+from ...services.llm_cache import llm_response_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["metrics"])
+
+
+def _cache_counts() -> Dict[str, Mapping[str, Mapping[str, float]]]:
+    """Hits and misses by cache, then namespace"""
+    memory = performance_optimizer.memory_cache.metrics
+    return {
+        "redis": cache_manager.namespace_stats,
+        "llm": {
+            # Coalesced requests were answered without an upstream call
+            namespace: {"hits": c.get("hits", 0) + c.get("coalesced", 0), "misses": c.get("misses", 0)}
+            for namespace, c in llm_response_cache.stats.items()
+        },
+        "guide_stage": {
+            namespace: {"hits": c.get("hits", 0) + c.get("coalesced", 0), "misses": c.get("misses", 0)}
+            for namespace, c in guide_engine.stats.items()
+        },
+        "memory": {"default": {"hits": memory.cache_hits, "misses": memory.cache_misses}},
+    }
+
+
+def collect_cache_metrics() -> Iterable[MetricFamily]:
+    requests = MetricFamily("cache.requests", MetricType.COUNTER, "Cache lookups by cache, namespace and result")
+    ratios = MetricFamily("cache.hit_ratio", MetricType.GAUGE, "Share of cache lookups served from the cache")
+    for cache, namespaces in _cache_counts().items():
+        for namespace, counters in namespaces.items():
+            hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+            requests.add(hits, cache=cache, namespace=namespace, result="hit")
+            requests.add(misses, cache=cache, namespace=namespace, result="miss")
+            if hits + misses:
+                ratios.add(hits / (hits + misses), cache=cache, namespace=namespace)
+    return [requests, ratios]
+
+
+def collect_blocking_calls() -> Iterable[MetricFamily]:
+    """Top blocking call sites; bounded so the site label stays low-cardinality"""
+    episodes = MetricFamily("event_loop.blocking_calls", MetricType.COUNTER, "Event loop blocking episodes by call site")
+    blocked = MetricFamily(
+        "event_loop.blocked_seconds", MetricType.COUNTER, "Time the event loop spent blocked, by call site"
+    )
+    for site in event_loop_watchdog.offenders(limit=20):
+        episodes.add(site.count, site=site.site)
+        blocked.add(site.total_ms / 1000, site=site.site)
+    return [episodes, blocked]
+
+
+prometheus_exporter.register_collector(collect_cache_metrics)
+prometheus_exporter.register_collector(collect_blocking_calls)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus text exposition of all registered metrics"""
+    return Response(prometheus_exporter.render(), media_type=CONTENT_TYPE)
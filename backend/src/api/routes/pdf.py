@@ -12,8 +12,8 @@ from ..dependencies.services import (
     DatabaseServiceDep,
     OptimizedGuideServiceDep
 )
-from ...services.pdf_generator import TravelPackGenerator
 from ...utils.error_handling import create_error_response
+from ...services.guide_sections import section_inputs, stamp_sections
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +32,7 @@ async def generate_pdf_for_trip(
     """
     try:
         # Fetch trip data
-        trip_data = await database_service.get_trip_data(trip_id)
+        trip_data = await database_service.get_trip_data(trip_id, sections=("itinerary", "preferences", "recommendations", "enhanced_guide"))
         if not trip_data:
             raise HTTPException(status_code=404, detail=f"Trip not found: {trip_id}")
 
@@ -55,14 +55,17 @@ async def generate_pdf_for_trip(
                     "address": h.get("address") or ""
                 }
 
+            preferences = trip_data.preferences or {}
             enhanced = await guide_service.generate_optimized_guide(
                 destination=destination,
                 start_date=start_date,
                 end_date=end_date,
                 hotel_info=hotel_info,
-                preferences=trip_data.preferences or {},
+                preferences=preferences,
                 extracted_data=itinerary
             )
+            if not enhanced.get("error"):
+                stamp_sections(enhanced, section_inputs(destination, start_date, end_date, hotel_info, preferences))
             trip_data.enhanced_guide = enhanced
             await database_service.save_trip_data(trip_data)
 
@@ -86,6 +89,8 @@ async def generate_pdf_for_trip(
         recommendations: Dict[str, Any] = trip_data.recommendations or {}
 
         # Generate PDF (ReportLab engine). For HTML-based engine use /api/generate-pdf-html
+        from ...services.pdf_generator import TravelPackGenerator  # reportlab, loaded on first PDF
+
         generator = TravelPackGenerator()
         pdf_path = await generator.generate(
             trip_id=trip_id,
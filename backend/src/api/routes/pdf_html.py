@@ -12,8 +12,8 @@ from ..dependencies.services import (
     DatabaseServiceDep,
     OptimizedGuideServiceDep
 )
-from ...services.html_pdf_renderer import HTMLPDFRenderer
 from ...utils.error_handling import create_error_response
+from ...services.guide_sections import section_inputs, stamp_sections
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +27,7 @@ async def generate_pdf_html(
     guide_service: OptimizedGuideServiceDep = None,
 ) -> Any:
     try:
-        trip_data = await database_service.get_trip_data(trip_id)
+        trip_data = await database_service.get_trip_data(trip_id, sections=("itinerary", "preferences", "enhanced_guide"))
         if not trip_data:
             raise HTTPException(status_code=404, detail=f"Trip not found: {trip_id}")
 
@@ -48,14 +48,17 @@ async def generate_pdf_html(
                     "address": h.get("address") or ""
                 }
 
+            preferences = trip_data.preferences or {}
             enhanced = await guide_service.generate_optimized_guide(
                 destination=destination,
                 start_date=start_date,
                 end_date=end_date,
                 hotel_info=hotel_info,
-                preferences=trip_data.preferences or {},
+                preferences=preferences,
                 extracted_data=itinerary
             )
+            if not enhanced.get("error"):
+                stamp_sections(enhanced, section_inputs(destination, start_date, end_date, hotel_info, preferences))
             trip_data.enhanced_guide = enhanced
             await database_service.save_trip_data(trip_data)
 
@@ -75,6 +78,8 @@ async def generate_pdf_html(
         output_dir.mkdir(exist_ok=True)
         pdf_path = output_dir / f"travel_pack_{trip_id}_magazine.pdf"
 
+        from ...services.html_pdf_renderer import HTMLPDFRenderer  # jinja2, loaded on first PDF
+
         renderer = HTMLPDFRenderer()
         try:
             out = renderer.render_magazine_pdf(guide=trip_data.enhanced_guide, itinerary=itinerary, output_path=pdf_path)
@@ -8,6 +8,8 @@ from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 import logging
 
+from ...core.upstream_metrics import upstream_call
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -30,8 +32,9 @@ async def get_place_photo(
         
         # Fetch the photo from Google Places API
         async with httpx.AsyncClient() as client:
-            response = await client.get(photo_url)
-            response.raise_for_status()
+            with upstream_call("google_places"):
+                response = await client.get(photo_url)
+                response.raise_for_status()
             
             # Return the image as a streaming response
             return StreamingResponse(
@@ -74,8 +77,9 @@ async def get_static_map(
         
         # Fetch the map from Google Static Maps API
         async with httpx.AsyncClient() as client:
-            response = await client.get(map_url)
-            response.raise_for_status()
+            with upstream_call("google_places"):
+                response = await client.get(map_url)
+                response.raise_for_status()
             
             # Return the image as a streaming response
             return StreamingResponse(
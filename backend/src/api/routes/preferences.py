@@ -35,7 +35,7 @@ async def save_preferences(
     
     try:
         # Get existing trip data
-        trip_data = await database_service.get_trip_data(trip_id)
+        trip_data = await database_service.get_trip_data(trip_id, sections=("preferences",))
         
         if not trip_data:
             # Create new trip data if it doesn't exist
@@ -88,7 +88,7 @@ async def get_preferences(
     logger.info(f"Getting preferences for trip {trip_id}")
     
     try:
-        trip_data = await database_service.get_trip_data(trip_id)
+        trip_data = await database_service.get_trip_data(trip_id, sections=("preferences", "itinerary", "enhanced_guide"))
         
         if not trip_data:
             logger.warning(f"Trip not found: {trip_id}")
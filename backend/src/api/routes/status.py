@@ -46,7 +46,7 @@ async def get_processing_status(
             )
 
         # Get trip data if available
-        trip_data = await database_service.get_trip_data(validated_trip_id)
+        trip_data = await database_service.get_trip_data(validated_trip_id, sections=("extracted_data", "itinerary", "recommendations", "enhanced_guide"))
 
         # Handle status as either enum or string
         status_value = processing_state.status
@@ -39,6 +39,14 @@ class DatabaseConfig(BaseSettings):
     cache_enabled: bool = Field(default=True, env="DB_CACHE_ENABLED")
     cache_size: int = Field(default=1000, env="DB_CACHE_SIZE")
     cache_ttl_seconds: int = Field(default=300, env="DB_CACHE_TTL_SECONDS")
+    trip_cache_bytes: int = Field(default=64 * 1024 * 1024, env="DB_TRIP_CACHE_BYTES")
+    metadata_cache_size: int = Field(default=10000, env="DB_METADATA_CACHE_SIZE")
+    processing_flush_ms: int = Field(default=250, env="DB_PROCESSING_FLUSH_MS")
+    compress_min_bytes: int = Field(default=64 * 1024, env="DB_COMPRESS_MIN_BYTES")  # 0 disables
+    
+    # Durability: fsync off, on every commit ("always") or per group commit window
+    fsync: str = Field(default="group", env="DB_FSYNC")
+    group_commit_ms: float = Field(default=2.0, env="DB_GROUP_COMMIT_MS")
     
     @validator('type')
     def validate_db_type(cls, v):
@@ -48,6 +56,14 @@ class DatabaseConfig(BaseSettings):
             raise ValueError(f'Database type must be one of: {valid_types}')
         return v
     
+    @validator('fsync')
+    def validate_fsync(cls, v):
+        """Validate fsync mode"""
+        valid_modes = ['off', 'always', 'group']
+        if v not in valid_modes:
+            raise ValueError(f'fsync must be one of: {valid_modes}')
+        return v
+    
     def get_database_path(self) -> Path:
         """Get database directory path"""
         return Path(self.path).resolve()
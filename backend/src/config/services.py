@@ -34,6 +34,22 @@ class ServicesConfig(BaseSettings):
     perplexity_temperature: float = Field(default=0.2, env="PERPLEXITY_TEMPERATURE")
     perplexity_timeout: int = Field(default=60, env="PERPLEXITY_TIMEOUT")
     
+    # xAI Configuration (OpenAI-compatible API)
+    xai_enabled: bool = Field(default=True, env="XAI_ENABLED")
+    xai_api_key: Optional[str] = Field(default=None, env="XAI_API_KEY")
+    xai_model: str = Field(default="grok-beta", env="XAI_MODEL")
+    xai_max_tokens: int = Field(default=2048, env="XAI_MAX_TOKENS")
+    xai_temperature: float = Field(default=0.2, env="XAI_TEMPERATURE")
+    xai_timeout: int = Field(default=60, env="XAI_TIMEOUT")
+    
+    # SambaNova Configuration (OpenAI-compatible API)
+    sambanova_enabled: bool = Field(default=True, env="SAMBANOVA_ENABLED")
+    sambanova_api_key: Optional[str] = Field(default=None, env="SAMBANOVA_API_KEY")
+    sambanova_model: str = Field(default="Meta-Llama-3.1-8B-Instruct", env="SAMBANOVA_MODEL")
+    sambanova_max_tokens: int = Field(default=2048, env="SAMBANOVA_MAX_TOKENS")
+    sambanova_temperature: float = Field(default=0.1, env="SAMBANOVA_TEMPERATURE")
+    sambanova_timeout: int = Field(default=60, env="SAMBANOVA_TIMEOUT")
+    
     # Google Places Configuration
     google_places_enabled: bool = Field(default=True, env="GOOGLE_PLACES_ENABLED")
     google_places_api_key: Optional[str] = Field(default=None, env="GOOGLE_PLACES_API_KEY")
@@ -78,7 +94,7 @@ class ServicesConfig(BaseSettings):
     retry_delay_seconds: float = Field(default=1.0, env="RETRY_DELAY_SECONDS")
     retry_backoff_factor: float = Field(default=2.0, env="RETRY_BACKOFF_FACTOR")
     
-    @validator('openai_temperature', 'anthropic_temperature', 'perplexity_temperature')
+    @validator('openai_temperature', 'anthropic_temperature', 'perplexity_temperature', 'xai_temperature', 'sambanova_temperature')
     def validate_temperature(cls, v):
         """Validate temperature is between 0 and 2"""
         if not 0 <= v <= 2:
@@ -115,6 +131,8 @@ class ServicesConfig(BaseSettings):
             'openai': self.openai_enabled,
             'anthropic': self.anthropic_enabled,
             'perplexity': self.perplexity_enabled,
+            'xai': self.xai_enabled,
+            'sambanova': self.sambanova_enabled,
             'google_places': self.google_places_enabled,
             'weather': self.weather_enabled,
             'maps': self.maps_enabled,
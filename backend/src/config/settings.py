@@ -58,6 +58,8 @@ class Settings(BaseSettings):
     # Monitoring
     health_check_enabled: bool = Field(default=True, env="HEALTH_CHECK_ENABLED")
     metrics_enabled: bool = Field(default=False, env="METRICS_ENABLED")
+    event_loop_watchdog_enabled: bool = Field(default=True, env="EVENT_LOOP_WATCHDOG")
+    event_loop_block_ms: float = Field(default=100.0, env="EVENT_LOOP_BLOCK_MS")
     
     @validator('allowed_origins', pre=True)
     def parse_allowed_origins(cls, v):
@@ -198,5 +200,6 @@ def get_config_summary() -> Dict[str, Any]:
             "cleanup": settings.cleanup_enabled,
             "health_checks": settings.health_check_enabled,
             "metrics": settings.metrics_enabled,
+            "event_loop_watchdog": settings.event_loop_watchdog_enabled,
         }
     }
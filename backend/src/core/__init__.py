@@ -19,6 +19,7 @@ __all__ = [
     'AuthenticationError',
     'AuthorizationError',
     'RateLimitError',
+    'ConflictError',
     
     # Middleware
     'ErrorHandlingMiddleware',
@@ -0,0 +1,136 @@
+"""
+Bounded Cache
+In-process LRU cache bounded by entry count and estimated bytes, with an
+optional TTL, for long-lived workers whose caches must not grow with the
+number of trips served.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class BoundedCache(Generic[V]):
+    """
+    LRU cache. Entries are sized with `sizer` when stored (and on resize());
+    the least recently used ones are evicted once either budget is exceeded.
+    A value larger than the whole byte budget is not cached at all.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        sizer: Optional[Callable[[V], int]] = None
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds or None
+        self.sizer = sizer
+        # key -> (value, estimated bytes, monotonic expiry or None)
+        self._entries: "OrderedDict[Hashable, Tuple[V, int, Optional[float]]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._live(key) is not None
+
+    def _live(self, key: Hashable) -> Optional[Tuple[V, int, Optional[float]]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        entry = self._live(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: V) -> None:
+        size = self.sizer(value) if self.sizer else 0
+        self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.rejected += 1
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[key] = (value, size, expires_at)
+        self.bytes += size
+        self._evict()
+
+    def resize(self, key: Hashable) -> None:
+        """Re-measure an entry whose value grew or shrank in place"""
+        entry = self._entries.get(key)
+        if entry is None or not self.sizer:
+            return
+        value, old_size, expires_at = entry
+        size = self.sizer(value)
+        self._entries[key] = (value, size, expires_at)
+        self.bytes += size - old_size
+        if self.max_bytes is not None and size > self.max_bytes:
+            self._remove(key)
+            self.rejected += 1
+        self._evict()
+
+    def pop(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        entry = self._remove(key)
+        return entry[0] if entry is not None else default
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def values(self) -> List[V]:
+        """Live values, least recently used first (does not touch LRU order)"""
+        now = time.monotonic()
+        for key in [k for k, (_, _, exp) in self._entries.items() if exp is not None and exp <= now]:
+            self._remove(key)
+            self.expirations += 1
+        return [value for value, _, _ in self._entries.values()]
+
+    def _remove(self, key: Hashable) -> Optional[Tuple[V, int, Optional[float]]]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+        return entry
+
+    def _evict(self) -> None:
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,153 @@
+"""
+Codec
+Central JSON encoding for stored and cached payloads. Uses orjson (or
+msgspec) when installed and falls back to the stdlib; output is compact
+UTF-8 bytes. Large blobs can be compressed with zstd (zlib when zstandard
+is not installed) and are recognised by their frame magic when read, so
+plain, pretty-printed and compressed payloads all decode the same way.
+"""
+import json
+import logging
+import zlib
+from typing import Any, Dict, Optional, Protocol, Type, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+class StorageModel(Protocol):
+    """A storage model decode() can fall back to building with from_dict()"""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Any: ...
+
+
+T = TypeVar("T", bound=StorageModel)
+
+BACKEND = "orjson" if ORJSON_AVAILABLE else "msgspec" if MSGSPEC_AVAILABLE else "json"
+COMPRESSION = "zstd" if ZSTD_AVAILABLE else "zlib"
+
+# Payloads at least this large are compressed by pack() unless told otherwise
+COMPRESS_MIN_BYTES = 64 * 1024
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 1
+
+# A JSON document starts with whitespace or one of {["-0-9tfn, never with these
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZLIB_MAGIC = 0x78
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+if MSGSPEC_AVAILABLE:
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=str)
+    _msgspec_decoder = msgspec.json.Decoder()
+if ZSTD_AVAILABLE:
+    _zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """Compact JSON bytes; values JSON has no type for are written as str()"""
+    if ORJSON_AVAILABLE:
+        options = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        try:
+            return orjson.dumps(value, default=str, option=options)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib handles them
+    elif MSGSPEC_AVAILABLE and not sort_keys:
+        try:
+            return _msgspec_encoder.encode(value)
+        except (TypeError, msgspec.EncodeError):
+            pass
+    return json.dumps(
+        value, separators=(",", ":"), sort_keys=sort_keys, default=str
+    ).encode()
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode JSON from bytes or str (compressed payloads go through unpack)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    if MSGSPEC_AVAILABLE:
+        try:
+            return _msgspec_decoder.decode(data.encode() if isinstance(data, str) else data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e  # the stdlib and orjson errors are ValueErrors
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+def compress(payload: bytes) -> bytes:
+    if ZSTD_AVAILABLE:
+        return _zstd_compressor.compress(payload)
+    return zlib.compress(payload, ZLIB_LEVEL)
+
+
+def is_compressed(data: Union[bytes, str]) -> bool:
+    if not isinstance(data, (bytes, bytearray)) or not data:
+        return False
+    return data[:4] == ZSTD_MAGIC or data[0] == ZLIB_MAGIC
+
+
+def decompress(data: bytes) -> bytes:
+    """Inflate a pack() frame; anything else is returned unchanged"""
+    if data[:4] == ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Payload is zstd-compressed but zstandard is not installed")
+        return _zstd_decompressor.decompress(data)
+    if data[:1] == bytes((ZLIB_MAGIC,)):
+        return zlib.decompress(data)
+    return data
+
+
+def pack(value: Any, compress_min_bytes: Optional[int] = COMPRESS_MIN_BYTES) -> bytes:
+    """
+    dumps() plus compression for payloads of at least compress_min_bytes
+    (None or 0 never compresses). Compression is kept only when it helps.
+    """
+    payload = dumps(value)
+    if compress_min_bytes and len(payload) >= compress_min_bytes:
+        packed = compress(payload)
+        if len(packed) < len(payload):
+            return packed
+    return payload
+
+
+def unpack(data: Union[bytes, str]) -> Any:
+    """Decode a pack() result, a plain JSON document or legacy pretty-printed JSON"""
+    if not isinstance(data, str) and is_compressed(data):
+        data = decompress(bytes(data))
+    return loads(data)
+
+
+def decode(data: Union[bytes, str], schema: Type[T]) -> T:
+    """
+    Decode a stored payload into one of the storage models (TripData,
+    TripMetadata, ProcessingState). With msgspec the document is decoded
+    and type-checked against the dataclass in one pass; otherwise, or when
+    it does not validate, the model's from_dict() builds it.
+    """
+    if not isinstance(data, str) and is_compressed(data):
+        data = decompress(bytes(data))
+    if MSGSPEC_AVAILABLE:
+        try:
+            return msgspec.json.decode(data, type=schema)
+        except msgspec.ValidationError as e:
+            logger.debug(f"{schema.__name__} payload did not validate, using from_dict: {e}")
+    return schema.from_dict(loads(data))
@@ -0,0 +1,223 @@
+"""
+Event Loop Monitoring
+Watchdog thread that probes the event loop with call_soon_threadsafe: the
+time until the probe runs is the loop lag, and when it has not run after
+the blocking threshold the loop thread's stack is captured. Blocking
+episodes are aggregated by call site (the innermost frame in our own code),
+so sync I/O on the loop shows up by file and line instead of only in p99s.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .metrics import MetricsRegistry, MetricType, metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+PROBE_INTERVAL = 0.5            # seconds between lag probes
+BLOCKING_THRESHOLD_MS = 100.0   # a probe this late means the loop is blocked
+MAX_STACK_SAMPLES = 5           # stacks captured per blocking episode
+MAX_CALL_SITES = 200
+STACK_DEPTH = 20
+
+# Frames under here are "our" code when choosing a call site
+SOURCE_ROOT = Path(__file__).resolve().parent.parent
+_THIS_FILE = str(Path(__file__).resolve())
+
+
+class BlockingCallSite:
+    """Blocking episodes attributed to one call site"""
+    __slots__ = ("site", "blocking_frame", "count", "total_ms", "max_ms", "last_seen", "stack")
+
+    def __init__(self, site: str, blocking_frame: str):
+        self.site = site
+        self.blocking_frame = blocking_frame
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen = 0.0
+        self.stack: List[str] = []
+
+    def record(self, blocked_ms: float, stack: List[str]) -> None:
+        self.count += 1
+        self.total_ms += blocked_ms
+        self.max_ms = max(self.max_ms, blocked_ms)
+        self.last_seen = time.time()
+        self.stack = stack
+
+    def to_dict(self, include_stack: bool = False) -> Dict[str, Any]:
+        data = {
+            "site": self.site,
+            "blocking_frame": self.blocking_frame,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "last_seen": datetime.fromtimestamp(self.last_seen).isoformat() if self.last_seen else None,
+        }
+        if include_stack:
+            data["stack"] = self.stack
+        return data
+
+
+def _format_frame(frame: traceback.FrameSummary) -> str:
+    path = Path(frame.filename)
+    try:
+        path = path.resolve().relative_to(SOURCE_ROOT.parent)
+    except ValueError:
+        pass
+    return f"{path}:{frame.lineno} in {frame.name}"
+
+
+def call_site(stack: traceback.StackSummary) -> str:
+    """Innermost frame in our source tree, else the innermost frame"""
+    for frame in reversed(stack):
+        filename = str(Path(frame.filename).resolve())
+        if filename.startswith(str(SOURCE_ROOT)) and filename != _THIS_FILE:
+            return _format_frame(frame)
+    return _format_frame(stack[-1]) if stack else "unknown"
+
+
+class EventLoopWatchdog:
+    """
+    Samples loop lag into event_loop.lag_ms and records blocking episodes
+    (probe later than threshold_ms) into event_loop.blocked_ms and per
+    call-site aggregates.
+    """
+
+    def __init__(
+        self,
+        interval: float = PROBE_INTERVAL,
+        threshold_ms: float = BLOCKING_THRESHOLD_MS,
+        registry: Optional[MetricsRegistry] = None
+    ):
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+        self.registry = registry or metrics_registry
+        self._lag = self.registry.series("event_loop.lag_ms", MetricType.TIMER)
+        self._blocked = self.registry.series("event_loop.blocked_ms", MetricType.TIMER)
+        self.sites: Dict[str, BlockingCallSite] = {}
+        self._sites_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._ran_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start watching the running loop (call from the loop thread)"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        # Handed to the thread so it never sees a loop that is unbound or rebound
+        self._thread = threading.Thread(
+            target=self._run, args=(loop, loop_thread_id), name="event-loop-watchdog", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Event loop watchdog started (blocking threshold {self.threshold_ms:.0f}ms)")
+
+    async def stop(self) -> None:
+        if not self._thread:
+            return
+        self._stop.set()
+        await asyncio.to_thread(self._thread.join, 2.0)
+        self._thread = None
+
+    def _probe(self, done: threading.Event) -> None:
+        self._ran_at = time.perf_counter()
+        done.set()
+
+    def _run(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+        threshold = self.threshold_ms / 1000
+        while not self._stop.is_set():
+            done = threading.Event()
+            scheduled = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(self._probe, done)
+            except RuntimeError:
+                break  # loop closed
+            stacks: List[traceback.StackSummary] = []
+            while not done.wait(threshold):
+                if self._stop.is_set():
+                    return
+                if len(stacks) < MAX_STACK_SAMPLES:
+                    stack = self._loop_stack(loop_thread_id)
+                    if stack:
+                        stacks.append(stack)
+
+            lag_ms = max(self._ran_at - scheduled, 0.0) * 1000
+            self._lag.record(lag_ms)
+            if stacks:
+                self._record_blocking(lag_ms, stacks)
+            self._stop.wait(self.interval)
+
+    def _loop_stack(self, loop_thread_id: int) -> Optional[traceback.StackSummary]:
+        frame = sys._current_frames().get(loop_thread_id)
+        if frame is None:
+            return None
+        return traceback.extract_stack(frame, limit=STACK_DEPTH)
+
+    def _record_blocking(self, blocked_ms: float, stacks: List[traceback.StackSummary]) -> None:
+        # The first sample is taken inside the blocking call; later ones confirm it
+        stack = stacks[0]
+        site = call_site(stack)
+        self._blocked.record(blocked_ms)
+        with self._sites_lock:
+            entry = self.sites.get(site)
+            if entry is None:
+                if len(self.sites) >= MAX_CALL_SITES:
+                    least = min(self.sites.values(), key=lambda s: s.total_ms)
+                    del self.sites[least.site]
+                entry = BlockingCallSite(site, _format_frame(stack[-1]) if stack else "unknown")
+                self.sites[site] = entry
+            entry.record(blocked_ms, [_format_frame(frame) for frame in stack])
+        logger.warning(f"Event loop blocked for {blocked_ms:.0f}ms at {site}")
+
+    def offenders(self, limit: int = 20) -> List[BlockingCallSite]:
+        """Call sites ordered by total time blocked"""
+        with self._sites_lock:
+            return sorted(self.sites.values(), key=lambda s: s.total_ms, reverse=True)[:limit]
+
+    def report(self, limit: int = 20, include_stacks: bool = False) -> Dict[str, Any]:
+        lag = self._lag.histogram
+        blocked = self._blocked.histogram
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold_ms,
+            "lag_ms": lag.to_dict() if lag is not None else {},
+            "blocking_episodes": blocked.count if blocked is not None else 0,
+            "blocked_total_ms": round(blocked.sum, 1) if blocked is not None else 0.0,
+            "offenders": [site.to_dict(include_stacks) for site in self.offenders(limit)],
+        }
+
+    def format_report(self, limit: int = 10) -> str:
+        """Plain-text offender list for logs and debug output"""
+        offenders = self.offenders(limit)
+        if not offenders:
+            return "No blocking calls detected"
+        lines = [f"Blocking calls (threshold {self.threshold_ms:.0f}ms), by total time blocked:"]
+        for site in offenders:
+            lines.append(
+                f"  {site.total_ms:9.0f}ms total  {site.count:5d}x  max {site.max_ms:7.0f}ms  "
+                f"{site.site}  ->  {site.blocking_frame}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        with self._sites_lock:
+            self.sites.clear()
+
+
+# Global watchdog, started with the application (EVENT_LOOP_WATCHDOG)
+event_loop_watchdog = EventLoopWatchdog()
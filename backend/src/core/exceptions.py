@@ -189,6 +189,28 @@ class DatabaseError(TripCraftException):
         super().__init__(message, details=details, **kwargs)
 
 
+class ConflictError(TripCraftException):
+    """Concurrent modification error - 409 Conflict"""
+    
+    def __init__(
+        self,
+        message: str = "Resource was modified concurrently",
+        resource: Optional[str] = None,
+        expected_version: Optional[int] = None,
+        actual_version: Optional[int] = None,
+        **kwargs
+    ):
+        details = kwargs.get('details', {})
+        if resource:
+            details['resource'] = resource
+        if expected_version is not None:
+            details['expected_version'] = expected_version
+        if actual_version is not None:
+            details['actual_version'] = actual_version
+        
+        super().__init__(message, details=details, **kwargs)
+
+
 class FileError(TripCraftException):
     """File operation error - 422 Unprocessable Entity"""
     
@@ -238,6 +260,7 @@ EXCEPTION_STATUS_MAP = {
     AuthorizationError: 403,
     RateLimitError: 429,
     DatabaseError: 500,
+    ConflictError: 409,
     FileError: 422,
     TimeoutError: 408,
     TripCraftException: 500,  # Default for base exception
@@ -0,0 +1,354 @@
+"""
+Metrics Core
+Fixed-size ring buffers, monotonic counters and streaming log-bucket
+histograms (DDSketch-style) per metric name and tag set. Recording is O(1)
+with no per-sample objects, and percentiles come from bucket counts
+instead of sorting samples.
+"""
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Iterator
+
+# Relative error of histogram quantiles: an estimate is within 1% of the true value
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048          # ~1% buckets cover over 17 orders of magnitude
+MIN_INDEXABLE = 1e-9        # values at or below this share the zero bucket
+RECENT_WINDOW = 1024        # recent samples kept per series
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+TagKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricType(str, Enum):
+    """Metric types"""
+    COUNTER = "counter"
+    GAUGE = "gauge"
+    HISTOGRAM = "histogram"
+    TIMER = "timer"
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO over a preallocated list; appends overwrite the oldest value"""
+    __slots__ = ("capacity", "_values", "_next", "_size")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._values: List[float] = [0.0] * capacity
+        self._next = 0
+        self._size = 0
+
+    def append(self, value: float) -> Optional[float]:
+        """Add a value, returning the one it evicted (None while filling)"""
+        evicted = self._values[self._next] if self._size == self.capacity else None
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        return evicted
+
+    def values(self) -> List[float]:
+        """Contents, oldest first"""
+        if self._size < self.capacity:
+            return self._values[:self._size]
+        return self._values[self._next:] + self._values[:self._next]
+
+    def latest(self) -> Optional[float]:
+        return self._values[self._next - 1] if self._size else None
+
+    def oldest(self) -> Optional[float]:
+        if not self._size:
+            return None
+        return self._values[self._next if self._size == self.capacity else 0]
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class WindowedMean:
+    """Mean of the last `capacity` values, maintained with a running sum"""
+    __slots__ = ("_buffer", "_sum")
+
+    def __init__(self, capacity: int):
+        self._buffer = RingBuffer(capacity)
+        self._sum = 0.0
+
+    def add(self, value: float) -> None:
+        evicted = self._buffer.append(value)
+        self._sum += value - (evicted or 0.0)
+
+    @property
+    def mean(self) -> float:
+        return self._sum / len(self._buffer) if len(self._buffer) else 0.0
+
+
+class StreamingHistogram:
+    """
+    Log-bucketed quantile sketch for non-negative values. Bucket i holds
+    values in (gamma^(i-1), gamma^i]; counts live in one contiguous list,
+    so a quantile is a single cumulative scan. When the range outgrows
+    max_buckets, the lowest buckets are collapsed together.
+    """
+    __slots__ = ("gamma", "_log_gamma", "max_buckets", "_counts", "_offset",
+                 "zero_count", "count", "sum", "min", "max")
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY, max_buckets: int = MAX_BUCKETS):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self._counts: List[int] = []
+        self._offset = 0
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= MIN_INDEXABLE:
+            self.zero_count += 1
+            return
+
+        index = math.ceil(math.log(value) / self._log_gamma)
+        counts = self._counts
+        if not counts:
+            self._counts = [1]
+            self._offset = index
+            return
+        position = index - self._offset
+        if position < 0:
+            self._counts = [0] * -position + counts
+            self._offset = index
+            position = 0
+        elif position >= len(counts):
+            counts.extend([0] * (position - len(counts) + 1))
+        self._counts[position] += 1
+        if len(self._counts) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        excess = len(self._counts) - self.max_buckets
+        collapsed = sum(self._counts[:excess + 1])
+        self._counts = [collapsed] + self._counts[excess + 1:]
+        self._offset += excess
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0..1), within the relative accuracy"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+        seen = self.zero_count
+        for position, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen > rank:
+                estimate = 2 * self.gamma ** (self._offset + position) / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds: Iterable[float]) -> List[int]:
+        """
+        Number of values at or below each bound (ascending), for fixed-bucket
+        exports. A sketch bucket counts towards a bound when its
+        representative value does, so counts share the relative accuracy.
+        """
+        totals = list(itertools.accumulate(self._counts))
+        counts = []
+        for bound in bounds:
+            if bound < 0:
+                counts.append(0)
+                continue
+            if bound <= MIN_INDEXABLE or not totals:
+                counts.append(self.zero_count)
+                continue
+            # Highest bucket index whose representative value 2*gamma^i/(gamma+1) <= bound
+            last = math.floor(math.log(bound * (self.gamma + 1) / 2) / self._log_gamma) - self._offset
+            if last < 0:
+                counts.append(self.zero_count)
+            else:
+                counts.append(self.zero_count + totals[min(last, len(totals) - 1)])
+        return counts
+
+    def quantiles(self, qs: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, Optional[float]]:
+        return {f"p{round(q * 100, 1):g}": self.quantile(q) for q in qs}
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "avg": self.mean,
+            **self.quantiles(),
+        }
+
+
+class MetricSeries:
+    """One metric name + tag set: recent samples, running totals and, for histograms/timers, a sketch"""
+    __slots__ = ("name", "tags", "metric_type", "recent", "recent_times",
+                 "count", "total", "last", "histogram")
+
+    def __init__(self, name: str, tags: TagKey, metric_type: MetricType, window: int = RECENT_WINDOW):
+        self.name = name
+        self.tags = tags
+        self.metric_type = metric_type
+        self.recent = RingBuffer(window)
+        self.recent_times = RingBuffer(window)
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.histogram = (
+            StreamingHistogram() if metric_type in (MetricType.HISTOGRAM, MetricType.TIMER) else None
+        )
+
+    def record(self, value: float, now: Optional[float] = None) -> None:
+        self.count += 1
+        self.total += value
+        # Counters report their running total; everything else its latest sample
+        self.last = self.total if self.metric_type == MetricType.COUNTER else value
+        self.recent.append(value)
+        self.recent_times.append(time.monotonic() if now is None else now)
+        if self.histogram is not None:
+            self.histogram.add(value)
+
+    @property
+    def label(self) -> str:
+        if not self.tags:
+            return self.name
+        return self.name + "{" + ",".join(f"{k}={v}" for k, v in self.tags) + "}"
+
+    def summary(self) -> Dict[str, Any]:
+        values = self.recent.values()
+        summary: Dict[str, Any] = {
+            "type": self.metric_type.value,
+            "count": self.count,
+            "latest": self.last,
+            "min": min(values) if values else 0,
+            "max": max(values) if values else 0,
+            "avg": sum(values) / len(values) if values else 0,
+        }
+        if self.tags:
+            summary["tags"] = dict(self.tags)
+        if self.metric_type == MetricType.COUNTER:
+            summary["total"] = self.total
+        if self.histogram is not None and self.histogram.count:
+            summary.update({
+                "min": self.histogram.min,
+                "max": self.histogram.max,
+                "avg": self.histogram.mean,
+                **self.histogram.quantiles(),
+            })
+        return summary
+
+
+class MetricsRegistry:
+    """
+    Series keyed by (name, sorted tags). Lookups take a lock only when a
+    series is created; hot paths can keep the MetricSeries handle from
+    series() and record on it directly.
+    """
+
+    def __init__(self, window: int = RECENT_WINDOW):
+        self.window = window
+        self._series: Dict[Tuple[str, TagKey], MetricSeries] = {}
+        self._lock = threading.Lock()
+        # Maps monotonic sample times back to wall-clock time for reports
+        self._wall_offset = time.time() - time.monotonic()
+
+    @staticmethod
+    def tag_key(tags: Optional[Dict[str, str]]) -> TagKey:
+        return tuple(sorted((str(k), str(v)) for k, v in tags.items())) if tags else ()
+
+    def series(
+        self,
+        name: str,
+        metric_type: MetricType = MetricType.GAUGE,
+        tags: Optional[Dict[str, str]] = None
+    ) -> MetricSeries:
+        key = (name, self.tag_key(tags))
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    series = MetricSeries(name, key[1], metric_type, self.window)
+                    self._series[key] = series
+        return series
+
+    def record(
+        self,
+        name: str,
+        value: float,
+        metric_type: MetricType = MetricType.GAUGE,
+        tags: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.series(name, metric_type, tags).record(value)
+
+    def increment(self, name: str, amount: float = 1.0, tags: Optional[Dict[str, str]] = None) -> None:
+        self.record(name, amount, MetricType.COUNTER, tags)
+
+    def adjust(self, name: str, delta: float, tags: Optional[Dict[str, str]] = None) -> None:
+        """Move a gauge up or down from its latest value, e.g. for in-flight counts"""
+        series = self.series(name, MetricType.GAUGE, tags)
+        series.record(series.last + delta)
+
+    def observe(self, name: str, value: float, tags: Optional[Dict[str, str]] = None) -> None:
+        self.record(name, value, MetricType.HISTOGRAM, tags)
+
+    @contextmanager
+    def timer(self, name: str, tags: Optional[Dict[str, str]] = None) -> Iterator[None]:
+        """Record the duration of the block in milliseconds"""
+        series = self.series(name, MetricType.TIMER, tags)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            series.record((time.perf_counter() - started) * 1000)
+
+    def get(self, name: str, tags: Optional[Dict[str, str]] = None) -> Optional[MetricSeries]:
+        return self._series.get((name, self.tag_key(tags)))
+
+    def all_series(self) -> List[MetricSeries]:
+        return list(self._series.values())
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-series summaries plus the wall-clock span of the recent samples"""
+        series = self.all_series()
+        starts = [t for t in (s.recent_times.oldest() for s in series) if t is not None]
+        ends = [t for t in (s.recent_times.latest() for s in series) if t is not None]
+        return {
+            "total_metrics": sum(s.count for s in series),
+            "metric_summaries": {s.label: s.summary() for s in series},
+            "time_range": {
+                "start": self._wall_time(min(starts)) if starts else None,
+                "end": self._wall_time(max(ends)) if ends else None,
+            },
+        }
+
+    def _wall_time(self, monotonic_time: float) -> str:
+        return datetime.fromtimestamp(monotonic_time + self._wall_offset).isoformat()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+# Global registry shared by monitoring, the performance optimizer and exporters
+metrics_registry = MetricsRegistry()
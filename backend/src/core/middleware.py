@@ -5,7 +5,7 @@ Improved request handling, security, and monitoring
 import time
 import json
 import uuid
-from typing import Callable, Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 
@@ -22,6 +22,8 @@ from .exceptions import (
     ValidationError
 )
 from ..config import get_settings
+from .metrics import MetricSeries, MetricType, metrics_registry
+from .tracing import tracer, parse_traceparent, Span, SpanKind, StatusCode
 
 logger = logging.getLogger(__name__)
 
@@ -160,6 +162,62 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         return request.client.host if request.client else "unknown"
 
 
+class TracingMiddleware(BaseHTTPMiddleware):
+    """Server span per request, continuing an incoming W3C traceparent"""
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if not tracer.enabled:
+            return await call_next(request)
+        
+        remote_parent = parse_traceparent(request.headers.get("traceparent"))
+        with tracer.span(f"HTTP {request.method}", {"http.method": request.method}, SpanKind.SERVER, remote_parent) as span:
+            correlation_id = getattr(request.state, 'correlation_id', None)
+            if correlation_id:
+                span.set_attribute("correlation_id", correlation_id)
+            try:
+                response = await call_next(request)
+            finally:
+                route = getattr(request.scope.get("route"), "path", None)
+                if route and isinstance(span, Span):
+                    span.name = f"HTTP {request.method} {route}"
+                    span.set_attribute("http.route", route)
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status(StatusCode.ERROR, f"HTTP {response.status_code}")
+            response.headers["X-Trace-ID"] = span.trace_id
+            return response
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """Request latency histograms per route template, method and status class"""
+    
+    def __init__(self, app: ASGIApp):
+        super().__init__(app)
+        self._series: Dict[Tuple[str, str, int], MetricSeries] = {}
+    
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # Templates ("/api/trip/{trip_id}") keep label cardinality bounded
+            route = request.scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            key = (template, request.method, status_code // 100)
+            series = self._series.get(key)
+            if series is None:
+                series = metrics_registry.series("http.server.duration_ms", MetricType.TIMER, {
+                    "route": template,
+                    "method": request.method,
+                    "status": f"{status_code // 100}xx",
+                })
+                self._series[key] = series
+            series.record((time.perf_counter() - started) * 1000)
+
+
 class ErrorHandlingMiddleware(BaseHTTPMiddleware):
     """Enhanced error handling with custom exceptions"""
     
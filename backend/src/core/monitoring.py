@@ -5,7 +5,8 @@ Advanced monitoring system for production environments
 import asyncio
 import time
 import psutil
-from typing import Dict, Any, List, Optional, Callable, Awaitable
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Deque
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
@@ -13,6 +14,8 @@ import logging
 
 from ..config import get_settings
 from ..services.service_factory import service_factory
+from .metrics import MetricType, MetricsRegistry, metrics_registry
+from .event_loop import event_loop_watchdog
 
 logger = logging.getLogger(__name__)
 
@@ -25,14 +28,6 @@ class HealthStatus(str, Enum):
     CRITICAL = "critical"
 
 
-class MetricType(str, Enum):
-    """Metric types"""
-    COUNTER = "counter"
-    GAUGE = "gauge"
-    HISTOGRAM = "histogram"
-    TIMER = "timer"
-
-
 @dataclass
 class HealthCheck:
     """Health check definition"""
@@ -95,15 +90,20 @@ class SystemMetrics:
         }
 
 
+# Monitoring loop samples once a minute; keep a day of system metrics
+SYSTEM_METRICS_HISTORY = 24 * 60
+MAX_ALERTS = 500
+
+
 class MonitoringService:
     """Production monitoring service"""
     
-    def __init__(self):
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
         self.settings = get_settings()
         self.health_checks: Dict[str, HealthCheck] = {}
-        self.metrics: List[Metric] = []
-        self.system_metrics_history: List[SystemMetrics] = []
-        self.alerts: List[Dict[str, Any]] = []
+        self.registry = registry or metrics_registry
+        self.system_metrics_history: Deque[SystemMetrics] = deque(maxlen=SYSTEM_METRICS_HISTORY)
+        self.alerts: Deque[Dict[str, Any]] = deque(maxlen=MAX_ALERTS)
         self._monitoring_task: Optional[asyncio.Task] = None
         self._start_time = time.time()
         
@@ -137,11 +137,17 @@ class MonitoringService:
     
     def record_metric(self, metric: Metric) -> None:
         """Record a metric"""
-        self.metrics.append(metric)
-        
-        # Keep only recent metrics (last hour)
-        cutoff_time = datetime.now() - timedelta(hours=1)
-        self.metrics = [m for m in self.metrics if m.timestamp > cutoff_time]
+        self.registry.record(metric.name, metric.value, metric.metric_type, metric.tags)
+    
+    def record(
+        self,
+        name: str,
+        value: float,
+        metric_type: MetricType = MetricType.GAUGE,
+        tags: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Record a metric value without building a Metric"""
+        self.registry.record(name, value, metric_type, tags)
     
     async def get_health_status(self) -> Dict[str, Any]:
         """Get overall health status"""
@@ -288,37 +294,12 @@ class MonitoringService:
     async def get_metrics_summary(self) -> Dict[str, Any]:
         """Get metrics summary"""
         try:
-            if not self.metrics:
+            if not self.registry.all_series():
                 return {"message": "No metrics available"}
             
-            # Group metrics by name
-            metrics_by_name = {}
-            for metric in self.metrics:
-                if metric.name not in metrics_by_name:
-                    metrics_by_name[metric.name] = []
-                metrics_by_name[metric.name].append(metric)
-            
-            # Calculate summaries
-            summaries = {}
-            for name, metric_list in metrics_by_name.items():
-                values = [m.value for m in metric_list]
-                summaries[name] = {
-                    "count": len(values),
-                    "latest": values[-1] if values else 0,
-                    "min": min(values) if values else 0,
-                    "max": max(values) if values else 0,
-                    "avg": sum(values) / len(values) if values else 0,
-                    "type": metric_list[0].metric_type.value if metric_list else "unknown"
-                }
-            
-            return {
-                "total_metrics": len(self.metrics),
-                "metric_summaries": summaries,
-                "time_range": {
-                    "start": min(m.timestamp for m in self.metrics).isoformat() if self.metrics else None,
-                    "end": max(m.timestamp for m in self.metrics).isoformat() if self.metrics else None
-                }
-            }
+            # min/max/avg cover each series' recent window; histograms and
+            # timers report sketch statistics and percentiles since start
+            return self.registry.summary()
             
         except Exception as e:
             logger.error(f"Failed to get metrics summary: {e}")
@@ -332,19 +313,13 @@ class MonitoringService:
             while True:
                 # Collect system metrics
                 system_metrics = await self.get_system_metrics()
+                # Bounded deque: the oldest sample drops off after 24 hours
                 self.system_metrics_history.append(system_metrics)
                 
-                # Keep only recent system metrics (last 24 hours)
-                cutoff_time = datetime.now() - timedelta(hours=24)
-                self.system_metrics_history = [
-                    m for m in self.system_metrics_history 
-                    if m.timestamp > cutoff_time
-                ]
-                
                 # Record system metrics as metrics
-                self.record_metric(Metric("system.cpu_percent", system_metrics.cpu_percent, MetricType.GAUGE))
-                self.record_metric(Metric("system.memory_percent", system_metrics.memory_percent, MetricType.GAUGE))
-                self.record_metric(Metric("system.disk_percent", system_metrics.disk_percent, MetricType.GAUGE))
+                self.record("system.cpu_percent", system_metrics.cpu_percent)
+                self.record("system.memory_percent", system_metrics.memory_percent)
+                self.record("system.disk_percent", system_metrics.disk_percent)
                 
                 # Check for alerts
                 await self._check_alerts(system_metrics)
@@ -418,12 +393,10 @@ class MonitoringService:
                 self.alerts.append(alert)
                 logger.warning(f"Alert: {alert['message']}")
             
-            # Keep only recent alerts (last 24 hours)
+            # Keep only recent alerts (last 24 hours); they arrive in time order
             cutoff_time = datetime.now() - timedelta(hours=24)
-            self.alerts = [
-                a for a in self.alerts 
-                if datetime.fromisoformat(a["timestamp"]) > cutoff_time
-            ]
+            while self.alerts and datetime.fromisoformat(self.alerts[0]["timestamp"]) <= cutoff_time:
+                self.alerts.popleft()
             
         except Exception as e:
             logger.error(f"Failed to check alerts: {e}")
@@ -453,6 +426,14 @@ class MonitoringService:
             interval_seconds=60,
             critical=False
         ))
+
+        # Blocking calls on the event loop
+        self.register_health_check(HealthCheck(
+            name="event_loop",
+            check_function=self._check_event_loop_health,
+            interval_seconds=60,
+            critical=False
+        ))
     
     async def _check_service_factory_health(self) -> Dict[str, Any]:
         """Check service factory health"""
@@ -526,6 +507,26 @@ class MonitoringService:
         except Exception as e:
             return {"status": "unhealthy", "error": str(e)}
 
+    
+    async def _check_event_loop_health(self) -> Dict[str, Any]:
+        """Warn when the event loop was blocked in the last five minutes"""
+        try:
+            since = time.time() - 300
+            recent = [site for site in event_loop_watchdog.offenders(limit=50) if site.last_seen >= since]
+            lag = event_loop_watchdog.report(limit=0)["lag_ms"]
+            if not event_loop_watchdog.running:
+                return {"status": "warning", "message": "Event loop watchdog not running"}
+            if recent:
+                return {
+                    "status": "warning",
+                    "message": f"Event loop blocked at {len(recent)} call site(s) in the last 5 minutes",
+                    "offenders": [site.to_dict() for site in recent[:5]],
+                    "lag_ms": lag
+                }
+            return {"status": "healthy", "message": "No blocking calls detected", "lag_ms": lag}
+        except Exception as e:
+            return {"status": "unhealthy", "error": str(e)}
+
 
 # Global monitoring service instance
 monitoring_service = MonitoringService()
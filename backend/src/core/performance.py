@@ -19,6 +19,8 @@ except ImportError:
     REDIS_AVAILABLE = False
 
 from ..config import get_settings
+from ..services.llm_cache import llm_response_cache
+from .metrics import MetricType, StreamingHistogram, WindowedMean, metrics_registry
 
 logger = logging.getLogger(__name__)
 
@@ -263,7 +265,10 @@ class PerformanceOptimizer:
         )
         self.redis_cache: Optional[RedisCache] = None
         self.metrics = PerformanceMetrics()
-        self._response_times: List[float] = []
+        # Average over the last 1000 requests; percentiles from a streaming sketch
+        self._recent_response_times = WindowedMean(1000)
+        self._response_times = StreamingHistogram()
+        self._response_series = metrics_registry.series("http.response_time_ms", MetricType.TIMER)
         self._cleanup_task: Optional[asyncio.Task] = None
     
     async def initialize(self) -> None:
@@ -327,15 +332,13 @@ class PerformanceOptimizer:
     
     def record_response_time(self, response_time_ms: float) -> None:
         """Record response time for metrics"""
-        self._response_times.append(response_time_ms)
-        
-        # Keep only recent response times (last 1000)
-        if len(self._response_times) > 1000:
-            self._response_times = self._response_times[-1000:]
+        self._recent_response_times.add(response_time_ms)
+        self._response_times.add(response_time_ms)
+        self._response_series.record(response_time_ms)
         
         # Update metrics
         self.metrics.total_requests += 1
-        self.metrics.avg_response_time_ms = sum(self._response_times) / len(self._response_times)
+        self.metrics.avg_response_time_ms = self._recent_response_times.mean
     
     async def get_performance_metrics(self) -> Dict[str, Any]:
         """Get comprehensive performance metrics"""
@@ -357,24 +360,20 @@ class PerformanceOptimizer:
             "memory_cache": self.memory_cache.metrics.to_dict(),
             "redis_cache": self.redis_cache.metrics.to_dict() if self.redis_cache else None,
             "response_time_percentiles": self._calculate_percentiles(),
+            "llm_cache": llm_response_cache.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
     
     def _calculate_percentiles(self) -> Dict[str, float]:
-        """Calculate response time percentiles"""
-        if not self._response_times:
+        """Response time percentiles (within 1%) without sorting samples"""
+        histogram = self._response_times
+        if not histogram.count:
             return {}
         
-        sorted_times = sorted(self._response_times)
-        length = len(sorted_times)
-        
         return {
-            "p50": sorted_times[int(length * 0.5)],
-            "p90": sorted_times[int(length * 0.9)],
-            "p95": sorted_times[int(length * 0.95)],
-            "p99": sorted_times[int(length * 0.99)],
-            "min": min(sorted_times),
-            "max": max(sorted_times)
+            **histogram.quantiles((0.5, 0.9, 0.95, 0.99)),
+            "min": histogram.min,
+            "max": histogram.max
         }
     
     async def _cleanup_loop(self) -> None:
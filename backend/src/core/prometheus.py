@@ -0,0 +1,162 @@
+"""
+Prometheus Exposition
+Renders the metrics registry in the Prometheus text format (0.0.4), which
+OpenMetrics scrapers also accept. Counters, gauges and histograms come
+straight from the registry's running totals and sketches; scrape-time
+collectors add values that live elsewhere, such as cache hit counts.
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Callable, Iterable, Optional
+
+from .metrics import MetricsRegistry, MetricSeries, MetricType, metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRIC_PREFIX = "tripcraft_"
+
+# Histogram bucket bounds in seconds, spanning fast routes to full guide generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "http.server.duration_ms": "HTTP request latency by route template, method and status class",
+    "upstream.duration_ms": "Upstream call latency by provider",
+    "upstream.requests": "Upstream calls by provider and outcome",
+    "event_loop.lag_ms": "Delay between a scheduled event loop wake-up and when it ran",
+    "event_loop.blocked_ms": "Duration of event loop blocking episodes over the watchdog threshold",
+    "jobs.in_progress": "Trips with guide processing in progress",
+}
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+
+Labels = Dict[str, str]
+
+
+@dataclass
+class MetricFamily:
+    """Samples produced by a scrape-time collector"""
+    name: str
+    metric_type: MetricType
+    help: str
+    samples: List[Tuple[Labels, float]] = field(default_factory=list)
+
+    def add(self, value: float, **labels: str) -> "MetricFamily":
+        self.samples.append((labels, value))
+        return self
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+def metric_name(name: str) -> str:
+    return METRIC_PREFIX + _INVALID_NAME_CHARS.sub("_", name)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{_INVALID_NAME_CHARS.sub("_", k)}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusExporter:
+    """
+    Text exposition of a MetricsRegistry plus any registered collectors.
+    Series whose names end in "_ms" are exported in seconds, as Prometheus
+    convention expects, with fixed latency buckets derived from the sketch.
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics_registry, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.registry = registry
+        self.buckets = buckets
+        self._collectors: List[Collector] = []
+
+    def register_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        families: Dict[str, List[MetricSeries]] = {}
+        for series in self.registry.all_series():
+            families.setdefault(series.name, []).append(series)
+        for name, series_list in families.items():
+            self._render_series(lines, name, series_list)
+
+        for collector in self._collectors:
+            try:
+                for family in collector():
+                    self._render_family(lines, family)
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        lines.append("")
+        return "\n".join(lines)
+
+    def _render_series(self, lines: List[str], name: str, series_list: List[MetricSeries]) -> None:
+        metric_type = series_list[0].metric_type
+        scale = 1.0
+        exported = name
+        if name.endswith("_ms"):
+            exported, scale = name[:-3] + "_seconds", 0.001
+        exported = metric_name(exported)
+        help_text = HELP.get(name, name)
+
+        if metric_type == MetricType.COUNTER:
+            if not exported.endswith("_total"):
+                exported += "_total"
+            self._header(lines, exported, "counter", help_text)
+            for series in series_list:
+                lines.append(f"{exported}{_format_labels(dict(series.tags))} {_format_value(series.total * scale)}")
+        elif series_list[0].histogram is None:
+            self._header(lines, exported, "gauge", help_text)
+            for series in series_list:
+                lines.append(f"{exported}{_format_labels(dict(series.tags))} {_format_value(series.last * scale)}")
+        else:
+            self._header(lines, exported, "histogram", help_text)
+            for series in series_list:
+                self._render_histogram(lines, exported, series, scale)
+
+    def _render_histogram(self, lines: List[str], exported: str, series: MetricSeries, scale: float) -> None:
+        histogram = series.histogram
+        if histogram is None:
+            return
+        labels = dict(series.tags)
+        counts = histogram.cumulative_counts(bound / scale for bound in self.buckets)
+        for bound, count in zip(self.buckets, counts):
+            lines.append(f"{exported}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {count}")
+        lines.append(f"{exported}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+        lines.append(f"{exported}_sum{_format_labels(labels)} {_format_value(histogram.sum * scale)}")
+        lines.append(f"{exported}_count{_format_labels(labels)} {histogram.count}")
+
+    def _render_family(self, lines: List[str], family: MetricFamily) -> None:
+        exported = metric_name(family.name)
+        prom_type = "gauge"
+        if family.metric_type == MetricType.COUNTER:
+            if not exported.endswith("_total"):
+                exported += "_total"
+            prom_type = "counter"
+        self._header(lines, exported, prom_type, family.help)
+        for labels, value in family.samples:
+            lines.append(f"{exported}{_format_labels(labels)} {_format_value(value)}")
+
+    @staticmethod
+    def _header(lines: List[str], exported: str, prom_type: str, help_text: Optional[str]) -> None:
+        lines.append(f"# HELP {exported} {_escape(help_text or exported)}")
+        lines.append(f"# TYPE {exported} {prom_type}")
+
+
+# Global exporter behind the /metrics endpoint
+prometheus_exporter = PrometheusExporter()
@@ -0,0 +1,210 @@
+"""
+Startup Profiler
+Accounts for a worker's cold start: how long each startup phase took, how
+long each lazily built service took to construct, and (opt-in, with
+STARTUP_PROFILE=1) how long each module took to import, inclusive of the
+modules it pulled in and on its own. It also holds the readiness flag the
+readiness probe reports, set once warm-up has completed.
+"""
+import importlib.abc
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def process_uptime_ms() -> Optional[float]:
+    """Milliseconds since the process started, interpreter start-up included"""
+    try:
+        import psutil
+        return (time.time() - psutil.Process(os.getpid()).create_time()) * 1000
+    except Exception:
+        return None
+
+
+class ModuleImport:
+    """Import time of one module"""
+    __slots__ = ("name", "total_ms", "self_ms")
+
+    def __init__(self, name: str, total_ms: float, self_ms: float):
+        self.name = name
+        self.total_ms = total_ms    # executing the module, its own imports included
+        self.self_ms = self_ms      # excluding modules first imported while it ran
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"module": self.name, "total_ms": round(self.total_ms, 2), "self_ms": round(self.self_ms, 2)}
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Meta path finder that times module execution: it lets the other finders
+    resolve the module and wraps the loader's exec_module on the spec it
+    returns. Nested imports are attributed per thread, since warm-up imports
+    services on executor threads while the loop keeps importing on its own.
+    """
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        loader = spec.loader
+        # Only per-module loaders (source, bytecode, extension files); built-in,
+        # frozen and zip importers are shared by many modules
+        if getattr(loader, "name", None) != fullname or not hasattr(loader, "exec_module"):
+            return spec
+        loader.exec_module = self._timed(fullname, loader.exec_module)
+        return spec
+
+    def _timed(self, fullname: str, exec_module):
+        def exec_module_timed(module):
+            stack: List[float] = self._local.__dict__.setdefault("children_ms", [])
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total_ms = (time.perf_counter() - started) * 1000
+                children_ms = stack.pop()
+                if stack:
+                    stack[-1] += total_ms
+                self._profiler.record_import(fullname, total_ms, total_ms - children_ms)
+        return exec_module_timed
+
+
+class StartupProfiler:
+    """Startup phases, service construction and import times, and readiness"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._import_timer: Optional[_ImportTimer] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self.services: Dict[str, float] = {}
+        self.service_errors: Dict[str, str] = {}
+        self.imports: Dict[str, ModuleImport] = {}
+        self.ready = False
+        self.ready_at_uptime_ms: Optional[float] = None
+
+    # Imports
+
+    @property
+    def import_timing(self) -> bool:
+        return self._import_timer is not None
+
+    def enable_import_timing(self) -> None:
+        """
+        Time every module imported from now on. Modules already loaded (the
+        interpreter's, and whatever src.core pulls in before the app factory
+        can call this) are not listed; uptime_ms covers them.
+        """
+        if self._import_timer is None:
+            self._import_timer = _ImportTimer(self)
+            sys.meta_path.insert(0, self._import_timer)
+
+    def disable_import_timing(self) -> None:
+        if self._import_timer is not None:
+            sys.meta_path.remove(self._import_timer)
+            self._import_timer = None
+
+    def record_import(self, name: str, total_ms: float, self_ms: float) -> None:
+        with self._lock:
+            self.imports[name] = ModuleImport(name, total_ms, self_ms)
+
+    # Phases and services
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, (time.perf_counter() - started) * 1000)
+
+    def record_phase(self, name: str, ms: float) -> None:
+        self.phases[name] = ms
+
+    def record_service(self, name: str, construct_ms: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.services[name] = construct_ms
+            if error:
+                self.service_errors[name] = error
+
+    def mark_ready(self) -> None:
+        if not self.ready:
+            self.ready = True
+            self.ready_at_uptime_ms = process_uptime_ms()
+            logger.info(self.format_report())
+
+    # Reports
+
+    def slowest_imports(self, limit: int = 20, by: str = "self_ms") -> List[ModuleImport]:
+        with self._lock:
+            imports = list(self.imports.values())
+        return sorted(imports, key=lambda entry: getattr(entry, by), reverse=True)[:limit]
+
+    @staticmethod
+    def package_of(module: str) -> str:
+        """Third-party libraries are grouped whole, our own modules one by one"""
+        parts = module.split(".")
+        return ".".join(parts[:3]) if parts[0] == "src" else parts[0]
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        # Self times summed per package, so a heavy SDK shows up once with its full cost
+        with self._lock:
+            packages: Dict[str, float] = {}
+            for name, entry in self.imports.items():
+                package = self.package_of(name)
+                packages[package] = packages.get(package, 0.0) + entry.self_ms
+        return {
+            "ready": self.ready,
+            "ready_at_uptime_ms": round(self.ready_at_uptime_ms, 1) if self.ready_at_uptime_ms else None,
+            "uptime_ms": round(process_uptime_ms() or 0.0, 1),
+            "phases_ms": {name: round(ms, 1) for name, ms in self.phases.items()},
+            "services_ms": {name: round(ms, 1) for name, ms in
+                            sorted(self.services.items(), key=lambda item: item[1], reverse=True)},
+            "service_errors": dict(self.service_errors),
+            "import_timing": self.import_timing,
+            "modules_imported": len(self.imports),
+            "slowest_packages_ms": {name: round(ms, 1) for name, ms in
+                                    sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]},
+            "slowest_modules": [entry.to_dict() for entry in self.slowest_imports(limit)],
+        }
+
+    def format_report(self, limit: int = 10) -> str:
+        report = self.report(limit)
+        ready = f"{report['ready_at_uptime_ms']:.0f}ms after process start" if report["ready_at_uptime_ms"] else "-"
+        lines = [f"Startup profile: ready {ready}"]
+        lines.append("  phases: " + (", ".join(f"{name} {ms:.0f}ms" for name, ms in report["phases_ms"].items()) or "-"))
+        lines.append("  services: " + (", ".join(f"{name} {ms:.0f}ms" for name, ms in report["services_ms"].items()) or "-"))
+        for name, error in report["service_errors"].items():
+            lines.append(f"  {name} unavailable: {error}")
+        if report["import_timing"]:
+            lines.append(f"  imports ({report['modules_imported']} modules), slowest packages: " + ", ".join(
+                f"{name} {ms:.0f}ms" for name, ms in report["slowest_packages_ms"].items()))
+        return "\n".join(lines)
+
+
+# Global startup profiler instance
+startup_profiler = StartupProfiler()
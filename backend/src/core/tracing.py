@@ -0,0 +1,576 @@
+"""
+Tracing
+Lightweight OpenTelemetry-compatible spans for the guide pipeline. The
+current span lives in a contextvar, so it follows asyncio tasks and
+gather() children automatically; wrap_context()/run_in_executor() carry it
+into executor threads. Spans are buffered per trace and exported when the
+root span ends if the trace was head-sampled, failed, or ran longer than
+the slow threshold, so slow guides are always captured. Exports use the
+OTLP JSON layout, so files can be replayed into any OTel collector; the
+file exporter appends them from a background thread.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from enum import IntEnum
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Mapping, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_TRACE_PATH = Path(__file__).parent.parent.parent / "data" / "traces.jsonl"
+SERVICE_NAME = "tripcraft-backend"
+
+DEFAULT_SAMPLE_RATE = 0.01      # share of traces exported regardless of latency
+DEFAULT_SLOW_MS = 10_000.0      # traces at least this slow are always exported
+MAX_PENDING_TRACES = 1000       # traces whose root is still open
+MAX_SPANS_PER_TRACE = 2000
+MAX_EXPORTED_TRACE_IDS = 1000   # late spans of exported traces are still exported
+MAX_QUEUED_EXPORTS = 10_000     # traces waiting for the file writer thread
+
+AttributeValue = Union[str, int, float, bool]
+
+
+class SpanKind(IntEnum):
+    """OTLP span kinds"""
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+class StatusCode(IntEnum):
+    """OTLP status codes"""
+    UNSET = 0
+    OK = 1
+    ERROR = 2
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class _TraceBuffer:
+    """Spans of one trace collected until its local root ends"""
+    __slots__ = ("trace_id", "root", "spans", "head_sampled", "error", "dropped")
+
+    def __init__(self, trace_id: str, head_sampled: bool):
+        self.trace_id = trace_id
+        self.root: Optional["Span"] = None
+        self.spans: List["Span"] = []
+        self.head_sampled = head_sampled
+        self.error = False
+        self.dropped = 0
+
+
+class Span:
+    """One timed operation; end() hands it back to the tracer"""
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "events", "status", "status_message", "_tracer", "_trace")
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        trace: _TraceBuffer,
+        name: str,
+        kind: SpanKind,
+        parent_id: Optional[str],
+        attributes: Optional[Mapping[str, AttributeValue]] = None,
+        start_ns: Optional[int] = None
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace.trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, AttributeValue] = dict(attributes) if attributes else {}
+        self.events: List[Tuple[int, str, Dict[str, AttributeValue]]] = []
+        self.status = StatusCode.UNSET
+        self.status_message = ""
+        self._tracer = tracer
+        self._trace = trace
+
+    @property
+    def recording(self) -> bool:
+        return True
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Mapping[str, AttributeValue]) -> None:
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: Optional[Mapping[str, AttributeValue]] = None) -> None:
+        self.events.append((time.time_ns(), name, dict(attributes) if attributes else {}))
+
+    def set_status(self, status: StatusCode, message: str = "") -> None:
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, error: BaseException) -> None:
+        self.add_event("exception", {
+            "exception.type": type(error).__name__,
+            "exception.message": str(error)[:500],
+        })
+        self.set_status(StatusCode.ERROR, str(error)[:200])
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        self._tracer._on_end(self)
+
+    def traceparent(self) -> str:
+        """W3C trace-context header value for this span"""
+        flags = "01" if self._trace.head_sampled else "00"
+        return f"00-{self.trace_id}-{self.span_id}-{flags}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": int(self.kind),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": int(self.status), **({"message": self.status_message} if self.status_message else {})},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.events:
+            span["events"] = [
+                {"timeUnixNano": str(ts), "name": name, "attributes": _otlp_attributes(attrs)}
+                for ts, name, attrs in self.events
+            ]
+        return span
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled"""
+    __slots__ = ()
+    recording = False
+    trace_id = span_id = parent_id = None
+    duration_ms = 0.0
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        pass
+
+    def set_attributes(self, attributes: Mapping[str, AttributeValue]) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Mapping[str, AttributeValue]] = None) -> None:
+        pass
+
+    def set_status(self, status: StatusCode, message: str = "") -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        pass
+
+    def traceparent(self) -> Optional[str]:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Union[Span, _NoopSpan]:
+    return _current_span.get() or NOOP_SPAN
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent span_id, sampled) from a W3C traceparent header"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class _SpanScope:
+    """Makes a span current for a with-block; a class rather than a generator to keep spans cheap"""
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self._token: Optional[contextvars.Token[Optional[Span]]] = None
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._token is not None:
+            _current_span.reset(self._token)
+        if exc is not None:
+            if isinstance(exc, asyncio.CancelledError):
+                self.span.add_event("cancelled")
+            else:
+                self.span.record_exception(exc)
+        self.span.end()
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class SpanExporter:
+    """Receives the spans of each sampled trace"""
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps finished spans in memory, for tests"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self.spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends one OTLP JSON ExportTraceServiceRequest per line. export() only
+    queues the spans, since root spans end on the event loop; a background
+    thread serializes and appends them, batching whatever has queued up.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_TRACE_PATH,
+        service_name: str = SERVICE_NAME,
+        max_queued: int = MAX_QUEUED_EXPORTS
+    ):
+        self.path = Path(path)
+        self.service_name = service_name
+        self.dropped_spans = 0
+        self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(max_queued)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        self._start_writer()
+        try:
+            self._queue.put_nowait(list(spans))
+        except queue.Full:
+            self.dropped_spans += len(spans)
+
+    def flush(self) -> None:
+        """Block until every queued export has been written"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def shutdown(self) -> None:
+        """Write what is queued and stop the writer thread"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def _start_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="trace-file-exporter", daemon=True)
+                self._writer.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write([self._line(spans) for spans in batch if spans is not None])
+            except Exception as e:
+                logger.warning(f"Trace export to {self.path} failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if None in batch:
+                return
+
+    def _line(self, spans: List[Span]) -> str:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "tripcraft"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+        return json.dumps(payload, separators=(",", ":"), default=str) + "\n"
+
+    def _write(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+
+class Tracer:
+    """
+    Creates spans and decides, per trace, whether to export it. A trace is
+    exported when its root ends if it was head-sampled (sample_rate), any
+    span failed, or the root took at least slow_threshold_ms.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        enabled: bool = True,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        slow_threshold_ms: float = DEFAULT_SLOW_MS
+    ):
+        self.exporter = exporter
+        self.enabled = enabled and exporter is not None
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self._pending: "OrderedDict[str, _TraceBuffer]" = OrderedDict()
+        self._exported: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"traces_exported": 0, "traces_dropped": 0, "spans_exported": 0}
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        enabled = os.getenv("TRACING_ENABLED", "true").lower() in ("true", "1", "yes")
+        path = os.getenv("TRACING_EXPORT_PATH", str(DEFAULT_TRACE_PATH))
+        return cls(
+            exporter=FileSpanExporter(path) if enabled else None,
+            enabled=enabled,
+            sample_rate=float(os.getenv("TRACING_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)),
+            slow_threshold_ms=float(os.getenv("TRACING_SLOW_MS", DEFAULT_SLOW_MS))
+        )
+
+    def configure(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        slow_threshold_ms: Optional[float] = None
+    ) -> None:
+        """Swap the exporter or sampling policy at runtime (tests, startup)"""
+        if exporter is not None:
+            self.exporter = exporter
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if slow_threshold_ms is not None:
+            self.slow_threshold_ms = slow_threshold_ms
+        if enabled is not None:
+            self.enabled = enabled
+        self.enabled = self.enabled and self.exporter is not None
+
+    def shutdown(self) -> None:
+        """Flush and stop the exporter (blocking; call from a thread at shutdown)"""
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Mapping[str, AttributeValue]] = None,
+        kind: SpanKind = SpanKind.INTERNAL,
+        parent: Optional[Span] = None,
+        remote_parent: Optional[Tuple[str, str, bool]] = None,
+        start_ns: Optional[int] = None
+    ) -> Union[Span, _NoopSpan]:
+        """
+        Start a span without making it current. The parent defaults to the
+        current span; remote_parent (from parse_traceparent) continues a
+        trace started by another service.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = parent or _current_span.get()
+        if parent is not None and parent.recording:
+            return Span(self, parent._trace, name, kind, parent.span_id, attributes, start_ns)
+
+        if remote_parent:
+            trace_id, parent_id, sampled = remote_parent
+        else:
+            trace_id, parent_id, sampled = os.urandom(16).hex(), None, False
+        trace = _TraceBuffer(trace_id, sampled or random.random() < self.sample_rate)
+        span = Span(self, trace, name, kind, parent_id, attributes, start_ns)
+        trace.root = span
+        with self._lock:
+            self._pending[span.span_id] = trace
+            while len(self._pending) > MAX_PENDING_TRACES:
+                self._pending.popitem(last=False)
+                self.stats["traces_dropped"] += 1
+        return span
+
+    def span(
+        self,
+        name: str,
+        attributes: Optional[Mapping[str, AttributeValue]] = None,
+        kind: SpanKind = SpanKind.INTERNAL,
+        remote_parent: Optional[Tuple[str, str, bool]] = None
+    ) -> Union["_SpanScope", "_NoopScope"]:
+        """Context manager running a block inside a new current span; exceptions mark it as failed"""
+        if not self.enabled:
+            return _NOOP_SCOPE
+        span = self.start_span(name, attributes, kind, remote_parent=remote_parent)
+        if isinstance(span, _NoopSpan):
+            # Tracing was disabled concurrently
+            return _NOOP_SCOPE
+        return _SpanScope(span)
+
+    async def wrap(
+        self,
+        name: str,
+        awaitable: Awaitable[Any],
+        attributes: Optional[Mapping[str, AttributeValue]] = None
+    ) -> Any:
+        """Await inside a span; for coroutines handed to gather() or create_task()"""
+        with self.span(name, attributes):
+            return await awaitable
+
+    def traced(self, name: Optional[str] = None, **attributes: AttributeValue) -> Callable:
+        """Decorator running a sync or async function inside a span"""
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name, attributes):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, attributes):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _on_end(self, span: Span) -> None:
+        trace = span._trace
+        if span.status == StatusCode.ERROR:
+            trace.error = True
+
+        if trace.root is None:
+            # Root already finished: late spans follow their trace's decision
+            if trace.trace_id in self._exported:
+                self._export([span])
+            return
+
+        if len(trace.spans) < MAX_SPANS_PER_TRACE:
+            trace.spans.append(span)
+        else:
+            trace.dropped += 1
+        if span is not trace.root:
+            return
+
+        with self._lock:
+            self._pending.pop(span.span_id, None)
+        trace.root = None
+        if trace.head_sampled or trace.error or span.duration_ms >= self.slow_threshold_ms:
+            if trace.dropped:
+                span.set_attribute("tracing.dropped_spans", trace.dropped)
+            with self._lock:
+                self._exported[trace.trace_id] = None
+                while len(self._exported) > MAX_EXPORTED_TRACE_IDS:
+                    self._exported.popitem(last=False)
+            self._export(trace.spans)
+            self.stats["traces_exported"] += 1
+        trace.spans = []
+
+    def _export(self, spans: List[Span]) -> None:
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(spans)
+            self.stats["spans_exported"] += len(spans)
+        except Exception as e:
+            logger.warning(f"Span export failed: {e}")
+
+
+def wrap_context(func: Callable) -> Callable:
+    """Bind func to the caller's context (and current span) for use in another thread"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def run_in_executor(executor: Any, func: Callable, *args) -> "asyncio.Future":
+    """loop.run_in_executor that keeps the current span as parent"""
+    return asyncio.get_running_loop().run_in_executor(executor, wrap_context(func), *args)
+
+
+# Global tracer, configured from TRACING_* environment variables
+tracer = Tracer.from_env()
+traced = tracer.traced
@@ -0,0 +1,134 @@
+"""
+Upstream Call Metrics
+Latency histograms, outcome counters and client spans for calls to external
+providers (Perplexity, Google Places, weather, events, LLM APIs). aiohttp sessions
+report through a shared TraceConfig that maps hosts to providers,
+requests-based clients (googlemaps) through a response hook, and other
+clients wrap their calls in upstream_call().
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .metrics import MetricType, metrics_registry
+from .tracing import tracer, SpanKind, StatusCode
+
+UPSTREAM_HOSTS = {
+    "api.perplexity.ai": "perplexity",
+    "maps.googleapis.com": "google_places",
+    "places.googleapis.com": "google_places",
+    "weather.googleapis.com": "weather",
+    "api.openweathermap.org": "weather",
+    "app.ticketmaster.com": "events",
+    "www.eventbriteapi.com": "events",
+    "api.seatgeek.com": "events",
+    "api.openai.com": "openai",
+    "api.anthropic.com": "anthropic",
+    "api.x.ai": "xai",
+    "api.sambanova.ai": "sambanova",
+    "api.yelp.com": "yelp",
+    "api.unsplash.com": "unsplash",
+}
+
+# Keeps label cardinality fixed however many image or page hosts get fetched
+OTHER_PROVIDER = "other"
+
+
+def provider_for_host(host: Optional[str]) -> str:
+    return UPSTREAM_HOSTS.get(host or "", OTHER_PROVIDER)
+
+
+def record_upstream(provider: str, duration_ms: float, ok: bool) -> None:
+    """Record one upstream call"""
+    metrics_registry.series("upstream.duration_ms", MetricType.TIMER, {"provider": provider}).record(duration_ms)
+    metrics_registry.increment("upstream.requests", tags={"provider": provider, "outcome": "ok" if ok else "error"})
+
+
+@contextmanager
+def upstream_call(provider: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """Time and trace a block as one call to `provider`; exceptions count as errors"""
+    started = time.perf_counter()
+    ok = False
+    with tracer.span(f"upstream {provider}", {"upstream.provider": provider, **(attributes or {})}, SpanKind.CLIENT) as span:
+        try:
+            yield span
+            ok = True
+        finally:
+            record_upstream(provider, (time.perf_counter() - started) * 1000, ok)
+
+
+def _client_span_attributes(method: str, url: str, provider: str) -> Dict[str, Any]:
+    # Query strings are left out: several providers take API keys there
+    return {
+        "http.method": method,
+        "http.url": url.split("?", 1)[0],
+        "server.address": urlparse(url).hostname or "",
+        "upstream.provider": provider,
+    }
+
+
+async def _on_request_start(session, context, params: aiohttp.TraceRequestStartParams) -> None:
+    context.started = time.perf_counter()
+    provider = provider_for_host(params.url.host)
+    context.span = tracer.start_span(
+        f"HTTP {params.method} {provider}",
+        _client_span_attributes(params.method, str(params.url), provider),
+        SpanKind.CLIENT
+    )
+
+
+async def _on_request_end(session, context, params: aiohttp.TraceRequestEndParams) -> None:
+    status = params.response.status
+    record_upstream(provider_for_host(params.url.host), (time.perf_counter() - context.started) * 1000, status < 400)
+    context.span.set_attribute("http.status_code", status)
+    if status >= 400:
+        context.span.set_status(StatusCode.ERROR, f"HTTP {status}")
+    context.span.end()
+
+
+async def _on_request_exception(session, context, params: aiohttp.TraceRequestExceptionParams) -> None:
+    record_upstream(provider_for_host(params.url.host), (time.perf_counter() - context.started) * 1000, False)
+    context.span.record_exception(params.exception)
+    context.span.end()
+
+
+def _build_trace_config() -> aiohttp.TraceConfig:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+
+_TRACE_CONFIG = _build_trace_config()
+
+
+def upstream_trace_configs() -> List[aiohttp.TraceConfig]:
+    """trace_configs for an aiohttp.ClientSession talking to upstream providers"""
+    return [_TRACE_CONFIG]
+
+
+
+def _on_requests_response(response: Any, *args, **kwargs) -> None:
+    provider = provider_for_host(urlparse(response.url).hostname)
+    elapsed_ns = int(response.elapsed.total_seconds() * 1e9)
+    record_upstream(provider, elapsed_ns / 1e6, response.status_code < 400)
+    # The hook runs once the response is in, so the span is back-dated
+    span = tracer.start_span(
+        f"HTTP {response.request.method} {provider}",
+        _client_span_attributes(response.request.method, response.url, provider),
+        SpanKind.CLIENT,
+        start_ns=time.time_ns() - elapsed_ns
+    )
+    span.set_attribute("http.status_code", response.status_code)
+    if response.status_code >= 400:
+        span.set_status(StatusCode.ERROR, f"HTTP {response.status_code}")
+    span.end()
+
+
+def upstream_requests_kwargs() -> Dict[str, Any]:
+    """requests_kwargs for a googlemaps.Client (or other requests-based client)"""
+    return {"hooks": {"response": [_on_requests_response]}}
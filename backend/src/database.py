@@ -2,19 +2,25 @@
 Simple file-based database for trip persistence
 Uses JSON files to store trip data
 """
-import json
 import os
 from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
 import aiofiles
 
+from .core import codec
+from .services.file_store import FileStore, KeyedLocks, atomic_write_sync
+
 class TripDatabase:
     def __init__(self):
         # Create data directory if it doesn't exist
         self.data_dir = Path(__file__).parent / "data" / "trips"
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
+        # Files are replaced atomically; updates to one trip are serialised
+        self.files = FileStore()
+        self.locks = KeyedLocks()
+        
         # Index file to track all trips
         self.index_file = self.data_dir / "index.json"
         if not self.index_file.exists():
@@ -22,14 +28,13 @@ class TripDatabase:
     
     def _save_index(self, index: Dict):
         """Save index to file"""
-        with open(self.index_file, 'w') as f:
-            json.dump(index, f, indent=2)
+        atomic_write_sync(self.index_file, codec.dumps(index))
     
     def _load_index(self) -> Dict:
         """Load index from file"""
         try:
-            with open(self.index_file, 'r') as f:
-                return json.load(f)
+            with open(self.index_file, 'rb') as f:
+                return codec.loads(f.read())
         except:
             return {}
     
@@ -47,8 +52,8 @@ class TripDatabase:
             
             # Save full trip data
             trip_file = self.data_dir / f"{trip_id}.json"
-            async with aiofiles.open(trip_file, 'w') as f:
-                await f.write(json.dumps(trip_data, indent=2))
+            async with self.locks.hold(trip_id):
+                await self.files.write(trip_file, codec.pack(trip_data))
             
             # Update index
             index = self._load_index()
@@ -79,9 +84,9 @@ class TripDatabase:
             if not trip_file.exists():
                 return None
             
-            async with aiofiles.open(trip_file, 'r') as f:
+            async with aiofiles.open(trip_file, 'rb') as f:
                 content = await f.read()
-                return json.loads(content)
+                return codec.unpack(content)
         except Exception as e:
             print(f"Error loading trip: {e}")
             return None
@@ -89,20 +94,20 @@ class TripDatabase:
     async def update_trip_enhanced_guide(self, trip_id: str, enhanced_guide: Dict) -> bool:
         """Update a trip with enhanced guide data"""
         try:
-            # Load existing trip
-            trip_data = await self.load_trip(trip_id)
-            if not trip_data:
-                print(f"Trip {trip_id} not found for update")
-                return False
-            
-            # Add enhanced guide
-            trip_data["enhanced_guide"] = enhanced_guide
-            trip_data["enhanced_guide_generated_at"] = datetime.now().isoformat()
-            
-            # Save updated trip
-            trip_file = self.data_dir / f"{trip_id}.json"
-            async with aiofiles.open(trip_file, 'w') as f:
-                await f.write(json.dumps(trip_data, indent=2))
+            async with self.locks.hold(trip_id):
+                # Load existing trip
+                trip_data = await self.load_trip(trip_id)
+                if not trip_data:
+                    print(f"Trip {trip_id} not found for update")
+                    return False
+                
+                # Add enhanced guide
+                trip_data["enhanced_guide"] = enhanced_guide
+                trip_data["enhanced_guide_generated_at"] = datetime.now().isoformat()
+                
+                # Save updated trip
+                trip_file = self.data_dir / f"{trip_id}.json"
+                await self.files.write(trip_file, codec.pack(trip_data))
             
             # Update index to reflect guide generation
             index = self._load_index()
@@ -1,16 +1,24 @@
 import os
 import base64
 from openai import OpenAI
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Union, Optional, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 from pathlib import Path
 import logging
 from PIL import Image
 import io
+import time
 import fitz  # PyMuPDF for PDF to image conversion
 
+from ..services.document_router import document_router
+from ..core.tracing import traced, wrap_context
+
 logger = logging.getLogger(__name__)
 
+# Vision calls in flight at once across documents and page groups
+MAX_CONCURRENT_DOCUMENTS = int(os.getenv("VISION_MAX_CONCURRENCY", "4"))
+
 class OpenAIMultimodal:
     def __init__(self, api_key: str = None):
         if api_key is None:
@@ -24,26 +32,24 @@ class OpenAIMultimodal:
             return base64.b64encode(image_file.read()).decode('utf-8')
     
     def pdf_to_images(self, pdf_path: str, max_pages: int = 10) -> List[str]:
-        """Convert PDF pages to base64 encoded images."""
+        """Convert PDF pages to base64 encoded images (adaptive JPEG/WebP, cached per page)."""
         images = []
         try:
-            pdf_document = fitz.open(pdf_path)
-            for page_num in range(min(len(pdf_document), max_pages)):
-                page = pdf_document[page_num]
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x scale for better quality
-                img_data = pix.pil_tobytes(format="PNG")
-                img_base64 = base64.b64encode(img_data).decode('utf-8')
-                images.append(img_base64)
-            pdf_document.close()
+            with fitz.open(pdf_path) as pdf_document:
+                for page_num in range(min(len(pdf_document), max_pages)):
+                    page = pdf_document[page_num]
+                    images.append(document_router.rasterize(pdf_document, page).base64)
         except Exception as e:
             logger.error(f"Error converting PDF to images: {e}")
         return images
     
+    @traced("llm.extract_document")
     def process_document(self, 
                         document_path: str = None,
                         image_data: bytes = None,
-                        text_prompt: str = None) -> Dict[str, Any]:
-        """Process document using multimodal capabilities."""
+                        text_prompt: str = None,
+                        pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Process document using multimodal capabilities (`pages` limits a PDF to a page group)."""
         
         messages = [
             {
@@ -83,17 +89,23 @@ class OpenAIMultimodal:
             })
         
         # Process based on input type
+        routed = None
         if document_path:
             file_ext = Path(document_path).suffix.lower()
             
             if file_ext == '.pdf':
-                # Convert PDF to images
-                images = self.pdf_to_images(document_path)
-                for img_base64 in images:
+                # Text-native pages go as text; only low-text pages are rasterized
+                routed = document_router.route_pdf(document_path, pages=pages)
+                if routed.text_pages:
+                    user_content.append({
+                        "type": "text",
+                        "text": f"Text extracted from the document:\n{routed.text_block()}"
+                    })
+                for image in routed.images():
                     user_content.append({
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{img_base64}",
+                            "url": image.data_url,
                             "detail": "high"  # Use high detail for better OCR
                         }
                     })
@@ -214,7 +226,9 @@ class OpenAIMultimodal:
             }
         }
         
+        route = document_router.route_name(routed)
         try:
+            started = time.perf_counter()
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
@@ -224,12 +238,15 @@ class OpenAIMultimodal:
             )
             
             result = json.loads(response.choices[0].message.function_call.arguments)
+            document_router.record(route, time.perf_counter() - started, routed)
             
             # Add metadata about processing
             result['_metadata'] = {
                 'model': self.model,
                 'processing_type': 'multimodal',
-                'document_type': Path(document_path).suffix if document_path else 'image'
+                'document_type': Path(document_path).suffix if document_path else 'image',
+                'route': route,
+                'routing': routed.metadata() if routed else None
             }
             
             return result
@@ -244,8 +261,19 @@ class OpenAIMultimodal:
                 'other': []
             }
     
-    def process_multiple_documents(self, document_paths: List[str]) -> Dict[str, Any]:
-        """Process multiple documents and merge results."""
+    def process_multiple_documents(
+        self,
+        document_paths: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        max_workers: int = MAX_CONCURRENT_DOCUMENTS
+    ) -> Dict[str, Any]:
+        """
+        Process multiple documents in parallel and merge results.
+
+        Documents, and page groups of long PDFs, run on a bounded thread pool.
+        Results are merged in document order as each prefix completes and
+        progress_callback(completed, total) is called once per finished part.
+        """
         all_results = {
             'flights': [],
             'hotels': [],
@@ -253,22 +281,51 @@ class OpenAIMultimodal:
             'other': []
         }
         
+        jobs: List[Tuple[str, Optional[List[int]]]] = []
         for path in document_paths:
-            result = self.process_document(path)
-            if 'error' not in result:
-                all_results['flights'].extend(result.get('flights', []))
-                all_results['hotels'].extend(result.get('hotels', []))
-                all_results['passengers'].extend(result.get('passengers', []))
-                all_results['other'].extend(result.get('other', []))
+            if Path(path).suffix.lower() == '.pdf':
+                jobs.extend((path, pages) for pages in document_router.page_groups(path))
+            else:
+                jobs.append((path, None))
+        if not jobs:
+            return all_results
         
-        # Deduplicate passengers
+        finished: Dict[int, Dict[str, Any]] = {}
+        next_to_merge = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+            futures = {
+                executor.submit(wrap_context(self.process_document), path, pages=pages): index
+                for index, (path, pages) in enumerate(jobs)
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                finished[futures[future]] = future.result()
+                
+                # Merge the completed prefix in document order, deduplicating as it grows
+                merged = False
+                while next_to_merge in finished:
+                    result = finished.pop(next_to_merge)
+                    if 'error' not in result:
+                        for key in all_results:
+                            all_results[key].extend(result.get(key, []))
+                        merged = True
+                    next_to_merge += 1
+                if merged:
+                    all_results = self._deduplicate_results(all_results)
+                
+                if progress_callback:
+                    progress_callback(completed, len(jobs))
+        
+        return all_results
+    
+    def _deduplicate_results(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Deduplicate passengers by name."""
         seen_passengers = set()
         unique_passengers = []
-        for p in all_results['passengers']:
+        for p in results['passengers']:
             key = f"{p.get('first_name', '')}{p.get('last_name', '')}"
             if key not in seen_passengers:
                 seen_passengers.add(key)
                 unique_passengers.append(p)
-        all_results['passengers'] = unique_passengers
+        results['passengers'] = unique_passengers
         
-        return all_results
\ No newline at end of file
+        return results
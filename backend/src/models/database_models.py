@@ -2,7 +2,7 @@
 Database Models - Data persistence and storage entities
 """
 from dataclasses import dataclass, asdict
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Iterable
 from datetime import datetime
 from enum import Enum
 import json
@@ -27,6 +27,7 @@ class ProcessingState:
     updated_at: datetime
     extracted_data: Optional[Dict[str, Any]] = None
     error_details: Optional[str] = None
+    partial_results: Optional[Dict[str, List[Dict[str, Any]]]] = None  # items streamed before completion
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
@@ -57,13 +58,30 @@ class ProcessingState:
             created_at=datetime.fromisoformat(data['created_at']),
             updated_at=datetime.fromisoformat(data['updated_at']),
             extracted_data=data.get('extracted_data'),
-            error_details=data.get('error_details')
+            error_details=data.get('error_details'),
+            partial_results=data.get('partial_results')
         )
 
 
+# TripData fields stored as independent blobs and loaded on first access
+TRIP_SECTIONS = (
+    "extracted_data",
+    "itinerary",
+    "recommendations",
+    "enhanced_guide",
+    "preferences",
+    "preferences_raw",
+    "preference_progress",
+)
+
+
 @dataclass
 class TripData:
-    """Complete trip data for database storage"""
+    """
+    Complete trip data for database storage. Instances built with lazy()
+    hold only the trip fields; each section is read by the loader the first
+    time it is accessed.
+    """
     trip_id: str
     user_id: str = "default"
     extracted_data: Optional[Dict[str, Any]] = None
@@ -84,8 +102,42 @@ class TripData:
             self.created_at = now
         self.updated_at = now
     
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for sections of a lazy instance that are not loaded yet
+        loader = self.__dict__.get("_section_loader")
+        if loader is None or name not in TRIP_SECTIONS:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        value = loader(name)
+        self.__dict__[name] = value
+        return value
+    
+    @classmethod
+    def lazy(cls, trip_id: str, loader: Callable[[str], Any], **fields) -> 'TripData':
+        """Trip whose sections are loaded on demand by loader(section)"""
+        trip_data = object.__new__(cls)
+        trip_data.__dict__.update(
+            trip_id=trip_id,
+            user_id=fields.get("user_id", "default"),
+            pdf_path=fields.get("pdf_path"),
+            created_at=fields.get("created_at"),
+            updated_at=fields.get("updated_at"),
+            _section_loader=loader,
+        )
+        return trip_data
+    
+    def loaded_sections(self) -> List[str]:
+        """Sections held in memory (all of them for eagerly built instances)"""
+        return [name for name in TRIP_SECTIONS if name in self.__dict__]
+    
+    def set_loaded(self, sections: Dict[str, Any]) -> None:
+        """Fill in sections that were loaded elsewhere"""
+        self.__dict__.update(sections)
+    
+    def missing_sections(self, sections: Iterable[str]) -> List[str]:
+        return [name for name in sections if name in TRIP_SECTIONS and name not in self.__dict__]
+    
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
+        """Convert to dictionary for JSON serialization (loads every section)"""
         return asdict(self)
     
     @classmethod
@@ -98,6 +150,13 @@ class TripData:
         self.updated_at = datetime.now().isoformat()
 
 
+# Drop the class-level defaults dataclass leaves behind so unloaded sections
+# fall through to __getattr__; __init__ keeps its None defaults
+for _section in TRIP_SECTIONS:
+    delattr(TripData, _section)
+del _section
+
+
 @dataclass
 class TripMetadata:
     """Trip metadata for quick listing and searching"""
@@ -0,0 +1,387 @@
+"""
+Candidate Ranking Engine
+Vectorized scoring, deduplication and diversity-aware top-k selection for
+restaurant, attraction and event candidate pools
+"""
+import logging
+import math
+import re
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Mapping, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Default day plan window (minutes after midnight) used for opening-hour overlap
+DEFAULT_DAY_WINDOW = (9 * 60, 18 * 60)
+
+_NAME_NOISE = re.compile(r"[^a-z0-9]+")
+_LEADING_ARTICLE = re.compile(r"^(the|le|la|el|il)\s+")
+_TIME_RANGE = re.compile(
+    r"(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?\s*(?:-|–|—|to)\s*(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class ScoringWeights:
+    """Relative weight of each feature in the final score"""
+    rating: float = 1.0
+    reviews: float = 0.35
+    price_fit: float = 0.75
+    distance: float = 0.4
+    category: float = 1.5
+    hours: float = 0.5
+    max_distance_km: float = 15.0
+
+
+DEFAULT_TEXT_FIELDS = ("name", "cuisine", "type", "types", "category", "description")
+
+
+@dataclass
+class CandidateMatrix:
+    """
+    Column-oriented feature arrays for a candidate pool. Category columns
+    are derived per vocabulary with with_categories(); texts and columns
+    already computed are shared by every matrix derived from the same pool,
+    so a cached pool only pays for keywords it has not seen before.
+    """
+    candidates: List[Dict[str, Any]]
+    rating: np.ndarray
+    log_reviews: np.ndarray
+    price: np.ndarray
+    latitude: np.ndarray
+    longitude: np.ndarray
+    open_minutes: np.ndarray
+    close_minutes: np.ndarray
+    categories: np.ndarray
+    category_names: Tuple[str, ...] = field(default_factory=tuple)
+    name_keys: np.ndarray = field(default_factory=lambda: np.array([], dtype=object))
+    # text fields -> lowercase text per candidate; (text fields, keywords) -> column
+    texts: Dict[Tuple[str, ...], List[str]] = field(default_factory=dict, repr=False, compare=False)
+    columns: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], np.ndarray] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def same_pool(self, candidates: Sequence[Dict[str, Any]]) -> bool:
+        """True when `candidates` are the very dicts this matrix was built from"""
+        return len(candidates) == len(self.candidates) and all(
+            a is b for a, b in zip(candidates, self.candidates)
+        )
+
+    def with_categories(
+        self,
+        category_keywords: Optional[Mapping[str, Sequence[str]]] = None,
+        text_fields: Sequence[str] = DEFAULT_TEXT_FIELDS
+    ) -> "CandidateMatrix":
+        """A matrix over the same features with one category column per vocabulary entry"""
+        category_keywords = category_keywords or {}
+        fields = tuple(text_fields)
+        categories = np.zeros((len(self.candidates), len(category_keywords)), dtype=np.float32)
+        for j, keywords in enumerate(category_keywords.values()):
+            key = (fields, tuple(k.lower() for k in keywords))
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = self._keyword_column(fields, key[1])
+            categories[:, j] = column
+        return replace(self, categories=categories, category_names=tuple(category_keywords))
+
+    def _keyword_column(self, fields: Tuple[str, ...], keywords: Tuple[str, ...]) -> np.ndarray:
+        column = np.zeros(len(self.candidates), dtype=np.float32)
+        if not keywords:
+            return column
+        texts = self.texts.get(fields)
+        if texts is None:
+            texts = self.texts[fields] = [_candidate_text(c, fields) for c in self.candidates]
+        pattern = re.compile("|".join(re.escape(k) for k in keywords))
+        for i, text in enumerate(texts):
+            if pattern.search(text):
+                column[i] = 1.0
+        return column
+
+    @classmethod
+    def from_candidates(
+        cls,
+        candidates: Sequence[Dict[str, Any]],
+        category_keywords: Optional[Mapping[str, Sequence[str]]] = None,
+        text_fields: Sequence[str] = DEFAULT_TEXT_FIELDS
+    ) -> "CandidateMatrix":
+        """Extract features from candidate dicts in a single pass"""
+        n = len(candidates)
+        rating = np.full(n, np.nan, dtype=np.float32)
+        reviews = np.zeros(n, dtype=np.float32)
+        price = np.full(n, np.nan, dtype=np.float32)
+        latitude = np.full(n, np.nan, dtype=np.float64)
+        longitude = np.full(n, np.nan, dtype=np.float64)
+        open_minutes = np.full(n, np.nan, dtype=np.float32)
+        close_minutes = np.full(n, np.nan, dtype=np.float32)
+        name_keys = []
+
+        for i, candidate in enumerate(candidates):
+            rating[i] = _to_float(candidate.get("rating"))
+            reviews[i] = _to_float(candidate.get("review_count") or candidate.get("user_ratings_total"), 0.0)
+            price[i] = _price_tier(
+                candidate.get("price_level_numeric")
+                or candidate.get("price_range")
+                or candidate.get("price_level")
+            )
+            latitude[i], longitude[i] = extract_coordinates(candidate)
+            open_minutes[i], close_minutes[i] = opening_window(
+                candidate.get("opening_hours") or candidate.get("hours")
+            )
+            name_keys.append(normalize_name(candidate.get("name", "")))
+
+        matrix = cls(
+            candidates=list(candidates),
+            rating=rating,
+            log_reviews=np.log1p(np.maximum(reviews, 0.0)),
+            price=price,
+            latitude=latitude,
+            longitude=longitude,
+            open_minutes=open_minutes,
+            close_minutes=close_minutes,
+            categories=np.zeros((n, 0), dtype=np.float32),
+            name_keys=np.array(name_keys, dtype=object),
+        )
+        return matrix.with_categories(category_keywords, text_fields) if category_keywords else matrix
+
+
+class CandidateRanker:
+    """
+    Scores candidate matrices against a preference vector.
+
+    All per-candidate arithmetic is done on NumPy arrays so a 10k-candidate
+    pool scores in a few milliseconds; only feature extraction touches dicts.
+    """
+
+    def __init__(self, weights: Optional[ScoringWeights] = None):
+        self.weights = weights or ScoringWeights()
+
+    def score(
+        self,
+        matrix: CandidateMatrix,
+        category_weights: Optional[np.ndarray] = None,
+        preferred_prices: Sequence[int] = (),
+        origin: Optional[Tuple[float, float]] = None,
+        day_window: Optional[Tuple[int, int]] = DEFAULT_DAY_WINDOW
+    ) -> np.ndarray:
+        """Preference-weighted score for every candidate"""
+        w = self.weights
+        n = len(matrix)
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        # Quality: rating centred on 4.0 plus review volume (saturates at ~10k reviews)
+        scores = w.rating * np.nan_to_num(matrix.rating - 4.0, nan=0.0)
+        scores = scores + w.reviews * np.minimum(matrix.log_reviews / math.log1p(10000), 1.0)
+
+        if preferred_prices:
+            wanted = np.asarray(preferred_prices, dtype=np.float32)
+            gap = np.min(np.abs(matrix.price[:, None] - wanted[None, :]), axis=1)
+            scores = scores + w.price_fit * np.nan_to_num(1.0 - gap, nan=0.0)
+
+        if category_weights is not None and matrix.categories.shape[1]:
+            scores = scores + w.category * (matrix.categories @ category_weights.astype(np.float32))
+
+        if origin is not None:
+            distance = haversine_km(origin[0], origin[1], matrix.latitude, matrix.longitude)
+            penalty = np.minimum(distance, w.max_distance_km) / 5.0
+            scores = scores - w.distance * np.nan_to_num(penalty, nan=0.0)
+
+        if day_window is not None:
+            scores = scores + w.hours * hours_overlap(matrix, day_window)
+
+        return scores.astype(np.float32)
+
+    @staticmethod
+    def dedupe_mask(matrix: CandidateMatrix, scores: np.ndarray) -> np.ndarray:
+        """Keep only the best-scoring candidate per normalized name"""
+        keep = np.zeros(len(matrix), dtype=bool)
+        if len(matrix) == 0:
+            return keep
+        order = np.argsort(-scores, kind="stable")
+        _, first = np.unique(matrix.name_keys[order].astype(str), return_index=True)
+        keep[order[first]] = True
+        keep &= matrix.name_keys.astype(bool)
+        return keep
+
+    @staticmethod
+    def top_k(
+        scores: np.ndarray,
+        k: int,
+        categories: Optional[np.ndarray] = None,
+        diversity: float = 0.0,
+        mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Indices of the k best candidates. With diversity > 0 each pick
+        penalizes candidates sharing its categories (greedy MMR).
+        """
+        scores = scores.astype(np.float64, copy=True)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        available = int(np.isfinite(scores).sum())
+        k = min(k, available)
+        if k <= 0:
+            return np.zeros(0, dtype=np.intp)
+
+        if diversity <= 0 or categories is None or categories.shape[1] == 0:
+            if k < len(scores):
+                part = np.argpartition(-scores, k - 1)[:k]
+            else:
+                part = np.arange(len(scores))
+            return part[np.argsort(-scores[part], kind="stable")]
+
+        selected = np.empty(k, dtype=np.intp)
+        counts = np.zeros(categories.shape[1], dtype=np.float64)
+        for step in range(k):
+            adjusted = scores - diversity * (categories @ counts)
+            best = int(np.argmax(adjusted))
+            selected[step] = best
+            scores[best] = -np.inf
+            counts += categories[best]
+        return selected
+
+    def rank(
+        self,
+        matrix: CandidateMatrix,
+        k: int,
+        category_weights: Optional[np.ndarray] = None,
+        preferred_prices: Sequence[int] = (),
+        origin: Optional[Tuple[float, float]] = None,
+        day_window: Optional[Tuple[int, int]] = DEFAULT_DAY_WINDOW,
+        diversity: float = 0.0,
+        mask: Optional[np.ndarray] = None,
+        dedupe: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Score, dedupe and select the top k candidate dicts"""
+        scores = self.score(matrix, category_weights, preferred_prices, origin, day_window)
+        keep = self.dedupe_mask(matrix, scores) if dedupe else np.ones(len(matrix), dtype=bool)
+        if mask is not None:
+            keep &= mask
+        indices = self.top_k(scores, k, matrix.categories, diversity, keep)
+        return [matrix.candidates[i] for i in indices]
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km; broadcasts over array arguments"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def hours_overlap(matrix: CandidateMatrix, day_window: Tuple[int, int]) -> np.ndarray:
+    """Fraction of the day window a candidate is open; 0.5 when hours are unknown"""
+    start, end = day_window
+    span = max(end - start, 1)
+    close = np.where(matrix.close_minutes < matrix.open_minutes, matrix.close_minutes + 1440, matrix.close_minutes)
+    overlap = (np.minimum(close, end) - np.maximum(matrix.open_minutes, start)) / span
+    return np.nan_to_num(np.clip(overlap, 0.0, 1.0), nan=0.5)
+
+
+def normalize_name(name: Any) -> str:
+    """Canonical key used to detect the same place from different sources"""
+    text = _LEADING_ARTICLE.sub("", str(name or "").lower().strip())
+    return _NAME_NOISE.sub("", text)
+
+
+def extract_coordinates(candidate: Dict[str, Any]) -> Tuple[float, float]:
+    """Read (lat, lng) from the coordinate shapes used across services"""
+    for source in (candidate.get("coordinates"), candidate.get("location"), candidate.get("geometry"), candidate):
+        if isinstance(source, dict):
+            if isinstance(source.get("location"), dict):
+                source = source["location"]
+            lat = source.get("latitude", source.get("lat"))
+            lng = source.get("longitude", source.get("lng", source.get("lon")))
+            if lat is not None and lng is not None:
+                return _to_float(lat), _to_float(lng)
+    return math.nan, math.nan
+
+
+def _to_float(value: Any, default: float = math.nan) -> float:
+    try:
+        return float(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _price_tier(value: Any) -> float:
+    if value is None or value == "":
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(min(max(int(value), 1), 4))
+    text = str(value).strip().upper()
+    if text.startswith("$"):
+        return float(min(max(text.count("$"), 1), 4))
+    for tier, marker in enumerate(("INEXPENSIVE", "MODERATE", "EXPENSIVE", "VERY_EXPENSIVE"), start=1):
+        if text.endswith(marker):
+            return float(tier)
+    return math.nan
+
+
+def _to_minutes(hour: str, minute: Optional[str], meridiem: Optional[str]) -> int:
+    h = int(hour) % 24
+    if meridiem:
+        is_pm = meridiem.lower().startswith("p")
+        h = (h % 12) + (12 if is_pm else 0)
+    return h * 60 + int(minute or 0)
+
+
+def opening_window(hours: Any) -> Tuple[float, float]:
+    """First open-close range (minutes after midnight) in Google weekday_text or free text"""
+    if not hours:
+        return math.nan, math.nan
+    if isinstance(hours, dict):
+        hours = hours.get("weekday_text") or hours.get("hours") or ""
+    if isinstance(hours, (list, tuple)):
+        hours = " ".join(str(h) for h in hours[:1])
+    return _parse_window(str(hours))
+
+
+@lru_cache(maxsize=4096)
+def _parse_window(text: str) -> Tuple[float, float]:
+    # Opening-hours strings repeat heavily across a pool, so parse each once
+    if "24 hours" in text.lower():
+        return 0.0, 1440.0
+    match = _TIME_RANGE.search(text)
+    if not match:
+        return math.nan, math.nan
+    h1, m1, ap1, h2, m2, ap2 = match.groups()
+    if ap1 is None and ap2 is not None:
+        # "1-5pm" shares the meridiem, "9-5pm" / "11-2pm" crosses noon; 12 is
+        # the start of its half-day ("12-3pm" opens at noon) and "11-12pm"
+        # closes at noon
+        opens, closes = int(h1), int(h2)
+        crosses = "am" if ap2.lower().startswith("p") else "pm"
+        if opens == 12:
+            ap1 = ap2
+        elif closes == 12:
+            ap1 = crosses
+        else:
+            ap1 = ap2 if opens <= closes else crosses
+    opening = _to_minutes(h1, m1, ap1)
+    closing = _to_minutes(h2, m2, ap2)
+    return float(opening), float(closing)
+
+
+def _candidate_text(candidate: Dict[str, Any], fields: Sequence[str]) -> str:
+    parts: List[str] = []
+    for name in fields:
+        value = candidate.get(name)
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(v) for v in value)
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts).lower()
+
+
+# Global instance shared by the guide services
+candidate_ranker = CandidateRanker()
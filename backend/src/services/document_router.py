@@ -0,0 +1,247 @@
+"""
+Document Extraction Router
+Measures per-page text yield and sends only low-text (scanned) pages to
+vision models, rasterized at an adaptive resolution and JPEG/WebP quality.
+Rasterizations are cached per page hash and every route records its
+payload size, estimated tokens and latency.
+"""
+import base64
+import hashlib
+import io
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Sequence
+
+import fitz  # PyMuPDF
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+
+# A page with at least this much extractable text is sent as text
+MIN_TEXT_CHARS = 200
+
+# Vision models downscale anything larger, so never render past this long side
+MAX_LONG_SIDE_PX = 2048
+SCANNED_LONG_SIDE_PX = 1600  # dense scans need the detail
+SPARSE_LONG_SIDE_PX = 1024   # pages with some text just need layout context
+
+# PDFs longer than this are extracted in page groups of PAGE_GROUP_SIZE
+SPLIT_PAGE_THRESHOLD = 6
+PAGE_GROUP_SIZE = 4
+
+# Per-image payload budget; quality then resolution step down to meet it
+TARGET_IMAGE_BYTES = 350_000
+QUALITY_STEPS = (80, 65, 50)
+
+IMAGE_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+
+# Approximate OpenAI pricing inputs used for the cost estimate
+VISION_BASE_TOKENS = 85
+VISION_TILE_TOKENS = 170
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class PageImage:
+    """An encoded page rasterization ready for a vision request"""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+
+    @property
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("utf-8")
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.base64}"
+
+    def estimated_tokens(self) -> int:
+        """High-detail vision token estimate (512px tiles after fitting 2048/768)"""
+        scale = min(1.0, MAX_LONG_SIDE_PX / max(self.width, self.height))
+        width, height = self.width * scale, self.height * scale
+        scale = min(1.0, 768 / min(width, height))
+        tiles = math.ceil(width * scale / 512) * math.ceil(height * scale / 512)
+        return VISION_BASE_TOKENS + VISION_TILE_TOKENS * tiles
+
+
+@dataclass
+class RoutedPage:
+    """One page and the route chosen for it"""
+    index: int
+    text: str
+    route: str  # "text" or "vision"
+    image: Optional[PageImage] = None
+
+
+@dataclass
+class RoutedDocument:
+    """Pages of one document split by route"""
+    path: str
+    pages: List[RoutedPage] = field(default_factory=list)
+
+    @property
+    def text_pages(self) -> List[RoutedPage]:
+        return [p for p in self.pages if p.route == "text"]
+
+    @property
+    def vision_pages(self) -> List[RoutedPage]:
+        return [p for p in self.pages if p.route == "vision"]
+
+    def text_block(self) -> str:
+        """Extracted text of text-routed pages, labelled by page number"""
+        return "\n\n".join(f"--- Page {p.index + 1} ---\n{p.text.strip()}" for p in self.text_pages)
+
+    def images(self) -> List[PageImage]:
+        return [p.image for p in self.vision_pages if p.image is not None]
+
+    def estimated_tokens(self) -> int:
+        text_tokens = sum(len(p.text) for p in self.text_pages) // CHARS_PER_TOKEN
+        return text_tokens + sum(image.estimated_tokens() for image in self.images())
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "text_pages": [p.index + 1 for p in self.text_pages],
+            "vision_pages": [p.index + 1 for p in self.vision_pages],
+            "image_bytes": sum(len(image.data) for image in self.images()),
+            "estimated_input_tokens": self.estimated_tokens(),
+        }
+
+
+class DocumentRouter:
+    """Routes PDF pages to text or vision extraction"""
+
+    def __init__(
+        self,
+        min_text_chars: int = MIN_TEXT_CHARS,
+        max_pages: int = 10,
+        cache_bytes: int = 64 * 1024 * 1024
+    ):
+        self.min_text_chars = min_text_chars
+        self.max_pages = max_pages
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, PageImage]" = OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.RLock()
+        self.stats: Dict[str, float] = {}
+
+    def route_pdf(
+        self,
+        pdf_path: str,
+        force_vision: bool = False,
+        pages: Optional[Sequence[int]] = None
+    ) -> RoutedDocument:
+        """Measure text yield per page and rasterize only the pages that need vision"""
+        document = RoutedDocument(path=str(pdf_path))
+        with fitz.open(pdf_path) as pdf:
+            indexes = range(min(len(pdf), self.max_pages)) if pages is None else pages
+            for index in indexes:
+                page = pdf[index]
+                text = page.get_text("text") or ""
+                if not force_vision and len(text.strip()) >= self.min_text_chars:
+                    document.pages.append(RoutedPage(index=index, text=text, route="text"))
+                    continue
+                image = self.rasterize(pdf, page, sparse=bool(text.strip()))
+                document.pages.append(RoutedPage(index=index, text=text, route="vision", image=image))
+        return document
+
+    def page_groups(self, pdf_path: str) -> List[Optional[List[int]]]:
+        """
+        Page groups to extract independently. Short documents are a single
+        group (None = all pages) so related pages stay in one request.
+        """
+        try:
+            with fitz.open(pdf_path) as pdf:
+                page_count = min(len(pdf), self.max_pages)
+        except Exception as e:
+            logger.warning(f"Could not count pages of {pdf_path}: {e}")
+            return [None]
+        if page_count <= SPLIT_PAGE_THRESHOLD:
+            return [None]
+        return [
+            list(range(start, min(start + PAGE_GROUP_SIZE, page_count)))
+            for start in range(0, page_count, PAGE_GROUP_SIZE)
+        ]
+
+    def rasterize(self, pdf: "fitz.Document", page: "fitz.Page", sparse: bool = False) -> PageImage:
+        """Encode a page at an adaptive size/quality, reusing cached renders of identical pages"""
+        long_side = SPARSE_LONG_SIDE_PX if sparse else SCANNED_LONG_SIDE_PX
+        key = f"{self.page_hash(pdf, page)}:{long_side}:{IMAGE_FORMAT}"
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._count("raster_cache_hits")
+                return cached
+
+        self._count("raster_cache_misses")
+        scale = min(long_side / max(page.rect.width, page.rect.height), 2.0)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csRGB, alpha=False)
+        image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        encoded = self._encode(image)
+
+        with self._lock:
+            self._cache[key] = encoded
+            self._cache_size += len(encoded.data)
+            while self._cache_size > self.cache_bytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= len(evicted.data)
+        return encoded
+
+    @staticmethod
+    def page_hash(pdf: "fitz.Document", page: "fitz.Page") -> str:
+        """Content hash of a page: drawing streams plus the raw bytes of its images"""
+        digest = hashlib.sha256(f"{page.rect}".encode())
+        for xref in page.get_contents():
+            digest.update(pdf.xref_stream_raw(xref) or b"")
+        for image in page.get_images(full=True):
+            digest.update(pdf.xref_stream_raw(image[0]) or b"")
+        return digest.hexdigest()
+
+    @staticmethod
+    def route_name(document: Optional[RoutedDocument]) -> str:
+        """Route label for a routed document; plain images count as vision"""
+        if document is None or not document.text_pages:
+            return "vision"
+        return "hybrid" if document.vision_pages else "text"
+
+    def record(self, route: str, latency: float, document: Optional[RoutedDocument] = None) -> None:
+        """Record one extraction call so routes can be compared on cost and latency"""
+        self._count(f"{route}_calls")
+        self._count(f"{route}_latency_seconds", latency)
+        if document is not None:
+            meta = document.metadata()
+            self._count(f"{route}_text_pages", len(meta["text_pages"]))
+            self._count(f"{route}_vision_pages", len(meta["vision_pages"]))
+            self._count(f"{route}_image_bytes", meta["image_bytes"])
+            self._count(f"{route}_estimated_input_tokens", meta["estimated_input_tokens"])
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    @staticmethod
+    def _encode(image: Image.Image) -> PageImage:
+        mime_type = f"image/{IMAGE_FORMAT.lower()}"
+        while True:
+            for quality in QUALITY_STEPS:
+                buffer = io.BytesIO()
+                image.save(buffer, format=IMAGE_FORMAT, quality=quality)
+                if buffer.tell() <= TARGET_IMAGE_BYTES:
+                    break
+            if buffer.tell() <= TARGET_IMAGE_BYTES or max(image.size) <= SPARSE_LONG_SIDE_PX:
+                return PageImage(buffer.getvalue(), mime_type, image.width, image.height)
+            image = image.resize((int(image.width * 0.8), int(image.height * 0.8)), Image.Resampling.LANCZOS)
+
+
+# Global instance shared by the extractors so the rasterization cache is shared too
+document_router = DocumentRouter()
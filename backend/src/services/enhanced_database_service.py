@@ -2,13 +2,13 @@
 Enhanced Database Service
 Implementation of StorageServiceInterface with improved functionality
 """
-import json
 import asyncio
 import aiofiles
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Iterable
 from datetime import datetime, timedelta
 import logging
+from functools import partial
 
 from .interfaces import (
     StorageServiceInterface, 
@@ -19,12 +19,34 @@ from .interfaces import (
     QueryOperator,
     ServiceConfig
 )
-from ..models.database_models import TripData, ProcessingState, ProcessingStatus, TripMetadata
-from ..core.exceptions import DatabaseError, NotFoundError, ValidationError
+from ..models.database_models import TripData, ProcessingState, ProcessingStatus, TripMetadata, TRIP_SECTIONS
+from ..core.exceptions import DatabaseError, NotFoundError, ValidationError, ConflictError
 from ..config import get_settings
+from ..core.metrics import metrics_registry
+from ..core import codec
+from ..core.bounded_cache import BoundedCache
+from ..core.tracing import traced
+from .guide_sections import merge_sections
+from .section_store import SectionStore, GUIDE_SECTION_PREFIX
+from .file_store import FileStore, sweep_temp_files
+from .progress_store import ProgressStore, TERMINAL_STATUSES
 
 logger = logging.getLogger(__name__)
 
+GUIDE_SECTION = "enhanced_guide"
+
+# Parsed JSON takes several times its serialized size in memory
+JSON_MEMORY_FACTOR = 4
+TRIP_OVERHEAD_BYTES = 2048
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
 
 class EnhancedDatabaseService(StorageServiceInterface):
     """Enhanced database service implementing the storage interface"""
@@ -47,12 +69,41 @@ class EnhancedDatabaseService(StorageServiceInterface):
         self.processing_path = self.base_path / "processing"
         self.metadata_path = self.base_path / "metadata"
         self.backups_path = self.settings.database.get_backup_path()
+        # Each trip is a directory of independently versioned section blobs;
+        # every file is committed atomically through one FileStore
+        db_settings = self.settings.database
+        self.files = FileStore(db_settings.fsync, db_settings.group_commit_ms)
+        self.section_store = SectionStore(
+            self.trips_path,
+            max_manifests=db_settings.metadata_cache_size,
+            compress_min_bytes=db_settings.compress_min_bytes,
+            files=self.files
+        )
         
-        # In-memory caches
-        self._trip_cache: Dict[str, TripData] = {}
-        self._processing_cache: Dict[str, ProcessingState] = {}
-        self._metadata_cache: Dict[str, TripMetadata] = {}
+        # In-memory caches: full trips are bounded by estimated bytes, metadata
+        # (the listing index) by entry count with a separate, larger budget
+        self._trip_cache: BoundedCache[TripData] = BoundedCache(
+            "trips",
+            max_entries=db_settings.cache_size,
+            max_bytes=db_settings.trip_cache_bytes,
+            ttl_seconds=config.cache_ttl_seconds,
+            sizer=self._estimate_trip_bytes
+        )
+        # Active processing states live in the progress store; finished ones
+        # are served from this cache
+        self.progress_store = ProgressStore(self.processing_path, db_settings.processing_flush_ms, self.files)
+        self._processing_cache: BoundedCache[ProcessingState] = BoundedCache(
+            "processing", max_entries=db_settings.cache_size, ttl_seconds=config.cache_ttl_seconds
+        )
+        self._metadata_cache: BoundedCache[TripMetadata] = BoundedCache(
+            "metadata", max_entries=db_settings.metadata_cache_size
+        )
         self._cache_loaded = False
+        # Whether the metadata cache held every trip as of the last full load
+        self._metadata_complete = False
+        self._metadata_evictions = 0
+        # Trips whose processing is underway, exported as the job-queue depth
+        self._active_jobs: Set[str] = set()
     
     @property
     def storage_type(self) -> StorageType:
@@ -65,10 +116,16 @@ class EnhancedDatabaseService(StorageServiceInterface):
             # Create directories
             for path in [self.trips_path, self.processing_path, self.metadata_path, self.backups_path]:
                 path.mkdir(parents=True, exist_ok=True)
+            sweep_temp_files(self.base_path)
             
             # Load caches
             await self._load_caches()
             
+            # Replay progress updates that were journaled but not yet snapshotted
+            for trip_id in await self.progress_store.recover():
+                state = self.progress_store.get(trip_id)
+                self._track_job(trip_id, state.status if state else None)
+            
             logger.info(f"Enhanced database service initialized at {self.base_path}")
             
         except Exception as e:
@@ -104,11 +161,15 @@ class EnhancedDatabaseService(StorageServiceInterface):
     
     async def cleanup(self) -> None:
         """Cleanup database resources"""
+        await self.progress_store.close()
+        await self.files.flush()
+        
         # Clear caches
         self._trip_cache.clear()
         self._processing_cache.clear()
         self._metadata_cache.clear()
         self._cache_loaded = False
+        self._metadata_complete = False
 
         logger.info("Database service cleanup completed")
 
@@ -116,6 +177,7 @@ class EnhancedDatabaseService(StorageServiceInterface):
         """Clear cache for a specific trip"""
         self._trip_cache.pop(trip_id, None)
         self._processing_cache.pop(trip_id, None)
+        self.progress_store.evict(trip_id)
         self._metadata_cache.pop(trip_id, None)
         logger.info(f"Cleared cache for trip {trip_id}")
     
@@ -144,20 +206,19 @@ class EnhancedDatabaseService(StorageServiceInterface):
             }
             
             # Backup trips
-            for trip_file in self.trips_path.glob("*.json"):
-                async with aiofiles.open(trip_file, 'r') as f:
-                    content = await f.read()
-                    backup_data["trips"][trip_file.stem] = json.loads(content)
+            for trip_id in self._trip_ids():
+                trip_data = await self.get_trip_data(trip_id, sections=TRIP_SECTIONS)
+                if trip_data:
+                    backup_data["trips"][trip_id] = trip_data.to_dict()
             
             # Backup processing states
             for proc_file in self.processing_path.glob("*.json"):
-                async with aiofiles.open(proc_file, 'r') as f:
+                async with aiofiles.open(proc_file, 'rb') as f:
                     content = await f.read()
-                    backup_data["processing_states"][proc_file.stem] = json.loads(content)
+                    backup_data["processing_states"][proc_file.stem] = codec.loads(content)
             
             # Save backup
-            async with aiofiles.open(backup_path, 'w') as f:
-                await f.write(json.dumps(backup_data, indent=2))
+            await self.files.write(Path(backup_path), codec.pack(backup_data, self.settings.database.compress_min_bytes))
             
             return StorageResult.success_result(
                 data={"backup_path": backup_path},
@@ -170,24 +231,22 @@ class EnhancedDatabaseService(StorageServiceInterface):
     async def restore_backup(self, backup_path: str) -> StorageResult:
         """Restore from a backup"""
         try:
-            async with aiofiles.open(backup_path, 'r') as f:
+            async with aiofiles.open(backup_path, 'rb') as f:
                 content = await f.read()
-                backup_data = json.loads(content)
+                backup_data = codec.unpack(content)
             
             restored_count = 0
             
             # Restore trips
             for trip_id, trip_data in backup_data.get("trips", {}).items():
-                trip_file = self.trips_path / f"{trip_id}.json"
-                async with aiofiles.open(trip_file, 'w') as f:
-                    await f.write(json.dumps(trip_data, indent=2))
-                restored_count += 1
+                result = await self.save_trip_data(TripData.from_dict(trip_data))
+                if result.success:
+                    restored_count += 1
             
             # Restore processing states
             for proc_id, proc_data in backup_data.get("processing_states", {}).items():
                 proc_file = self.processing_path / f"{proc_id}.json"
-                async with aiofiles.open(proc_file, 'w') as f:
-                    await f.write(json.dumps(proc_data, indent=2))
+                await self.files.write(proc_file, codec.dumps(proc_data))
             
             # Reload caches
             await self._load_caches()
@@ -200,103 +259,165 @@ class EnhancedDatabaseService(StorageServiceInterface):
             return StorageResult.error_result(f"Restore failed: {e}")
     
     # Trip Data Operations
-    async def save_trip_data(self, trip_data: TripData) -> StorageResult:
-        """Save trip data"""
+    @traced("storage.save_trip_data")
+    async def save_trip_data(self, trip_data: TripData, expected_version: Optional[int] = None) -> StorageResult:
+        """
+        Save trip data. Only sections held in memory are considered, and of
+        those only the ones whose content changed are rewritten. With
+        expected_version the save fails if the trip was saved since.
+        """
+        async with self.section_store.lock(trip_data.trip_id):
+            return await self._write_trip(trip_data, expected_version)
+    
+    async def _write_trip(self, trip_data: TripData, expected_version: Optional[int] = None) -> StorageResult:
+        """save_trip_data body; the caller holds the trip lock"""
         try:
             trip_data.update_timestamp()
+            trip_id = trip_data.trip_id
+            loaded = trip_data.loaded_sections()
+            
+            await self.section_store.read_manifest(trip_id)
+            sections = {name: getattr(trip_data, name) for name in loaded if name != GUIDE_SECTION}
+            remove: List[str] = []
+            if GUIDE_SECTION in loaded:
+                guide_sections, remove = self.section_store.guide_sections(
+                    trip_id, GUIDE_SECTION, trip_data.enhanced_guide
+                )
+                sections.update(guide_sections)
+            written = await self.section_store.write_sections(
+                trip_id, sections, self._trip_fields(trip_data), remove, expected_version
+            )
             
-            # Save to file
-            trip_file = self.trips_path / f"{trip_data.trip_id}.json"
-            async with aiofiles.open(trip_file, 'w') as f:
-                await f.write(json.dumps(trip_data.to_dict(), indent=2))
+            # Trips stored in the old single-document layout migrate on first save
+            self._legacy_trip_file(trip_id).unlink(missing_ok=True)
             
             # Update cache
             if self.config.cache_enabled:
-                self._trip_cache[trip_data.trip_id] = trip_data
+                self._trip_cache.put(trip_id, trip_data)
             
-            # Update metadata
-            metadata = TripMetadata.from_trip_data(trip_data)
+            # Update metadata; it only derives from the itinerary
+            metadata = self._metadata_cache.get(trip_id)
+            if metadata is None or "itinerary" in written:
+                await self._load_sections(trip_data, ("itinerary",))
+                metadata = TripMetadata.from_trip_data(trip_data)
+            else:
+                metadata.updated_at = trip_data.updated_at
             await self._save_metadata(metadata)
             
             return StorageResult.success_result(
-                data={"trip_id": trip_data.trip_id}
+                data={"trip_id": trip_id, "sections_written": written,
+                      "version": await self.section_store.version(trip_id)}
             )
             
+        except ConflictError as e:
+            return self._conflict_result(e)
         except Exception as e:
             logger.error(f"Failed to save trip data {trip_data.trip_id}: {e}")
             return StorageResult.error_result(f"Save failed: {e}")
     
+    def _conflict_result(self, error: ConflictError) -> StorageResult:
+        logger.info(f"Rejected stale write: {error.message}")
+        return StorageResult.error_result(error.message, metadata={"conflict": True, **error.details})
+    
     async def save_enhanced_guide(self, trip_id: str, guide: Dict[str, Any]) -> bool:
         """Save enhanced guide for a trip"""
         try:
-            # Get existing trip data
-            trip_data = await self.get_trip_data(trip_id)
-            if not trip_data:
+            async with self.section_store.lock(trip_id):
+                result = await self._save_guide(trip_id, guide)
+            if not result.success:
                 logger.warning(f"Trip not found for saving guide: {trip_id}")
-                return False
-            
-            # Update with enhanced guide
-            trip_data.enhanced_guide = guide
-            trip_data.updated_at = datetime.now().isoformat()
-            
-            # Save updated trip data
-            result = await self.save_trip_data(trip_data)
-            return result.success if result else False
+            return result.success
         except Exception as e:
             logger.error(f"Failed to save enhanced guide for {trip_id}: {e}")
             return False
 
-    async def get_trip_data(self, trip_id: str) -> Optional[TripData]:
-        """Get trip data by ID"""
+    @traced("storage.get_trip_data")
+    async def get_trip_data(
+        self,
+        trip_id: str,
+        sections: Optional[Iterable[str]] = None
+    ) -> Optional[TripData]:
+        """
+        Get trip data by ID. Pass the sections the caller reads as `sections`
+        to load them without blocking the event loop; any other section is
+        read synchronously on first attribute access, which is meant for
+        callers off the loop only.
+        """
         try:
             # Check cache first
-            if self.config.cache_enabled and trip_id in self._trip_cache:
-                return self._trip_cache[trip_id]
-            
-            # Load from file
-            trip_file = self.trips_path / f"{trip_id}.json"
-            if not trip_file.exists():
-                return None
-            
-            async with aiofiles.open(trip_file, 'r') as f:
-                content = await f.read()
-                data = json.loads(content)
-                trip_data = TripData.from_dict(data)
-            
-            # Update cache
-            if self.config.cache_enabled:
-                self._trip_cache[trip_id] = trip_data
-            
+            trip_data = self._trip_cache.get(trip_id) if self.config.cache_enabled else None
+            
+            if trip_data is None:
+                manifest = await self.section_store.read_manifest(trip_id)
+                if manifest is not None:
+                    trip_data = TripData.lazy(
+                        trip_id, partial(self._load_section_sync, trip_id), **manifest["fields"]
+                    )
+                else:
+                    trip_data = await self._load_legacy_trip(trip_id)
+                    if trip_data is None:
+                        return None
+                
+                # Update cache
+                if self.config.cache_enabled:
+                    self._trip_cache.put(trip_id, trip_data)
+            
+            if sections:
+                await self._load_sections(trip_data, sections)
+            # Sections loaded since the trip was cached count against the budget now
+            self._trip_cache.resize(trip_id)
             return trip_data
             
         except Exception as e:
             logger.error(f"Failed to get trip data {trip_id}: {e}")
             return None
     
-    async def update_trip_data(self, trip_id: str, **updates) -> StorageResult:
-        """Update trip data"""
+    @traced("storage.update_trip_data")
+    async def update_trip_data(
+        self,
+        trip_id: str,
+        expected_version: Optional[int] = None,
+        **updates
+    ) -> StorageResult:
+        """
+        Update trip data. With expected_version (from get_trip_version) the
+        update is rejected, and nothing is changed, if the trip was saved
+        since; the result's metadata then has conflict=True.
+        """
         try:
-            trip_data = await self.get_trip_data(trip_id)
-            if not trip_data:
-                return StorageResult.error_result("Trip not found")
-            
-            # Apply updates
-            for key, value in updates.items():
-                if hasattr(trip_data, key):
-                    setattr(trip_data, key, value)
-            
-            # Save updated data
-            return await self.save_trip_data(trip_data)
+            async with self.section_store.lock(trip_id):
+                trip_data = await self.get_trip_data(trip_id)
+                if not trip_data:
+                    return StorageResult.error_result("Trip not found")
+                await self.section_store.check_version(trip_id, expected_version)
+                
+                # Apply updates
+                for key, value in updates.items():
+                    # Sections are assigned without reading the stored copy first
+                    if key in TRIP_SECTIONS or hasattr(trip_data, key):
+                        setattr(trip_data, key, value)
+                
+                # Save updated data
+                return await self._write_trip(trip_data)
             
+        except ConflictError as e:
+            return self._conflict_result(e)
         except Exception as e:
             return StorageResult.error_result(f"Update failed: {e}")
     
+    async def get_trip_version(self, trip_id: str) -> Optional[int]:
+        """Version to pass as expected_version; bumped by every save (None if not found)"""
+        if await self.section_store.read_manifest(trip_id) is None:
+            return 0 if self._legacy_trip_file(trip_id).exists() else None
+        return await self.section_store.version(trip_id)
+    
+    @traced("storage.delete_trip_data")
     async def delete_trip_data(self, trip_id: str) -> StorageResult:
         """Delete trip data"""
         try:
-            trip_file = self.trips_path / f"{trip_id}.json"
-            if trip_file.exists():
-                trip_file.unlink()
+            async with self.section_store.lock(trip_id):
+                self._legacy_trip_file(trip_id).unlink(missing_ok=True)
+                self.section_store.delete(trip_id)
             
             # Remove from cache
             self._trip_cache.pop(trip_id, None)
@@ -319,10 +440,8 @@ class EnhancedDatabaseService(StorageServiceInterface):
     ) -> List[TripMetadata]:
         """List trips with optional filtering"""
         try:
-            await self._ensure_metadata_loaded()
-            
             # Start with all trips
-            trips = list(self._metadata_cache.values())
+            trips = await self._all_metadata()
             
             # Filter by user_id
             if user_id:
@@ -375,7 +494,7 @@ class EnhancedDatabaseService(StorageServiceInterface):
     async def get_storage_stats(self) -> Dict[str, Any]:
         """Get storage statistics"""
         try:
-            trip_count = len(list(self.trips_path.glob("*.json")))
+            trip_count = len(self._trip_ids())
             processing_count = len(list(self.processing_path.glob("*.json")))
             
             # Calculate total size
@@ -392,6 +511,15 @@ class EnhancedDatabaseService(StorageServiceInterface):
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
                 "cache_enabled": self.config.cache_enabled,
                 "cached_trips": len(self._trip_cache),
+                "active_processing_states": len(self.progress_store),
+                "progress_store": dict(self.progress_store.stats),
+                "caches": {
+                    cache.name: cache.stats()
+                    for cache in (self._trip_cache, self._metadata_cache, self._processing_cache)
+                },
+                "section_writes": dict(self.section_store.stats),
+                "file_commits": dict(self.files.stats, fsync=self.files.fsync),
+                "trip_locks": self.section_store.locks.stats(),
                 "storage_type": self.storage_type.value
             }
             
@@ -400,6 +528,87 @@ class EnhancedDatabaseService(StorageServiceInterface):
             return {"error": str(e)}
     
     # Helper methods
+    def _legacy_trip_file(self, trip_id: str) -> Path:
+        """Single-document trip file used before section storage"""
+        return self.trips_path / f"{trip_id}.json"
+    
+    def _trip_ids(self) -> List[str]:
+        legacy = [trip_file.stem for trip_file in self.trips_path.glob("*.json")]
+        return list(dict.fromkeys(self.section_store.list_ids() + legacy))
+    
+    @staticmethod
+    def _trip_fields(trip_data: TripData) -> Dict[str, Any]:
+        """Non-section fields, kept in the section manifest"""
+        return {
+            "user_id": trip_data.user_id,
+            "pdf_path": trip_data.pdf_path,
+            "created_at": trip_data.created_at,
+            "updated_at": trip_data.updated_at,
+        }
+    
+    async def _load_legacy_trip(self, trip_id: str) -> Optional[TripData]:
+        trip_file = self._legacy_trip_file(trip_id)
+        if not trip_file.exists():
+            return None
+        async with aiofiles.open(trip_file, 'rb') as f:
+            return codec.decode(await f.read(), TripData)
+    
+    def _load_section_sync(self, trip_id: str, name: str) -> Any:
+        """
+        Lazy loader behind TripData attribute access, for callers off the
+        event loop; async callers pass the sections they use to get_trip_data
+        """
+        if _on_event_loop():
+            logger.warning(f"Section {name} of trip {trip_id} read synchronously on the event loop")
+        if name == GUIDE_SECTION:
+            return self.section_store.read_guide_sync(trip_id, name)
+        return self.section_store.read_section_sync(trip_id, name)
+    
+    async def _load_sections(self, trip_data: TripData, sections: Iterable[str]) -> None:
+        missing = trip_data.missing_sections(sections)
+        if not missing:
+            return
+        trip_id = trip_data.trip_id
+        values = await asyncio.gather(*(
+            self.section_store.read_guide(trip_id, name) if name == GUIDE_SECTION
+            else self.section_store.read_section(trip_id, name)
+            for name in missing
+        ))
+        trip_data.set_loaded(dict(zip(missing, values)))
+    
+    async def _save_guide(
+        self,
+        trip_id: str,
+        guide: Optional[Dict[str, Any]],
+        changed_keys: Optional[Iterable[str]] = None
+    ) -> StorageResult:
+        """Write the guide's blobs (only changed_keys, if given) without touching other sections"""
+        if await self.section_store.read_manifest(trip_id) is None:
+            trip_data = await self.get_trip_data(trip_id)
+            if not trip_data:
+                return StorageResult.error_result(f"Trip {trip_id} not found")
+            trip_data.enhanced_guide = guide
+            return await self._write_trip(trip_data)
+        
+        updated_at = datetime.now().isoformat()
+        sections, remove = self.section_store.guide_sections(trip_id, GUIDE_SECTION, guide, changed_keys)
+        written = await self.section_store.write_sections(trip_id, sections, {"updated_at": updated_at}, remove)
+        version = await self.section_store.version(trip_id)
+        
+        cached = self._trip_cache.get(trip_id)
+        if cached is not None:
+            cached.set_loaded({GUIDE_SECTION: guide})
+            cached.updated_at = updated_at
+            self._trip_cache.resize(trip_id)
+        metadata = self._metadata_cache.get(trip_id)
+        if metadata is not None:
+            metadata.updated_at = updated_at
+            await self._save_metadata(metadata)
+        
+        return StorageResult.success_result(
+            data={"trip_id": trip_id, "sections_written": written, "version": version}
+        )
+    
     async def _load_caches(self):
         """Load data into caches"""
         if self._cache_loaded or not self.config.cache_enabled:
@@ -407,13 +616,13 @@ class EnhancedDatabaseService(StorageServiceInterface):
         
         try:
             # Load trip metadata
-            for metadata_file in self.metadata_path.glob("*.json"):
-                async with aiofiles.open(metadata_file, 'r') as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                    metadata = TripMetadata.from_dict(data)
-                    self._metadata_cache[metadata.trip_id] = metadata
+            evictions = self._metadata_cache.evictions
+            for metadata in await self._read_all_metadata():
+                self._metadata_cache.put(metadata.trip_id, metadata)
             
+            # Listing is served from the cache only while it holds every trip
+            self._metadata_complete = self._metadata_cache.evictions == evictions
+            self._metadata_evictions = self._metadata_cache.evictions
             self._cache_loaded = True
             logger.info(f"Loaded {len(self._metadata_cache)} trip metadata into cache")
             
@@ -425,16 +634,44 @@ class EnhancedDatabaseService(StorageServiceInterface):
         if not self._cache_loaded:
             await self._load_caches()
     
+    async def _read_all_metadata(self) -> List[TripMetadata]:
+        all_metadata = []
+        for metadata_file in self.metadata_path.glob("*.json"):
+            async with aiofiles.open(metadata_file, 'rb') as f:
+                all_metadata.append(codec.decode(await f.read(), TripMetadata))
+        return all_metadata
+    
+    async def _all_metadata(self) -> List[TripMetadata]:
+        """Every trip's metadata; from the cache unless it has had to evict some"""
+        await self._ensure_metadata_loaded()
+        if self._metadata_complete and self._metadata_cache.evictions == self._metadata_evictions:
+            return self._metadata_cache.values()
+        return await self._read_all_metadata()
+    
+    def _estimate_trip_bytes(self, trip_data: TripData) -> int:
+        """Approximate memory held by a cached trip, from its loaded sections' stored sizes"""
+        stored = self.section_store.section_sizes(trip_data.trip_id)
+        total = TRIP_OVERHEAD_BYTES
+        for name in trip_data.loaded_sections():
+            if name == GUIDE_SECTION and name in stored:
+                size = sum(v for k, v in stored.items() if k == name or k.startswith(GUIDE_SECTION_PREFIX))
+            else:
+                size = stored.get(name)
+            if size is None:
+                # Not stored in sections yet (new or single-document trip)
+                size = len(codec.dumps(trip_data.__dict__[name]))
+            total += size * JSON_MEMORY_FACTOR
+        return total
+    
     async def _save_metadata(self, metadata: TripMetadata):
         """Save trip metadata"""
         try:
             metadata_file = self.metadata_path / f"{metadata.trip_id}.json"
-            async with aiofiles.open(metadata_file, 'w') as f:
-                await f.write(json.dumps(metadata.to_dict(), indent=2))
+            await self.files.write(metadata_file, codec.dumps(metadata.to_dict()))
             
             # Update cache
             if self.config.cache_enabled:
-                self._metadata_cache[metadata.trip_id] = metadata
+                self._metadata_cache.put(metadata.trip_id, metadata)
                 
         except Exception as e:
             logger.error(f"Failed to save metadata for {metadata.trip_id}: {e}")
@@ -461,6 +698,7 @@ class EnhancedDatabaseService(StorageServiceInterface):
         return filtered_trips
     
     # Processing State Operations
+    @traced("storage.create_processing_state")
     async def create_processing_state(
         self,
         trip_id: str,
@@ -481,21 +719,18 @@ class EnhancedDatabaseService(StorageServiceInterface):
                 updated_at=now
             )
             
-            # Save to file
-            state_file = self.processing_path / f"{trip_id}.json"
-            async with aiofiles.open(state_file, 'w') as f:
-                await f.write(json.dumps(processing_state.to_dict(), indent=2))
-            
-            # Update cache
-            if self.config.cache_enabled:
-                self._processing_cache[trip_id] = processing_state
+            # A new state is written through
+            self._processing_cache.pop(trip_id)
+            await self.progress_store.put(processing_state, flush=True)
             
+            self._track_job(trip_id, processing_state.status)
             return StorageResult.success_result(processing_state)
             
         except Exception as e:
             logger.error(f"Failed to create processing state for {trip_id}: {e}")
             return StorageResult.error_result(str(e))
     
+    @traced("storage.update_processing_state")
     async def update_processing_state(
         self,
         trip_id: str,
@@ -504,7 +739,11 @@ class EnhancedDatabaseService(StorageServiceInterface):
         progress: Optional[int] = None,
         **kwargs
     ) -> StorageResult:
-        """Update an existing processing state"""
+        """
+        Update an existing processing state. Progress-only updates are
+        coalesced in the progress store; status changes and terminal states
+        are persisted before returning.
+        """
         try:
             # Get existing state
             state = await self.get_processing_state(trip_id)
@@ -512,51 +751,62 @@ class EnhancedDatabaseService(StorageServiceInterface):
                 return StorageResult.error_result(f"Processing state not found for {trip_id}")
             
             # Update fields
+            changed = []
+            status_changed = status is not None and status != state.status
             if status is not None:
                 state.status = status
             if message is not None:
                 state.message = message
             if progress is not None:
                 state.progress = progress
+            for field_name in ("extracted_data", "error_details", "partial_results"):
+                if kwargs.get(field_name) is not None:
+                    setattr(state, field_name, kwargs[field_name])
+                    changed.append(field_name)
 
             # Always update the timestamp
             from datetime import datetime
             state.updated_at = datetime.utcnow()
             
-            # Save to file
-            state_file = self.processing_path / f"{trip_id}.json"
-            async with aiofiles.open(state_file, 'w') as f:
-                await f.write(json.dumps(state.to_dict(), indent=2))
-            
-            # Update cache
-            if self.config.cache_enabled:
-                self._processing_cache[trip_id] = state
+            terminal = state.status in TERMINAL_STATUSES
+            await self.progress_store.put(state, changed, flush=status_changed or terminal)
+            if terminal:
+                # Finished states leave the progress store for the bounded cache
+                self.progress_store.evict(trip_id)
+                if self.config.cache_enabled:
+                    self._processing_cache.put(trip_id, state)
             
+            self._track_job(trip_id, state.status)
             return StorageResult.success_result(state)
             
         except Exception as e:
             logger.error(f"Failed to update processing state for {trip_id}: {e}")
             return StorageResult.error_result(str(e))
     
+    @traced("storage.get_processing_state")
     async def get_processing_state(self, trip_id: str) -> Optional[ProcessingState]:
         """Get processing state by trip ID"""
         try:
-            # Check cache first
-            if self.config.cache_enabled and trip_id in self._processing_cache:
-                return self._processing_cache[trip_id]
+            # Active states are always in memory
+            state = self.progress_store.get(trip_id)
+            if state is not None:
+                return state
+            if self.config.cache_enabled:
+                state = self._processing_cache.get(trip_id)
+                if state is not None:
+                    return state
             
             # Load from file
             state_file = self.processing_path / f"{trip_id}.json"
             if not state_file.exists():
                 return None
             
-            async with aiofiles.open(state_file, 'r') as f:
-                data = json.loads(await f.read())
-                state = ProcessingState(**data)
+            async with aiofiles.open(state_file, 'rb') as f:
+                state = codec.decode(await f.read(), ProcessingState)
             
             # Update cache
             if self.config.cache_enabled:
-                self._processing_cache[trip_id] = state
+                self._processing_cache.put(trip_id, state)
             
             return state
             
@@ -564,24 +814,36 @@ class EnhancedDatabaseService(StorageServiceInterface):
             logger.error(f"Failed to get processing state for {trip_id}: {e}")
             return None
     
+    @traced("storage.delete_processing_state")
     async def delete_processing_state(self, trip_id: str) -> StorageResult:
         """Delete processing state"""
         try:
+            # Drop it from memory first so a pending flush cannot recreate the file
+            self.progress_store.discard(trip_id)
+            
             # Delete file
             state_file = self.processing_path / f"{trip_id}.json"
             if state_file.exists():
                 state_file.unlink()
             
             # Remove from cache
-            if trip_id in self._processing_cache:
-                del self._processing_cache[trip_id]
+            self._processing_cache.pop(trip_id)
             
+            self._track_job(trip_id, None)
             return StorageResult.success_result()
             
         except Exception as e:
             logger.error(f"Failed to delete processing state for {trip_id}: {e}")
             return StorageResult.error_result(str(e))
     
+    def _track_job(self, trip_id: str, status: Optional[ProcessingStatus]) -> None:
+        """Keep the in-progress job gauge in step with processing states"""
+        if status in (ProcessingStatus.PENDING, ProcessingStatus.PROCESSING):
+            self._active_jobs.add(trip_id)
+        else:
+            self._active_jobs.discard(trip_id)
+        metrics_registry.record("jobs.in_progress", len(self._active_jobs))
+    
     async def cleanup_old_data(self, older_than_days: int = 30) -> StorageResult:
         """Clean up old data older than specified days"""
         try:
@@ -599,6 +861,11 @@ class EnhancedDatabaseService(StorageServiceInterface):
                 if trip_file.stat().st_mtime < cutoff_date.timestamp():
                     trip_file.unlink()
                     deleted_count += 1
+            for trip_id in self.section_store.list_ids():
+                if self.section_store.modified_at(trip_id) < cutoff_date.timestamp():
+                    self.section_store.delete(trip_id)
+                    self._trip_cache.pop(trip_id, None)
+                    deleted_count += 1
             
             return StorageResult.success_result(
                 data={"deleted_count": deleted_count},
@@ -614,7 +881,7 @@ class EnhancedDatabaseService(StorageServiceInterface):
         try:
             # For file-based storage, we can only execute simple queries
             if query == "count_trips":
-                count = len(list(self.trips_path.glob("*.json")))
+                count = len(self._trip_ids())
                 return StorageResult.success_result(data={"count": count})
             elif query == "count_processing":
                 count = len(list(self.processing_path.glob("*.json")))
@@ -634,39 +901,50 @@ class EnhancedDatabaseService(StorageServiceInterface):
     ) -> StorageResult:
         """Update preference collection progress"""
         try:
-            # Get trip data
-            trip_data = await self.get_trip_data(trip_id)
-            if not trip_data:
-                return StorageResult.error_result(f"Trip {trip_id} not found")
-            
-            # Update preferences
-            if not hasattr(trip_data, 'preferences_collected'):
-                trip_data.preferences_collected = preferences_collected
-            if not hasattr(trip_data, 'preferences_progress'):
-                trip_data.preferences_progress = preferences_progress
-            
-            # Save updated trip data
-            return await self.save_trip_data(trip_data)
+            async with self.section_store.lock(trip_id):
+                # Get trip data
+                trip_data = await self.get_trip_data(trip_id)
+                if not trip_data:
+                    return StorageResult.error_result(f"Trip {trip_id} not found")
+                
+                # Update preferences
+                if not hasattr(trip_data, 'preferences_collected'):
+                    trip_data.preferences_collected = preferences_collected
+                if not hasattr(trip_data, 'preferences_progress'):
+                    trip_data.preferences_progress = preferences_progress
+                
+                # Save updated trip data
+                return await self._write_trip(trip_data)
             
         except Exception as e:
             logger.error(f"Failed to update preference progress for {trip_id}: {e}")
             return StorageResult.error_result(str(e))
     
-    async def save_enhanced_guide_data(self, trip_id: str, guide_data: Dict[str, Any]) -> StorageResult:
-        """Save enhanced guide data for a trip - renamed method to avoid caching issues"""
+    async def save_enhanced_guide_data(
+        self,
+        trip_id: str,
+        guide_data: Dict[str, Any],
+        merge: bool = False
+    ) -> StorageResult:
+        """
+        Save enhanced guide data for a trip - renamed method to avoid caching issues.
+        With merge=True, guide_data holds only regenerated sections and is
+        overlaid onto the stored guide.
+        """
         logger.info(f"DEBUG: save_enhanced_guide_data called for trip {trip_id}")
         try:
-            # Get trip data
-            trip_data = await self.get_trip_data(trip_id)
-            if not trip_data:
-                return StorageResult.error_result(f"Trip {trip_id} not found")
-            
-            # Add enhanced guide data to trip
-            trip_data.enhanced_guide = guide_data
-            trip_data.enhanced_guide_created_at = datetime.utcnow()
-            
-            # Save updated trip data
-            return await self.save_trip_data(trip_data)
+            # Held across the merge so concurrent section updates are not lost
+            async with self.section_store.lock(trip_id):
+                changed_keys = None
+                if merge:
+                    # Only the regenerated sections' blobs (and their metadata) are rewritten
+                    trip_data = await self.get_trip_data(trip_id, sections=(GUIDE_SECTION,))
+                    if not trip_data:
+                        return StorageResult.error_result(f"Trip {trip_id} not found")
+                    changed_keys = set(guide_data) | {"section_meta"}
+                    guide_data = merge_sections(trip_data.enhanced_guide, guide_data)
+                
+                return await self._save_guide(trip_id, guide_data, changed_keys)
             
         except Exception as e:
             logger.error(f"Failed to save enhanced guide for {trip_id}: {e}")
@@ -675,11 +953,11 @@ class EnhancedDatabaseService(StorageServiceInterface):
     async def get_enhanced_guide(self, trip_id: str) -> Optional[Dict[str, Any]]:
         """Get enhanced guide data for a trip"""
         try:
-            trip_data = await self.get_trip_data(trip_id)
+            trip_data = await self.get_trip_data(trip_id, sections=(GUIDE_SECTION,))
             if not trip_data:
                 return None
             
-            return getattr(trip_data, 'enhanced_guide', None)
+            return trip_data.enhanced_guide
             
         except Exception as e:
             logger.error(f"Failed to get enhanced guide for {trip_id}: {e}")
@@ -14,6 +14,9 @@ import googlemaps
 from pathlib import Path
 from dotenv import load_dotenv
 
+from .candidate_ranking import CandidateMatrix, candidate_ranker
+from ..core.upstream_metrics import upstream_requests_kwargs
+
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
 env_path = root_dir / ".env"
@@ -42,7 +45,7 @@ class EnhancedGooglePlacesService:
         # API configuration
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         if self.api_key:
-            self.client = googlemaps.Client(key=self.api_key)
+            self.client = googlemaps.Client(key=self.api_key, requests_kwargs=upstream_requests_kwargs())
         else:
             self.client = None
         
@@ -196,8 +199,10 @@ class EnhancedGooglePlacesService:
                     logger.warning(f"Failed to process restaurant {place.get('name', 'unknown')}: {e}")
                     continue
             
-            # Sort by rating and review count
-            restaurants.sort(key=lambda x: (x.get('rating', 0), x.get('review_count', 0)), reverse=True)
+            # Rank by rating and review volume (vectorized)
+            restaurants = candidate_ranker.rank(
+                CandidateMatrix.from_candidates(restaurants), len(restaurants), day_window=None, dedupe=False
+            )
             
             # Cache the results
             self._cache[cache_key] = restaurants
@@ -527,17 +532,10 @@ class EnhancedGooglePlacesService:
                 if len(attractions) >= limit:
                     break
 
-            # Remove duplicates and sort by rating
-            seen_names = set()
-            unique_attractions = []
-            for attraction in attractions:
-                name = attraction.get('name', '').lower()
-                if name not in seen_names:
-                    seen_names.add(name)
-                    unique_attractions.append(attraction)
-
-            unique_attractions.sort(key=lambda x: x.get('rating', 0), reverse=True)
-            return unique_attractions[:limit]
+            # Remove duplicates and rank by rating and review volume
+            return candidate_ranker.rank(
+                CandidateMatrix.from_candidates(attractions), limit, day_window=None
+            )
 
         except Exception as e:
             logger.error(f"Google Places attraction search failed: {e}")
@@ -13,12 +13,14 @@ from pathlib import Path
 import aiohttp
 
 from .guide_parser import GuideParser
+from .perplexity_markdown import parse_guide_markdown
 from .llm_parser import LLMParser
 from .perplexity_search_service import PerplexitySearchService
 from .weather_service import WeatherService
 from .google_places_enhancer import GooglePlacesEnhancer
 from ..utils.environment import load_project_env, get_api_key
 from ..utils.error_handling import safe_execute, APIError, log_and_return_error
+from ..core.upstream_metrics import upstream_trace_configs
 
 # Load environment variables
 load_project_env()
@@ -399,7 +401,7 @@ class EnhancedGuideService:
         try:
             print(f"[DEBUG] Starting Perplexity API call for {context.get('destination', 'unknown')}")
             timeout = aiohttp.ClientTimeout(total=90)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -520,7 +522,7 @@ Make it feel like a personalized concierge service, not a generic guide."""
             }
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.openai_api_key}",
                     "Content-Type": "application/json"
@@ -588,158 +590,7 @@ Make it feel like a personalized concierge service, not a generic guide."""
     
     def _parse_guide_content(self, content: str, citations: List) -> Dict:
         """Parse LLM response into structured guide format"""
-        
-        # Initialize guide structure
-        guide = {
-            "summary": "",
-            "destination_insights": "",
-            "weather": {},
-            "daily_itinerary": [],
-            "restaurants": [],
-            "attractions": [],
-            "events": [],
-            "neighborhoods": [],
-            "practical_info": {},
-            "hidden_gems": [],
-            "citations": citations,
-            "raw_content": content
-        }
-        
-        # Parse sections from the content
-        sections = (content or "").split("\n## ")
-        
-        for section in sections:
-            lines = section.split("\n")
-            if not lines:
-                continue
-                
-            first = lines[0] if lines else ""
-            title = str(first or "").strip("#").strip().lower()
-            content = "\n".join(lines[1:]).strip()
-            
-            if "summary" in title:
-                guide["summary"] = content
-            elif "insight" in title or "destination" in title:
-                guide["destination_insights"] = content
-            elif "itinerary" in title:
-                guide["daily_itinerary"] = self._parse_itinerary(content)
-            elif "dining" in title or "restaurant" in title:
-                guide["restaurants"] = self._parse_restaurants(content)
-            elif "cultural" in title or "entertainment" in title or "event" in title:
-                guide["events"] = self._parse_events(content)
-            elif "neighborhood" in title:
-                guide["neighborhoods"] = self._parse_neighborhoods(content)
-            elif "practical" in title:
-                guide["practical_info"] = self._parse_practical_info(content)
-            elif "hidden" in title or "secret" in title:
-                guide["hidden_gems"] = self._parse_hidden_gems(content)
-        
-        return guide
-    
-    def _parse_itinerary(self, content: str) -> List[Dict]:
-        """Parse daily itinerary from content"""
-        days = []
-        current_day = None
-        
-        for line in content.split("\n"):
-            if line.startswith("### Day") or line.startswith("**Day"):
-                if current_day:
-                    days.append(current_day)
-                current_day = {
-                    "day": len(days) + 1,
-                    "title": line.strip("#*").strip(),
-                    "activities": []
-                }
-            elif current_day and line.strip():
-                current_day["activities"].append(line.strip("- ").strip())
-        
-        if current_day:
-            days.append(current_day)
-        
-        return days
-    
-    def _parse_restaurants(self, content: str) -> List[Dict]:
-        """Parse restaurant recommendations from content"""
-        restaurants = []
-        current_restaurant = None
-        
-        for line in content.split("\n"):
-            if line.startswith("### ") or line.startswith("**"):
-                if current_restaurant:
-                    restaurants.append(current_restaurant)
-                current_restaurant = {
-                    "name": line.strip("#*").strip(),
-                    "description": "",
-                    "details": []
-                }
-            elif current_restaurant:
-                if line.strip():
-                    if not current_restaurant["description"]:
-                        current_restaurant["description"] = line.strip()
-                    else:
-                        current_restaurant["details"].append(line.strip("- ").strip())
-        
-        if current_restaurant:
-            restaurants.append(current_restaurant)
-        
-        return restaurants
-    
-    def _parse_events(self, content: str) -> List[Dict]:
-        """Parse events from content"""
-        events = []
-        for line in content.split("\n"):
-            if line.strip() and not line.startswith("#"):
-                events.append({"description": line.strip("- ").strip()})
-        return events
-    
-    def _parse_neighborhoods(self, content: str) -> List[Dict]:
-        """Parse neighborhood information"""
-        neighborhoods = []
-        current_area = None
-        
-        for line in content.split("\n"):
-            if line.startswith("### ") or line.startswith("**"):
-                if current_area:
-                    neighborhoods.append(current_area)
-                current_area = {
-                    "name": line.strip("#*").strip(),
-                    "description": "",
-                    "highlights": []
-                }
-            elif current_area and line.strip():
-                if not current_area["description"]:
-                    current_area["description"] = line.strip()
-                else:
-                    current_area["highlights"].append(line.strip("- ").strip())
-        
-        if current_area:
-            neighborhoods.append(current_area)
-        
-        return neighborhoods
-    
-    def _parse_practical_info(self, content: str) -> Dict:
-        """Parse practical information"""
-        info = {}
-        current_category = "general"
-        
-        for line in content.split("\n"):
-            if line.startswith("### ") or line.startswith("**"):
-                current_category = (line or "").strip("#*").strip().lower()
-                info[current_category] = []
-            elif line.strip():
-                if current_category not in info:
-                    info[current_category] = []
-                info[current_category].append(line.strip("- ").strip())
-        
-        return info
-    
-    def _parse_hidden_gems(self, content: str) -> List[Dict]:
-        """Parse hidden gems and local secrets"""
-        gems = []
-        for line in content.split("\n"):
-            if line.strip() and not line.startswith("#"):
-                gems.append({"description": line.strip("- ").strip()})
-        return gems
+        return parse_guide_markdown(content, citations)
     
     async def _parse_rich_guide(self, content: str) -> Dict:
         """Parse guide content while preserving rich details"""
@@ -18,7 +18,9 @@ from .interfaces import (
 )
 from ..core.exceptions import ServiceError, ConfigurationError, ValidationError
 from ..config import get_settings
-from .enhanced_redis_cache import cache_manager
+from ..core.upstream_metrics import upstream_call
+from .llm_cache import llm_response_cache, CachedCompletion, SCHEMA_VERSION
+from .streaming_json import JSONItemStream
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +42,8 @@ class EnhancedLLMService(LLMServiceInterface):
         
         self._provider = provider
         self.settings = get_settings()
-        self._client = None
+        # AsyncOpenAI or AsyncAnthropic, depending on the provider
+        self._client: Any = None
         self._capabilities = self._get_provider_capabilities()
         self._models = self._get_provider_models()
     
@@ -68,6 +71,8 @@ class EnhancedLLMService(LLMServiceInterface):
                 await self._initialize_anthropic()
             elif self._provider == LLMProvider.PERPLEXITY:
                 await self._initialize_perplexity()
+            elif self._provider in (LLMProvider.XAI, LLMProvider.SAMBANOVA):
+                await self._initialize_compatible()
             else:
                 raise ConfigurationError(f"Unsupported provider: {self._provider}")
             
@@ -90,7 +95,7 @@ class EnhancedLLMService(LLMServiceInterface):
                 max_tokens=10
             )
             
-            response = await self.generate_response(test_request)
+            response = await self.generate_response(test_request, skip_cache=True)
             
             return {
                 "status": "healthy" if response.is_success else "unhealthy",
@@ -123,52 +128,58 @@ class EnhancedLLMService(LLMServiceInterface):
         request: Union[LLMRequest, str],
         **kwargs
     ) -> LLMResponse:
-        """Generate a response from the LLM with Redis caching"""
+        """
+        Generate a response from the LLM through the LLM response cache.
+        
+        Cache kwargs: cache_namespace (TTL group, default "llm_response"),
+        schema_version, skip_cache (bypass entirely) and refresh_cache
+        (ignore a cached answer but store the new one).
+        """
+        # Convert string to LLMRequest
+        if isinstance(request, str):
+            request = LLMRequest(prompt=request)
+        
         try:
-            # Convert string to LLMRequest
-            if isinstance(request, str):
-                request = LLMRequest(prompt=request)
-            
             # Merge kwargs into request
             for key, value in kwargs.items():
                 if hasattr(request, key) and value is not None:
                     setattr(request, key, value)
             
-            # Generate cache key based on request parameters
-            cache_key_data = {
-                "provider": self._provider.value,
-                "prompt_hash": hashlib.sha256(request.prompt.encode()).hexdigest(),
-                "model": request.model or "default",
-                "temperature": request.temperature,
-                "max_tokens": request.max_tokens,
-                "system_prompt_hash": hashlib.sha256(
-                    (request.system_prompt or "").encode()
-                ).hexdigest() if request.system_prompt else None
-            }
-            
-            # Check Redis cache if caching is enabled
-            if self.config.cache_enabled and not kwargs.get("skip_cache", False):
-                cached_response = await cache_manager.get("llm_response", cache_key_data)
-                if cached_response:
-                    logger.info(f"Redis cache HIT for LLM ({self._provider.value})")
-                    # Convert dict back to LLMResponse
-                    return LLMResponse(**cached_response)
-            
-            # Route to appropriate provider
-            if self._provider == LLMProvider.OPENAI:
-                response = await self._generate_openai_response(request)
-            elif self._provider == LLMProvider.ANTHROPIC:
-                response = await self._generate_anthropic_response(request)
-            elif self._provider == LLMProvider.PERPLEXITY:
-                response = await self._generate_perplexity_response(request)
-            else:
-                raise ServiceError(f"Unsupported provider: {self._provider}")
-            
-            # Cache successful responses
-            if self.config.cache_enabled and not response.error and not kwargs.get("skip_cache", False):
-                await cache_manager.set("llm_response", cache_key_data, response.__dict__)
+            # Identical requests are served from the persistent LLM response cache
+            live: Dict[str, LLMResponse] = {}
+            
+            async def call() -> CachedCompletion:
+                live["response"] = await self._dispatch(request)
+                response = live["response"]
+                return CachedCompletion(content=response.content or "", model=response.model, usage=response.usage)
+            
+            completion = await llm_response_cache.complete(
+                kwargs.get("cache_namespace", "llm_response"),
+                self._provider.value,
+                request.model or self.default_model,
+                self._cache_messages(request),
+                call,
+                params={
+                    "temperature": request.temperature,
+                    "max_tokens": request.max_tokens,
+                    "functions": request.functions,
+                    "images": [hashlib.sha256(image.encode()).hexdigest() for image in request.images or []],
+                },
+                schema_version=kwargs.get("schema_version", SCHEMA_VERSION),
+                bypass=not self.config.cache_enabled or kwargs.get("skip_cache", False),
+                refresh=kwargs.get("refresh_cache", False)
+            )
+            if "response" in live:
+                return live["response"]
             
-            return response
+            logger.info(f"LLM cache HIT ({self._provider.value})")
+            return LLMResponse(
+                content=completion.content,
+                provider=self._provider,
+                model=completion.model,
+                usage=completion.usage,
+                metadata={"cached": True}
+            )
                 
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
@@ -179,6 +190,42 @@ class EnhancedLLMService(LLMServiceInterface):
                 error=str(e)
             )
     
+    async def _dispatch(self, request: LLMRequest) -> LLMResponse:
+        """Route a request to the provider implementation"""
+        with upstream_call(self._provider.value, {"llm.model": request.model or self.default_model}):
+            if self._provider == LLMProvider.OPENAI:
+                return await self._generate_openai_response(request)
+            elif self._provider == LLMProvider.ANTHROPIC:
+                return await self._generate_anthropic_response(request)
+            elif self._provider == LLMProvider.PERPLEXITY:
+                return await self._generate_perplexity_response(request)
+            elif self._provider in (LLMProvider.XAI, LLMProvider.SAMBANOVA):
+                return await self._generate_compatible_response(request)
+        raise ServiceError(f"Unsupported provider: {self._provider}")
+    
+    @property
+    def default_model(self) -> str:
+        """Model used when a request does not name one"""
+        if self._provider == LLMProvider.OPENAI:
+            return self.settings.services.openai_model
+        elif self._provider == LLMProvider.ANTHROPIC:
+            return self.settings.services.anthropic_model
+        elif self._provider == LLMProvider.PERPLEXITY:
+            return self.settings.services.perplexity_model
+        elif self._provider == LLMProvider.XAI:
+            return self.settings.services.xai_model
+        elif self._provider == LLMProvider.SAMBANOVA:
+            return self.settings.services.sambanova_model
+        return "default"
+    
+    @staticmethod
+    def _cache_messages(request: LLMRequest) -> List[Dict[str, Any]]:
+        messages = []
+        if request.system_prompt:
+            messages.append({"role": "system", "content": request.system_prompt})
+        messages.append({"role": "user", "content": request.prompt})
+        return messages
+    
     async def generate_streaming_response(
         self,
         request: Union[LLMRequest, str],
@@ -189,16 +236,16 @@ class EnhancedLLMService(LLMServiceInterface):
         if not self.supports_streaming():
             raise ServiceError(f"Provider {self._provider} does not support streaming")
         
+        # Convert string to LLMRequest
+        if isinstance(request, str):
+            request = LLMRequest(prompt=request, stream=True)
+        else:
+            request.stream = True
+        
         try:
-            # Convert string to LLMRequest
-            if isinstance(request, str):
-                request = LLMRequest(prompt=request, stream=True)
-            else:
-                request.stream = True
-            
-            # Route to appropriate provider
-            if self._provider == LLMProvider.OPENAI:
-                return await self._generate_openai_streaming(request, callback)
+            # Route to appropriate provider; all but Anthropic speak the OpenAI API
+            if self._provider != LLMProvider.ANTHROPIC:
+                return await self._generate_openai_streaming(request, callback, **kwargs)
             else:
                 raise ServiceError(f"Streaming not implemented for {self._provider}")
                 
@@ -211,6 +258,27 @@ class EnhancedLLMService(LLMServiceInterface):
                 error=str(e)
             )
     
+    async def generate_json_items(
+        self,
+        request: Union[LLMRequest, str],
+        item_callback: Callable[[Optional[str], Any], Awaitable[None]]
+    ) -> LLMResponse:
+        """
+        Stream a JSON completion and hand each array item (keyed by its
+        top-level property, None for a root array) to item_callback as soon
+        as it closes. The full text is not accumulated; the response carries
+        item and parse-error counts in its metadata instead.
+        """
+        parser = JSONItemStream()
+
+        async def feed(chunk: str) -> None:
+            for key, value in parser.feed(chunk):
+                await item_callback(key, value)
+
+        response = await self.generate_streaming_response(request, feed, accumulate=False)
+        response.metadata = {**(response.metadata or {}), "items": parser.items, "item_errors": parser.errors}
+        return response
+
     async def validate_api_key(self) -> bool:
         """Validate the API key"""
         try:
@@ -218,7 +286,7 @@ class EnhancedLLMService(LLMServiceInterface):
                 prompt="Test",
                 max_tokens=1
             )
-            response = await self.generate_response(test_request)
+            response = await self.generate_response(test_request, skip_cache=True)
             return response.is_success
             
         except Exception:
@@ -270,10 +338,28 @@ class EnhancedLLMService(LLMServiceInterface):
         except ImportError:
             raise ConfigurationError("OpenAI library not installed (required for Perplexity)")
     
+    async def _initialize_compatible(self):
+        """Initialize an OpenAI-compatible client for xAI or SambaNova"""
+        try:
+            from openai import AsyncOpenAI
+            
+            services = self.settings.services
+            if self._provider == LLMProvider.XAI:
+                api_key, base_url = services.xai_api_key, "https://api.x.ai/v1"
+            else:
+                api_key, base_url = services.sambanova_api_key, "https://api.sambanova.ai/v1"
+            if not api_key:
+                raise ConfigurationError(f"{self._provider.value} API key not configured")
+            
+            self._client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+            
+        except ImportError:
+            raise ConfigurationError(f"OpenAI library not installed (required for {self._provider.value})")
+    
     async def _generate_openai_response(self, request: LLMRequest) -> LLMResponse:
         """Generate response using OpenAI"""
         try:
-            messages = []
+            messages: List[Dict[str, Any]] = []
             
             if request.system_prompt:
                 messages.append({"role": "system", "content": request.system_prompt})
@@ -282,13 +368,13 @@ class EnhancedLLMService(LLMServiceInterface):
             
             # Add images if provided (for vision models)
             if request.images and self.supports_vision():
-                content = [{"type": "text", "text": request.prompt}]
+                parts: List[Dict[str, Any]] = [{"type": "text", "text": request.prompt}]
                 for image in request.images:
-                    content.append({
+                    parts.append({
                         "type": "image_url",
                         "image_url": {"url": f"data:image/jpeg;base64,{image}"}
                     })
-                messages[-1]["content"] = content
+                messages[-1]["content"] = parts
             
             response = await self._client.chat.completions.create(
                 model=request.model or self.settings.services.openai_model,
@@ -376,17 +462,57 @@ class EnhancedLLMService(LLMServiceInterface):
         except Exception as e:
             raise ServiceError(f"Perplexity API error: {e}", service_name="perplexity")
     
+    async def _generate_compatible_response(self, request: LLMRequest) -> LLMResponse:
+        """Generate response using an OpenAI-compatible API (xAI, SambaNova)"""
+        try:
+            services = self.settings.services
+            if self._provider == LLMProvider.XAI:
+                max_tokens, temperature = services.xai_max_tokens, services.xai_temperature
+            else:
+                max_tokens, temperature = services.sambanova_max_tokens, services.sambanova_temperature
+            
+            messages = []
+            if request.system_prompt:
+                messages.append({"role": "system", "content": request.system_prompt})
+            messages.append({"role": "user", "content": request.prompt})
+            
+            response = await self._client.chat.completions.create(
+                model=request.model or self.default_model,
+                messages=messages,
+                max_tokens=request.max_tokens or max_tokens,
+                temperature=request.temperature or temperature,
+                timeout=self.config.timeout_seconds
+            )
+            
+            content = response.choices[0].message.content
+            usage = {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
+            } if response.usage else None
+            
+            return LLMResponse(
+                content=content,
+                provider=self._provider,
+                model=response.model,
+                usage=usage
+            )
+            
+        except Exception as e:
+            raise ServiceError(f"{self._provider.value} API error: {e}", service_name=self._provider.value)
+    
     async def _generate_openai_streaming(
         self, 
         request: LLMRequest, 
-        callback: Callable[[str], Awaitable[None]]
+        callback: Callable[[str], Awaitable[None]],
+        accumulate: bool = True
     ) -> LLMResponse:
-        """Generate streaming response using OpenAI"""
+        """Generate streaming response using OpenAI or an OpenAI-compatible API"""
         try:
-            messages = [{"role": "user", "content": request.prompt}]
+            messages = self._cache_messages(request)
             
             stream = await self._client.chat.completions.create(
-                model=request.model or self.settings.services.openai_model,
+                model=request.model or self.default_model,
                 messages=messages,
                 max_tokens=request.max_tokens or self.settings.services.openai_max_tokens,
                 temperature=request.temperature or self.settings.services.openai_temperature,
@@ -394,21 +520,25 @@ class EnhancedLLMService(LLMServiceInterface):
                 timeout=self.config.timeout_seconds
             )
             
-            full_content = ""
+            parts: List[str] = []
+            streamed_chars = 0
             async for chunk in stream:
-                if chunk.choices[0].delta.content:
+                if chunk.choices and chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
-                    full_content += content
+                    streamed_chars += len(content)
+                    if accumulate:
+                        parts.append(content)
                     await callback(content)
             
             return LLMResponse(
-                content=full_content,
+                content="".join(parts),
                 provider=self._provider,
-                model=request.model or self.settings.services.openai_model
+                model=request.model or self.default_model,
+                metadata={"streamed_chars": streamed_chars}
             )
             
         except Exception as e:
-            raise ServiceError(f"OpenAI streaming error: {e}", service_name="openai")
+            raise ServiceError(f"{self._provider.value} streaming error: {e}", service_name=self._provider.value)
     
     def _get_provider_capabilities(self) -> List[LLMCapability]:
         """Get capabilities for the provider"""
@@ -438,5 +568,9 @@ class EnhancedLLMService(LLMServiceInterface):
             return ["claude-3-sonnet-20240229", "claude-3-opus-20240229", "claude-3-haiku-20240307"]
         elif self._provider == LLMProvider.PERPLEXITY:
             return ["llama-3.1-sonar-small-128k-online", "llama-3.1-sonar-large-128k-online"]
+        elif self._provider == LLMProvider.XAI:
+            return ["grok-beta", "grok-2-latest"]
+        elif self._provider == LLMProvider.SAMBANOVA:
+            return ["Meta-Llama-3.1-8B-Instruct", "Meta-Llama-3.1-70B-Instruct"]
         else:
             return []
@@ -12,6 +12,7 @@ from typing import Dict, List, Optional, Any, Callable
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
+from ..core.upstream_metrics import upstream_trace_configs
 
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
@@ -227,7 +228,7 @@ Format as JSON with categories: essentials, clothing, accessories, electronics,
 
         try:
             timeout = aiohttp.ClientTimeout(total=15)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -294,7 +295,7 @@ Format as JSON."""
 
         try:
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -16,6 +16,9 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from ..core import codec
+from ..core.tracing import tracer
+
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
 env_path = root_dir / ".env"
@@ -53,6 +56,9 @@ class CacheConfig:
         "neighborhoods": 3600 * 24 * 7,    # 1 week - neighborhood info is stable
         "recommendations": 3600 * 12,      # 12 hours - recommendations update
     }
+    
+    # Values at least this large are stored compressed (guides, search results)
+    COMPRESS_MIN_BYTES = 16 * 1024
 
 
 class EnhancedRedisCache:
@@ -75,6 +81,8 @@ class EnhancedRedisCache:
             "errors": 0,
             "sets": 0
         }
+        # Hit/miss counts per namespace, for hit ratios
+        self.namespace_stats: Dict[str, Dict[str, int]] = {}
     
     async def connect(self) -> bool:
         """Establish Redis connection with pooling"""
@@ -89,7 +97,7 @@ class EnhancedRedisCache:
                 db=self.redis_db,
                 password=self.redis_password,
                 max_connections=self.redis_max_connections,
-                decode_responses=True,
+                decode_responses=False,  # values may be compressed bytes
                 socket_connect_timeout=5,
                 socket_timeout=5,
                 retry_on_timeout=True,
@@ -137,7 +145,7 @@ class EnhancedRedisCache:
     
     def _generate_key(self, namespace: str, key_data: Dict[str, Any]) -> str:
         """Generate consistent cache key"""
-        # Sort for consistency
+        # Sort for consistency (stdlib encoding keeps existing keys addressable)
         sorted_data = json.dumps(key_data, sort_keys=True)
         hash_digest = hashlib.sha256(sorted_data.encode()).hexdigest()[:16]
         return f"tripdiary:{namespace}:{hash_digest}"
@@ -157,17 +165,21 @@ class EnhancedRedisCache:
         
         try:
             cache_key = self._generate_key(namespace, key_data)
-            value = await self.redis_client.get(cache_key)
+            with tracer.span("cache.get", {"cache.name": "redis", "cache.namespace": namespace}) as span:
+                value = await self.redis_client.get(cache_key)
+                span.set_attribute("cache.hit", bool(value))
             
             if value:
                 self.stats["hits"] += 1
+                self._count(namespace, "hits")
                 logger.debug(f"Cache HIT: {namespace}")
                 
                 if deserialize:
-                    return json.loads(value)
+                    return codec.unpack(value)
                 return value
             else:
                 self.stats["misses"] += 1
+                self._count(namespace, "misses")
                 logger.debug(f"Cache MISS: {namespace}")
                 return None
                 
@@ -200,7 +212,7 @@ class EnhancedRedisCache:
             
             # Serialize if needed
             if serialize:
-                value = json.dumps(value)
+                value = codec.pack(value, CacheConfig.COMPRESS_MIN_BYTES)
             
             # Set with expiration
             await self.redis_client.setex(cache_key, ttl, value)
@@ -300,12 +312,17 @@ class EnhancedRedisCache:
             logger.error(f"Cache EXPIRE error ({namespace}): {e}")
             return False
     
+    def _count(self, namespace: str, name: str) -> None:
+        counters = self.namespace_stats.setdefault(namespace, {})
+        counters[name] = counters.get(name, 0) + 1
+    
     async def get_stats(self) -> Dict[str, Any]:
         """Get comprehensive cache statistics"""
         stats = {
             "connected": self.connected,
             "host": f"{self.redis_host}:{self.redis_port}",
-            "local_stats": self.stats.copy()
+            "local_stats": self.stats.copy(),
+            "namespace_stats": {name: dict(counters) for name, counters in self.namespace_stats.items()}
         }
         
         if not self.connected:
@@ -370,7 +387,7 @@ class EnhancedRedisCache:
             for i, value in enumerate(values):
                 if value:
                     key_str = json.dumps(key_data_list[i], sort_keys=True)
-                    result[key_str] = json.loads(value)
+                    result[key_str] = codec.unpack(value)
             
             return result
             
@@ -397,7 +414,7 @@ class EnhancedRedisCache:
             
             for key_data, value in items:
                 cache_key = self._generate_key(namespace, key_data)
-                serialized = json.dumps(value)
+                serialized = codec.pack(value, CacheConfig.COMPRESS_MIN_BYTES)
                 pipe.setex(cache_key, ttl, serialized)
             
             await pipe.execute()
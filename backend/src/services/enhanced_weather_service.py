@@ -19,6 +19,7 @@ from .interfaces import (
 from ..core.exceptions import ServiceError, ConfigurationError, ValidationError
 from ..config import get_settings
 from .enhanced_redis_cache import cache_manager
+from ..core.upstream_metrics import upstream_trace_configs
 
 logger = logging.getLogger(__name__)
 
@@ -66,7 +67,7 @@ class EnhancedWeatherService(WeatherServiceInterface):
             
             # Create HTTP session
             timeout = aiohttp.ClientTimeout(total=self.config.timeout_seconds)
-            self._session = aiohttp.ClientSession(timeout=timeout)
+            self._session = aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs())
             
             # Validate API key
             if not await self.validate_api_key():
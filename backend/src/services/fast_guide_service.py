@@ -12,6 +12,11 @@ from typing import Dict, List, Optional, Any
 from pathlib import Path
 from dotenv import load_dotenv
 from .guide_validator import GuideValidator
+from .guide_engine import CachePolicy, GuideProfile, GuideRequest, SourceStage, guide_engine, select
+from .guide_sections import SECTION_TTL
+from .guide_personalization import guide_personalizer, profile_from_preferences
+from .route_planner import route_planner, places_origin
+from ..core.upstream_metrics import upstream_trace_configs
 
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
@@ -27,7 +32,40 @@ class FastGuideService:
         
         # Cache for common destinations (in production, use Redis)
         self.destination_cache = {}
-        
+        self.profile = self._build_profile()
+
+    def _build_profile(self) -> GuideProfile:
+        """
+        Fast profile: one combined Perplexity call for the content sections,
+        OpenWeather and a day plan, all preference-neutral and keyed on the
+        trip alone, under a 15 second deadline
+        """
+        trip = ("destination", "dates")
+        return GuideProfile("fast", [
+            SourceStage(
+                "content",
+                lambda r, deps: self._get_essential_content(r.destination, r.start_date, r.end_date),
+                cache=CachePolicy(trip, SECTION_TTL["events"]),
+                fallback=lambda e: {"error": f"Content fetch failed: {e}"}
+            ),
+            SourceStage(
+                "weather",
+                lambda r, deps: self._get_fast_weather(r.destination, r.start_date, r.end_date),
+                cache=CachePolicy(trip, SECTION_TTL["weather"], cacheable=lambda w: bool(w.get("forecasts"))),
+                fallback={}
+            ),
+            SourceStage(
+                "daily_itinerary",
+                lambda r, deps: self._get_quick_itinerary(r.destination, r.start_date, r.end_date),
+                cache=CachePolicy(trip, SECTION_TTL["daily_itinerary"], cacheable=lambda i: isinstance(i, list) and bool(i)),
+                fallback=[]
+            ),
+            select("restaurants", "content", default=[]),
+            select("attractions", "content", default=[]),
+            select("events", "content", default=[]),
+            select("transport", "content", key="transportation", default=[]),
+        ], deadline=15.0)
+
     async def generate_fast_guide(
         self,
         destination: str,
@@ -43,45 +81,31 @@ class FastGuideService:
         if progress_callback:
             await progress_callback(5, "Starting fast generation")
         
-        # Check cache first
+        # Check cache first - the cached guide is preference-neutral and is
+        # personalized per request without any upstream calls
         cache_key = f"{destination}_{start_date}_{end_date}"
         if cache_key in self.destination_cache:
             cached = self.destination_cache[cache_key]
-            # Personalize cached content with preferences
-            return self._personalize_cached_guide(cached, preferences)
-        
-        # Prepare all tasks to run in PARALLEL
-        tasks = []
-        
-        # Task 1: Get essential info (restaurants, attractions, events) in ONE call
-        tasks.append(self._get_essential_content(destination, start_date, end_date, preferences))
-        
-        # Task 2: Get weather (lightweight, fast)
-        tasks.append(self._get_fast_weather(destination, start_date, end_date))
-        
-        # Task 3: Get quick itinerary
-        tasks.append(self._get_quick_itinerary(destination, start_date, end_date, preferences))
+            guide = self._personalize_cached_guide(cached, preferences, hotel_info, cache_key)
+            if progress_callback:
+                await progress_callback(100, "Guide ready!")
+            return guide
         
         if progress_callback:
             await progress_callback(20, "Fetching data in parallel")
         
-        # Execute ALL tasks in parallel with aggressive timeout
-        try:
-            results = await asyncio.wait_for(
-                asyncio.gather(*tasks, return_exceptions=True),
-                timeout=15.0  # 15 second hard timeout
-            )
-        except asyncio.TimeoutError:
-            # Return partial results if timeout
-            results = [{"error": "timeout"}, {}, {}]
+        # All stages run in parallel under the profile's 15 second deadline;
+        # a stage that fails or runs out of time yields its fallback
+        run = await guide_engine.run(
+            self.profile, GuideRequest(destination, start_date, end_date, hotel_info, preferences)
+        )
         
         if progress_callback:
             await progress_callback(80, "Assembling guide")
         
-        # Unpack results
-        essential_content = results[0] if not isinstance(results[0], Exception) else {}
-        weather_data = results[1] if not isinstance(results[1], Exception) else {}
-        itinerary_result = results[2] if not isinstance(results[2], Exception) else []
+        essential_content = run["content"]
+        weather_data = run["weather"]
+        itinerary_result = run["daily_itinerary"]
         
         # Check if itinerary is an error response
         if isinstance(itinerary_result, dict) and itinerary_result.get("error"):
@@ -93,9 +117,9 @@ class FastGuideService:
             itinerary = []
         
         # Check for API failures and return error if no real content
-        restaurants = essential_content.get("restaurants", [])
-        attractions = essential_content.get("attractions", [])
-        events = essential_content.get("events", [])
+        restaurants = run["restaurants"]
+        attractions = run["attractions"]
+        events = run["events"]
         weather_forecasts = weather_data.get("forecasts", [])
 
         # If essential content failed, return error - NO FALLBACK CONTENT
@@ -110,16 +134,6 @@ class FastGuideService:
                 "generated_with": "fast_guide_service"
             }
 
-        # Create comprehensive summary
-        summary_parts = [f"Your personalized travel guide to {destination}"]
-        if weather_forecasts:
-            avg_temp = sum(f.get("temp_high", 20) for f in weather_forecasts) // len(weather_forecasts)
-            summary_parts.append(f"Expect temperatures around {avg_temp}°C")
-        if restaurants:
-            summary_parts.append(f"featuring {len(restaurants)} restaurant recommendations")
-        if attractions:
-            summary_parts.append(f"and {len(attractions)} must-see attractions")
-
         # Build destination insights
         insights_parts = [f"Discover the best of {destination} with our curated recommendations."]
         if essential_content.get("error"):
@@ -130,18 +144,20 @@ class FastGuideService:
         # Integrate weather into itinerary
         enhanced_itinerary = self._integrate_weather_into_itinerary(itinerary, weather_forecasts)
 
+        # Base guide keeps the full candidate pool; personalization trims it
         guide = {
-            "summary": " ".join(summary_parts),
+            "destination": destination,
+            "summary": self._create_summary(destination, weather_forecasts, restaurants, attractions),
             "destination_insights": " ".join(insights_parts),
             "weather": weather_forecasts,
             "weather_summary": self._create_weather_summary(weather_forecasts),
             "daily_itinerary": enhanced_itinerary,
-            "restaurants": restaurants[:10],  # Limit to 10
-            "attractions": attractions[:10],  # Limit to 10
-            "events": events[:5],  # Limit to 5
+            "restaurants": restaurants,
+            "attractions": attractions,
+            "events": events,
             "neighborhoods": [],
             "practical_info": {
-                "transportation": essential_content.get("transportation", []),
+                "transportation": run["transport"],
                 "money": [],
                 "cultural": [],
                 "tips": essential_content.get("tips", []),
@@ -177,16 +193,34 @@ class FastGuideService:
         # Log validation results
         GuideValidator.log_validation_results(guide, is_valid, errors, validation_details)
 
-        # Cache for future use
+        # Cache the preference-neutral guide for future use
         self.destination_cache[cache_key] = guide
 
         if progress_callback:
             await progress_callback(100, "Guide ready!")
 
-        return guide
+        return self._personalize_cached_guide(guide, preferences, hotel_info, cache_key)
+
+    def _create_summary(
+        self,
+        destination: str,
+        weather_forecasts: List[Dict],
+        restaurants: List[Dict],
+        attractions: List[Dict]
+    ) -> str:
+        """Create the guide summary line"""
+        summary_parts = [f"Your personalized travel guide to {destination}"]
+        if weather_forecasts:
+            avg_temp = sum(f.get("temp_high", 20) for f in weather_forecasts) // len(weather_forecasts)
+            summary_parts.append(f"Expect temperatures around {avg_temp}°C")
+        if restaurants:
+            summary_parts.append(f"featuring {len(restaurants)} restaurant recommendations")
+        if attractions:
+            summary_parts.append(f"and {len(attractions)} must-see attractions")
+        return " ".join(summary_parts)
     
-    async def _get_essential_content(self, destination: str, start_date: str, end_date: str, preferences: Dict) -> Dict:
-        """Get restaurants, attractions, and events with retry logic"""
+    async def _get_essential_content(self, destination: str, start_date: str, end_date: str) -> Dict:
+        """Get a preference-neutral pool of restaurants, attractions, and events with retry logic"""
         
         if not self.perplexity_api_key:
             # Return error instead of empty data
@@ -198,15 +232,16 @@ class FastGuideService:
                 "transportation": []
             }
         
-        # Smaller, focused prompt
+        # Broad prompt - the pool is shared by every traveler and ranked locally
         prompt = f"""For {destination} from {start_date} to {end_date}, provide:
 
-1. TOP 5 RESTAURANTS:
-- Name, cuisine, price ($/$$/$$$), address, why recommended
-- Focus on: {preferences.get('cuisineTypes', ['local cuisine'])}
+1. TOP 15 RESTAURANTS:
+- Name, cuisine, price ($/$$/$$$/$$$$), address, why recommended
+- Cover a range of cuisines, dietary options and every price level
 
-2. TOP 5 ATTRACTIONS:
+2. TOP 12 ATTRACTIONS:
 - Name, type, address, hours, admission price
+- Cover landmarks, museums, parks, markets, nightlife and hidden gems
 
 3. CURRENT EVENTS during the dates
 
@@ -224,7 +259,7 @@ BE CONCISE - one line per item."""
                 timeout = aiohttp.ClientTimeout(total=base_timeout + (attempt * 5))  # 12s, 17s
                 print(f"Attempt {attempt + 1}/{max_retries} for Perplexity API (timeout: {timeout.total}s)")
                 
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                     headers = {
                         "Authorization": f"Bearer {self.perplexity_api_key}",
                         "Content-Type": "application/json"
@@ -243,7 +278,7 @@ BE CONCISE - one line per item."""
                             }
                         ],
                         "temperature": 0.3,  # Lower for consistency
-                        "max_tokens": 2000  # Smaller response
+                        "max_tokens": 3000  # Room for the broader pool
                     }
                     
                     async with session.post("https://api.perplexity.ai/chat/completions", 
@@ -309,7 +344,7 @@ BE CONCISE - one line per item."""
             
             # Weather API timeout
             timeout = aiohttp.ClientTimeout(total=5)  # 5 second timeout
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 # Get coordinates
                 geo_url = f"http://api.openweathermap.org/geo/1.0/direct?q={destination}&limit=1&appid={self.openweather_api_key}"
                 async with session.get(geo_url) as response:
@@ -379,8 +414,8 @@ BE CONCISE - one line per item."""
             }
         }
     
-    async def _get_quick_itinerary(self, destination: str, start_date: str, end_date: str, preferences: Dict) -> List[Dict]:
-        """Generate a detailed daily itinerary with real activities"""
+    async def _get_quick_itinerary(self, destination: str, start_date: str, end_date: str) -> List[Dict]:
+        """Generate a detailed, preference-neutral daily itinerary with real activities"""
 
         if not self.perplexity_api_key:
             return {
@@ -393,16 +428,12 @@ BE CONCISE - one line per item."""
         end = datetime.strptime(end_date, "%Y-%m-%d")
         num_days = (end - start).days + 1
 
-        # Create focused prompt for itinerary
-        interests = preferences.get('interests', {})
-        active_interests = [k for k, v in interests.items() if v]
-        interest_text = ", ".join(active_interests) if active_interests else "general sightseeing"
-
+        # Itinerary is shared across travelers, so keep the prompt general
         prompt = f"""Create a detailed {num_days}-day itinerary for {destination} from {start_date} to {end_date}.
 
-Traveler interests: {interest_text}
-Budget: {preferences.get('budget', 'moderate')}
-Pace: {preferences.get('pace', 'moderate')}
+Traveler interests: a balanced mix of landmarks, culture, food and neighborhoods
+Budget: moderate
+Pace: moderate
 
 For each day, provide:
 - Morning activity (9-12 PM) with specific location and timing
@@ -415,7 +446,7 @@ Include specific times, addresses, and activity names."""
 
         try:
             timeout = aiohttp.ClientTimeout(total=12)  # Reduced from 20 to 12 seconds
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -678,25 +709,30 @@ Include specific times, addresses, and activity names."""
     
     # Removed fallback content to comply with no mocks policy
     
-    def _personalize_cached_guide(self, cached_guide: Dict, preferences: Dict) -> Dict:
-        """Personalize a cached guide based on user preferences"""
-        guide = cached_guide.copy()
-        
-        # Filter restaurants by cuisine preference
-        if preferences.get('cuisineTypes'):
-            preferred_cuisines = [c.lower() for c in preferences['cuisineTypes'] if c]
-            guide['restaurants'] = [
-                r for r in guide.get('restaurants', [])
-                if any(pref in (r.get('cuisine') or '').lower() for pref in preferred_cuisines)
-            ][:10]
-        
-        # Filter by price preference
-        if preferences.get('budget'):
-            budget_map = {'budget': '$', 'moderate': '$$', 'luxury': '$$$'}
-            max_price = budget_map.get(preferences['budget'], '$$')
-            guide['restaurants'] = [
-                r for r in guide.get('restaurants', [])
-                if len(r.get('price_range', '$$')) <= len(max_price)
-            ]
-        
-        return guide
\ No newline at end of file
+    def _personalize_cached_guide(
+        self,
+        cached_guide: Dict,
+        preferences: Dict,
+        hotel_info: Optional[Dict] = None,
+        cache_key: Optional[str] = None
+    ) -> Dict:
+        """Rank the cached candidate pool for this traveler and route each day from their hotel"""
+        profile = profile_from_preferences(preferences)
+        origin = places_origin(hotel_info, cached_guide.get("attractions", []))
+        guide = guide_personalizer.personalize_pool(
+            cached_guide, profile, origin=origin,
+            pool_key=("fast", cache_key) if cache_key else None
+        )
+        guide["daily_itinerary"] = route_planner.attach_routes(
+            cached_guide.get("daily_itinerary", []),
+            guide["attractions"],
+            origin,
+            stops_per_day=guide_personalizer.activities_per_day(profile)
+        )
+        guide["summary"] = self._create_summary(
+            cached_guide.get("destination", "your destination"),
+            guide.get("weather", []),
+            guide["restaurants"],
+            guide["attractions"]
+        )
+        return guide
@@ -0,0 +1,247 @@
+"""
+File Store
+Crash-safe commits for the JSON file backend. Every file is written to a
+temporary sibling and moved into place with os.replace, so readers see the
+old or the new document and never a partial one. Writes and journal appends
+go through a single committer task, in submission order, with fsync off, per
+commit or grouped over a short window. KeyedLocks serialises
+read-modify-write cycles per trip.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple, AsyncIterator, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+FSYNC_MODES = ("off", "always", "group")
+GROUP_COMMIT_MS = 2.0
+TEMP_SUFFIX = ".tmp"
+
+
+def _temp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex[:12]}{TEMP_SUFFIX}")
+
+
+def _write_temp(path: Path, data: bytes, durable: bool) -> Path:
+    temp = _temp_path(path)
+    with open(temp, 'wb') as f:
+        f.write(data)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    return temp
+
+
+def _append(path: Path, data: bytes, durable: bool) -> None:
+    with open(path, 'ab') as f:
+        f.write(data)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Make renames in directory durable (not supported everywhere)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_sync(path: Path, data: bytes, durable: bool = False) -> None:
+    """Blocking atomic write, for callers outside the event loop"""
+    path = Path(path)
+    temp = _write_temp(path, data, durable)
+    try:
+        os.replace(temp, path)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    if durable:
+        _fsync_dir(path.parent)
+
+
+def sweep_temp_files(root: Path) -> int:
+    """Remove temporary files left behind by writes interrupted by a crash"""
+    root = Path(root)
+    if not root.exists():
+        return 0
+    removed = 0
+    for temp in root.rglob(f".*{TEMP_SUFFIX}"):
+        temp.unlink(missing_ok=True)
+        removed += 1
+    if removed:
+        logger.info(f"Removed {removed} interrupted temporary files under {root}")
+    return removed
+
+
+class FileStore:
+    """
+    Atomic file commits. write_many() commits its files in order; with
+    fsync enabled they are durable when it returns. append() adds to the end
+    of a file in place, ordered with the writes. In "group" mode the
+    committer waits group_commit_ms for other writers so that one batch
+    shares the executor hop and the directory fsyncs.
+    """
+
+    def __init__(self, fsync: str = "off", group_commit_ms: float = GROUP_COMMIT_MS):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"fsync must be one of {FSYNC_MODES}, got {fsync!r}")
+        self.fsync = fsync
+        self.group_commit_window = group_commit_ms / 1000
+        self._pending: List[Tuple[List[Tuple[Path, bytes]], bool, asyncio.Future]] = []
+        self._committer: Optional[asyncio.Task] = None
+        self.stats = {"commits": 0, "files_written": 0, "batches": 0, "largest_batch": 0, "fsyncs": 0}
+
+    async def write(self, path: Path, data: bytes) -> None:
+        await self.write_many([(path, data)])
+
+    async def write_many(self, files: Iterable[Tuple[Path, bytes]]) -> None:
+        await self._submit([(Path(path), data) for path, data in files], append=False)
+
+    async def append(self, path: Path, data: bytes) -> None:
+        """Append data to path (created if missing), after earlier submissions"""
+        await self._submit([(Path(path), data)], append=True)
+
+    async def _submit(self, files: List[Tuple[Path, bytes]], append: bool) -> None:
+        if not files:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((files, append, future))
+        committer = self._committer
+        if committer is None or committer.done() or committer.get_loop() is not loop:
+            self._committer = loop.create_task(self._commit_pending())
+        await future
+
+    async def flush(self) -> None:
+        """Wait for every submitted write to be committed"""
+        while self._committer is not None and not self._committer.done():
+            await asyncio.shield(self._committer)
+
+    async def _commit_pending(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            if self.fsync == "group":
+                await asyncio.sleep(self.group_commit_window)
+            batch, self._pending = self._pending, []
+            try:
+                errors, counts = await loop.run_in_executor(
+                    None, self._commit_batch, [(files, append) for files, append, _ in batch]
+                )
+            except BaseException as e:
+                for _, _, future in batch:
+                    if future.done():
+                        continue
+                    if isinstance(e, Exception):
+                        future.set_exception(e)
+                    else:
+                        future.cancel()
+                raise
+            # Counters change only on the loop, never from the executor thread
+            for name, count in counts.items():
+                self.stats[name] += count
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            for (_, _, future), error in zip(batch, errors):
+                if future.done():
+                    continue  # the writer was cancelled; its files are committed regardless
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    def _commit_batch(
+        self,
+        batch: List[Tuple[List[Tuple[Path, bytes]], bool]]
+    ) -> Tuple[List[Optional[Exception]], Dict[str, int]]:
+        """
+        Runs in the executor: every commit succeeds or fails on its own.
+        Returns the per-commit errors and the counts to add to stats.
+        """
+        durable = self.fsync != "off"
+        errors: List[Optional[Exception]] = []
+        counts = {"commits": 0, "files_written": 0, "fsyncs": 0}
+        directories = set()
+        for files, append in batch:
+            temps: List[Tuple[Path, Path]] = []
+            appended = 0
+            try:
+                if append:
+                    for path, data in files:
+                        _append(path, data, durable)
+                        appended += 1
+                        directories.add(path.parent)
+                else:
+                    for path, data in files:
+                        temps.append((_write_temp(path, data, durable), path))
+                    for temp, path in temps:
+                        os.replace(temp, path)
+                        directories.add(path.parent)
+                errors.append(None)
+            except Exception as e:
+                for temp, _ in temps:
+                    temp.unlink(missing_ok=True)
+                errors.append(e)
+            written = appended or len(temps)
+            counts["commits"] += 1
+            counts["files_written"] += written
+            if durable:
+                counts["fsyncs"] += written
+        if durable:
+            for directory in directories:
+                _fsync_dir(directory)
+            counts["fsyncs"] += len(directories)
+        return errors, counts
+
+
+class KeyedLocks:
+    """
+    One asyncio.Lock per key, created on demand and dropped once no task
+    holds or waits for it, so the table does not grow with the trips served.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._users: Dict[Hashable, int] = {}
+        self.acquisitions = 0
+        self.contended = 0
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def locked(self, key: Hashable) -> bool:
+        lock = self._locks.get(key)
+        return lock is not None and lock.locked()
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        elif lock.locked():
+            self.contended += 1
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                self.acquisitions += 1
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"held": len(self._locks), "acquisitions": self.acquisitions, "contended": self.contended}
@@ -11,6 +11,9 @@ from pathlib import Path
 import asyncio
 import aiohttp
 
+from .route_planner import RoutePlanner, TravelTimeMatrix, google_distance_matrix_provider
+from ..core.upstream_metrics import upstream_requests_kwargs
+
 # Load .env from project root
 root_dir = Path(__file__).parent.parent.parent.parent
 env_path = root_dir / ".env"
@@ -20,7 +23,9 @@ class GooglePlacesEnhancer:
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         if self.api_key:
-            self.client = googlemaps.Client(key=self.api_key)
+            self.client = googlemaps.Client(key=self.api_key, requests_kwargs=upstream_requests_kwargs())
+            # Batched Distance Matrix lookups for route ordering
+            self.route_planner = RoutePlanner(TravelTimeMatrix(provider=google_distance_matrix_provider(self.client)))
         else:
             self.client = None
             print("[WARNING] GOOGLE_MAPS_API_KEY not found in environment variables")
@@ -342,19 +347,30 @@ class GooglePlacesEnhancer:
         
         try:
             # Get coordinates for all attractions
-            waypoints = []
+            located = []
             for attraction in attractions:
                 if attraction.get('coordinates'):
-                    waypoints.append(f"{attraction['coordinates']['lat']},{attraction['coordinates']['lng']}")
+                    located.append(attraction)
                 elif attraction.get('address'):
                     # Geocode the address
                     geocode_result = self.client.geocode(attraction['address'])
                     if geocode_result:
                         location = geocode_result[0]['geometry']['location']
-                        waypoints.append(f"{location['lat']},{location['lng']}")
+                        located.append(dict(attraction, coordinates=location))
             
-            if not waypoints:
+            if not located:
                 return {"error": "Could not get coordinates for attractions"}
+
+            # Order stops with nearest-neighbour + 2-opt over a travel-time matrix
+            origin = None
+            if start_location:
+                geocode_result = self.client.geocode(start_location)
+                if geocode_result:
+                    location = geocode_result[0]['geometry']['location']
+                    origin = (location['lat'], location['lng'])
+            # Distance Matrix lookups block, so route in a worker thread
+            ordered, travel_minutes = await asyncio.to_thread(self.route_planner.order_stops, located, origin)
+            waypoints = [f"{a['coordinates']['lat']},{a['coordinates']['lng']}" for a in ordered]
             
             # Create route URL
             if start_location:
@@ -368,6 +384,8 @@ class GooglePlacesEnhancer:
                 "route_url": route_url,
                 "waypoints": waypoints,
                 "attraction_count": len(attractions),
+                "ordered_attractions": [a.get('name', '') for a in ordered],
+                "estimated_travel_minutes": round(travel_minutes),
                 "optimization_note": "Route is optimized for efficient travel between attractions"
             }
             
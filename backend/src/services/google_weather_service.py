@@ -21,6 +21,7 @@ from .interfaces import (
     ExternalServiceType
 )
 from ..core.exceptions import ServiceError, ConfigurationError
+from ..core.upstream_metrics import upstream_trace_configs
 
 # Load .env from project root
 root_dir = Path(__file__).parent.parent.parent.parent
@@ -63,7 +64,7 @@ class GoogleWeatherService(WeatherServiceInterface):
     async def make_request(self, request: ExternalRequest) -> ExternalResponse:
         """Make a request to the external service"""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 async with session.request(
                     method=request.method.value,
                     url=request.url,
@@ -261,7 +262,7 @@ class GoogleWeatherService(WeatherServiceInterface):
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 async with session.get(url, params=params) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -441,7 +442,7 @@ class GoogleWeatherService(WeatherServiceInterface):
             }
             
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 async with session.get(url, params=params) as response:
                     if response.status == 200:
                         data = await response.json()
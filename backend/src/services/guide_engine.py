@@ -0,0 +1,442 @@
+"""
+Guide Engine
+Runs guide generation as a DAG of typed source stages (weather, restaurants,
+attractions, events, transport, practical, neighborhoods, ...). Each stage
+declares the stages it depends on, the trip inputs its result depends on and
+how long it stays fresh, a timeout and a fallback; the guide services are
+profiles that pick a source for each stage. A stage starts as soon as its
+dependencies have finished, identical concurrent fetches share one upstream
+call, fresh results are reused across trips from an in-process cache, and
+every stage is traced and timed.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..core.bounded_cache import BoundedCache
+from ..core.metrics import MetricType, metrics_registry
+from ..core.tracing import tracer
+from .guide_sections import section_inputs
+
+logger = logging.getLogger(__name__)
+
+
+# Entries kept per profile stage; results are a few KB to a few hundred KB
+STAGE_CACHE_ENTRIES = 128
+
+# How long static destination facts (transport, practical info, neighborhoods) stay fresh
+STATIC_TTL = timedelta(days=7)
+
+# Inputs a cache policy may key on: the section inputs plus the raw preferences and traveler
+REQUEST_INPUTS = ("destination", "dates", "hotel", "dining", "interests", "pace", "preferences", "traveler")
+
+# Outcomes that replaced the stage's result with its fallback
+FAILED_OUTCOMES = ("timeout", "failed")
+
+StageFetch = Callable[["GuideRequest", Dict[str, Any]], Awaitable[Any]]
+
+
+class StageTimeout(asyncio.TimeoutError):
+    """A stage ran past its own timeout or the profile's deadline"""
+
+
+class GuideRequest:
+    """
+    The trip a guide is generated for. Callbacks travel with the request
+    but are never part of a stage's cache key.
+    """
+
+    def __init__(
+        self,
+        destination: str,
+        start_date: str,
+        end_date: str,
+        hotel_info: Optional[Dict[str, Any]] = None,
+        preferences: Optional[Dict[str, Any]] = None,
+        extracted_data: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+        item_callback: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None
+    ):
+        self.destination = destination
+        self.start_date = start_date
+        self.end_date = end_date
+        self.hotel_info = hotel_info or {}
+        self.preferences = preferences or {}
+        self.extracted_data = extracted_data or {}
+        self.progress_callback = progress_callback
+        self.item_callback = item_callback
+        self._inputs: Optional[Dict[str, Any]] = None
+
+    @property
+    def primary_traveler(self) -> str:
+        passengers = self.extracted_data.get("passengers") or []
+        return passengers[0].get("full_name", "Traveler") if passengers else "Traveler"
+
+    @property
+    def inputs(self) -> Dict[str, Any]:
+        """Section inputs (see guide_sections) plus the raw preferences and traveler, computed once"""
+        if self._inputs is None:
+            self._inputs = {
+                **section_inputs(self.destination, self.start_date, self.end_date, self.hotel_info, self.preferences),
+                "preferences": self.preferences,
+                "traveler": self.primary_traveler,
+            }
+        return self._inputs
+
+
+def usable(result: Any) -> bool:
+    """Default cacheability: non-empty and not an error response"""
+    return bool(result) and not (isinstance(result, dict) and result.get("error"))
+
+
+class CachePolicy:
+    """
+    Which request inputs a stage's result depends on and how long it stays
+    fresh (None: until evicted). Results failing `cacheable` are returned
+    but never stored.
+    """
+    __slots__ = ("inputs", "ttl", "cacheable", "max_entries")
+
+    def __init__(
+        self,
+        inputs: Sequence[str],
+        ttl: Optional[timedelta],
+        cacheable: Callable[[Any], bool] = usable,
+        max_entries: int = STAGE_CACHE_ENTRIES
+    ):
+        self.inputs = tuple(inputs)
+        self.ttl = ttl
+        self.cacheable = cacheable
+        self.max_entries = max_entries
+
+    def key(self, request: GuideRequest) -> str:
+        relevant = {name: request.inputs[name] for name in self.inputs}
+        return hashlib.md5(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SourceStage:
+    """
+    One node of a guide profile. `fetch(request, deps)` gets the results of
+    the stages named in `depends_on`. When it raises or runs past `timeout`
+    the stage yields `fallback` instead: a value (copied per run) or a
+    callable taking the exception.
+    """
+    __slots__ = ("name", "fetch", "depends_on", "cache", "timeout", "fallback")
+
+    def __init__(
+        self,
+        name: str,
+        fetch: StageFetch,
+        depends_on: Sequence[str] = (),
+        cache: Optional[CachePolicy] = None,
+        timeout: Optional[float] = None,
+        fallback: Any = None
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.depends_on = tuple(depends_on)
+        self.cache = cache
+        self.timeout = timeout
+        self.fallback = fallback
+
+    def fallback_value(self, error: BaseException) -> Any:
+        return self.fallback(error) if callable(self.fallback) else copy.deepcopy(self.fallback)
+
+
+def select(name: str, source: str, key: Optional[str] = None, default: Any = None) -> SourceStage:
+    """A stage taking one section (`key`, default: its name) of another stage's combined result"""
+    key = key or name
+
+    async def fetch(request: GuideRequest, deps: Dict[str, Any]) -> Any:
+        value = deps[source]
+        return value.get(key, copy.deepcopy(default)) if isinstance(value, dict) else copy.deepcopy(default)
+
+    return SourceStage(name, fetch, depends_on=(source,), fallback=default)
+
+
+class GuideProfile:
+    """A named set of stages plus an overall deadline; validated when built"""
+
+    def __init__(self, name: str, stages: Iterable[SourceStage], deadline: Optional[float] = None):
+        self.name = name
+        self.deadline = deadline
+        self.stages: Dict[str, SourceStage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Profile '{name}' declares stage '{stage.name}' twice")
+            self.stages[stage.name] = stage
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, str] = {}  # name -> "visiting" / "done"
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Profile '{self.name}' has a dependency cycle: {' -> '.join(path + (name,))}")
+            state[name] = "visiting"
+            for dep in self.stages[name].depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{name}' of profile '{self.name}' depends on unknown stage '{dep}'")
+                visit(dep, path + (name,))
+            state[name] = "done"
+            order.append(name)
+
+        for name, stage in self.stages.items():
+            if stage.cache is not None:
+                unknown = set(stage.cache.inputs) - set(REQUEST_INPUTS)
+                if unknown:
+                    raise ValueError(f"Stage '{name}' of profile '{self.name}' is keyed on unknown inputs {sorted(unknown)}")
+            visit(name, ())
+        return order
+
+    def closure(self, names: Iterable[str]) -> List[str]:
+        """The named stages and everything they depend on, in execution order"""
+        needed = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"Profile '{self.name}' has no stage '{name}'")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].depends_on)
+        return [name for name in self.order if name in needed]
+
+
+class StageResult:
+    """Value and bookkeeping of one stage in one run"""
+    __slots__ = ("value", "outcome", "duration_ms", "error")
+
+    def __init__(self, value: Any, outcome: str, duration_ms: float, error: Optional[BaseException] = None):
+        self.value = value
+        self.outcome = outcome          # fetched / cached / coalesced / timeout / failed
+        self.duration_ms = duration_ms
+        self.error = error
+
+
+class GuideRun:
+    """Results of one profile run, by stage name"""
+
+    def __init__(self, profile: str):
+        self.profile = profile
+        self.stages: Dict[str, StageResult] = {}
+        self.duration_ms = 0.0
+
+    def __getitem__(self, name: str) -> Any:
+        return self.stages[name].value
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.stages
+
+    def get(self, name: str, default: Any = None) -> Any:
+        result = self.stages.get(name)
+        return result.value if result is not None else default
+
+    def failed(self, name: str) -> bool:
+        """The stage fell back (exception or timeout)"""
+        result = self.stages.get(name)
+        return result is not None and result.outcome in FAILED_OUTCOMES
+
+    def error(self, name: str) -> Optional[BaseException]:
+        result = self.stages.get(name)
+        return result.error if result is not None else None
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {"outcome": r.outcome, "ms": round(r.duration_ms, 1)} for name, r in self.stages.items()}
+
+
+class GuideEngine:
+    """
+    Executes guide profiles. The stage cache and in-flight map are shared by
+    all profiles and requests; entries are namespaced per profile stage, so
+    two profiles fetching the same section from different sources never mix.
+    """
+
+    def __init__(self, cache_enabled: Optional[bool] = None):
+        if cache_enabled is None:
+            cache_enabled = os.getenv("GUIDE_STAGE_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+        self.cache_enabled = cache_enabled
+        self._caches: Dict[str, BoundedCache] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    async def run(
+        self,
+        profile: GuideProfile,
+        request: GuideRequest,
+        stages: Optional[Iterable[str]] = None,
+        refresh: Iterable[str] = ()
+    ) -> GuideRun:
+        """
+        Run `stages` (default: all) of the profile and what they depend on.
+        Stages named in `refresh` skip the cache read but store their fresh
+        result. Never raises for a failing stage: it yields its fallback.
+        """
+        names = profile.closure(stages) if stages is not None else profile.order
+        refresh = set(refresh)
+        run = GuideRun(profile.name)
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in names:
+            stage = profile.stages[name]
+            deps = [tasks[dep] for dep in stage.depends_on]
+            tasks[name] = asyncio.ensure_future(
+                self._run_stage(profile, stage, request, deps, run, name in refresh)
+            )
+        if tasks:
+            try:
+                _, pending = await asyncio.wait(list(tasks.values()), timeout=profile.deadline)
+            except asyncio.CancelledError:
+                for task in tasks.values():
+                    task.cancel()
+                raise
+            if pending:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for name in names:
+            if name not in run.stages:
+                # Cancelled at the deadline, or waiting on a stage that was
+                error = StageTimeout(f"Stage '{name}' did not finish within the {profile.deadline}s deadline")
+                logger.warning(f"Guide stage {profile.name}.{name} timed out; using its fallback")
+                self._record(profile.name, name, run, StageResult(
+                    profile.stages[name].fallback_value(error), "timeout", elapsed_ms, error
+                ))
+        run.duration_ms = elapsed_ms
+        return run
+
+    async def _run_stage(
+        self,
+        profile: GuideProfile,
+        stage: SourceStage,
+        request: GuideRequest,
+        deps: List[asyncio.Task],
+        run: GuideRun,
+        refresh: bool
+    ) -> None:
+        if deps:
+            await asyncio.gather(*deps)
+        dep_values = {dep: run[dep] for dep in stage.depends_on}
+        namespace = f"{profile.name}.{stage.name}"
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        with tracer.span(f"guide.stage.{stage.name}", {"guide.profile": profile.name}) as span:
+            try:
+                value, outcome = await self._fetch(namespace, stage, request, dep_values, refresh)
+            except Exception as e:
+                outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "failed"
+                logger.warning(f"Guide stage {namespace} {outcome}: {e!r}; using its fallback")
+                value, error = stage.fallback_value(e), e
+            span.set_attribute("guide.stage.outcome", outcome)
+        self._record(profile.name, stage.name, run, StageResult(
+            value, outcome, (time.perf_counter() - started) * 1000, error
+        ))
+
+    async def _fetch(
+        self,
+        namespace: str,
+        stage: SourceStage,
+        request: GuideRequest,
+        deps: Dict[str, Any],
+        refresh: bool
+    ) -> Tuple[Any, str]:
+        policy = stage.cache
+        if policy is None or not self.cache_enabled:
+            return await self._call(stage, request, deps), "fetched"
+
+        key = (namespace, policy.key(request))
+        pending = None if refresh else self._inflight.get(key)
+        if pending is not None:
+            try:
+                # Identical concurrent fetches share one upstream call
+                value = await asyncio.shield(pending)
+                self._count(namespace, "coalesced")
+                return copy.deepcopy(value), "coalesced"
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The fetching run hit its deadline; fetch on our own
+
+        cache = self._cache(namespace, policy)
+        if not refresh:
+            cached = cache.get(key[1])
+            if cached is not None:
+                self._count(namespace, "hits")
+                return copy.deepcopy(cached), "cached"
+        self._count(namespace, "misses")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._call(stage, request, deps)
+            if policy.cacheable(value):
+                # Callers mutate what they get back, so the cache keeps its own copy
+                cache.put(key[1], copy.deepcopy(value))
+            future.set_result(value)
+            return value, "fetched"
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    @staticmethod
+    async def _call(stage: SourceStage, request: GuideRequest, deps: Dict[str, Any]) -> Any:
+        if stage.timeout is None:
+            return await stage.fetch(request, deps)
+        try:
+            return await asyncio.wait_for(stage.fetch(request, deps), stage.timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeout(f"Stage '{stage.name}' timed out after {stage.timeout}s") from None
+
+    def _cache(self, namespace: str, policy: CachePolicy) -> BoundedCache:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            ttl = policy.ttl.total_seconds() if policy.ttl is not None else None
+            cache = self._caches[namespace] = BoundedCache(
+                f"guide_stage.{namespace}", max_entries=policy.max_entries, ttl_seconds=ttl
+            )
+        return cache
+
+    def _record(self, profile: str, stage: str, run: GuideRun, result: StageResult) -> None:
+        run.stages[stage] = result
+        tags = {"profile": profile, "stage": stage}
+        metrics_registry.series("guide.stage_ms", MetricType.TIMER, tags).record(result.duration_ms)
+        metrics_registry.increment("guide.stages", tags={**tags, "outcome": result.outcome})
+
+    def _count(self, namespace: str, name: str) -> None:
+        counters = self.stats.setdefault(namespace, {})
+        counters[name] = counters.get(name, 0) + 1
+
+    def clear(self) -> None:
+        for cache in self._caches.values():
+            cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-stage cache counters and sizes"""
+        return {
+            "enabled": self.cache_enabled,
+            "stages": {
+                namespace: {**self.stats.get(namespace, {}), "entries": len(cache)}
+                for namespace, cache in self._caches.items()
+            },
+        }
+
+
+# Global engine shared by all guide services
+guide_engine = GuideEngine()
@@ -0,0 +1,474 @@
+"""
+Guide Personalization Layer
+Two-stage guide pipeline: a broad, preference-neutral candidate pool is fetched
+and cached once per (destination, date window), then ranked and filtered per
+traveler locally - new preference combinations need zero upstream calls
+"""
+import logging
+import re
+from typing import Dict, List, Optional, Any, Hashable, Iterable, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..models.user_profile import (
+    UserProfile,
+    DiningPreferences,
+    InterestPreferences,
+    TravelPreferences,
+    PriceRange,
+    TravelPace,
+    GroupType,
+)
+from ..models.preferences import CuisineType
+from ..core.bounded_cache import BoundedCache
+from .candidate_ranking import CandidateMatrix, CandidateRanker, candidate_ranker
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the shape of cached candidate pools changes
+CANDIDATE_POOL_VERSION = 1
+
+PRICE_TIERS = [PriceRange.BUDGET, PriceRange.MODERATE, PriceRange.UPSCALE, PriceRange.LUXURY]
+
+BUDGET_PRICE_RANGES = {
+    "budget": [PriceRange.BUDGET, PriceRange.MODERATE],
+    "moderate": [PriceRange.MODERATE, PriceRange.UPSCALE],
+    "luxury": [PriceRange.UPSCALE, PriceRange.LUXURY],
+}
+
+PACE_ALIASES = {
+    "relaxed": TravelPace.RELAXED,
+    "slow": TravelPace.RELAXED,
+    "moderate": TravelPace.BALANCED,
+    "balanced": TravelPace.BALANCED,
+    "packed": TravelPace.PACKED,
+    "fast": TravelPace.PACKED,
+}
+
+# Free-form interest names used by the frontend and prompts -> InterestPreferences keys
+INTEREST_ALIASES = {
+    "art": "art_galleries",
+    "galleries": "art_galleries",
+    "history": "historical_sites",
+    "historical": "historical_sites",
+    "culture": "local_culture",
+    "music": "live_music",
+    "nightlife": "nightclubs",
+    "bars": "bars_pubs",
+    "nature": "nature_parks",
+    "parks": "nature_parks",
+    "beach": "beaches",
+    "markets": "local_markets",
+    "spa": "spa_wellness",
+    "wellness": "spa_wellness",
+    "food": "cooking_classes",
+    "wine": "wine_tasting",
+    "kids": "kid_friendly",
+    "family": "kid_friendly",
+    "theater": "theaters",
+    "theatre": "theaters",
+}
+
+# Keywords that mark a candidate as matching an interest
+INTEREST_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "art_galleries": ("art", "gallery", "exhibition"),
+    "museums": ("museum", "exhibition"),
+    "historical_sites": ("histor", "castle", "palace", "ruin", "monument", "cathedral", "fort"),
+    "architecture": ("architect", "cathedral", "tower", "bridge", "building"),
+    "theaters": ("theater", "theatre", "opera", "ballet", "musical"),
+    "local_culture": ("local", "traditional", "heritage", "cultur", "market"),
+    "live_music": ("music", "jazz", "concert", "live"),
+    "concerts": ("concert", "music", "symphony", "orchestra"),
+    "nightclubs": ("club", "nightlife", "dj"),
+    "bars_pubs": ("bar", "pub", "cocktail", "brewery"),
+    "comedy_clubs": ("comedy", "stand-up"),
+    "casinos": ("casino",),
+    "nature_parks": ("park", "garden", "nature", "botanical"),
+    "beaches": ("beach", "coast", "seaside"),
+    "hiking": ("hike", "hiking", "trail", "mountain"),
+    "water_sports": ("surf", "kayak", "sail", "dive", "snorkel"),
+    "adventure_sports": ("adventure", "zipline", "climb", "rafting"),
+    "cycling": ("bike", "cycling", "bicycle"),
+    "shopping": ("shop", "boutique", "mall", "store"),
+    "local_markets": ("market", "bazaar", "souk"),
+    "spa_wellness": ("spa", "wellness", "bath", "massage", "hammam"),
+    "photography": ("view", "viewpoint", "panoram", "scenic", "lookout"),
+    "cooking_classes": ("cooking", "culinary", "food tour", "tasting"),
+    "wine_tasting": ("wine", "vineyard", "winery"),
+    "kid_friendly": ("family", "kids", "children"),
+    "playgrounds": ("playground",),
+    "zoos_aquariums": ("zoo", "aquarium"),
+    "theme_parks": ("theme park", "amusement"),
+    "educational": ("science", "museum", "planetarium"),
+}
+
+DIETARY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "vegetarian": ("vegetarian", "veggie", "plant-based"),
+    "vegan": ("vegan", "plant-based"),
+    "gluten-free": ("gluten",),
+    "halal": ("halal",),
+    "kosher": ("kosher",),
+}
+
+CUISINE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "cuisine:" + cuisine.value.lower(): (cuisine.value.lower().replace(" cuisine", ""),)
+    for cuisine in CuisineType
+}
+CUISINE_KEYWORDS["cuisine:local cuisine"] = ("local", "traditional", "regional")
+
+MEAL_STYLE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "fine_dining": ("fine dining", "michelin", "tasting menu", "gastronom"),
+    "street_food": ("street food", "food stall", "hawker", "market"),
+    "cafes": ("cafe", "café", "coffee", "bakery"),
+    "bars": ("bar", "cocktail", "wine bar"),
+}
+
+ACTIVITIES_PER_DAY = {
+    TravelPace.RELAXED: 2,
+    TravelPace.BALANCED: 3,
+    TravelPace.PACKED: 4,
+}
+
+
+def candidate_pool_key(destination: str, start_date: str, end_date: str) -> Dict[str, Any]:
+    """Cache key for a preference-neutral candidate pool"""
+    return {
+        "destination": (destination or "").strip().lower(),
+        "start": start_date,
+        "end": end_date,
+        "pool_version": CANDIDATE_POOL_VERSION,
+    }
+
+
+def _as_list(value: Any) -> List[str]:
+    """Normalize a preference value that may be a list, a comma string or None"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    if isinstance(value, dict):
+        return [k for k, enabled in value.items() if enabled]
+    return [str(v) for v in value if v]
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).replace(" ", "_").replace("-", "_").lower()
+
+
+def _parse_price(value: Any) -> Optional[int]:
+    """Map '$$', 2, 'PRICE_LEVEL_MODERATE' etc. to a 1-4 price tier"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return max(1, min(4, int(value))) if value > 0 else 1
+    text = str(value).strip().upper()
+    if text.startswith("$"):
+        return max(1, min(4, text.count("$")))
+    for tier, marker in enumerate(("INEXPENSIVE", "MODERATE", "EXPENSIVE", "VERY_EXPENSIVE"), start=1):
+        if text.endswith(marker):
+            return tier
+    if text.isdigit():
+        return max(1, min(4, int(text)))
+    return None
+
+
+def _price_ranges(explicit: Any, budget: Optional[str]) -> List[PriceRange]:
+    tiers = []
+    for value in _as_list(explicit):
+        tier = _parse_price(value)
+        if tier and PRICE_TIERS[tier - 1] not in tiers:
+            tiers.append(PRICE_TIERS[tier - 1])
+    if tiers:
+        return tiers
+    if budget and budget.lower() in BUDGET_PRICE_RANGES:
+        return list(BUDGET_PRICE_RANGES[budget.lower()])
+    return [PriceRange.MODERATE]
+
+
+def _active_interests(preferences: Dict[str, Any]) -> List[str]:
+    """Collect interest names from the flat and nested frontend formats"""
+    raw: List[str] = []
+    interests = preferences.get("interests")
+    if isinstance(interests, dict):
+        for key, value in interests.items():
+            if isinstance(value, dict):
+                raw.extend(k for k, enabled in value.items() if enabled)
+            elif value:
+                raw.append(key)
+    else:
+        raw.extend(_as_list(interests))
+    raw.extend(_as_list(preferences.get("specialInterests")))
+    return raw
+
+
+def profile_from_preferences(preferences: Union[UserProfile, Dict[str, Any], None]) -> UserProfile:
+    """
+    Build a UserProfile from the loosely-structured preference dicts the
+    guide services receive (flat camelCase, nested frontend or canonical)
+    """
+    if isinstance(preferences, UserProfile):
+        return preferences
+
+    prefs: Dict[str, Any] = preferences or {}
+    dining: Dict[str, Any] = prefs["dining"] if isinstance(prefs.get("dining"), dict) else {}
+
+    cuisines = _as_list(
+        dining.get("cuisineTypes") or dining.get("cuisine_types")
+        or prefs.get("cuisineTypes") or prefs.get("cuisine_preferences")
+    )
+    dietary = _as_list(
+        dining.get("dietaryRestrictions") or dining.get("dietary_restrictions")
+        or prefs.get("dietaryRestrictions") or prefs.get("dietary_restrictions")
+    )
+    price_ranges = _price_ranges(
+        dining.get("priceRanges") or dining.get("price_ranges")
+        or prefs.get("priceRanges") or prefs.get("priceRange"),
+        prefs.get("budget") or prefs.get("budgetLevel") or prefs.get("budget_level"),
+    )
+
+    meal_preferences = DiningPreferences().meal_preferences
+    for key, value in (dining.get("mealPreferences") or dining.get("meal_preferences") or {}).items():
+        meal_preferences[_snake_case(key)] = bool(value)
+    if prefs.get("budget") == "luxury":
+        meal_preferences["fine_dining"] = True
+
+    interest_prefs = InterestPreferences()
+    known = {key: category for category, keys in interest_prefs.categories.items() for key in keys}
+    for interest in _active_interests(prefs):
+        key = _snake_case(interest)
+        key = key if key in known else INTEREST_ALIASES.get(key, key)
+        if key in known:
+            interest_prefs.categories[known[key]][key] = True
+
+    travel: Dict[str, Any] = prefs["travel"] if isinstance(prefs.get("travel"), dict) else {}
+    pace = str(travel.get("pace") or prefs.get("pace") or prefs.get("travelStyle") or "balanced").lower()
+    group = str(travel.get("groupSize") or prefs.get("groupType") or "couple").lower()
+
+    travel_style = TravelPreferences(
+        pace=PACE_ALIASES.get(pace, TravelPace.BALANCED),
+        group_type=GroupType(group) if group in GroupType._value2member_map_ else GroupType.COUPLE,
+    )
+
+    return UserProfile(
+        profile_id=str(prefs.get("profile_id", "session")),
+        dining=DiningPreferences(
+            cuisine_types=cuisines or ["Local Cuisine"],
+            dietary_restrictions=dietary,
+            price_ranges=price_ranges,
+            meal_preferences=meal_preferences,
+        ),
+        interests=interest_prefs,
+        travel_style=travel_style,
+    )
+
+
+def _price_tier_index(price_range: Any) -> int:
+    return PRICE_TIERS.index(PriceRange(price_range)) + 1
+
+
+def restaurant_categories(profile: UserProfile) -> Dict[str, Tuple[str, ...]]:
+    """Restaurant category vocabulary: known cuisines, the traveler's cuisines, diets and styles"""
+    vocabulary: Dict[str, Tuple[str, ...]] = dict(CUISINE_KEYWORDS)
+    for cuisine in profile.dining.cuisine_types:
+        key = "cuisine:" + cuisine.lower()
+        if key not in vocabulary:
+            vocabulary[key] = (cuisine.lower().replace(" cuisine", ""),)
+    for restriction in profile.dining.dietary_restrictions:
+        vocabulary["diet:" + restriction.lower()] = DIETARY_KEYWORDS.get(
+            restriction.lower(), (restriction.lower(),)
+        )
+    for style, keywords in MEAL_STYLE_KEYWORDS.items():
+        vocabulary["style:" + style] = keywords
+    return vocabulary
+
+
+class GuidePersonalizer:
+    """
+    Ranks and filters preference-neutral candidate pools for one traveler.
+    Pure in-process work: no I/O, safe to run on every request. Scoring is
+    delegated to the vectorized CandidateRanker. Callers ranking a cached
+    pool pass its pool_key so feature extraction runs once per pool and each
+    traveler only pays for scoring.
+    """
+
+    def __init__(
+        self,
+        restaurant_limit: int = 10,
+        attraction_limit: int = 10,
+        event_limit: int = 5,
+        ranker: Optional[CandidateRanker] = None,
+        matrix_cache_size: int = 64
+    ):
+        self.restaurant_limit = restaurant_limit
+        self.attraction_limit = attraction_limit
+        self.event_limit = event_limit
+        self.ranker = ranker or candidate_ranker
+        # (pool_key, section) -> feature matrix of that cached pool section
+        self._matrices: BoundedCache[CandidateMatrix] = BoundedCache(
+            "candidate_matrices", max_entries=matrix_cache_size
+        )
+
+    def rank_restaurants(
+        self,
+        restaurants: Optional[Iterable[Dict[str, Any]]],
+        profile: UserProfile,
+        limit: Optional[int] = None,
+        origin: Optional[Tuple[float, float]] = None,
+        pool_key: Optional[Hashable] = None
+    ) -> List[Dict[str, Any]]:
+        """Rank restaurants, dropping ones more than one price tier away when enough remain"""
+        limit = limit or self.restaurant_limit
+        candidates = [r for r in restaurants or [] if isinstance(r, dict) and r.get("name")]
+        vocabulary = restaurant_categories(profile)
+        matrix = self._pool_matrix(candidates, "restaurants", pool_key).with_categories(
+            vocabulary,
+            text_fields=("name", "cuisine", "type", "description", "recommendation", "why_recommended")
+        )
+
+        wanted = [_price_tier_index(p) for p in profile.dining.price_ranges]
+        weights = np.zeros(len(vocabulary), dtype=np.float32)
+        preferred = {"cuisine:" + c.lower() for c in profile.dining.cuisine_types}
+        for j, name in enumerate(vocabulary):
+            if name in preferred:
+                weights[j] = 1.3
+            elif name.startswith("diet:"):
+                weights[j] = 0.5
+            elif name.startswith("style:") and profile.dining.meal_preferences.get(name[len("style:"):]):
+                weights[j] = 0.35
+
+        gap = np.min(np.abs(matrix.price[:, None] - np.asarray(wanted, dtype=np.float32)[None, :]), axis=1)
+        in_range = ~(gap > 1)  # unknown prices (NaN) stay in range
+        mask = in_range if in_range.sum() >= min(limit, len(candidates)) // 2 else None
+
+        cuisine_columns = np.array([name.startswith("cuisine:") for name in vocabulary])
+        matrix.categories = matrix.categories * cuisine_columns  # diversify on cuisine only
+        return self.ranker.rank(
+            matrix, limit,
+            category_weights=weights,
+            preferred_prices=wanted,
+            origin=origin,
+            day_window=self._day_window(profile),
+            diversity=0.4,
+            mask=mask
+        ) if candidates else []
+
+    def rank_attractions(
+        self,
+        attractions: Optional[Iterable[Dict[str, Any]]],
+        profile: UserProfile,
+        limit: Optional[int] = None,
+        origin: Optional[Tuple[float, float]] = None,
+        pool_key: Optional[Hashable] = None
+    ) -> List[Dict[str, Any]]:
+        """Rank attractions by interest match, rating and category diversity"""
+        return self._rank_activities(
+            attractions, profile, limit or self.attraction_limit, origin,
+            diversity=0.5, section="attractions", pool_key=pool_key
+        )
+
+    def rank_events(
+        self,
+        events: Optional[Iterable[Dict[str, Any]]],
+        profile: UserProfile,
+        limit: Optional[int] = None,
+        pool_key: Optional[Hashable] = None
+    ) -> List[Dict[str, Any]]:
+        """Rank events by interest match"""
+        return self._rank_activities(
+            events, profile, limit or self.event_limit, None,
+            diversity=0.25, section="events", pool_key=pool_key
+        )
+
+    def personalize_pool(
+        self,
+        pool: Dict[str, Any],
+        preferences: Union[UserProfile, Dict[str, Any], None],
+        origin: Optional[Tuple[float, float]] = None,
+        pool_key: Optional[Hashable] = None
+    ) -> Dict[str, Any]:
+        """
+        Return a new dict with restaurants/attractions/events ranked for the
+        traveler. Lists are rebuilt so the cached pool is never mutated.
+        pool_key identifies a cached pool whose feature matrices can be reused.
+        """
+        profile = profile_from_preferences(preferences)
+        personalized = dict(pool)
+        personalized["restaurants"] = self.rank_restaurants(
+            pool.get("restaurants"), profile, origin=origin, pool_key=pool_key
+        )
+        personalized["attractions"] = self.rank_attractions(
+            pool.get("attractions"), profile, origin=origin, pool_key=pool_key
+        )
+        personalized["events"] = self.rank_events(pool.get("events"), profile, pool_key=pool_key)
+        return personalized
+
+    @staticmethod
+    def interest_weights(profile: UserProfile) -> np.ndarray:
+        """Category weight vector over INTEREST_KEYWORDS for the traveler"""
+        active = set(profile.interests.get_active_interests())
+        weights = np.array([1.0 if name in active else 0.0 for name in INTEREST_KEYWORDS], dtype=np.float32)
+        if profile.travel_style.group_type == GroupType.FAMILY:
+            weights[list(INTEREST_KEYWORDS).index("kid_friendly")] += 0.7
+        return weights
+
+    @staticmethod
+    def activities_per_day(profile: UserProfile) -> int:
+        """Number of sightseeing stops per day for the traveler's pace"""
+        return ACTIVITIES_PER_DAY.get(profile.travel_style.pace, 3)
+
+    def _rank_activities(
+        self,
+        candidates: Optional[Iterable[Dict[str, Any]]],
+        profile: UserProfile,
+        limit: int,
+        origin: Optional[Tuple[float, float]],
+        diversity: float,
+        section: str = "activities",
+        pool_key: Optional[Hashable] = None
+    ) -> List[Dict[str, Any]]:
+        candidates = [c for c in candidates or [] if isinstance(c, dict) and c.get("name")]
+        if not candidates:
+            return []
+        matrix = self._pool_matrix(candidates, section, pool_key).with_categories(
+            INTEREST_KEYWORDS,
+            text_fields=("name", "type", "types", "category", "description", "venue")
+        )
+        return self.ranker.rank(
+            matrix, limit,
+            category_weights=self.interest_weights(profile),
+            origin=origin,
+            day_window=self._day_window(profile),
+            diversity=diversity
+        )
+
+    def _pool_matrix(
+        self,
+        candidates: Sequence[Dict[str, Any]],
+        section: str,
+        pool_key: Optional[Hashable]
+    ) -> CandidateMatrix:
+        """
+        Feature matrix for a pool section, reused while the cached pool still
+        holds the same candidate dicts; a refetched pool rebuilds it
+        """
+        if pool_key is None:
+            return CandidateMatrix.from_candidates(candidates)
+        key = (pool_key, section)
+        matrix = self._matrices.get(key)
+        if matrix is None or not matrix.same_pool(candidates):
+            matrix = CandidateMatrix.from_candidates(candidates)
+            self._matrices.put(key, matrix)
+        return matrix
+
+    @staticmethod
+    def _day_window(profile: UserProfile) -> Tuple[int, int]:
+        """Day plan window implied by the traveler's preferred times"""
+        times = profile.travel_style.preferred_times
+        start = 6 * 60 if times.get("early_morning") else 9 * 60 if times.get("morning", True) else 12 * 60
+        end = 23 * 60 if times.get("late_night") else 21 * 60 if times.get("evening", True) else 17 * 60
+        return start, end
+
+
+# Global instance shared by the guide services
+guide_personalizer = GuidePersonalizer()
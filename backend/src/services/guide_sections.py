@@ -0,0 +1,242 @@
+"""
+Guide Section Tracking
+Records the inputs, sources and fetch time of each stored guide section so
+regeneration only refetches the sections whose inputs changed or expired
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+from .guide_personalization import guide_personalizer, profile_from_preferences
+from .route_planner import route_planner, places_origin
+
+logger = logging.getLogger(__name__)
+
+
+# Inputs each section depends on; a change in any of them makes it stale
+SECTION_INPUTS = {
+    "weather": ("destination", "dates"),
+    "restaurants": ("destination", "dining"),
+    "attractions": ("destination", "interests", "hotel"),
+    "events": ("destination", "dates", "interests"),
+    "daily_itinerary": ("destination", "dates", "hotel", "pace"),
+}
+
+# Maximum age before a section is refetched even if its inputs are unchanged
+SECTION_TTL = {
+    "weather": timedelta(hours=6),
+    "events": timedelta(hours=24),
+    "restaurants": timedelta(days=7),
+    "attractions": timedelta(days=7),
+    "daily_itinerary": None,
+}
+
+SECTION_SOURCES = {
+    "weather": ["OpenWeather API"],
+    "restaurants": ["Perplexity AI search results"],
+    "attractions": ["Perplexity AI search results"],
+    "events": ["Perplexity AI search results"],
+    "daily_itinerary": ["Perplexity AI search results", "Route planner"],
+}
+
+CONTENT_SECTIONS = ("restaurants", "attractions", "events")
+
+
+def section_inputs(
+    destination: str,
+    start_date: str,
+    end_date: str,
+    hotel_info: Optional[Dict[str, Any]],
+    preferences: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Normalized regeneration inputs, grouped by what sections depend on"""
+    profile = profile_from_preferences(preferences)
+    hotel_info = hotel_info or {}
+    return {
+        "destination": (destination or "").strip().lower(),
+        "dates": [start_date, end_date],
+        "hotel": [hotel_info.get("name", ""), hotel_info.get("address", ""), hotel_info.get("coordinates")],
+        "dining": profile.dining.model_dump(mode="json"),
+        "interests": sorted(profile.interests.get_active_interests()) + [profile.travel_style.group_type.value],
+        "pace": profile.travel_style.pace.value,
+    }
+
+
+def section_fingerprint(inputs: Dict[str, Any], section: str) -> str:
+    """Stable hash of the inputs one section depends on"""
+    relevant = {name: inputs.get(name) for name in SECTION_INPUTS[section]}
+    return hashlib.md5(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def stamp_sections(
+    guide: Dict[str, Any],
+    inputs: Dict[str, Any],
+    sections: Optional[Iterable[str]] = None,
+    fetched_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Record inputs, sources and fetch time for the given (default: all) sections"""
+    stamped_at = (fetched_at or datetime.utcnow()).isoformat()
+    meta = dict(guide.get("section_meta") or {})
+    for section in sections if sections is not None else SECTION_INPUTS:
+        meta[section] = {
+            "inputs": section_fingerprint(inputs, section),
+            "sources": SECTION_SOURCES[section],
+            "fetched_at": stamped_at,
+        }
+    guide["section_meta"] = meta
+    return guide
+
+
+def stale_sections(
+    guide: Dict[str, Any],
+    inputs: Dict[str, Any],
+    now: Optional[datetime] = None
+) -> Dict[str, str]:
+    """Map of stale section -> reason ("missing", "inputs" or "expired")"""
+    now = now or datetime.utcnow()
+    meta = guide.get("section_meta") or {}
+    stale = {}
+    for section, ttl in SECTION_TTL.items():
+        entry = meta.get(section)
+        if not entry:
+            stale[section] = "missing"
+        elif entry.get("inputs") != section_fingerprint(inputs, section):
+            stale[section] = "inputs"
+        elif ttl is not None:
+            try:
+                fetched_at = datetime.fromisoformat(entry.get("fetched_at", ""))
+            except ValueError:
+                stale[section] = "expired"
+                continue
+            if now - fetched_at > ttl:
+                stale[section] = "expired"
+    return stale
+
+
+def merge_sections(stored_guide: Optional[Dict[str, Any]], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Overlay regenerated sections onto a stored guide, keeping other sections' metadata"""
+    merged = dict(stored_guide or {})
+    meta = dict(merged.get("section_meta") or {})
+    meta.update(updates.get("section_meta") or {})
+    merged.update(updates)
+    merged["section_meta"] = meta
+    return merged
+
+
+class IncrementalGuideRegenerator:
+    """
+    Refreshes only the stale sections of a stored fast guide. Content
+    sections are re-ranked from the service's cached candidate pool when one
+    exists, so a preference change usually needs no upstream call at all.
+    """
+
+    def __init__(self, fast_guide_service):
+        self.fast_guide_service = fast_guide_service
+
+    async def regenerate(
+        self,
+        stored_guide: Dict[str, Any],
+        destination: str,
+        start_date: str,
+        end_date: str,
+        hotel_info: Dict[str, Any],
+        preferences: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Returns (updated sections, refreshed section names). The updates are
+        meant for save_enhanced_guide_data(..., merge=True).
+        """
+        service = self.fast_guide_service
+        inputs = section_inputs(destination, start_date, end_date, hotel_info, preferences)
+        stale = stale_sections(stored_guide, inputs)
+        if not stale:
+            return {}, []
+        logger.info(f"Regenerating guide sections: {stale}")
+
+        # Content sections share one candidate pool; reuse the cached one unless it expired
+        content_stale = [s for s in CONTENT_SECTIONS if s in stale]
+        cache_key = f"{destination}_{start_date}_{end_date}"
+        pool = service.destination_cache.get(cache_key)
+        if any(stale[s] == "expired" for s in content_stale):
+            pool = None
+
+        stages = []
+        if "weather" in stale:
+            stages.append("weather")
+        if content_stale and pool is None:
+            stages.append("content")
+        if "daily_itinerary" in stale:
+            stages.append("daily_itinerary")
+        # Sections whose stored data expired must not be answered from the stage cache
+        refresh = [s for s in stages if stale.get(s) == "expired"]
+        if "content" in stages and any(stale[s] == "expired" for s in content_stale):
+            refresh.append("content")
+
+        # Imported here: the engine keys its stage cache on section_inputs
+        from .guide_engine import GuideRequest, guide_engine
+        run = await guide_engine.run(
+            service.profile,
+            GuideRequest(destination, start_date, end_date, hotel_info, preferences),
+            stages=stages,
+            refresh=refresh
+        )
+        results: Dict[str, Any] = {}
+        for name in stages:
+            result = run[name]
+            if run.failed(name) or (isinstance(result, dict) and result.get("error")):
+                logger.warning(f"Section fetch '{name}' failed, keeping stored data: {run.error(name) or result}")
+                result = None
+            results[name] = result
+
+        updates: Dict[str, Any] = {}
+        refreshed: List[str] = []
+
+        weather = stored_guide.get("weather", [])
+        if results.get("weather") is not None:
+            weather = results["weather"].get("forecasts", [])
+            updates["weather"] = weather
+            updates["weather_summary"] = service._create_weather_summary(weather)
+            practical_info = dict(stored_guide.get("practical_info") or {})
+            practical_info["packing"] = service._generate_packing_suggestions(weather)
+            updates["practical_info"] = practical_info
+            refreshed.append("weather")
+
+        if content_stale:
+            # Only the cached guide's pool is reused across travelers
+            pool_key = ("fast", cache_key) if pool is not None else None
+            pool = pool if pool is not None else results.get("content")
+            if pool is not None:
+                profile = profile_from_preferences(preferences)
+                origin = places_origin(hotel_info, pool.get("attractions", []))
+                ranked = guide_personalizer.personalize_pool(pool, profile, origin=origin, pool_key=pool_key)
+                for section in content_stale:
+                    updates[section] = ranked[section]
+                    refreshed.append(section)
+
+        itinerary = results.get("daily_itinerary")
+        if itinerary is not None:
+            refreshed.append("daily_itinerary")
+        if itinerary is not None or updates.keys() & {"weather", "attractions"}:
+            # Day plans carry weather notes and routes, so rebuild them from the latest inputs
+            itinerary = itinerary if itinerary is not None else stored_guide.get("daily_itinerary", [])
+            attractions = updates.get("attractions", stored_guide.get("attractions", []))
+            profile = profile_from_preferences(preferences)
+            updates["daily_itinerary"] = route_planner.attach_routes(
+                service._integrate_weather_into_itinerary(itinerary, weather),
+                attractions,
+                places_origin(hotel_info, attractions),
+                stops_per_day=guide_personalizer.activities_per_day(profile)
+            )
+
+        if updates:
+            updates["summary"] = service._create_summary(
+                destination,
+                weather,
+                updates.get("restaurants", stored_guide.get("restaurants", [])),
+                updates.get("attractions", stored_guide.get("attractions", []))
+            )
+            updates["timestamp"] = datetime.now().isoformat()
+        stamp_sections(updates, inputs, refreshed)
+        return updates, refreshed
@@ -8,13 +8,20 @@ import re
 import asyncio
 import aiohttp
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Hashable
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
 import time
 
 from .redis_cache_service import cache_service
+from ..core.bounded_cache import BoundedCache
+from .guide_personalization import (
+    guide_personalizer,
+    candidate_pool_key,
+    profile_from_preferences,
+)
+from ..core.upstream_metrics import upstream_trace_configs
 
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
@@ -23,6 +30,11 @@ load_dotenv(env_path)
 
 logger = logging.getLogger(__name__)
 
+# Decoded candidate pools kept in process, so travelers ranking the same pool
+# share its feature matrices (a Redis hit decodes fresh dicts every time)
+POOL_MEMORY_ENTRIES = 32
+POOL_MEMORY_TTL_SECONDS = 300
+
 class HighPerformanceGuideService:
     """Ultra-fast guide generation with Redis caching and parallel processing"""
     
@@ -41,6 +53,10 @@ class HighPerformanceGuideService:
         
         # Connection pooling - removed as it causes issues
         self.connector = None
+        
+        self._pools: BoundedCache[Dict[str, Any]] = BoundedCache(
+            "candidate_pools", max_entries=POOL_MEMORY_ENTRIES, ttl_seconds=POOL_MEMORY_TTL_SECONDS
+        )
     
     async def generate_high_performance_guide(
         self,
@@ -72,38 +88,65 @@ class HighPerformanceGuideService:
         end = datetime.strptime(end_date, "%Y-%m-%d")
         num_days = (end - start).days + 1
         
-        # Check for complete cached guide first
-        guide_cache_key = {
-            "destination": destination,
-            "start": start_date,
-            "end": end_date,
-            "budget": preferences.get("budget", "moderate")
-        }
+        # Stage 1: preference-neutral candidate pool per destination/date window
+        pool_key = candidate_pool_key(destination, start_date, end_date)
+        memory_key = ("high_performance", tuple(sorted(pool_key.items())))
         
-        cached_guide = await cache_service.get("complete_guide", **guide_cache_key)
-        if cached_guide:
-            logger.info(f"Complete guide cache hit! Saved {time.time() - start_time:.1f}s")
-            cached_guide["from_cache"] = True
-            cached_guide["performance_metrics"] = {
-                "total_time": time.time() - start_time,
-                "cache_hits": 1,
-                "api_calls": 0
-            }
+        pool = self._pools.get(memory_key) or await cache_service.get("candidate_pool", **pool_key)
+        pool_from_cache = bool(pool)
+        if pool:
+            logger.info(f"Candidate pool cache hit! Saved {time.time() - start_time:.1f}s")
+            metrics["cache_hits"] += 1
+        else:
             if progress_callback:
-                await progress_callback(100, "Guide loaded from cache!")
-            return cached_guide
+                await progress_callback(20, "Fetching travel content...")
+            pool = await self._fetch_candidate_pool(destination, start_date, end_date, metrics)
+            if pool.get("content"):
+                await cache_service.set("candidate_pool", pool, **pool_key)
+        if pool.get("content"):
+            self._pools.put(memory_key, pool)
         
         if progress_callback:
-            await progress_callback(20, "Fetching travel content...")
+            await progress_callback(70, "Assembling your guide...")
+        
+        # Stage 2: rank and assemble locally for this traveler
+        guide = self._assemble_guide(
+            pool, destination, start_date, end_date, num_days,
+            hotel_info, preferences, extracted_data, primary_traveler,
+            pool_key=memory_key
+        )
+        guide["from_cache"] = pool_from_cache
+        guide["generation_time_seconds"] = round(time.time() - start_time, 2)
+        guide["performance_metrics"] = {
+            "total_time": round(time.time() - start_time, 2),
+            "cache_hits": metrics["cache_hits"],
+            "api_calls": metrics["api_calls"],
+            "cache_enabled": cache_service.connected
+        }
+        
+        if progress_callback:
+            await progress_callback(100, f"Guide ready in {guide['generation_time_seconds']}s!")
+        
+        logger.info(f"Guide generated in {guide['generation_time_seconds']}s "
+                   f"(Cache hits: {metrics['cache_hits']}, API calls: {metrics['api_calls']})")
+        
+        return guide
+    
+    async def _fetch_candidate_pool(
+        self,
+        destination: str,
+        start_date: str,
+        end_date: str,
+        metrics: Dict
+    ) -> Dict[str, Any]:
+        """Fetch every preference-neutral section in parallel"""
         
         # Parallel task execution with caching
         tasks = []
         task_names = []
         
         # Task 1: Get restaurants and attractions (cached)
-        tasks.append(self._get_cached_content(
-            destination, preferences, metrics
-        ))
+        tasks.append(self._get_cached_content(destination, metrics))
         task_names.append("content")
         
         # Task 2: Get weather (cached separately)
@@ -143,19 +186,45 @@ class HighPerformanceGuideService:
             else:
                 result_dict[name] = result or {}
         
-        if progress_callback:
-            await progress_callback(70, "Assembling your guide...")
-        
-        # Build the guide
-        content = result_dict.get("content", {})
-        weather = result_dict.get("weather", {})
-        events = result_dict.get("events", {})
-        neighborhoods = result_dict.get("neighborhoods", [])
+        return result_dict
+    
+    def _assemble_guide(
+        self,
+        pool: Dict[str, Any],
+        destination: str,
+        start_date: str,
+        end_date: str,
+        num_days: int,
+        hotel_info: Dict,
+        preferences: Dict,
+        extracted_data: Dict,
+        primary_traveler: str,
+        pool_key: Optional[Hashable] = None
+    ) -> Dict[str, Any]:
+        """
+        Rank the candidate pool for one traveler and build the guide.
+        pool_key lets the personalizer reuse the pool's feature matrices.
+        """
+        profile = profile_from_preferences(preferences)
+        
+        content = pool.get("content", {})
+        weather = pool.get("weather", {})
+        events = pool.get("events", {})
+        neighborhoods = pool.get("neighborhoods", [])
+        
+        ranked = {
+            "restaurants": guide_personalizer.rank_restaurants(
+                content.get("restaurants", []), profile, pool_key=pool_key
+            ),
+            "attractions": guide_personalizer.rank_attractions(
+                content.get("attractions", []), profile, pool_key=pool_key
+            ),
+        }
+        ranked_events = guide_personalizer.rank_events(events.get("events", []), profile, pool_key=pool_key)
         
-        guide = {
+        return {
             "guide_type": "high_performance_luxury",
             "generation_timestamp": datetime.now().isoformat(),
-            "generation_time_seconds": round(time.time() - start_time, 2),
             
             # Personalization
             "personalization": {
@@ -167,20 +236,20 @@ class HighPerformanceGuideService:
             
             # Content sections
             "culinary_guide": {
-                "michelin_starred": content.get("restaurants", []),
+                "michelin_starred": ranked["restaurants"],
                 "reservations_required": [
                     f"{r.get('name', 'Restaurant')}: Book in advance"
-                    for r in content.get("restaurants", [])[:5]
+                    for r in ranked["restaurants"][:5]
                 ]
             },
             
             "cultural_experiences": {
-                "museums": content.get("attractions", []),
+                "museums": ranked["attractions"],
                 "exclusive_tours": []
             },
             
             "contemporary_happenings": {
-                "events": events.get("events", [])
+                "events": ranked_events
             },
             
             "weather_forecast": weather,
@@ -194,11 +263,11 @@ class HighPerformanceGuideService:
             
             # Quick itinerary generation
             "daily_itinerary": self._generate_fast_itinerary(
-                num_days, content, destination
+                num_days, ranked, destination
             ),
             
             # Insider tips
-            "insider_tips": self._generate_quick_tips(destination, content),
+            "insider_tips": self._generate_quick_tips(destination, ranked),
             
             # Travel logistics
             "flight_details": extracted_data.get("flights", []),
@@ -206,45 +275,23 @@ class HighPerformanceGuideService:
             
             # Quality indicators
             "quality_indicators": {
-                "restaurant_count": len(content.get("restaurants", [])),
-                "attraction_count": len(content.get("attractions", [])),
-                "event_count": len(events.get("events", [])),
+                "restaurant_count": len(ranked["restaurants"]),
+                "attraction_count": len(ranked["attractions"]),
+                "event_count": len(ranked_events),
                 "neighborhood_count": len(neighborhoods),
                 "has_weather": bool(weather and not weather.get("error")),
                 "has_maps": True,
                 "has_photos": True,
                 "has_reservations": True,
                 "insider_tips_count": 5
-            },
-            
-            # Performance metrics
-            "performance_metrics": {
-                "total_time": round(time.time() - start_time, 2),
-                "cache_hits": metrics["cache_hits"],
-                "api_calls": metrics["api_calls"],
-                "cache_enabled": cache_service.connected
             }
         }
-        
-        # Cache the complete guide
-        await cache_service.set("complete_guide", guide, ttl=7200, **guide_cache_key)
-        
-        if progress_callback:
-            await progress_callback(100, f"Guide ready in {guide['generation_time_seconds']}s!")
-        
-        logger.info(f"Guide generated in {guide['generation_time_seconds']}s "
-                   f"(Cache hits: {metrics['cache_hits']}, API calls: {metrics['api_calls']})")
-        
-        return guide
     
-    async def _get_cached_content(self, destination: str, preferences: Dict, metrics: Dict) -> Dict:
-        """Get restaurants and attractions with caching"""
+    async def _get_cached_content(self, destination: str, metrics: Dict) -> Dict:
+        """Get a preference-neutral restaurant and attraction pool with caching"""
         
         # Check cache
-        cache_key = {
-            "destination": destination,
-            "budget": preferences.get("budget", "moderate")
-        }
+        cache_key = {"destination": destination, "scope": "all_budgets"}
         
         cached = await cache_service.get("perplexity_content", **cache_key)
         if cached:
@@ -255,26 +302,18 @@ class HighPerformanceGuideService:
         if not self.perplexity_api_key:
             return {}
         
-        budget = preferences.get("budget", "moderate")
-        
-        # Optimized prompt - specific and concise
-        if budget == "budget":
-            restaurant_type = "street food and local cheap eats under $15"
-        elif budget == "luxury":
-            restaurant_type = "Michelin-starred and fine dining restaurants"
-        else:
-            restaurant_type = "popular local restaurants $20-50 per meal"
-        
+        # Broad prompt covering every budget - ranking happens per traveler
         prompt = f"""List for {destination}:
-1. Top 10 {restaurant_type}
-2. Top 5 tourist attractions
+1. Top 20 restaurants: mix street food and cheap eats, popular local restaurants and Michelin-starred fine dining
+2. Top 12 tourist attractions across culture, history, nature, shopping and nightlife
 
 Format each with: name, type, address, description (max 15 words).
+Restaurants also need: cuisine, price_range ($ to $$$$).
 Return as JSON arrays: restaurants, attractions"""
 
         try:
             timeout = aiohttp.ClientTimeout(total=self.timeouts["perplexity"])
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -284,7 +323,7 @@ Return as JSON arrays: restaurants, attractions"""
                     "model": "sonar-pro",
                     "messages": [{"role": "user", "content": prompt}],
                     "temperature": 0.2,
-                    "max_tokens": 1500
+                    "max_tokens": 2500
                 }
                 
                 metrics["api_calls"] += 1
@@ -336,7 +375,7 @@ Return as JSON arrays: restaurants, attractions"""
         
         try:
             timeout = aiohttp.ClientTimeout(total=self.timeouts["weather"])
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 url = "https://api.openweathermap.org/data/2.5/forecast"
                 params = {
                     "q": destination,
@@ -394,7 +433,7 @@ Return as JSON arrays: restaurants, attractions"""
         
         try:
             timeout = aiohttp.ClientTimeout(total=self.timeouts["perplexity"])
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -448,7 +487,7 @@ Return as JSON arrays: restaurants, attractions"""
         
         try:
             timeout = aiohttp.ClientTimeout(total=self.timeouts["perplexity"])
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
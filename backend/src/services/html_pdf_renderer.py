@@ -9,6 +9,9 @@ from pathlib import Path
 from typing import Any, Dict, Optional
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
+from ..core.tracing import traced
+
+
 class HTMLPDFRenderer:
     def __init__(self, templates_dir: Optional[Path] = None):
         if templates_dir is None:
@@ -44,6 +47,7 @@ class HTMLPDFRenderer:
             browser.close()
         return output_path
 
+    @traced("pdf.build", renderer="html")
     def render_magazine_pdf(self, guide: Dict[str, Any], itinerary: Dict[str, Any], output_path: Path) -> Path:
         html = self.render_html("magazine_guide.html", {
             "guide": guide,
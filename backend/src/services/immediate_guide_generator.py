@@ -9,6 +9,8 @@ from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 
 from .perplexity_search_service import PerplexitySearchService
+from .route_planner import route_planner, places_origin
+from ..utils.trip_data_extractor import extract_hotel_info
 from ..utils.environment import load_project_env, get_required_api_key
 from ..utils.error_handling import safe_execute, APIError
 
@@ -86,6 +88,15 @@ class ImmediateGuideGenerator:
             
             # Generate real daily activities
             if "daily_schedule" in itinerary:
+                # Two sightseeing stops per sightseeing day, clustered around the hotel
+                sightseeing_days = [d for d in itinerary["daily_schedule"] if d.get("day", 1) > 1]
+                hotel_info = hotels[0] if hotels else extract_hotel_info(itinerary, destination)
+                day_routes = route_planner.plan_days(
+                    attractions[:8], len(sightseeing_days),
+                    places_origin(hotel_info, attractions), stops_per_day=2
+                )
+                routes_by_day = {d.get("day"): route.stops for d, route in zip(sightseeing_days, day_routes)}
+
                 for day in itinerary["daily_schedule"]:
                     day_num = day.get("day", 1)
                     date = day.get("date", "")
@@ -93,7 +104,7 @@ class ImmediateGuideGenerator:
                     # Generate real activities for this day
                     real_activities = await self._generate_day_activities(
                         destination, day_num, date, hotel_address, 
-                        restaurants, attractions
+                        restaurants, attractions, routes_by_day.get(day_num)
                     )
                     
                     # Replace placeholder with real activities
@@ -120,9 +131,10 @@ class ImmediateGuideGenerator:
         date: str,
         hotel_address: str,
         restaurants: List[Dict],
-        attractions: List[Dict]
+        attractions: List[Dict],
+        day_stops: Optional[List[Dict]] = None
     ) -> List[str]:
-        """Generate real activities for a specific day"""
+        """Generate real activities for a specific day, using routed stops when planned"""
         
         activities = []
         
@@ -139,12 +151,17 @@ class ImmediateGuideGenerator:
         
         # Middle days - real attractions
         elif day_num > 1 and attractions:
-            # Rotate through attractions
-            morning_idx = (day_num - 2) * 2 % len(attractions)
-            afternoon_idx = (morning_idx + 1) % len(attractions)
-            
-            morning_attraction = attractions[morning_idx] if morning_idx < len(attractions) else None
-            afternoon_attraction = attractions[afternoon_idx] if afternoon_idx < len(attractions) else None
+            if day_stops:
+                # Route planner already ordered the day's stops from the hotel
+                morning_attraction = day_stops[0]
+                afternoon_attraction = day_stops[1] if len(day_stops) > 1 else None
+            else:
+                # Rotate through attractions
+                morning_idx = (day_num - 2) * 2 % len(attractions)
+                afternoon_idx = (morning_idx + 1) % len(attractions)
+
+                morning_attraction = attractions[morning_idx] if morning_idx < len(attractions) else None
+                afternoon_attraction = attractions[afternoon_idx] if afternoon_idx < len(attractions) else None
             
             if morning_attraction:
                 activities.append(f"Morning: Visit {morning_attraction.get('name', 'attraction')}")
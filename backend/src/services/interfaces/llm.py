@@ -118,7 +118,7 @@ class LLMServiceInterface(BaseService):
         """Extract travel information from text"""
         prompt = self._build_extraction_prompt(text, extraction_type)
         request = LLMRequest(prompt=prompt)
-        response = await self.generate_response(request)
+        response = await self.generate_response(request, cache_namespace="extraction")
         
         if not response.is_success:
             raise Exception(f"LLM extraction failed: {response.error}")
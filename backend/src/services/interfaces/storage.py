@@ -103,8 +103,8 @@ class StorageServiceInterface(BaseService):
     
     # Trip Data Operations
     @abstractmethod
-    async def save_trip_data(self, trip_data: TripData) -> StorageResult:
-        """Save trip data"""
+    async def save_trip_data(self, trip_data: TripData, expected_version: Optional[int] = None) -> StorageResult:
+        """Save trip data; fails with a conflict if the trip is not at expected_version"""
         pass
     
     @abstractmethod
@@ -113,8 +113,13 @@ class StorageServiceInterface(BaseService):
         pass
     
     @abstractmethod
-    async def update_trip_data(self, trip_id: str, **updates) -> StorageResult:
-        """Update trip data"""
+    async def update_trip_data(
+        self,
+        trip_id: str,
+        expected_version: Optional[int] = None,
+        **updates
+    ) -> StorageResult:
+        """Update trip data; fails with a conflict if the trip is not at expected_version"""
         pass
     
     @abstractmethod
@@ -0,0 +1,341 @@
+"""
+LLM Response Cache
+Deterministic memoization of LLM calls keyed by provider, model, normalized
+prompt, sampling params and schema version. Entries live in a persistent
+SQLite store with per-namespace TTLs, and every hit is credited with the
+tokens and estimated cost it saved.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Callable, Awaitable, Tuple, Union
+
+from ..core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when a prompt template or the cached payload shape changes incompatibly
+SCHEMA_VERSION = 1
+
+# Seconds an entry stays valid, per namespace
+NAMESPACE_TTL = {
+    "extraction": 3600 * 24 * 7,     # same document text -> same booking data
+    "guide_parse": 3600 * 24,        # structuring a fetched guide
+    "search_parse": 3600 * 24,       # structuring Perplexity search results
+    "json_repair": 3600 * 24,        # gpt-4o-mini JSON fallback
+    "llm_response": 3600,            # generic EnhancedLLMService calls
+}
+DEFAULT_TTL = 3600
+
+# USD per 1M tokens (input, output) used for the cost-saved estimate
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "claude-3-haiku": (0.25, 1.25),
+    "claude-3-sonnet": (3.00, 15.00),
+    "claude-3-opus": (15.00, 75.00),
+    "sonar": (1.00, 1.00),
+}
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent.parent / "data" / "llm_cache.sqlite3"
+
+
+@dataclass
+class CachedCompletion:
+    """Content and usage of one LLM call, as stored in the cache"""
+    content: str
+    model: str
+    usage: Optional[Dict[str, int]] = None
+    cached: bool = False
+
+
+def normalize_prompt(text: Optional[str]) -> str:
+    """Whitespace-insensitive form of a prompt, so reindented templates share entries"""
+    lines = [re.sub(r"[ \t]+", " ", line.strip()) for line in (text or "").strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def is_json(content: str) -> bool:
+    """True when content (optionally inside a markdown code fence) parses as JSON"""
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```(?:json)?|```$", "", text, flags=re.MULTILINE).strip()
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+
+def model_price(model: str) -> Tuple[float, float]:
+    """Per-1M-token prices for the longest known model prefix"""
+    model = (model or "").lower()
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name) or name in model:
+            return MODEL_PRICES[name]
+    return (0.0, 0.0)
+
+
+class SQLiteCacheStore:
+    """Persistent key/value store with expiry; one shared connection guarded by a lock"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, namespace TEXT NOT NULL,"
+            " value TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < (now or time.time()):
+            return None
+        return row[0]
+
+    def set(self, key: str, namespace: str, value: str, ttl: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, value, now, now + ttl)
+            )
+            self._conn.commit()
+
+    def delete_namespace(self, namespace: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM llm_cache WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class LLMResponseCache:
+    """
+    Memoizes LLM completions. Callers pass the provider, model, messages and
+    sampling params plus a coroutine factory that performs the real call;
+    `bypass` skips the cache entirely and `refresh` skips the read but
+    stores the fresh answer.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        enabled: Optional[bool] = None,
+        ttls: Optional[Dict[str, int]] = None
+    ):
+        if enabled is None:
+            enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+        self.enabled = enabled
+        self.path = Path(path or os.getenv("LLM_CACHE_PATH") or DEFAULT_CACHE_PATH)
+        self.ttls = {**NAMESPACE_TTL, **(ttls or {})}
+        self._store: Optional[SQLiteCacheStore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def store(self) -> Optional[SQLiteCacheStore]:
+        """Opened on first use so importing the module never touches the disk"""
+        if self._store is None and self.enabled:
+            try:
+                self._store = SQLiteCacheStore(self.path)
+            except Exception as e:
+                logger.warning(f"LLM cache store unavailable at {self.path}: {e}. Caching disabled.")
+                self.enabled = False
+        return self._store
+
+    @staticmethod
+    def cache_key(
+        provider: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        params: Optional[Dict[str, Any]] = None,
+        schema_version: int = SCHEMA_VERSION
+    ) -> str:
+        payload = {
+            "provider": provider,
+            "model": model,
+            "messages": [
+                {"role": m.get("role"), "content": normalize_prompt(m.get("content"))
+                 if isinstance(m.get("content"), str) else m.get("content")}
+                for m in messages
+            ],
+            "params": params or {},
+            "schema_version": schema_version,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    async def complete(
+        self,
+        namespace: str,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        call: Callable[[], Awaitable[CachedCompletion]],
+        params: Optional[Dict[str, Any]] = None,
+        schema_version: int = SCHEMA_VERSION,
+        bypass: bool = False,
+        refresh: bool = False,
+        ttl: Optional[int] = None,
+        validate: Optional[Callable[[str], bool]] = None
+    ) -> CachedCompletion:
+        """
+        Return the cached completion for this request or perform `call` and
+        store it. Answers failing `validate` are returned but never stored.
+        """
+        if bypass or not self.enabled or self.store is None:
+            self._count(namespace, "bypassed")
+            return await call()
+
+        key = self.cache_key(provider, model, messages, params, schema_version)
+        pending = None if refresh else self._inflight.get(key)
+        while pending is not None:
+            # Identical concurrent requests share one lookup and upstream call
+            try:
+                completion = await asyncio.shield(pending)
+                self._count(namespace, "coalesced")
+                self._record_saving(namespace, completion)
+                return CachedCompletion(**{**asdict(completion), "cached": True})
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+            # The leading request was cancelled; the first waiter to resume
+            # takes over and the others wait on it
+            pending = self._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            completion = None if refresh else await self.get(namespace, key)
+            if completion is None:
+                completion = await call()
+                if completion.content and (validate is None or validate(completion.content)):
+                    await self.set(namespace, key, completion, ttl)
+            future.set_result(completion)
+            return completion
+        except asyncio.CancelledError:
+            # Only the leader was cancelled: waiters see a cancelled future and call themselves
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def get(self, namespace: str, key: str) -> Optional[CachedCompletion]:
+        store = self.store
+        if store is None:
+            return None
+        with tracer.span("cache.get", {"cache.name": "llm", "cache.namespace": namespace}) as span:
+            try:
+                value = await asyncio.to_thread(store.get, key)
+            except Exception as e:
+                self._count(namespace, "errors")
+                logger.warning(f"LLM cache read failed ({namespace}): {e}")
+                return None
+            span.set_attribute("cache.hit", value is not None)
+        if value is None:
+            self._count(namespace, "misses")
+            return None
+        completion = CachedCompletion(**{**json.loads(value), "cached": True})
+        self._count(namespace, "hits")
+        self._record_saving(namespace, completion)
+        return completion
+
+    async def set(self, namespace: str, key: str, completion: CachedCompletion, ttl: Optional[int] = None) -> None:
+        store = self.store
+        if store is None:
+            return
+        value = json.dumps({"content": completion.content, "model": completion.model, "usage": completion.usage})
+        try:
+            await asyncio.to_thread(store.set, key, namespace, value, ttl or self.ttls.get(namespace, DEFAULT_TTL))
+            self._count(namespace, "stores")
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"LLM cache write failed ({namespace}): {e}")
+
+    async def clear_namespace(self, namespace: str) -> int:
+        if self.store is None:
+            return 0
+        return await asyncio.to_thread(self.store.delete_namespace, namespace)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-namespace and total hit/miss counts with tokens and cost saved"""
+        totals: Dict[str, float] = {}
+        for counters in self.stats.values():
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+        served = totals.get("hits", 0) + totals.get("coalesced", 0)
+        lookups = served + totals.get("misses", 0)
+        totals["hit_rate"] = served / lookups if lookups else 0.0
+        totals["cost_saved_usd"] = round(totals.get("cost_saved_usd", 0.0), 6)
+        return {
+            "enabled": self.enabled,
+            "path": str(self.path),
+            "schema_version": SCHEMA_VERSION,
+            "totals": totals,
+            "namespaces": {name: dict(counters) for name, counters in self.stats.items()},
+        }
+
+    def _record_saving(self, namespace: str, completion: CachedCompletion) -> None:
+        usage = completion.usage or {}
+        prompt_tokens = usage.get("prompt_tokens", 0) or 0
+        completion_tokens = usage.get("completion_tokens", 0) or 0
+        input_price, output_price = model_price(completion.model)
+        self._count(namespace, "prompt_tokens_saved", prompt_tokens)
+        self._count(namespace, "completion_tokens_saved", completion_tokens)
+        self._count(namespace, "cost_saved_usd", (prompt_tokens * input_price + completion_tokens * output_price) / 1e6)
+
+    def _count(self, namespace: str, name: str, amount: float = 1) -> None:
+        counters = self.stats.setdefault(namespace, {})
+        counters[name] = counters.get(name, 0) + amount
+
+
+def openai_completion(response: Any) -> CachedCompletion:
+    """CachedCompletion from an OpenAI-style chat completion object"""
+    usage = None
+    if getattr(response, "usage", None):
+        usage = {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "total_tokens": response.usage.total_tokens,
+        }
+    return CachedCompletion(content=response.choices[0].message.content or "", model=response.model, usage=usage)
+
+
+# Global instance shared by all LLM call sites
+llm_response_cache = LLMResponseCache()
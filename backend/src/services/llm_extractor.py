@@ -5,11 +5,11 @@ Uses OpenAI/Claude to extract structured travel information from text
 import os
 import json
 from typing import Dict, Any, Optional
-from openai import AsyncOpenAI
-import anthropic
 from dotenv import load_dotenv
 from pathlib import Path
 
+from .llm_cache import llm_response_cache, openai_completion, is_json, CachedCompletion
+
 # Load .env from project root directory
 project_root = Path(__file__).parent.parent.parent.parent
 env_path = project_root / ".env"
@@ -21,14 +21,19 @@ class LLMExtractor:
         self.openai_client = None
         self.claude_client = None
         
+        # The SDKs take seconds to import; only the configured one is loaded
         if os.getenv("OPENAI_API_KEY"):
+            from openai import AsyncOpenAI
             self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         elif os.getenv("ANTHROPIC_API_KEY"):
+            import anthropic
             self.claude_client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
     
-    async def extract_travel_info(self, text: str) -> Dict[str, Any]:
+    async def extract_travel_info(self, text: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """
-        Extract structured travel information from text using LLM
+        Extract structured travel information from text using LLM.
+        Identical document text is answered from the LLM response cache
+        unless bypass_cache is set.
         """
         import logging
         logger = logging.getLogger(__name__)
@@ -124,30 +129,39 @@ Return ONLY the JSON object, no markdown, no explanations."""
                 print(f"[EXTRACTION] 🚀 Starting LLM extraction for {len(text)} characters of text")
                 print(f"[EXTRACTION] 📄 Text preview: {text[:200]}...")
 
-                try:
-                    # Try with response_format first (only works with newer models)
-                    response = await self.openai_client.chat.completions.create(
-                        model=model,
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": prompt.format(text=text[:8000])}  # Increased text length
-                        ],
-                        temperature=0.1,
-                        response_format={"type": "json_object"}
-                    )
-                except Exception as format_error:
-                    print(f"[EXTRACTION] ⚠️  Using fallback without response_format")
-                    # Fallback without response_format
-                    response = await self.openai_client.chat.completions.create(
-                        model=model,
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": prompt.format(text=text[:8000])}  # Increased text length
-                        ],
-                        temperature=0.1
-                    )
+                messages = [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt.format(text=text[:8000])}  # Increased text length
+                ]
+
+                async def call() -> CachedCompletion:
+                    try:
+                        # Try with response_format first (only works with newer models)
+                        response = await self.openai_client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            temperature=0.1,
+                            response_format={"type": "json_object"}
+                        )
+                    except Exception as format_error:
+                        print(f"[EXTRACTION] ⚠️  Using fallback without response_format")
+                        # Fallback without response_format
+                        response = await self.openai_client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            temperature=0.1
+                        )
+                    return openai_completion(response)
 
-                result = response.choices[0].message.content
+                completion = await llm_response_cache.complete(
+                    "extraction", "openai", model, messages, call,
+                    params={"temperature": 0.1, "response_format": "json_object"},
+                    bypass=bypass_cache,
+                    validate=is_json
+                )
+                if completion.cached:
+                    print("[EXTRACTION] ♻️  Served from LLM cache")
+                result = completion.content
                 print(f"[EXTRACTION] 🤖 OpenAI response: {result[:500]}...")
 
                 # Clean up response if needed (remove markdown code blocks)
@@ -188,16 +202,32 @@ Return ONLY the JSON object, no markdown, no explanations."""
                 return parsed_data
                 
             elif self.claude_client:
-                response = await self.claude_client.messages.create(
-                    model="claude-3-haiku-20240307",
-                    max_tokens=2000,
-                    temperature=0.1,
-                    messages=[
-                        {"role": "user", "content": prompt.format(text=text[:4000])}
-                    ]
+                messages = [
+                    {"role": "user", "content": prompt.format(text=text[:4000])}
+                ]
+
+                async def call() -> CachedCompletion:
+                    response = await self.claude_client.messages.create(
+                        model="claude-3-haiku-20240307",
+                        max_tokens=2000,
+                        temperature=0.1,
+                        messages=messages
+                    )
+                    return CachedCompletion(
+                        content=response.content[0].text,
+                        model=response.model,
+                        usage={
+                            "prompt_tokens": response.usage.input_tokens,
+                            "completion_tokens": response.usage.output_tokens,
+                        }
+                    )
+
+                completion = await llm_response_cache.complete(
+                    "extraction", "anthropic", "claude-3-haiku-20240307", messages, call,
+                    params={"temperature": 0.1, "max_tokens": 2000},
+                    bypass=bypass_cache
                 )
-                
-                result = response.content[0].text
+                result = completion.content
                 # Extract JSON from Claude's response
                 import re
                 json_match = re.search(r'\{.*\}', result, re.DOTALL)
@@ -4,8 +4,11 @@ Uses vision-capable models to extract travel information directly from images/PD
 """
 import os
 import json
+import asyncio
 import base64
-from typing import Dict, Any, Optional, List, Union
+import time
+from collections import Counter
+from typing import Dict, Any, Optional, List, Union, Tuple
 from openai import AsyncOpenAI
 import anthropic
 from dotenv import load_dotenv
@@ -14,11 +17,16 @@ import fitz  # PyMuPDF
 from PIL import Image
 import io
 
+from .document_router import document_router
+
 # Load .env from backend directory
 backend_dir = Path(__file__).parent.parent
 env_path = backend_dir / ".env"
 load_dotenv(env_path)
 
+# Vision calls in flight at once across files and page groups
+MAX_CONCURRENT_EXTRACTIONS = int(os.getenv("VISION_MAX_CONCURRENCY", "4"))
+
 class MultimodalLLMExtractor:
     def __init__(self):
         self.openai_client = None
@@ -30,17 +38,13 @@ class MultimodalLLMExtractor:
             self.claude_client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
     
     def pdf_to_images_base64(self, pdf_path: str, max_pages: int = 10) -> List[str]:
-        """Convert PDF pages to base64 encoded images."""
+        """Convert PDF pages to base64 encoded images (adaptive JPEG/WebP, cached per page)."""
         images = []
         try:
-            pdf_document = fitz.open(pdf_path)
-            for page_num in range(min(len(pdf_document), max_pages)):
-                page = pdf_document[page_num]
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x scale
-                img_data = pix.pil_tobytes(format="PNG")
-                img_base64 = base64.b64encode(img_data).decode('utf-8')
-                images.append(img_base64)
-            pdf_document.close()
+            with fitz.open(pdf_path) as pdf_document:
+                for page_num in range(min(len(pdf_document), max_pages)):
+                    page = pdf_document[page_num]
+                    images.append(document_router.rasterize(pdf_document, page).base64)
         except Exception as e:
             print(f"Error converting PDF to images: {e}")
         return images
@@ -52,9 +56,11 @@ class MultimodalLLMExtractor:
     
     async def extract_from_image(self, 
                                  file_path: Optional[str] = None,
-                                 image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+                                 image_bytes: Optional[bytes] = None,
+                                 pages: Optional[List[int]] = None) -> Dict[str, Any]:
         """
         Extract travel information using multimodal vision capabilities.
+        `pages` limits a PDF to a page group (0-based indexes).
         """
         
         system_prompt = """You are an expert travel document analyzer with perfect OCR capabilities.
@@ -141,14 +147,17 @@ class MultimodalLLMExtractor:
         try:
             # Prepare image data
             image_data_list = []
+            routed = None
+            text_block = ""
             
             if file_path:
                 file_ext = Path(file_path).suffix.lower()
                 
                 if file_ext == '.pdf':
-                    # Convert PDF to images
-                    images = self.pdf_to_images_base64(file_path)
-                    image_data_list = [{"base64": img, "type": "image/png"} for img in images]
+                    # Text-native pages go as text; only low-text pages are rasterized
+                    routed = await asyncio.to_thread(document_router.route_pdf, file_path, pages=pages)
+                    text_block = routed.text_block()
+                    image_data_list = [{"base64": img.base64, "type": img.mime_type} for img in routed.images()]
                 elif file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
                     # Direct image
                     img_base64 = self.image_to_base64(file_path)
@@ -158,12 +167,16 @@ class MultimodalLLMExtractor:
                 img_base64 = base64.b64encode(image_bytes).decode('utf-8')
                 image_data_list = [{"base64": img_base64, "type": "image/png"}]
             
-            if not image_data_list:
+            if not image_data_list and not text_block:
                 return self._empty_result("No valid image data")
+            if text_block:
+                user_prompt += f"\n\nText extracted from the document:\n{text_block}"
+            route = document_router.route_name(routed)
+            started = time.perf_counter()
             
             # Use OpenAI GPT-4 Vision
             if self.openai_client:
-                messages = [
+                messages: List[Dict[str, Any]] = [
                     {"role": "system", "content": system_prompt},
                     {
                         "role": "user",
@@ -199,12 +212,15 @@ class MultimodalLLMExtractor:
                     result_text = result_text.split("```")[1].split("```")[0]
                 
                 result = json.loads(result_text.strip())
+                document_router.record(route, time.perf_counter() - started, routed)
                 
                 # Add metadata
                 result['_metadata'] = {
                     'extraction_method': 'multimodal_vision',
                     'model': 'gpt-4o',
-                    'pages_processed': len(image_data_list)
+                    'pages_processed': len(routed.pages) if routed else len(image_data_list),
+                    'route': route,
+                    'routing': routed.metadata() if routed else None
                 }
                 
                 return result
@@ -212,7 +228,7 @@ class MultimodalLLMExtractor:
             # Use Claude Vision if available
             elif self.claude_client:
                 # Claude 3 models with vision
-                message_content = [
+                message_content: List[Dict[str, Any]] = [
                     {"type": "text", "text": user_prompt}
                 ]
                 
@@ -242,10 +258,13 @@ class MultimodalLLMExtractor:
                 json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
                 if json_match:
                     result = json.loads(json_match.group())
+                    document_router.record(route, time.perf_counter() - started, routed)
                     result['_metadata'] = {
                         'extraction_method': 'multimodal_vision',
                         'model': 'claude-3-sonnet',
-                        'pages_processed': len(image_data_list)
+                        'pages_processed': len(routed.pages) if routed else len(image_data_list),
+                        'route': route,
+                        'routing': routed.metadata() if routed else None
                     }
                     return result
             
@@ -271,33 +290,80 @@ class MultimodalLLMExtractor:
         }
     
     async def extract_from_multiple_files(self, file_paths: List[str], progress_callback=None) -> Dict[str, Any]:
-        """Process multiple files and merge results."""
-        all_results = {
+        """
+        Process multiple files concurrently and merge results.
+
+        Files, and page groups of long PDFs, are extracted with at most
+        MAX_CONCURRENT_EXTRACTIONS vision calls in flight. Results are merged
+        and deduplicated in file order as soon as each prefix is complete, so
+        the output does not depend on which call finishes first.
+        """
+        all_results: Dict[str, List[Dict[str, Any]]] = {
             "flights": [],
             "hotels": [],
             "passengers": [],
             "other": []
         }
         
-        total_files = len(file_paths)
-        for idx, file_path in enumerate(file_paths):
-            # Update progress if callback provided
-            if progress_callback:
-                progress = 30 + (20 * (idx + 1) // total_files)  # Progress from 30-50%
-                await progress_callback(progress, f"Analyzing document {idx+1} of {total_files}...")
-            
-            result = await self.extract_from_image(file_path=file_path)
-            if result and not result.get("_metadata", {}).get("error"):
-                all_results["flights"].extend(result.get("flights", []))
-                all_results["hotels"].extend(result.get("hotels", []))
-                all_results["passengers"].extend(result.get("passengers", []))
-                all_results["other"].extend(result.get("other", []))
+        jobs = await asyncio.to_thread(self._extraction_jobs, file_paths)
+        if not jobs:
+            return all_results
         
-        # Deduplicate
-        all_results = self._deduplicate_results(all_results)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_EXTRACTIONS)
+        
+        async def run_job(index: int, file_path: str, pages: Optional[List[int]]):
+            async with semaphore:
+                return index, await self.extract_from_image(file_path=file_path, pages=pages)
+        
+        tasks = [asyncio.create_task(run_job(i, path, pages)) for i, (path, pages) in enumerate(jobs)]
+        finished: Dict[int, Dict[str, Any]] = {}
+        next_to_merge = 0
+        parts_left = Counter(path for path, _ in jobs)
+        done_files = 0
+        total_files = len(parts_left)
+        try:
+            for completed, task in enumerate(asyncio.as_completed(tasks), start=1):
+                index, result = await task
+                finished[index] = result
+                parts_left[jobs[index][0]] -= 1
+                if parts_left[jobs[index][0]] == 0:
+                    done_files += 1
+                
+                # Merge the completed prefix in job order, deduplicating as it grows
+                merged = False
+                while next_to_merge in finished:
+                    result = finished.pop(next_to_merge)
+                    if result and not result.get("_metadata", {}).get("error"):
+                        for key in all_results:
+                            all_results[key].extend(result.get(key, []))
+                        merged = True
+                    next_to_merge += 1
+                if merged:
+                    all_results = self._deduplicate_results(all_results)
+                
+                # Update progress if callback provided (monotonic, 30-50%)
+                if progress_callback:
+                    progress = 30 + (20 * completed // len(jobs))
+                    await progress_callback(
+                        progress,
+                        f"Analyzed {done_files} of {total_files} documents ({completed}/{len(jobs)} parts)..."
+                    )
+        finally:
+            for task in tasks:
+                task.cancel()
         
         return all_results
     
+    def _extraction_jobs(self, file_paths: List[str]) -> List[Tuple[str, Optional[List[int]]]]:
+        """(file, page group) pairs; long PDFs are split so their pages run in parallel"""
+        jobs: List[Tuple[str, Optional[List[int]]]] = []
+        for file_path in file_paths:
+            if Path(file_path).suffix.lower() == '.pdf':
+                jobs.extend((file_path, pages) for pages in document_router.page_groups(file_path))
+            else:
+                jobs.append((file_path, None))
+        return jobs
+    
     def _deduplicate_results(self, results: Dict) -> Dict:
         """Remove duplicate entries."""
         # Deduplicate flights by flight number + date
@@ -10,6 +10,11 @@ import aiohttp
 from dotenv import load_dotenv
 from pathlib import Path
 
+from .interfaces import LLMRequest, LLMResponse, LLMProvider
+from .llm_cache import llm_response_cache, is_json, CachedCompletion
+from .llm_router import LLMRouter, ProviderRoute
+from ..core.upstream_metrics import upstream_trace_configs
+
 # Load .env from project root
 root_dir = Path(__file__).parent.parent.parent.parent
 env_path = root_dir / ".env"
@@ -22,18 +27,24 @@ class LLMParser:
         self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY", "")
         
-    async def parse_guide(self, content: str) -> Dict:
-        """Parse travel guide content using LLM"""
+        routes = []
+        if self.openai_api_key:
+            routes.append(ProviderRoute(LLMProvider.OPENAI, "gpt-4-turbo-preview", self._generate_openai, timeout_seconds=120))
+        if self.anthropic_api_key:
+            routes.append(ProviderRoute(LLMProvider.ANTHROPIC, "claude-3-haiku-20240307", self._generate_anthropic, timeout_seconds=120))
+        self.router = LLMRouter(routes)
+        
+    async def parse_guide(self, content: str, bypass_cache: bool = False) -> Dict:
+        """Parse travel guide content using LLM (answers are memoized unless bypass_cache)"""
         
         # Create extraction prompt
         extraction_prompt = self._create_extraction_prompt(content)
         
-        # Try OpenAI first, then Anthropic
-        if self.openai_api_key:
-            result = await self._parse_with_openai(extraction_prompt)
-        elif self.anthropic_api_key:
-            result = await self._parse_with_anthropic(extraction_prompt)
-        else:
+        # The router picks between configured providers and falls back on failure
+        result = None
+        if self.router.routes:
+            result = await self._parse_with_router(extraction_prompt, bypass_cache)
+        if result is None:
             # Fallback to basic extraction
             result = self._basic_extraction(content)
         
@@ -191,28 +202,49 @@ Return ONLY the JSON object, no other text."""
         
         return prompt
     
-    async def _parse_with_openai(self, prompt: str) -> Dict:
-        """Use OpenAI to parse content"""
+    async def _parse_with_router(self, prompt: str, bypass_cache: bool = False) -> Optional[Dict]:
+        """Parse with whichever configured provider the router expects to answer best"""
+        request = LLMRequest(prompt=prompt, metadata={"bypass_cache": bypass_cache})
+        response = await self.router.generate(request)
+        if not response.is_success:
+            print(f"Error parsing with LLM router: {response.error}")
+            return None
+        
+        # Claude might return text with JSON, extract it
+        result_text = response.content
+        json_start = result_text.find('{')
+        json_end = result_text.rfind('}') + 1
+        if json_start >= 0 and json_end > json_start:
+            try:
+                return json.loads(result_text[json_start:json_end])
+            except json.JSONDecodeError as e:
+                print(f"Invalid JSON from {response.provider.value}: {e}")
+        return None
+    
+    async def _generate_openai(self, request: LLMRequest) -> LLMResponse:
+        """Router route: OpenAI chat completion through the LLM response cache"""
+        model = request.model or "gpt-4-turbo-preview"
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a data extraction expert. Extract structured data from travel guides and return valid JSON."
+            },
+            {
+                "role": "user",
+                "content": request.prompt
+            }
+        ]
         
-        try:
-            async with aiohttp.ClientSession() as session:
+        async def call() -> CachedCompletion:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.openai_api_key}",
                     "Content-Type": "application/json"
                 }
                 
                 payload = {
-                    "model": "gpt-4-turbo-preview",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a data extraction expert. Extract structured data from travel guides and return valid JSON."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
+                    "model": model,
+                    "messages": messages,
                     "temperature": 0.1,  # Low temperature for consistent extraction
                     "response_format": {"type": "json_object"}
                 }
@@ -220,23 +252,35 @@ Return ONLY the JSON object, no other text."""
                 url = "https://api.openai.com/v1/chat/completions"
                 
                 async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        result_text = data["choices"][0]["message"]["content"]
-                        return json.loads(result_text)
-                    else:
-                        print(f"OpenAI API error: {response.status}")
-                        return self._basic_extraction("")
-                        
-        except Exception as e:
-            print(f"Error parsing with OpenAI: {e}")
-            return self._basic_extraction("")
+                    if response.status != 200:
+                        raise RuntimeError(f"OpenAI API error: {response.status}")
+                    data = await response.json()
+                    return CachedCompletion(
+                        content=data["choices"][0]["message"]["content"],
+                        model=data.get("model", model),
+                        usage=data.get("usage")
+                    )
+        
+        completion = await llm_response_cache.complete(
+            "guide_parse", "openai", model, messages, call,
+            params={"temperature": 0.1, "response_format": "json_object"},
+            bypass=(request.metadata or {}).get("bypass_cache", False),
+            validate=is_json
+        )
+        return LLMResponse(content=completion.content, provider=LLMProvider.OPENAI, model=completion.model, usage=completion.usage)
     
-    async def _parse_with_anthropic(self, prompt: str) -> Dict:
-        """Use Anthropic Claude to parse content"""
+    async def _generate_anthropic(self, request: LLMRequest) -> LLMResponse:
+        """Router route: Anthropic Claude message through the LLM response cache"""
+        model = request.model or "claude-3-haiku-20240307"
+        messages = [
+            {
+                "role": "user",
+                "content": request.prompt
+            }
+        ]
         
-        try:
-            async with aiohttp.ClientSession() as session:
+        async def call() -> CachedCompletion:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "x-api-key": self.anthropic_api_key,
                     "anthropic-version": "2023-06-01",
@@ -244,36 +288,35 @@ Return ONLY the JSON object, no other text."""
                 }
                 
                 payload = {
-                    "model": "claude-3-haiku-20240307",
+                    "model": model,
                     "max_tokens": 4000,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
+                    "messages": messages,
                     "temperature": 0.1
                 }
                 
                 url = "https://api.anthropic.com/v1/messages"
                 
                 async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        result_text = data["content"][0]["text"]
-                        # Claude might return text with JSON, extract it
-                        json_start = result_text.find('{')
-                        json_end = result_text.rfind('}') + 1
-                        if json_start >= 0 and json_end > json_start:
-                            json_str = result_text[json_start:json_end]
-                            return json.loads(json_str)
-                    else:
-                        print(f"Anthropic API error: {response.status}")
-                        return self._basic_extraction("")
-                        
-        except Exception as e:
-            print(f"Error parsing with Anthropic: {e}")
-            return self._basic_extraction("")
+                    if response.status != 200:
+                        raise RuntimeError(f"Anthropic API error: {response.status}")
+                    data = await response.json()
+                    usage = data.get("usage") or {}
+                    return CachedCompletion(
+                        content=data["content"][0]["text"],
+                        model=data.get("model", model),
+                        usage={
+                            "prompt_tokens": usage.get("input_tokens", 0),
+                            "completion_tokens": usage.get("output_tokens", 0)
+                        }
+                    )
+        
+        completion = await llm_response_cache.complete(
+            "guide_parse", "anthropic", model, messages, call,
+            params={"temperature": 0.1, "max_tokens": 4000},
+            bypass=(request.metadata or {}).get("bypass_cache", False),
+            validate=lambda text: "{" in text
+        )
+        return LLMResponse(content=completion.content, provider=LLMProvider.ANTHROPIC, model=completion.model, usage=completion.usage)
     
     def _basic_extraction(self, content: str) -> Dict:
         """Basic extraction without LLM"""
@@ -0,0 +1,255 @@
+"""
+LLM Provider Router
+Routes each LLMRequest to the provider+model with the best recent latency,
+error rate and cost for its capability. Slow primaries are hedged with a
+second provider once they pass their own p90, and per-provider semaphores
+cap concurrent calls. Providers are plain async callables, so stubs can
+stand in for real services in tests.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Any, Callable, Awaitable, Deque, Iterable, Tuple
+
+from .interfaces import LLMRequest, LLMResponse, LLMProvider, LLMCapability
+from .llm_cache import model_price
+
+logger = logging.getLogger(__name__)
+
+
+# Concurrent calls allowed per provider when a route does not say otherwise
+PROVIDER_CONCURRENCY = {
+    LLMProvider.OPENAI: 8,
+    LLMProvider.ANTHROPIC: 4,
+    LLMProvider.PERPLEXITY: 4,
+    LLMProvider.XAI: 2,
+    LLMProvider.SAMBANOVA: 2,
+}
+
+# Latency assumed for a route until it has enough samples of its own
+PRIOR_LATENCY_S = 5.0
+MIN_SAMPLES = 5
+
+# Rough tokens per request used to compare routes on cost
+EXPECTED_PROMPT_TOKENS = 1500
+EXPECTED_COMPLETION_TOKENS = 800
+
+
+class RollingStats:
+    """Latency and outcome window for one route"""
+
+    def __init__(self, window: int = 100):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.in_flight = 0
+        self.calls = 0
+        self.hedges_won = 0
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.calls += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "p50_seconds": self.percentile(0.5),
+            "p90_seconds": self.percentile(0.9),
+            "error_rate": round(self.error_rate, 4),
+            "in_flight": self.in_flight,
+            "hedges_won": self.hedges_won,
+        }
+
+
+@dataclass
+class ProviderRoute:
+    """One provider+model the router may send requests to"""
+    provider: LLMProvider
+    model: str
+    generate: Callable[[LLMRequest], Awaitable[LLMResponse]]
+    capabilities: Tuple[LLMCapability, ...] = (LLMCapability.TEXT_GENERATION,)
+    max_concurrency: Optional[int] = None
+    timeout_seconds: float = 60.0
+    stats: RollingStats = field(default_factory=RollingStats)
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider.value}:{self.model}"
+
+    def estimated_cost(self) -> float:
+        input_price, output_price = model_price(self.model)
+        return (EXPECTED_PROMPT_TOKENS * input_price + EXPECTED_COMPLETION_TOKENS * output_price) / 1e6
+
+
+def request_capability(request: LLMRequest) -> LLMCapability:
+    """Capability a request needs, inferred from its contents"""
+    if request.images:
+        return LLMCapability.VISION
+    if request.functions:
+        return LLMCapability.FUNCTION_CALLING
+    if request.stream:
+        return LLMCapability.STREAMING
+    return LLMCapability.TEXT_GENERATION
+
+
+class LLMRouter:
+    """
+    Scores candidate routes by expected latency, inflated by recent errors
+    and queueing, plus a cost term (seconds per USD of expected spend), and
+    falls back down the ranking when a call fails.
+    """
+
+    def __init__(
+        self,
+        routes: Optional[Iterable[ProviderRoute]] = None,
+        cost_weight: float = 100.0,
+        hedge: bool = True
+    ):
+        self.cost_weight = cost_weight
+        self.hedge = hedge
+        self.routes: List[ProviderRoute] = []
+        self._semaphores: Dict[LLMProvider, asyncio.Semaphore] = {}
+        for route in routes or []:
+            self.register(route)
+
+    def register(self, route: ProviderRoute) -> None:
+        self.routes.append(route)
+        if route.provider not in self._semaphores:
+            limit = route.max_concurrency or PROVIDER_CONCURRENCY.get(route.provider, 4)
+            self._semaphores[route.provider] = asyncio.Semaphore(limit)
+
+    def score(self, route: ProviderRoute) -> float:
+        """Lower is better"""
+        stats = route.stats
+        latency = stats.percentile(0.5) or PRIOR_LATENCY_S
+        # Every failure costs roughly another attempt; a saturated provider adds queueing
+        expected = latency / max(1 - stats.error_rate, 0.05)
+        semaphore = self._semaphores[route.provider]
+        if semaphore.locked():
+            expected += latency
+        return expected + self.cost_weight * route.estimated_cost()
+
+    def candidates(self, capability: LLMCapability = LLMCapability.TEXT_GENERATION) -> List[ProviderRoute]:
+        eligible = [r for r in self.routes if capability in r.capabilities]
+        return sorted(eligible, key=self.score)
+
+    async def generate(
+        self,
+        request: LLMRequest,
+        capability: Optional[LLMCapability] = None,
+        hedge: Optional[bool] = None
+    ) -> LLMResponse:
+        """Send the request to the best route, hedging and falling back as needed"""
+        capability = capability or request_capability(request)
+        ranked = self.candidates(capability)
+        if not ranked:
+            return LLMResponse(
+                content="", provider=LLMProvider.OPENAI, model="none",
+                error=f"No provider supports {capability.value}"
+            )
+
+        hedge = self.hedge if hedge is None else hedge
+        remaining = list(ranked)
+        while True:
+            primary = remaining.pop(0)
+            backup = remaining[0] if hedge and remaining else None
+            response, used_backup = await self._race(primary, backup, request)
+            if used_backup:
+                remaining.pop(0)
+            if response.is_success:
+                return response
+            logger.warning(f"LLM route failed, falling back: {response.error}")
+            if not remaining:
+                return response
+
+    async def _race(
+        self,
+        primary: ProviderRoute,
+        backup: Optional[ProviderRoute],
+        request: LLMRequest
+    ) -> Tuple[LLMResponse, bool]:
+        """
+        Run the primary; if it is still running at its p90, also start the
+        backup and take whichever succeeds first. Returns (response, backup started).
+        """
+        primary_task = asyncio.create_task(self._call(primary, request))
+        hedge_after = primary.stats.percentile(0.9) if backup else None
+        if backup is None or hedge_after is None:
+            return await primary_task, False
+
+        done, _ = await asyncio.wait({primary_task}, timeout=hedge_after)
+        if done:
+            return primary_task.result(), False
+
+        logger.info(f"Hedging {primary.name} after {hedge_after:.2f}s with {backup.name}")
+        backup_task = asyncio.create_task(self._call(backup, request))
+        tasks = {primary_task: primary, backup_task: backup}
+        pending = set(tasks)
+        failures: List[LLMResponse] = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response = task.result()
+                    if response.is_success:
+                        if task is backup_task:
+                            backup.stats.hedges_won += 1
+                        return response, True
+                    failures.append(response)
+        finally:
+            for task in pending:
+                task.cancel()
+        return failures[0], True
+
+    async def _call(self, route: ProviderRoute, request: LLMRequest) -> LLMResponse:
+        """One attempt on one route, bounded by its provider semaphore and timeout"""
+        async with self._semaphores[route.provider]:
+            route.stats.in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    route.generate(replace(request, model=route.model)),
+                    timeout=route.timeout_seconds
+                )
+            except asyncio.CancelledError:
+                # A losing hedge says nothing about the route's health
+                raise
+            except Exception as e:
+                response = LLMResponse(content="", provider=route.provider, model=route.model, error=str(e) or type(e).__name__)
+            finally:
+                route.stats.in_flight -= 1
+            route.stats.record(time.perf_counter() - started, response.is_success)
+            return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            route.name: {**route.stats.to_dict(), "score": round(self.score(route), 3)}
+            for route in self.routes
+        }
+
+
+def service_route(service: Any, model: Optional[str] = None, **kwargs) -> ProviderRoute:
+    """Route backed by an LLMServiceInterface implementation"""
+    return ProviderRoute(
+        provider=service.provider,
+        model=model or service.available_models[0],
+        generate=service.generate_response,
+        capabilities=tuple(service.capabilities),
+        timeout_seconds=service.config.timeout_seconds,
+        **kwargs
+    )
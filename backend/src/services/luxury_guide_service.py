@@ -13,6 +13,11 @@ from pathlib import Path
 from dotenv import load_dotenv
 import logging
 
+from .route_planner import route_planner, places_origin
+from .guide_engine import STATIC_TTL, CachePolicy, GuideProfile, GuideRequest, SourceStage, guide_engine
+from .guide_sections import SECTION_TTL
+from ..core.upstream_metrics import upstream_trace_configs
+
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
 env_path = root_dir / ".env"
@@ -34,6 +39,51 @@ class LuxuryGuideService:
         
         if not self.perplexity_api_key:
             logger.warning("Perplexity API key not configured")
+        self.profile = self._build_profile()
+
+    def _build_profile(self) -> GuideProfile:
+        """
+        Luxury profile: personalized Perplexity content and itinerary,
+        OpenWeather, Google Maps neighborhoods and current events, under a
+        45 second deadline
+        """
+        trip = ("destination", "dates")
+        return GuideProfile("luxury", [
+            SourceStage(
+                "content",
+                lambda r, deps: self._get_premium_content(
+                    r.destination, r.start_date, r.end_date, r.preferences, r.primary_traveler
+                ),
+                cache=CachePolicy(trip + ("preferences", "traveler"), SECTION_TTL["events"]),
+                fallback={}
+            ),
+            SourceStage(
+                "weather",
+                lambda r, deps: self._get_detailed_weather(r.destination, r.start_date, r.end_date),
+                cache=CachePolicy(trip, SECTION_TTL["weather"]),
+                fallback={}
+            ),
+            SourceStage(
+                "neighborhoods",
+                lambda r, deps: self._get_location_intelligence(r.destination, r.hotel_info),
+                cache=CachePolicy(("destination", "hotel"), STATIC_TTL),
+                fallback={}
+            ),
+            SourceStage(
+                "events",
+                lambda r, deps: self._get_contemporary_content(r.destination, r.start_date, r.end_date),
+                cache=CachePolicy(trip, SECTION_TTL["events"]),
+                fallback={}
+            ),
+            SourceStage(
+                "daily_itinerary",
+                lambda r, deps: self._create_luxury_itinerary(
+                    r.destination, r.start_date, r.end_date, r.preferences, r.hotel_info, r.primary_traveler
+                ),
+                cache=CachePolicy(trip + ("preferences", "hotel", "traveler"), SECTION_TTL["events"]),
+                fallback=[]
+            ),
+        ], deadline=45.0)
     
     async def generate_luxury_guide(
         self,
@@ -50,66 +100,29 @@ class LuxuryGuideService:
         if progress_callback:
             await progress_callback(5, "Creating your personalized luxury travel guide...")
         
-        # Extract passenger names for personalization
-        passengers = extracted_data.get("passengers", [])
-        primary_traveler = passengers[0]["full_name"] if passengers else "Traveler"
+        request = GuideRequest(destination, start_date, end_date, hotel_info, preferences, extracted_data)
+        primary_traveler = request.primary_traveler
         
         # Calculate trip duration
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
         num_days = (end - start).days + 1
         
-        # Run all enrichment tasks in parallel
-        tasks = []
-        
-        # Task 1: Get premium content (restaurants, attractions, events, news)
-        tasks.append(self._get_premium_content(
-            destination, start_date, end_date, preferences, primary_traveler
-        ))
-        
-        # Task 2: Get detailed weather with hourly forecasts
-        tasks.append(self._get_detailed_weather(destination, start_date, end_date))
-        
-        # Task 3: Get location intelligence and maps
-        tasks.append(self._get_location_intelligence(destination, hotel_info))
-        
-        # Task 4: Get contemporary events and news
-        tasks.append(self._get_contemporary_content(destination, start_date, end_date))
-        
-        # Task 5: Create personalized daily itinerary
-        tasks.append(self._create_luxury_itinerary(
-            destination, start_date, end_date, preferences, hotel_info, primary_traveler
-        ))
-        
         if progress_callback:
             await progress_callback(20, "Gathering premium recommendations...")
         
-        try:
-            # Run tasks with longer timeout and handle individual failures
-            results = await asyncio.wait_for(
-                asyncio.gather(*tasks, return_exceptions=True),
-                timeout=45.0  # Increased timeout for multiple API calls
-            )
-        except asyncio.TimeoutError:
-            logger.error("API calls timed out - trying sequential approach")
-            # Try sequential approach if parallel fails
-            results = []
-            for task in tasks:
-                try:
-                    result = await asyncio.wait_for(task, timeout=15.0)
-                    results.append(result)
-                except:
-                    results.append({})  # Empty dict on failure
+        # All enrichment stages run in parallel; one that fails or misses the
+        # deadline yields its fallback without holding up the others
+        run = await guide_engine.run(self.profile, request)
         
         if progress_callback:
             await progress_callback(70, "Crafting your bespoke travel experience...")
         
-        # Unpack results and check for failures
-        premium_content = results[0] if not isinstance(results[0], Exception) else {}
-        weather_data = results[1] if not isinstance(results[1], Exception) else {}
-        location_data = results[2] if not isinstance(results[2], Exception) else {}
-        contemporary = results[3] if not isinstance(results[3], Exception) else {}
-        luxury_itinerary = results[4] if not isinstance(results[4], Exception) else []
+        premium_content = run["content"]
+        weather_data = run["weather"]
+        location_data = run["neighborhoods"]
+        contemporary = run["events"]
+        luxury_itinerary = run["daily_itinerary"]
         
         # Check if we have minimum required content
         if not premium_content or premium_content.get("error"):
@@ -125,6 +138,12 @@ class LuxuryGuideService:
                 "error": "Itinerary generation failed", 
                 "message": "Unable to create daily itinerary. Please try again."
             }
+
+        # Cluster each day's sightseeing around the hotel
+        attractions = premium_content.get("attractions", [])
+        luxury_itinerary = route_planner.attach_routes(
+            luxury_itinerary, attractions, places_origin(hotel_info, attractions)
+        )
         
         # Create the luxury guide
         guide = self._assemble_luxury_guide(
@@ -198,7 +217,7 @@ Format as JSON with keys: restaurants, attractions, experiences, events"""
         for attempt in range(max_retries):
             try:
                 timeout = aiohttp.ClientTimeout(total=30 + (attempt * 10))  # 30s, then 40s
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                     headers = {
                         "Authorization": f"Bearer {self.perplexity_api_key}",
                         "Content-Type": "application/json"
@@ -281,7 +300,7 @@ Format as JSON with keys: restaurants, attractions, experiences, events"""
         
         try:
             timeout = aiohttp.ClientTimeout(total=8)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 # Get coordinates
                 geo_url = f"http://api.openweathermap.org/geo/1.0/direct?q={destination}&limit=1&appid={self.openweather_api_key}"
                 
@@ -333,7 +352,7 @@ Format as JSON with keys: restaurants, attractions, experiences, events"""
         if self.google_maps_api_key:
             try:
                 timeout = aiohttp.ClientTimeout(total=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                     # Get place details
                     place_search_url = f"https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
                     params = {
@@ -396,7 +415,7 @@ Format as JSON array."""
 
         try:
             timeout = aiohttp.ClientTimeout(total=15)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -470,7 +489,7 @@ Format as JSON array with keys: day, date, morning, lunch, afternoon, dinner"""
 
         try:
             timeout = aiohttp.ClientTimeout(total=30)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -963,7 +982,7 @@ Format as JSON array."""
 
         try:
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
@@ -23,6 +23,8 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 import io
 from PIL import Image as PILImage
+from ..core.upstream_metrics import upstream_trace_configs
+from ..core.tracing import traced
 
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
@@ -143,6 +145,7 @@ class MagazinePDFService:
             'quote': quote_style
         }
     
+    @traced("pdf.build", renderer="magazine")
     async def generate_magazine_pdf(
         self,
         guide_data: Dict[str, Any],
@@ -517,7 +520,7 @@ class MagazinePDFService:
             if not self.unsplash_access_key:
                 return None
             
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 url = "https://api.unsplash.com/search/photos"
                 params = {
                     "query": destination,
@@ -547,7 +550,7 @@ class MagazinePDFService:
             
             query = f"{cuisine} restaurant {name}"
             
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 url = "https://api.unsplash.com/search/photos"
                 params = {
                     "query": query,
@@ -577,7 +580,7 @@ class MagazinePDFService:
             
             query = f"{name} {attraction_type}"
             
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 url = "https://api.unsplash.com/search/photos"
                 params = {
                     "query": query,
@@ -602,7 +605,7 @@ class MagazinePDFService:
     async def _download_image(self, image_url: str) -> Optional[str]:
         """Download image and return local path"""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
                 async with session.get(image_url) as response:
                     if response.status == 200:
                         image_data = await response.read()
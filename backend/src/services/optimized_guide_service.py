@@ -11,12 +11,16 @@ from pathlib import Path
 from dotenv import load_dotenv
 import logging
 
-from .optimized_perplexity_service import OptimizedPerplexityService
+from .optimized_perplexity_service import OptimizedPerplexityService, ItemCallback
 from .google_weather_service import GoogleWeatherService
 from .guide_validator import GuideValidator
 from .google_places_enhancer import GooglePlacesEnhancer
 from .real_events_service import RealEventsService
 from .enhanced_google_places_service import EnhancedGooglePlacesService
+from .guide_personalization import guide_personalizer, profile_from_preferences
+from .guide_engine import STATIC_TTL, CachePolicy, GuideProfile, GuideRequest, SourceStage, guide_engine
+from .guide_sections import SECTION_TTL
+from ..core.tracing import traced, current_span
 
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
@@ -49,7 +53,76 @@ class OptimizedGuideService:
             "average_time": 0.0,
             "cache_hits": 0
         }
+        self.profile = self._build_profile()
+
+    def _build_profile(self) -> GuideProfile:
+        """
+        Optimized profile: Google Places for restaurants and attractions, the
+        Perplexity candidate pool for everything else, Google weather, real
+        events and static destination facts, under a 45 second deadline.
+        Attractions merge both sources once they have arrived.
+        """
+        trip = ("destination", "dates")
+        return GuideProfile("optimized", [
+            SourceStage(
+                "restaurants",
+                lambda r, deps: self._fetch_google_places_restaurants(r.destination, r.preferences),
+                cache=CachePolicy(("destination", "preferences"), SECTION_TTL["restaurants"]),
+                fallback=[]
+            ),
+            SourceStage(
+                "places_attractions",
+                lambda r, deps: self._fetch_google_places_attractions(r.destination, r.preferences),
+                cache=CachePolicy(("destination",), SECTION_TTL["attractions"]),
+                fallback=[]
+            ),
+            SourceStage(
+                "perplexity",
+                self._fetch_perplexity_data,
+                cache=CachePolicy(trip + ("preferences",), SECTION_TTL["events"]),
+                fallback=lambda e: self._create_error_response(f"Failed to fetch guide data: {e}")
+            ),
+            SourceStage(
+                "attractions",
+                self._rank_attractions,
+                depends_on=("places_attractions", "perplexity"),
+                fallback=[]
+            ),
+            SourceStage(
+                "weather",
+                lambda r, deps: self.weather_service.get_weather_forecast(r.destination, r.start_date, r.end_date),
+                cache=CachePolicy(trip, SECTION_TTL["weather"]),
+                fallback=lambda e: {"error": str(e)}
+            ),
+            SourceStage(
+                "events",
+                lambda r, deps: self.events_service.get_events_for_dates(
+                    r.destination, r.start_date, r.end_date, r.preferences
+                ),
+                cache=CachePolicy(trip + ("preferences",), SECTION_TTL["events"]),
+                fallback=[]
+            ),
+            SourceStage(
+                "transport",
+                lambda r, deps: self._fetch_transportation_data(r.destination, r.preferences),
+                cache=CachePolicy(("destination",), STATIC_TTL),
+                fallback=lambda e: {"error": str(e)}
+            ),
+            SourceStage(
+                "accessibility",
+                lambda r, deps: self._fetch_accessibility_data(r.destination, r.preferences),
+                cache=CachePolicy(("destination",), STATIC_TTL),
+                fallback=lambda e: {"error": str(e)}
+            ),
+            SourceStage(
+                "practical",
+                lambda r, deps: self._fetch_practical_info(r.destination, r.preferences),
+                cache=CachePolicy(("destination",), STATIC_TTL),
+                fallback=lambda e: {"error": str(e)}
+            ),
+        ], deadline=45)
     
+    @traced("guide.generate")
     async def generate_optimized_guide(
         self,
         destination: str,
@@ -58,7 +131,8 @@ class OptimizedGuideService:
         hotel_info: Dict,
         preferences: Dict,
         extracted_data: Dict = None,
-        progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None
+        progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+        item_callback: Optional[ItemCallback] = None
     ) -> Dict:
         """
         Generate complete travel guide using optimized concurrent processing
@@ -71,12 +145,15 @@ class OptimizedGuideService:
             preferences: User preferences dict
             extracted_data: Additional extracted data
             progress_callback: Optional progress callback function
+            item_callback: Optional (section, item) callback for items streamed
+                from Perplexity before the guide is assembled
             
         Returns:
             Complete travel guide dict or error response
         """
         start_time = datetime.now()
         self.generation_stats["total_requests"] += 1
+        current_span().set_attributes({"guide.destination": destination, "guide.service": "optimized"})
         
         try:
             if progress_callback:
@@ -97,7 +174,7 @@ class OptimizedGuideService:
             
             # Execute concurrent tasks
             guide_data = await self._fetch_all_data_concurrently(
-                destination, start_date, end_date, preferences, progress_callback
+                destination, start_date, end_date, preferences, progress_callback, item_callback
             )
             
             if guide_data.get("error"):
@@ -126,6 +203,7 @@ class OptimizedGuideService:
                 }
             
             # Add metadata
+            stages = guide_data.get("stages", {})
             generation_time = (datetime.now() - start_time).total_seconds()
             complete_guide.update({
                 "validation_passed": True,
@@ -133,9 +211,10 @@ class OptimizedGuideService:
                 "generated_with": "optimized_guide_service",
                 "generated_at": datetime.now().isoformat(),
                 "performance_stats": {
-                    "concurrent_requests": 5,  # Weather + 4 Perplexity tasks
+                    "concurrent_requests": len(stages),
                     "total_time": generation_time,
-                    "cache_used": guide_data.get("cache_key") is not None
+                    "cache_used": any(s["outcome"] in ("cached", "coalesced") for s in stages.values()),
+                    "stages": stages
                 }
             })
             
@@ -162,160 +241,69 @@ class OptimizedGuideService:
         start_date: str,
         end_date: str,
         preferences: Dict,
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        item_callback: Optional[ItemCallback] = None
     ) -> Dict:
-        """Fetch all guide data using concurrent API calls"""
-        
-        # Create concurrent tasks
-        tasks = []
-        
-        # Task 1: Google Places restaurants (high-quality real data)
-        google_places_restaurants_task = self._fetch_google_places_restaurants(destination, preferences)
-        tasks.append(google_places_restaurants_task)
-
-        # Task 1b: Google Places attractions (high-quality real data with photos)
-        google_places_attractions_task = self._fetch_google_places_attractions(destination, preferences)
-        tasks.append(google_places_attractions_task)
-
-        # Task 2: Perplexity guide data (attractions, events, practical info, daily suggestions)
-        # Create async callback wrapper if progress_callback exists
+        """Fetch all guide data by running the optimized profile's stages"""
+        run = await guide_engine.run(self.profile, GuideRequest(
+            destination, start_date, end_date, preferences=preferences,
+            progress_callback=progress_callback, item_callback=item_callback
+        ))
+
+        # Perplexity is the only stage the guide cannot do without
+        perplexity_data = run["perplexity"]
+        if run.failed("perplexity") and isinstance(run.error("perplexity"), asyncio.TimeoutError):
+            logger.error(f"Timeout fetching data for {destination}")
+            return self._create_error_response(f"Timeout fetching data for {destination}")
+        if perplexity_data.get("error"):
+            return perplexity_data
+
+        # Restaurants come from Google Places; attractions merge both sources
+        combined_data = perplexity_data.copy()
+        combined_data["restaurants"] = run["restaurants"]
+        combined_data["attractions"] = run["attractions"]
+        combined_data["weather_data"] = run["weather"]
+        combined_data["real_events"] = run["events"]
+        combined_data["transportation"] = run["transport"]
+        combined_data["accessibility"] = run["accessibility"]
+        combined_data["practical_info"] = run["practical"]
+        combined_data["stages"] = run.summary()
+
+        logger.info(f"Combined data: {len(run['restaurants'])} Google Places restaurants, "
+                    f"{len(run['places_attractions'])} Google Places attractions, "
+                    f"{len(perplexity_data.get('attractions', []))} Perplexity attractions, "
+                    f"{len(combined_data['attractions'])} ranked attractions")
+
+        return combined_data
+
+    async def _fetch_perplexity_data(self, request: GuideRequest, deps: Dict[str, Any]) -> Dict:
+        """Perplexity guide data (attractions, events, practical info, daily suggestions)"""
+        progress_callback = request.progress_callback
         perplexity_callback = None
         if progress_callback:
             async def perplexity_progress(p, m):
-                if progress_callback:  # Double check it's still not None
-                    try:
-                        await progress_callback(15 + p * 0.4, m)
-                    except Exception as e:
-                        logger.error(f"Error in perplexity_progress callback: {e}")
-                        raise
+                try:
+                    await progress_callback(15 + p * 0.4, m)
+                except Exception as e:
+                    logger.error(f"Error in perplexity_progress callback: {e}")
+                    raise
             perplexity_callback = perplexity_progress
 
-        logger.debug(f"Created perplexity_callback: {perplexity_callback}")
-
-        perplexity_task = self.perplexity_service.generate_complete_guide_data(
-            destination, start_date, end_date, preferences,
-            progress_callback=perplexity_callback
+        return await self.perplexity_service.generate_complete_guide_data(
+            request.destination, request.start_date, request.end_date, request.preferences,
+            progress_callback=perplexity_callback,
+            item_callback=request.item_callback
         )
-        tasks.append(perplexity_task)
 
-        # Task 3: Weather data
-        weather_task = self.weather_service.get_weather_forecast(
-            destination, start_date, end_date
-        )
-        tasks.append(weather_task)
-        
-        # Task 3: Real events data
-        events_task = self.events_service.get_events_for_dates(
-            destination, start_date, end_date, preferences
+    async def _rank_attractions(self, request: GuideRequest, deps: Dict[str, Any]) -> List[Dict]:
+        """Google Places plus Perplexity attractions, deduplicated into a diverse, preference-ranked top 8"""
+        perplexity_data = deps["perplexity"]
+        perplexity_attractions = perplexity_data.get("attractions", []) if isinstance(perplexity_data, dict) else []
+        return guide_personalizer.rank_attractions(
+            deps["places_attractions"] + perplexity_attractions,
+            profile_from_preferences(request.preferences),
+            limit=8
         )
-        tasks.append(events_task)
-        
-        # Task 4: Transportation data
-        transport_task = self._fetch_transportation_data(destination, preferences)
-        tasks.append(transport_task)
-        
-        # Task 5: Accessibility data
-        accessibility_task = self._fetch_accessibility_data(destination, preferences)
-        tasks.append(accessibility_task)
-        
-        # Task 6: Budget and emergency data
-        practical_task = self._fetch_practical_info(destination, preferences)
-        tasks.append(practical_task)
-        
-        try:
-            # Execute all tasks concurrently with timeout
-            results = await asyncio.wait_for(
-                asyncio.gather(*tasks, return_exceptions=True),
-                timeout=45  # 45 second total timeout
-            )
-            
-            # Unpack results - we have 7 tasks now
-            google_places_restaurants, google_places_attractions, perplexity_data, weather_data, real_events, transport_data, accessibility_data, practical_data = results
-
-            # Handle Google Places restaurants data
-            if isinstance(google_places_restaurants, Exception):
-                logger.warning(f"Google Places restaurants fetch failed: {google_places_restaurants}")
-                google_places_restaurants = []  # Fallback to empty list
-
-            # Handle Google Places attractions data
-            if isinstance(google_places_attractions, Exception):
-                logger.warning(f"Google Places attractions fetch failed: {google_places_attractions}")
-                google_places_attractions = []  # Fallback to empty list
-            # Handle Perplexity data
-            if isinstance(perplexity_data, Exception):
-                logger.error(f"Perplexity data fetch failed: {perplexity_data}")
-                return self._create_error_response(f"Failed to fetch guide data: {str(perplexity_data)}")
-
-            if perplexity_data.get("error"):
-                return perplexity_data  # Return Perplexity error
-
-            # Handle weather data (non-critical)
-            if isinstance(weather_data, Exception):
-                logger.warning(f"Weather data fetch failed: {weather_data}")
-                weather_data = {"error": str(weather_data)}
-            
-            # Handle real events data (non-critical)
-            if isinstance(real_events, Exception):
-                logger.warning(f"Real events fetch failed: {real_events}")
-                real_events = []
-            
-            # Handle transportation data (non-critical)
-            if isinstance(transport_data, Exception):
-                logger.warning(f"Transportation data fetch failed: {transport_data}")
-                transport_data = {"error": str(transport_data)}
-            
-            # Combine data
-            combined_data = perplexity_data.copy()
-            combined_data["weather_data"] = weather_data
-            combined_data["real_events"] = real_events
-            combined_data["transport_data"] = transport_data
-            
-            # Handle accessibility data (non-critical)
-            if isinstance(accessibility_data, Exception):
-                logger.warning(f"Accessibility data fetch failed: {accessibility_data}")
-                accessibility_data = {"error": str(accessibility_data)}
-            
-            # Handle practical data (non-critical)
-            if isinstance(practical_data, Exception):
-                logger.warning(f"Practical data fetch failed: {practical_data}")
-                practical_data = {"error": str(practical_data)}
-
-            # Combine data - Replace Perplexity restaurants with Google Places restaurants
-            combined_data = perplexity_data.copy()
-            combined_data["restaurants"] = google_places_restaurants  # Use Google Places restaurants
-
-            # Combine Google Places attractions with Perplexity attractions
-            perplexity_attractions = perplexity_data.get('attractions', [])
-            all_attractions = google_places_attractions + perplexity_attractions
-
-            # Remove duplicates by name and limit to top attractions
-            seen_names = set()
-            unique_attractions = []
-            for attraction in all_attractions:
-                name = attraction.get('name', '')
-                if name and name not in seen_names:
-                    seen_names.add(name)
-                    unique_attractions.append(attraction)
-
-            combined_data["attractions"] = unique_attractions[:8]  # Top 8 attractions
-            combined_data["weather_data"] = weather_data
-            combined_data["transportation"] = transport_data
-            combined_data["accessibility"] = accessibility_data
-            combined_data["practical_info"] = practical_data
-
-            logger.info(f"Combined data: {len(google_places_restaurants)} Google Places restaurants, "
-                       f"{len(google_places_attractions)} Google Places attractions, "
-                       f"{len(perplexity_attractions)} Perplexity attractions, "
-                       f"{len(unique_attractions)} total unique attractions")
-
-            return combined_data
-            
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout fetching data for {destination}")
-            return self._create_error_response(f"Timeout fetching data for {destination}")
-        except Exception as e:
-            logger.error(f"Error in concurrent data fetching: {e}")
-            return self._create_error_response(f"Error fetching data: {str(e)}")
 
     async def _fetch_google_places_restaurants(self, destination: str, preferences: Dict) -> List[Dict]:
         """Fetch restaurants using Google Places API"""
@@ -758,6 +746,7 @@ class OptimizedGuideService:
 
         return "; ".join(tips) if tips else ""
 
+    @traced("guide.assemble")
     async def _assemble_complete_guide(
         self,
         guide_data: Dict,
@@ -5,14 +5,30 @@ High-performance service with concurrent processing, smart caching, and optimize
 import os
 import json
 import asyncio
+import time
 import aiohttp
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple, Callable, Awaitable
+from typing import Dict, List, Optional, Any, Tuple, Callable, Awaitable, AsyncIterator
 from dataclasses import dataclass
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
 
+from .guide_personalization import guide_personalizer
+from .llm_cache import llm_response_cache, openai_completion, is_json, CachedCompletion
+from .prompt_batching import (
+    BatchPlanner,
+    PromptBatch,
+    SectionRequest,
+    guide_section_requests,
+    split_batch_response,
+    validate_item,
+    validate_section
+)
+from .streaming_json import iter_json_items
+from ..core.upstream_metrics import upstream_trace_configs
+from ..core.tracing import tracer, traced
+
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
 env_path = root_dir / ".env"
@@ -20,6 +36,11 @@ load_dotenv(env_path)
 
 logger = logging.getLogger(__name__)
 
+PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
+
+# Receives (section, item) for each list item as soon as it has streamed in
+ItemCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
 
 @dataclass
 class PerplexityConfig:
@@ -32,6 +53,8 @@ class PerplexityConfig:
     max_concurrent: int = 3  # Limit concurrent requests to avoid rate limits
     retry_attempts: int = 2  # Quick retry logic
     retry_delay: float = 1.0  # Fast retry delay
+    batch_mode: bool = False  # Combine sections into structured-output requests
+    stream: bool = True  # Parse list sections incrementally from streamed completions
 
 
 class OptimizedPerplexityService:
@@ -49,8 +72,12 @@ class OptimizedPerplexityService:
             model=os.getenv("PERPLEXITY_MODEL", "sonar"),
             timeout=int(os.getenv("PERPLEXITY_TIMEOUT", "30")),  # Increased from 20 to 30 seconds
             max_tokens=int(os.getenv("PERPLEXITY_MAX_TOKENS", "3000")),
-            temperature=float(os.getenv("PERPLEXITY_TEMPERATURE", "0.3"))
+            temperature=float(os.getenv("PERPLEXITY_TEMPERATURE", "0.3")),
+            batch_mode=os.getenv("PERPLEXITY_BATCH_MODE", "false").lower() in ("1", "true", "batched"),
+            stream=os.getenv("PERPLEXITY_STREAM", "true").lower() in ("1", "true", "yes")
         )
+        self.batch_planner = BatchPlanner()
+        self.usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_seconds": 0.0}
         
         # In-memory cache for destination data (24 hour TTL)
         self._cache: Dict[str, Dict] = {}
@@ -71,11 +98,17 @@ class OptimizedPerplexityService:
         start_date: str,
         end_date: str,
         preferences: Dict,
-        progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None
+        progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+        item_callback: Optional[ItemCallback] = None
     ) -> Dict:
         """
         Generate complete guide data using concurrent API calls
         This is the main entry point for optimized guide generation
+
+        Upstream fetches are preference-neutral and cached per destination and
+        date window; preferences only drive the local ranking step. With
+        streaming enabled, item_callback sees each unranked list item as soon
+        as it closes in the response.
         """
         if not self.config.api_key:
             return self._create_error_response("Perplexity API key not configured")
@@ -96,69 +129,39 @@ class OptimizedPerplexityService:
         if cached_data:
             if progress_callback:
                 await progress_callback(100, "Using cached data")
-            return cached_data
-        
-        # Prepare concurrent tasks
-        tasks = []
-        
-        # Task 1: Restaurants and dining
-        tasks.append(self._fetch_restaurants(destination, preferences))
+            return guide_personalizer.personalize_pool(cached_data, preferences, pool_key=("perplexity", cache_key))
         
-        # Task 2: Attractions and activities  
-        tasks.append(self._fetch_attractions(destination, preferences))
-        
-        # Task 3: Events and entertainment
-        tasks.append(self._fetch_events(destination, start_date, end_date, preferences))
-        
-        # Task 4: Practical information
-        tasks.append(self._fetch_practical_info(destination))
-        
-        # Task 5: Daily itinerary suggestions
-        tasks.append(self._fetch_daily_suggestions(destination, start_date, end_date, preferences))
+        requests = guide_section_requests(destination, start_date, end_date)
         
         if progress_callback:
-            await progress_callback(30, "Fetching data concurrently")
+            mode = "batched" if self.config.batch_mode else "concurrent"
+            await progress_callback(30, f"Fetching data ({mode})")
         
         try:
-            # Execute all tasks concurrently with timeout
-            results = await asyncio.wait_for(
-                asyncio.gather(*tasks, return_exceptions=True),
+            # Batched mode combines sections into structured-output requests;
+            # otherwise each section is its own concurrent request
+            if self.config.batch_mode:
+                fetch = self._fetch_sections_batched(requests, item_callback)
+            else:
+                fetch = self._fetch_sections_concurrently(requests, item_callback)
+            sections = await asyncio.wait_for(
+                fetch,
                 timeout=self.config.timeout * 2  # Allow extra time for concurrent requests
             )
             
             if progress_callback:
                 await progress_callback(80, "Processing results")
             
-            # Process results
-            restaurants, attractions, events, practical_info, daily_suggestions = results
-            
-            # Handle any exceptions
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.warning(f"Task {i} failed: {result}")
-                    results[i] = []  # Use empty list as fallback
-            
             # Combine results
-            guide_data = {
-                "destination": destination,
-                "start_date": start_date,
-                "end_date": end_date,
-                "restaurants": restaurants if not isinstance(restaurants, Exception) else [],
-                "attractions": attractions if not isinstance(attractions, Exception) else [],
-                "events": events if not isinstance(events, Exception) else [],
-                "practical_info": practical_info if not isinstance(practical_info, Exception) else {},
-                "daily_suggestions": daily_suggestions if not isinstance(daily_suggestions, Exception) else [],
-                "generated_at": datetime.now().isoformat(),
-                "cache_key": cache_key
-            }
+            guide_data = self._assemble_pool(destination, start_date, end_date, sections)
             
-            # Cache the results
+            # Cache the preference-neutral pool
             self._cache_data(cache_key, guide_data)
             
             if progress_callback:
                 await progress_callback(100, "Guide data ready")
             
-            return guide_data
+            return guide_personalizer.personalize_pool(guide_data, preferences, pool_key=("perplexity", cache_key))
             
         except asyncio.TimeoutError:
             logger.error(f"Timeout generating guide data for {destination}")
@@ -167,164 +170,208 @@ class OptimizedPerplexityService:
             logger.error(f"Error generating guide data: {e}")
             return self._create_error_response(f"Error generating guide data: {str(e)}")
     
-    async def _fetch_restaurants(self, destination: str, preferences: Dict) -> List[Dict]:
-        """Fetch restaurant recommendations"""
-        cuisine_types = preferences.get("cuisineTypes", [])
-        price_range = preferences.get("priceRange", "")
-        
-        prompt = f"""Find the top 8 restaurants in {destination} for these preferences:
-- Cuisine types: {', '.join(cuisine_types)}
-- Price range: {price_range}
-- Include mix of local favorites and popular spots
-
-For each restaurant provide:
-- Name
-- Cuisine type
-- Price range ($/$$/$$$/$$$$)
-- Address
-- Why recommended (1 sentence)
-- Reservation info if needed
-
-Return as JSON array with these exact keys: name, cuisine, price_range, address, recommendation, reservation_info"""
-        
-        try:
-            response = await self._make_api_request(prompt)
-            return await self._parse_json_response(response, "restaurants") or []
-        except Exception as e:
-            logger.warning(f"Restaurant fetch failed: {e}")
-            return []
-    
-    async def _fetch_attractions(self, destination: str, preferences: Dict) -> List[Dict]:
-        """Fetch attraction recommendations"""
-        interests = preferences.get("specialInterests", ["culture", "history", "landmarks"])
-        
-        prompt = f"""Find the top 8 attractions in {destination} for these interests:
-- Special interests: {', '.join(interests)}
-- Include mix of must-see landmarks and hidden gems
-
-For each attraction provide:
-- Name
-- Type/category
-- Address
-- Opening hours
-- Admission price
-- Why visit (1 sentence)
-- Time needed for visit
-
-Return as JSON array with these exact keys: name, type, address, hours, price, description, time_needed"""
-        
-        try:
-            response = await self._make_api_request(prompt)
-            return await self._parse_json_response(response, "attractions") or []
-        except Exception as e:
-            logger.warning(f"Attractions fetch failed: {e}")
-            return []
-    
-    async def _fetch_events(self, destination: str, start_date: str, end_date: str, preferences: Dict) -> List[Dict]:
-        """Fetch events happening during travel dates"""
-        prompt = f"""Find REAL events happening in {destination} between {start_date} and {end_date}:
-- Concerts, shows, exhibitions, festivals
-- Sports events, cultural events
-- Seasonal activities
-
-For each event provide:
-- Name
-- Date and time
-- Venue
-- Ticket price range
-- Brief description
-- How to book
-
-Return as JSON array with these exact keys: name, date, venue, price_range, description, booking_info"""
-        
-        try:
-            response = await self._make_api_request(prompt)
-            return await self._parse_json_response(response, "events") or []
-        except Exception as e:
-            logger.warning(f"Events fetch failed: {e}")
-            return []
-    
-    async def _fetch_practical_info(self, destination: str) -> Dict:
-        """Fetch practical travel information"""
-        prompt = f"""Provide practical travel information for {destination}:
-
-1. Transportation: How to get around (public transit, taxis, walking)
-2. Currency: Local currency and payment methods
-3. Language: Local language and English usage
-4. Tipping: Tipping customs and amounts
-5. Safety: General safety tips and areas to avoid
-6. Emergency: Emergency numbers and useful contacts
-
-Return as JSON object with keys: transportation, currency, language, tipping, safety, emergency"""
-        
-        try:
-            response = await self._make_api_request(prompt)
-            return await self._parse_json_response(response, "practical_info") or {}
-        except Exception as e:
-            logger.warning(f"Practical info fetch failed: {e}")
-            return {}
-    
-    async def _fetch_daily_suggestions(self, destination: str, start_date: str, end_date: str, preferences: Dict) -> List[Dict]:
-        """Fetch daily activity suggestions"""
-        from datetime import datetime, timedelta
-        
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        days = (end - start).days + 1
-        
-        prompt = f"""Create {days} days of activity suggestions for {destination} from {start_date} to {end_date}:
+    async def warm_cache(self, trips: List[Tuple[str, str, str]]) -> int:
+        """
+        Pre-fetch candidate pools for several (destination, start, end) trips.
+        Sections for all trips are planned together, so small trips share
+        structured-output requests. Returns the number of pools cached.
+        """
+        if not self.config.api_key:
+            return 0
+        pending = [trip for trip in trips if not self._get_cached_data(f"{trip[0]}_{trip[1]}_{trip[2]}")]
+        requests = [r for trip in pending for r in guide_section_requests(*trip)]
+        if not requests:
+            return 0
+
+        sections = await self._fetch_sections_batched(requests)
+        for destination, start_date, end_date in pending:
+            trip_sections = {
+                r.section: value for r, value in sections.items()
+                if (r.destination, r.start_date, r.end_date) == (destination, start_date, end_date)
+            }
+            self._cache_data(
+                f"{destination}_{start_date}_{end_date}",
+                self._assemble_pool(destination, start_date, end_date, trip_sections)
+            )
+        return len(pending)
+
+    async def _fetch_sections_concurrently(
+        self,
+        requests: List[SectionRequest],
+        item_callback: Optional[ItemCallback] = None
+    ) -> Dict[str, Any]:
+        """Per-section mode: one request per section, run concurrently"""
+        results = await asyncio.gather(
+            *(self._fetch_section(r, item_callback) for r in requests), return_exceptions=True
+        )
+        sections: Dict[str, Any] = {}
+        for request, result in zip(requests, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"{request.section} fetch failed: {result!r}")
+                result = None
+            sections[request.section] = result
+        return sections
+
+    async def _fetch_sections_batched(
+        self,
+        requests: List[SectionRequest],
+        item_callback: Optional[ItemCallback] = None
+    ) -> Dict[Any, Any]:
+        """
+        Batched mode: planner-combined structured-output requests, split and
+        validated per section. Sections missing or invalid in a batch are
+        refetched individually. Keyed by section name for a single trip,
+        otherwise by SectionRequest.
+        """
+        batches = self.batch_planner.plan(requests)
+        responses = await asyncio.gather(
+            *(self._fetch_batch(batch, item_callback) for batch in batches),
+            return_exceptions=True
+        )
 
-For each day provide:
-- Day number and date
-- Morning activity (9-12pm)
-- Afternoon activity (1-5pm)  
-- Evening activity (6-10pm)
-- Walking/transport between activities
-- Estimated costs
+        values: Dict[SectionRequest, Any] = {}
+        for batch, response in zip(batches, responses):
+            if isinstance(response, BaseException):
+                # One failed sub-query is refetched below instead of failing the guide
+                logger.warning(f"Batched request for {len(batch.requests)} sections failed: {response!r}")
+                values.update({r: None for r in batch.requests})
+            else:
+                values.update(response)
+
+        retry = [r for r, value in values.items() if value is None]
+        if retry:
+            logger.info(f"Refetching {len(retry)} sections individually after batch validation")
+            for request, value in zip(retry, await asyncio.gather(
+                *(self._fetch_section(r, item_callback) for r in retry), return_exceptions=True
+            )):
+                if isinstance(value, BaseException):
+                    logger.warning(f"{request.section} refetch failed: {value!r}")
+                    value = None
+                values[request] = value
+
+        if len({(r.destination, r.start_date, r.end_date) for r in requests}) == 1:
+            return {r.section: value for r, value in values.items()}
+        return values
+
+    async def _fetch_batch(
+        self,
+        batch: PromptBatch,
+        item_callback: Optional[ItemCallback] = None
+    ) -> Dict[SectionRequest, Optional[Any]]:
+        """One structured-output request, streamed when it holds list sections"""
+        sections = ",".join(r.spec.name for r in batch.requests)
+        with tracer.span("perplexity.batch", {"perplexity.sections": sections}):
+            max_tokens = self.batch_planner.max_tokens_for(batch)
+            if self.config.stream and any(r.spec.is_list for r in batch.requests):
+                return await self._stream_sections(
+                    batch.prompt(), batch.requests, item_callback,
+                    max_tokens=max_tokens, response_format=batch.response_format()
+                )
+            response = await self._make_api_request(
+                batch.prompt(), max_tokens=max_tokens, response_format=batch.response_format()
+            )
+            return split_batch_response(batch, response)
 
-Consider traveler preferences: {preferences.get('specialInterests', [])}
+    async def _fetch_section(self, request: SectionRequest, item_callback: Optional[ItemCallback] = None) -> Any:
+        """Fetch one section with its standalone prompt"""
+        spec = request.spec
+        prompt = spec.prompt(request.destination, request.start_date, request.end_date)
+        with tracer.span("perplexity.section", {"perplexity.sections": spec.name}) as span:
+            try:
+                if self.config.stream and spec.is_list:
+                    streamed = await self._stream_sections(prompt, [request], item_callback)
+                    if streamed[request]:
+                        return streamed[request]
+                    logger.info(f"No valid {spec.name} items streamed, retrying with a buffered request")
+                response = await self._make_api_request(prompt)
+                parsed = await self._parse_json_response(response, spec.name)
+                return validate_section(spec, parsed) or ([] if spec.is_list else {})
+            except Exception as e:
+                logger.warning(f"{spec.name} fetch failed: {e}")
+                span.record_exception(e)
+                return [] if spec.is_list else {}
 
-Return as JSON array with keys: day, date, morning, afternoon, evening, transport_notes, estimated_cost"""
-        
+    async def _stream_sections(
+        self,
+        prompt: str,
+        requests: List[SectionRequest],
+        item_callback: Optional[ItemCallback] = None,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> Dict[SectionRequest, Optional[Any]]:
+        """
+        Stream a completion and validate list items as they close, handing
+        each to item_callback straight away. Same contract as
+        split_batch_response: a request maps to None when nothing valid
+        arrived for it. Items streamed before a mid-response failure are kept.
+        """
+        by_key = {r.key: r for r in requests}
+        items: Dict[SectionRequest, List[Dict[str, Any]]] = {r: [] for r in requests}
+        values: Dict[SectionRequest, Optional[Any]] = {}
         try:
-            response = await self._make_api_request(prompt)
-            return await self._parse_json_response(response, "daily_suggestions") or []
+            chunks = self._stream_api_request(prompt, max_tokens=max_tokens, response_format=response_format)
+            async for key, value in iter_json_items(chunks, strip_citations=True):
+                request = by_key.get(key) if key is not None else None
+                if request is None:
+                    if len(requests) != 1:
+                        continue
+                    # Single-section answers may come back unwrapped or under the section name
+                    request = requests[0]
+                spec = request.spec
+                if not spec.is_list:
+                    values[request] = validate_section(spec, value)
+                    continue
+                item = validate_item(spec, value)
+                # An object where a list belongs is a {"restaurants": [...]} style wrapper
+                new_items = [item] if item is not None else (validate_section(spec, value) or [])
+                for new_item in new_items:
+                    items[request].append(new_item)
+                    await self._notify_item(item_callback, spec.name, new_item)
         except Exception as e:
-            logger.warning(f"Daily suggestions fetch failed: {e}")
-            return []
+            logger.warning(f"Streamed request for {len(requests)} sections failed: {e}")
+        return {r: (items[r] or None) if r.spec.is_list else values.get(r) for r in requests}
+
+    async def _notify_item(self, item_callback: Optional[ItemCallback], section: str, item: Dict[str, Any]) -> None:
+        if item_callback is None:
+            return
+        try:
+            await item_callback(section, item)
+        except Exception as e:
+            logger.warning(f"Item callback failed for {section}: {e}")
+
+    def _assemble_pool(self, destination: str, start_date: str, end_date: str, sections: Dict[str, Any]) -> Dict:
+        """Preference-neutral candidate pool from fetched sections"""
+        return {
+            "destination": destination,
+            "start_date": start_date,
+            "end_date": end_date,
+            "restaurants": sections.get("restaurants") or [],
+            "attractions": sections.get("attractions") or [],
+            "events": sections.get("events") or [],
+            "practical_info": sections.get("practical_info") or {},
+            "daily_suggestions": sections.get("daily_suggestions") or [],
+            "generated_at": datetime.now().isoformat(),
+            "cache_key": f"{destination}_{start_date}_{end_date}"
+        }
 
-    async def _make_api_request(self, prompt: str) -> str:
+    async def _make_api_request(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Make optimized API request to Perplexity with retry logic"""
         async with self._semaphore:  # Limit concurrent requests
             for attempt in range(self.config.retry_attempts):
+                started = time.perf_counter()
                 try:
                     timeout = aiohttp.ClientTimeout(total=self.config.timeout)
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
-                        headers = {
-                            "Authorization": f"Bearer {self.config.api_key}",
-                            "Content-Type": "application/json"
-                        }
-
-                        payload = {
-                            "model": self.config.model,
-                            "messages": [
-                                {
-                                    "role": "system",
-                                    "content": "You are a travel expert with real-time web access. Provide accurate, current information in the requested JSON format."
-                                },
-                                {
-                                    "role": "user",
-                                    "content": prompt
-                                }
-                            ],
-                            "temperature": self.config.temperature,
-                            "max_tokens": self.config.max_tokens
-                        }
-
-                        async with session.post("https://api.perplexity.ai/chat/completions",
-                                               json=payload, headers=headers) as response:
+                    async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
+                        payload = self._request_payload(prompt, max_tokens, response_format)
+                        async with session.post(PERPLEXITY_API_URL, json=payload, headers=self._headers()) as response:
                             if response.status == 200:
                                 data = await response.json()
+                                self._record_usage(data.get("usage", {}), time.perf_counter() - started)
                                 return data["choices"][0]["message"]["content"]
                             else:
                                 error_text = await response.text()
@@ -341,6 +388,97 @@ Return as JSON array with keys: day, date, morning, afternoon, evening, transpor
 
             raise Exception(f"Failed after {self.config.retry_attempts} attempts")
 
+    async def _stream_api_request(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of _make_api_request yielding content deltas from
+        the SSE response. Retries only until the first delta arrives, so
+        content is never repeated to the consumer.
+        """
+        async with self._semaphore:
+            for attempt in range(self.config.retry_attempts):
+                started = time.perf_counter()
+                received = False
+                try:
+                    # The whole stream may run longer than one buffered request; stalls may not
+                    timeout = aiohttp.ClientTimeout(total=self.config.timeout * 2, sock_read=self.config.timeout)
+                    async with aiohttp.ClientSession(timeout=timeout, trace_configs=upstream_trace_configs()) as session:
+                        payload = {**self._request_payload(prompt, max_tokens, response_format), "stream": True}
+                        async with session.post(PERPLEXITY_API_URL, json=payload, headers=self._headers()) as response:
+                            if response.status != 200:
+                                error_text = await response.text()
+                                raise Exception(f"API error {response.status}: {error_text}")
+
+                            usage: Dict[str, Any] = {}
+                            async for line in response.content:
+                                line = line.strip()
+                                if not line.startswith(b"data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == b"[DONE]":
+                                    break
+                                event = json.loads(data)
+                                usage = event.get("usage") or usage
+                                choices = event.get("choices") or [{}]
+                                delta = (choices[0].get("delta") or {}).get("content")
+                                if delta:
+                                    received = True
+                                    yield delta
+                            self._record_usage(usage, time.perf_counter() - started)
+                            return
+
+                except Exception as e:
+                    if received:
+                        raise
+                    logger.warning(f"Perplexity stream error (attempt {attempt + 1}): {e or type(e).__name__}")
+                    if attempt < self.config.retry_attempts - 1:
+                        await asyncio.sleep(self.config.retry_delay * (attempt + 1))
+
+            raise Exception(f"Stream failed after {self.config.retry_attempts} attempts")
+
+    def _request_payload(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        payload = {
+            "model": self.config.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a travel expert with real-time web access. Provide accurate, current information in the requested JSON format."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": self.config.temperature,
+            "max_tokens": max_tokens or self.config.max_tokens
+        }
+        if response_format:
+            payload["response_format"] = response_format
+        return payload
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.config.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _record_usage(self, usage: Dict[str, Any], latency: float) -> None:
+        """Accumulate token usage and latency for cost comparisons"""
+        self.usage["requests"] += 1
+        self.usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        self.usage["completion_tokens"] += usage.get("completion_tokens", 0)
+        self.usage["latency_seconds"] += latency
+
+    @traced("guide.parse")
     async def _parse_json_response(self, response: str, data_type: str) -> Any:
         """Parse JSON response with fallback to LLM parsing"""
         try:
@@ -363,18 +501,26 @@ Return as JSON array with keys: day, date, morning, afternoon, evening, transpor
 
 Return only the JSON, no markdown, no explanations."""
 
-                llm_response = await self.openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": f"Extract {data_type} data as JSON."},
-                        {"role": "user", "content": parse_prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=2000
+                messages = [
+                    {"role": "system", "content": f"Extract {data_type} data as JSON."},
+                    {"role": "user", "content": parse_prompt}
+                ]
+
+                async def call() -> CachedCompletion:
+                    llm_response = await self.openai_client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=messages,
+                        temperature=0.1,
+                        max_tokens=2000
+                    )
+                    return openai_completion(llm_response)
+
+                completion = await llm_response_cache.complete(
+                    "json_repair", "openai", "gpt-4o-mini", messages, call,
+                    params={"temperature": 0.1, "max_tokens": 2000},
+                    validate=is_json
                 )
-
-                content = llm_response.choices[0].message.content
-                return json.loads(content)
+                return json.loads(completion.content)
             except Exception as e:
                 logger.warning(f"LLM parsing failed for {data_type}: {e}")
 
@@ -0,0 +1,496 @@
+"""
+Perplexity Markdown Tokenizer
+Single-pass parsing of markdown-formatted Perplexity responses. The text is
+split and every line stripped and classified once against precompiled
+patterns; the section builders (restaurants, attractions, events, daily
+itinerary, local insights) then consume the same classified lines in one
+sweep. Output matches the original per-section parsers exactly.
+"""
+import re
+from typing import Dict, List, Any, Optional, Iterable, Sequence, Callable, Protocol
+
+# Line classification
+_NUMBERED_BOLD = re.compile(r'^(\d+)\.\s+\*\*(.+?)\*\*')
+_NUMBERED_INLINE = re.compile(r'^(\d+)\.\s+\*\*(.+?)\*\*\s*[-–]\s*(.+)')
+_NUMBERED = re.compile(r'^\d+\.')
+_NUMBER_PREFIX = re.compile(r'^\d+\.\s*')
+_BOLD_SPAN = re.compile(r'\*\*(.+?)\*\*')
+
+# Field cleanup
+_NY_ADDRESS = re.compile(r'^([^.]+(?:NY|New York)\s+\d{5})')
+_BOLD_ADDRESS_LABEL = re.compile(r'\*\*[Aa]ddress:\*\*\s*')
+_ADDRESS_LABEL = re.compile(r'(\*\*)?[Aa]ddress:(\*\*)?\s*')
+_BOLD_TEXT = re.compile(r'\*\*.*?\*\*\s*')
+_BOLD_LABEL = re.compile(r'\*\*.*?\*\*:')
+_DOLLARS = re.compile(r'(\$+)')
+
+SECTIONS = ("restaurants", "attractions", "events", "daily_itinerary", "local_insights")
+
+
+class MarkdownLine:
+    """A stripped, non-empty line with the features every builder checks"""
+    __slots__ = ("text", "lower", "numbered", "bold")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        self.bold = "**" in text
+        # Only lines opening with a digit can be numbered entries
+        self.numbered = _NUMBERED_BOLD.match(text) if text[0].isdigit() else None
+
+    @property
+    def starts_numbered(self) -> bool:
+        return self.text[0].isdigit() and _NUMBERED.match(self.text) is not None
+
+
+def tokenize(response: str) -> List[MarkdownLine]:
+    """Split and classify once; blank lines carry no information for the builders"""
+    return [MarkdownLine(text) for text in (line.strip() for line in response.split('\n')) if text]
+
+
+def _after_colon(text: str) -> str:
+    return text.split(':', 1)[1].strip() if ':' in text else text
+
+
+class RestaurantBuilder:
+    """Numbered bold entries, inline ("1. **Name** - Address. Why") or with labeled detail lines"""
+
+    def __init__(self):
+        self.items: List[Dict] = []
+        self.current: Optional[Dict] = None
+
+    def feed(self, line: MarkdownLine) -> None:
+        text = line.text
+        if line.numbered:
+            if self.current:
+                self.items.append(self.current)
+            inline = _NUMBERED_INLINE.match(text)
+            if inline:
+                rest = inline.group(3).strip()
+                address_match = _NY_ADDRESS.match(rest)
+                if address_match:
+                    address = address_match.group(1).strip()
+                    description = rest[address_match.end():].strip('. ')
+                else:
+                    parts = rest.split('. ', 1)
+                    address = parts[0]
+                    description = parts[1] if len(parts) > 1 else ''
+                self.current = {
+                    'name': inline.group(2).strip(),
+                    'address': address,
+                    'description': description,
+                    'raw_text': [text]
+                }
+            else:
+                self.current = {'name': line.numbered.group(2).strip(), 'raw_text': []}
+            return
+
+        current = self.current
+        if current is None:
+            return
+        if line.bold:
+            if '**Address:**' in text or '**address:**' in text:
+                current['address'] = _BOLD_ADDRESS_LABEL.sub('', text).strip('- ').strip()
+            elif '**Why it' in text or '**why it' in text:
+                current['description'] = _BOLD_TEXT.sub('', _after_colon(text)).strip('- ')
+            elif '**Price' in text or '**price' in text:
+                price = _BOLD_TEXT.sub('', _after_colon(text)).strip('- ')
+                dollars = _DOLLARS.search(price) if '$' in price else None
+                current['price'] = dollars.group(1) if dollars else price
+            elif '**Cuisine' in text or '**cuisine' in text:
+                current['cuisine'] = _BOLD_TEXT.sub('', _after_colon(text)).strip('- ')
+            elif '**Hours' in text or '**Open' in text:
+                current['hours'] = _BOLD_TEXT.sub('', _after_colon(text)).strip('- ')
+        current['raw_text'].append(text)
+
+    def result(self) -> List[Dict]:
+        restaurants = self.items + ([self.current] if self.current else [])
+        for restaurant in restaurants:
+            raw_text = restaurant.pop('raw_text', None)
+            if 'description' not in restaurant and raw_text:
+                desc_lines = [
+                    text for text in raw_text
+                    if not text.startswith('-') and '**' not in text and len(text) > 20
+                ]
+                if desc_lines:
+                    restaurant['description'] = ' '.join(desc_lines)
+        return restaurants
+
+
+class AttractionBuilder:
+    """Numbered bold entries followed by labeled or bulleted details"""
+
+    def __init__(self):
+        self.items: List[Dict] = []
+        self.current: Optional[Dict] = None
+
+    def feed(self, line: MarkdownLine) -> None:
+        text = line.text
+        if line.numbered:
+            if self.current:
+                self.items.append(self.current)
+            self.current = {'name': line.numbered.group(2).strip(), 'details': []}
+            return
+
+        current = self.current
+        if current is None:
+            return
+        lower = line.lower
+        if 'Address:' in text:  # also covers '**Address:**'
+            current['address'] = _ADDRESS_LABEL.sub('', text).strip('- ')
+        elif 'Hours:' in text or 'Open:' in text:
+            current['hours'] = text.split(':', 1)[1].strip().strip('- ')
+        elif 'price:' in lower or 'admission:' in lower or 'tickets:' in lower or 'cost:' in lower:
+            current['price'] = _BOLD_TEXT.sub('', _after_colon(text)).strip('- ')
+        elif 'Why' in text or 'Description:' in text:
+            current['description'] = _BOLD_TEXT.sub('', _after_colon(text)).strip('- ')
+        elif text.startswith('-'):
+            current['details'].append(text.strip('- '))
+
+    def result(self) -> List[Dict]:
+        return self.items + ([self.current] if self.current else [])
+
+
+class EventBuilder:
+    """Any numbered or bold line starts an event; labeled lines fill it in"""
+
+    def __init__(self):
+        self.items: List[Dict] = []
+        self.current: Optional[Dict] = None
+
+    def feed(self, line: MarkdownLine) -> None:
+        text = line.text
+        if line.bold or line.starts_numbered:
+            if self.current and self.current.get('name'):
+                self.items.append(self.current)
+            name = _NUMBER_PREFIX.sub('', text) if text[0].isdigit() else text
+            self.current = {'name': name.replace('**', '').strip(), 'details': []}
+            return
+
+        current = self.current
+        if current is None:
+            return
+        lower = line.lower
+        if 'date:' in lower or 'when:' in lower or 'dates:' in lower:
+            current['date'] = _after_colon(text)
+        elif 'venue:' in lower or 'location:' in lower or 'where:' in lower:
+            current['venue'] = _after_colon(text)
+        elif 'price:' in lower or 'tickets:' in lower or 'cost:' in lower:
+            current['price'] = _after_colon(text)
+        elif text.startswith('-'):
+            current['details'].append(text.strip('- '))
+        elif len(text) > 20 and 'description' not in current:
+            current['description'] = text
+
+    def result(self) -> List[Dict]:
+        if self.current and self.current.get('name'):
+            return self.items + [self.current]
+        return self.items
+
+
+class DailyItineraryBuilder:
+    """Lines grouped under the most recent time-of-day marker"""
+
+    def __init__(self):
+        self.itinerary: Dict[str, List[str]] = {
+            "morning": [],
+            "lunch": [],
+            "afternoon": [],
+            "evening": [],
+            "tips": []
+        }
+        self.section: Optional[str] = None
+
+    def feed(self, line: MarkdownLine) -> None:
+        text, lower = line.text, line.lower
+        if 'morning' in lower or '8:00' in text or '9:00' in text:
+            self.section = 'morning'
+        elif 'lunch' in lower or '12:00' in text or '1:00' in text:
+            self.section = 'lunch'
+        elif 'afternoon' in lower or '2:00' in text or '3:00' in text:
+            self.section = 'afternoon'
+        elif 'evening' in lower or 'dinner' in lower or '6:00' in text or '7:00' in text:
+            self.section = 'evening'
+        elif 'tip' in lower or 'note' in lower:
+            self.section = 'tips'
+        elif self.section:
+            cleaned = (_BOLD_LABEL.sub('', text) if line.bold else text).strip('- ').strip()
+            if len(cleaned) > 10 and not cleaned.lower().startswith(('morning', 'afternoon', 'evening', 'lunch')):
+                self.itinerary[self.section].append(cleaned)
+
+    def result(self) -> Dict[str, List[str]]:
+        return self.itinerary
+
+
+class LocalInsightsBuilder:
+    """Lines grouped under the most recent topic keyword, defaulting to tips"""
+
+    TOPICS = ('weather', 'transport', 'money', 'cultur', 'safety')
+
+    def __init__(self):
+        self.insights: Dict[str, List[str]] = {
+            "weather": [],
+            "transportation": [],
+            "money": [],
+            "cultural": [],
+            "safety": [],
+            "tips": []
+        }
+        self.section = 'tips'
+
+    def feed(self, line: MarkdownLine) -> None:
+        lower = line.lower
+        if 'weather' in lower or 'climate' in lower:
+            self.section = 'weather'
+        elif 'transport' in lower or 'getting around' in lower:
+            self.section = 'transportation'
+        elif 'money' in lower or 'currency' in lower or 'cost' in lower:
+            self.section = 'money'
+        elif 'cultur' in lower or 'custom' in lower or 'etiquette' in lower:
+            self.section = 'cultural'
+        elif 'safety' in lower or 'security' in lower:
+            self.section = 'safety'
+        else:
+            text = line.text
+            cleaned = (_BOLD_LABEL.sub('', text) if line.bold else text).strip('- •').strip()
+            if len(cleaned) > 10 and not cleaned.lower().startswith(self.TOPICS):
+                self.insights[self.section].append(cleaned)
+
+    def result(self) -> Dict[str, List[str]]:
+        return self.insights
+
+
+class SectionBuilder(Protocol):
+    """Consumes classified lines and builds one section"""
+
+    def feed(self, line: MarkdownLine) -> None: ...
+
+    def result(self) -> Any: ...
+
+
+BUILDERS: Dict[str, Callable[[], SectionBuilder]] = {
+    "restaurants": RestaurantBuilder,
+    "attractions": AttractionBuilder,
+    "events": EventBuilder,
+    "daily_itinerary": DailyItineraryBuilder,
+    "local_insights": LocalInsightsBuilder,
+}
+
+
+def parse_markdown(response: str, sections: Iterable[str] = SECTIONS) -> Dict[str, Any]:
+    """Build the requested section structures in one sweep over the classified lines"""
+    builders = [(name, BUILDERS[name]()) for name in sections]
+    feeds = [builder.feed for _, builder in builders]
+    for line in tokenize(response or ""):
+        for feed in feeds:
+            feed(line)
+    return {name: builder.result() for name, builder in builders}
+
+
+# Lookahead parsers for loosely formatted lists (formerly simple_parser)
+
+_ADDRESS_MARKERS = ('Street', 'St', 'Ave', 'Avenue', 'Road', 'NY', 'New York')
+_ATTRACTION_ADDRESS_MARKERS = ('Street', 'St', 'Ave', 'Avenue', 'NY')
+
+
+def _is_numbered(text: str) -> bool:
+    return bool(text) and text[0].isdigit() and _NUMBERED.match(text) is not None
+
+
+def parse_restaurants_loose(response: str) -> List[Dict]:
+    """
+    Bold names with the address inline after a dash, on one of the next
+    lines, or labeled "Address:"
+    """
+    lines = [line.strip() for line in response.split('\n')]
+    restaurants = []
+    count = len(lines)
+    i = 0
+    while i < count:
+        line = lines[i]
+        name_match = _BOLD_SPAN.search(line) if '**' in line else None
+        if name_match:
+            name = name_match.group(1).strip()
+            rest_of_line = line[name_match.end():].strip()
+            if rest_of_line.startswith(('-', '–', '—')):
+                address = rest_of_line.strip('-–— ').strip()
+                if '. ' in address:
+                    address = address.split('. ', 1)[0]
+                restaurant = {'name': name, 'address': address}
+                if i + 1 < count:
+                    next_line = lines[i + 1]
+                    if next_line and not next_line.startswith(('**', '-', '1.', '2.', '3.')):
+                        restaurant['description'] = next_line
+                        i += 1
+            else:
+                restaurant = {'name': name}
+                for j in range(1, 4):
+                    if i + j >= count:
+                        continue
+                    next_line = lines[i + j]
+                    if not next_line:
+                        continue
+                    if '**' in next_line or _is_numbered(next_line):
+                        break
+                    if any(marker in next_line for marker in _ADDRESS_MARKERS):
+                        restaurant['address'] = next_line.strip('- ')
+                        if i + j + 1 < count:
+                            desc_line = lines[i + j + 1]
+                            if desc_line and not desc_line.startswith(('**', '-', '1.', '2.')):
+                                restaurant['description'] = desc_line
+                        i = i + j
+                        break
+                    elif 'Address:' in next_line:
+                        restaurant['address'] = next_line.split(':', 1)[1].strip()
+                        i = i + j
+                        break
+                    elif not restaurant.get('description'):
+                        restaurant['description'] = next_line
+            restaurants.append(restaurant)
+        i += 1
+    return restaurants
+
+
+def parse_attractions_loose(response: str) -> List[Dict]:
+    """Bold names followed by up to five lines of address, price, hours or description"""
+    lines = [line.strip() for line in response.split('\n')]
+    attractions = []
+    count = len(lines)
+    for i, line in enumerate(lines):
+        if '**' not in line:
+            continue
+        lower = line.lower()
+        if 'address:' in lower or 'price:' in lower or 'hours:' in lower:
+            continue
+        name_match = _BOLD_SPAN.search(line)
+        if not name_match:
+            continue
+        attraction = {'name': name_match.group(1).strip()}
+        for j in range(1, 6):
+            if i + j >= count:
+                continue
+            detail_line = lines[i + j]
+            if not detail_line:
+                continue
+            if '**' in detail_line or _is_numbered(detail_line):
+                break
+            if any(marker in detail_line for marker in _ATTRACTION_ADDRESS_MARKERS):
+                if 'address' not in attraction:
+                    attraction['address'] = detail_line.strip('- ')
+            elif 'Price:' in detail_line or 'Admission:' in detail_line:
+                attraction['price'] = detail_line.split(':', 1)[1].strip()
+            elif 'Hours:' in detail_line or 'Open:' in detail_line:
+                attraction['hours'] = detail_line.split(':', 1)[1].strip()
+            elif not attraction.get('description') and len(detail_line) > 20:
+                attraction['description'] = detail_line
+        if attraction.get('name'):
+            attractions.append(attraction)
+    return attractions
+
+
+# "## Section" guides (formerly EnhancedGuideService._parse_* helpers)
+
+def parse_guide_markdown(content: str, citations: List) -> Dict:
+    """Guide structure from a "## Section" formatted guide; each line is split out once"""
+    guide = {
+        "summary": "",
+        "destination_insights": "",
+        "weather": {},
+        "daily_itinerary": [],
+        "restaurants": [],
+        "attractions": [],
+        "events": [],
+        "neighborhoods": [],
+        "practical_info": {},
+        "hidden_gems": [],
+        "citations": citations,
+        "raw_content": content
+    }
+
+    for section in (content or "").split("\n## "):
+        lines = section.split("\n")
+        _apply_guide_section(guide, lines[0].strip("#").strip().lower(), _strip_block(lines[1:]))
+    return guide
+
+
+def _strip_block(lines: List[str]) -> List[str]:
+    """Lines of "\\n".join(lines).strip() without building the string"""
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    block = lines[start:end]
+    if block:
+        block[0] = block[0].lstrip()
+        block[-1] = block[-1].rstrip()
+    return block
+
+
+def _apply_guide_section(guide: Dict, title: str, lines: List[str]) -> None:
+    if "summary" in title:
+        guide["summary"] = "\n".join(lines)
+    elif "insight" in title or "destination" in title:
+        guide["destination_insights"] = "\n".join(lines)
+    elif "itinerary" in title:
+        guide["daily_itinerary"] = _guide_itinerary(lines)
+    elif "dining" in title or "restaurant" in title:
+        guide["restaurants"] = _guide_entries(lines, "details")
+    elif "cultural" in title or "entertainment" in title or "event" in title:
+        guide["events"] = _guide_descriptions(lines)
+    elif "neighborhood" in title:
+        guide["neighborhoods"] = _guide_entries(lines, "highlights")
+    elif "practical" in title:
+        guide["practical_info"] = _guide_practical_info(lines)
+    elif "hidden" in title or "secret" in title:
+        guide["hidden_gems"] = _guide_descriptions(lines)
+
+
+def _guide_itinerary(lines: Sequence[str]) -> List[Dict]:
+    days: List[Dict[str, Any]] = []
+    current_day: Optional[Dict[str, Any]] = None
+    for line in lines:
+        if line.startswith("### Day") or line.startswith("**Day"):
+            if current_day:
+                days.append(current_day)
+            current_day = {"day": len(days) + 1, "title": line.strip("#*").strip(), "activities": []}
+        elif current_day and line.strip():
+            current_day["activities"].append(line.strip("- ").strip())
+    if current_day:
+        days.append(current_day)
+    return days
+
+
+def _guide_entries(lines: Sequence[str], extra_key: str) -> List[Dict]:
+    """Heading entries: first body line is the description, the rest go under extra_key"""
+    entries: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    for line in lines:
+        if line.startswith("### ") or line.startswith("**"):
+            if current:
+                entries.append(current)
+            current = {"name": line.strip("#*").strip(), "description": "", extra_key: []}
+        elif current and line.strip():
+            if not current["description"]:
+                current["description"] = line.strip()
+            else:
+                current[extra_key].append(line.strip("- ").strip())
+    if current:
+        entries.append(current)
+    return entries
+
+
+def _guide_descriptions(lines: Sequence[str]) -> List[Dict]:
+    return [{"description": line.strip("- ").strip()} for line in lines if line.strip() and not line.startswith("#")]
+
+
+def _guide_practical_info(lines: Sequence[str]) -> Dict:
+    info: Dict[str, List[str]] = {}
+    current_category = "general"
+    for line in lines:
+        if line.startswith("### ") or line.startswith("**"):
+            current_category = line.strip("#*").strip().lower()
+            info[current_category] = []
+        elif line.strip():
+            info.setdefault(current_category, []).append(line.strip("- ").strip())
+    return info
@@ -11,6 +11,9 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
+
+from .llm_cache import llm_response_cache, openai_completion, is_json, CachedCompletion
+from ..core.upstream_metrics import upstream_trace_configs
 # Remove dependency on regex-based parsers - use LLM parsing instead
 
 # Load .env from project root
@@ -33,8 +36,8 @@ class PerplexitySearchService:
         else:
             self.openai_client = None
 
-    async def _parse_with_llm(self, content: str, data_type: str) -> List[Dict]:
-        """Parse Perplexity response using LLM instead of regex"""
+    async def _parse_with_llm(self, content: str, data_type: str, bypass_cache: bool = False) -> List[Dict]:
+        """Parse Perplexity response using LLM instead of regex (memoized unless bypass_cache)"""
         if not self.openai_client:
             print(f"[DEBUG] No OpenAI client available for parsing {data_type}")
             return []
@@ -94,17 +97,27 @@ Content to parse:
 
 Return ONLY the JSON array, no markdown, no explanations."""
 
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": f"You are a travel data parser. Extract {data_type} information and return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                response_format={"type": "json_object"}
-            )
+            messages = [
+                {"role": "system", "content": f"You are a travel data parser. Extract {data_type} information and return only valid JSON."},
+                {"role": "user", "content": prompt}
+            ]
 
-            result_text = response.choices[0].message.content
+            async def call() -> CachedCompletion:
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    temperature=0.1,
+                    response_format={"type": "json_object"}
+                )
+                return openai_completion(response)
+
+            completion = await llm_response_cache.complete(
+                "search_parse", "openai", "gpt-4o-mini", messages, call,
+                params={"temperature": 0.1, "response_format": "json_object"},
+                bypass=bypass_cache,
+                validate=is_json
+            )
+            result_text = completion.content
 
             # Parse the JSON
             import json
@@ -563,7 +576,7 @@ RULES:
             # "search_recency_filter": "month"  # Focus on recent information
         }
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
             async with session.post(self.api_url, json=payload, headers=headers) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -0,0 +1,220 @@
+"""
+Progress Store
+In-memory processing states with coalesced persistence. Progress updates
+are appended to a journal and folded into one snapshot write per trip every
+flush interval; status changes and terminal states are written through at
+once. Journal records are buffered and appended, like the snapshot
+replacements, through the FileStore committer off the event loop. On startup
+the journal is replayed over the snapshots, so a crash loses at most the
+updates not yet appended.
+"""
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable, Set
+
+import aiofiles
+
+from ..core import codec
+from .file_store import FileStore
+from ..models.database_models import ProcessingState, ProcessingStatus
+
+logger = logging.getLogger(__name__)
+
+
+FLUSH_INTERVAL_MS = 250
+JOURNAL_FILE = "journal.log"
+JOURNAL_MAX_BYTES = 8 * 1024 * 1024
+TERMINAL_STATUSES = (ProcessingStatus.COMPLETED, ProcessingStatus.ERROR)
+
+# Always journaled so a replayed record is meaningful on its own
+_CORE_FIELDS = ("status", "progress", "message", "updated_at")
+
+
+class ProgressStore:
+    """Active processing states, keyed by trip ID"""
+
+    def __init__(
+        self,
+        path: Path,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        files: Optional[FileStore] = None
+    ):
+        self.path = Path(path)
+        self.files = files or FileStore()
+        self.flush_interval = flush_interval_ms / 1000
+        self.journal_path = self.path / JOURNAL_FILE
+        self._states: Dict[str, ProcessingState] = {}
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._journal_bytes = 0
+        self._journal_lines: List[bytes] = []
+        self._journal_task: Optional[asyncio.Task] = None
+        self._writes_in_flight = 0
+        self.stats = {"updates": 0, "snapshots_written": 0, "coalesced": 0, "journal_records": 0}
+
+    def __contains__(self, trip_id: str) -> bool:
+        return trip_id in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, trip_id: str) -> Optional[ProcessingState]:
+        return self._states.get(trip_id)
+
+    def state_file(self, trip_id: str) -> Path:
+        return self.path / f"{trip_id}.json"
+
+    async def put(
+        self,
+        state: ProcessingState,
+        changed: Optional[Iterable[str]] = None,
+        flush: bool = False
+    ) -> None:
+        """
+        Record an update. `changed` names the fields to journal (all when
+        None); with flush=True the snapshot is written before returning.
+        """
+        trip_id = state.trip_id
+        self._states[trip_id] = state
+        self.stats["updates"] += 1
+        self._append_journal(state, changed)
+
+        if flush:
+            self._dirty.discard(trip_id)
+            await self._write_snapshot(trip_id)
+            return
+        if trip_id in self._dirty:
+            self.stats["coalesced"] += 1
+        self._dirty.add(trip_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    def evict(self, trip_id: str) -> Optional[ProcessingState]:
+        """Stop holding a state whose snapshot is current"""
+        if trip_id in self._dirty:
+            return self._states.get(trip_id)
+        return self._states.pop(trip_id, None)
+
+    def discard(self, trip_id: str) -> None:
+        self._states.pop(trip_id, None)
+        self._dirty.discard(trip_id)
+
+    async def flush(self) -> int:
+        """Write snapshots of every dirty state; truncates the journal when clean"""
+        flushed = 0
+        while self._dirty:
+            trip_id = self._dirty.pop()
+            if trip_id not in self._states:
+                continue
+            try:
+                await self._write_snapshot(trip_id)
+            except BaseException:
+                self._dirty.add(trip_id)
+                raise
+            flushed += 1
+        if self._journal_task is not None and not self._journal_task.done():
+            await asyncio.shield(self._journal_task)
+        if not self._dirty and not self._writes_in_flight and not self._journal_lines:
+            self._truncate_journal()
+        return flushed
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush processing states: {e}")
+
+    async def _write_snapshot(self, trip_id: str) -> None:
+        state = self._states[trip_id]
+        payload = codec.dumps(state.to_dict())
+        self._writes_in_flight += 1
+        try:
+            await self.files.write(self.state_file(trip_id), payload)
+        finally:
+            self._writes_in_flight -= 1
+        self.stats["snapshots_written"] += 1
+
+    def _append_journal(self, state: ProcessingState, changed: Optional[Iterable[str]]) -> None:
+        data = state.to_dict()
+        if changed is not None:
+            data = {name: data[name] for name in {*_CORE_FIELDS, *changed} if name in data}
+        self._journal_lines.append(codec.dumps({"trip_id": state.trip_id, "fields": data}) + b"\n")
+        self.stats["journal_records"] += 1
+        if self._journal_task is None or self._journal_task.done():
+            self._journal_task = asyncio.get_running_loop().create_task(self._write_journal())
+
+    async def _write_journal(self) -> None:
+        # Records buffered while an append is in flight go out in the next one
+        while self._journal_lines:
+            data = b"".join(self._journal_lines)
+            self._journal_lines = []
+            if not self._journal_bytes:
+                self.path.mkdir(parents=True, exist_ok=True)
+            # Counted as in flight so the journal is not truncated under the append
+            self._writes_in_flight += 1
+            try:
+                await self.files.append(self.journal_path, data)
+            except Exception as e:
+                logger.error(f"Failed to append to the processing journal: {e}")
+                continue
+            finally:
+                self._writes_in_flight -= 1
+            self._journal_bytes += len(data)
+        if self._journal_bytes > JOURNAL_MAX_BYTES and (self._flush_task is None or self._flush_task.done()):
+            # Snapshot everything so the journal can be truncated
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    def _truncate_journal(self) -> None:
+        if self._journal_bytes or self.journal_path.exists():
+            self.journal_path.unlink(missing_ok=True)
+        self._journal_bytes = 0
+
+    async def recover(self) -> List[str]:
+        """Replay the journal over stored snapshots; returns the recovered trip IDs"""
+        if not self.journal_path.exists():
+            return []
+        records: Dict[str, List[Dict[str, Any]]] = {}
+        async with aiofiles.open(self.journal_path, 'rb') as f:
+            async for line in f:
+                try:
+                    record = codec.loads(line)
+                except ValueError:
+                    break  # torn final line
+                records.setdefault(record["trip_id"], []).append(record["fields"])
+
+        recovered = []
+        for trip_id, updates in records.items():
+            data: Dict[str, Any] = {}
+            state_file = self.state_file(trip_id)
+            if state_file.exists():
+                async with aiofiles.open(state_file, 'rb') as f:
+                    data = codec.loads(await f.read())
+            for fields in updates:
+                if fields.get("updated_at", "") > data.get("updated_at", ""):
+                    data.update(fields)
+            try:
+                self._states[trip_id] = ProcessingState.from_dict({"trip_id": trip_id, **data})
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping unrecoverable processing state {trip_id}: {e}")
+                continue
+            self._dirty.add(trip_id)
+            recovered.append(trip_id)
+
+        self._journal_bytes = self.journal_path.stat().st_size
+        await self.flush()
+        for trip_id in recovered:
+            if self._states[trip_id].status in TERMINAL_STATUSES:
+                self.evict(trip_id)
+        logger.info(f"Recovered {len(recovered)} processing states from the journal")
+        return recovered
+
+    def active(self) -> List[ProcessingState]:
+        return list(self._states.values())
+
+    async def close(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        await self.flush()
@@ -0,0 +1,314 @@
+"""
+Prompt Batching
+Plans combined structured-output Perplexity requests: compatible guide
+sections (and, for cache warming, several destinations) share one request
+with a strict JSON schema, and the response is split and validated per section
+"""
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SectionSpec:
+    """One guide section: what to ask for and the shape of a valid answer"""
+    name: str
+    instructions: str
+    item_properties: Dict[str, str]
+    required: Tuple[str, ...] = ("name",)
+    is_list: bool = True
+    date_dependent: bool = False
+    est_output_tokens: int = 600
+
+    def item_schema(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {key: {"type": kind} for key, kind in self.item_properties.items()},
+            "required": list(self.required),
+        }
+
+    def schema(self) -> Dict[str, Any]:
+        """JSON schema for this section's value"""
+        if self.is_list:
+            return {"type": "array", "items": self.item_schema()}
+        return self.item_schema()
+
+    def prompt(self, destination: str, start_date: str, end_date: str) -> str:
+        """Standalone prompt used in per-section mode"""
+        keys = ", ".join(self.item_properties)
+        shape = "JSON array" if self.is_list else "JSON object"
+        return (
+            self.instructions.format(destination=destination, start_date=start_date, end_date=end_date, days=_days(start_date, end_date))
+            + f"\n\nReturn as {shape} with these exact keys: {keys}"
+        )
+
+
+SECTION_SPECS: Dict[str, SectionSpec] = {
+    "restaurants": SectionSpec(
+        name="restaurants",
+        instructions="""Find the top 20 restaurants in {destination}:
+- Cover a wide range of cuisines, including local specialties
+- Cover every price range from street food to fine dining
+- Include vegetarian/vegan-friendly options
+- Include mix of local favorites and popular spots
+- For each: name, cuisine type, price range ($/$$/$$$/$$$$), address, why recommended (1 sentence), reservation info if needed""",
+        item_properties={
+            "name": "string", "cuisine": "string", "price_range": "string",
+            "address": "string", "recommendation": "string", "reservation_info": "string",
+        },
+        est_output_tokens=1400,
+    ),
+    "attractions": SectionSpec(
+        name="attractions",
+        instructions="""Find the top 15 attractions in {destination}:
+- Cover culture, history, art, nature, shopping, nightlife and family interests
+- Include mix of must-see landmarks and hidden gems
+- For each: name, type/category, address, opening hours, admission price, why visit (1 sentence), time needed for visit""",
+        item_properties={
+            "name": "string", "type": "string", "address": "string", "hours": "string",
+            "price": "string", "description": "string", "time_needed": "string",
+        },
+        est_output_tokens=1200,
+    ),
+    "events": SectionSpec(
+        name="events",
+        instructions="""Find REAL events happening in {destination} between {start_date} and {end_date}:
+- Concerts, shows, exhibitions, festivals
+- Sports events, cultural events
+- Seasonal activities
+- For each: name, date and time, venue, ticket price range, brief description, how to book""",
+        item_properties={
+            "name": "string", "date": "string", "venue": "string",
+            "price_range": "string", "description": "string", "booking_info": "string",
+        },
+        date_dependent=True,
+        est_output_tokens=700,
+    ),
+    "practical_info": SectionSpec(
+        name="practical_info",
+        instructions="""Provide practical travel information for {destination}:
+
+1. Transportation: How to get around (public transit, taxis, walking)
+2. Currency: Local currency and payment methods
+3. Language: Local language and English usage
+4. Tipping: Tipping customs and amounts
+5. Safety: General safety tips and areas to avoid
+6. Emergency: Emergency numbers and useful contacts""",
+        item_properties={
+            "transportation": "string", "currency": "string", "language": "string",
+            "tipping": "string", "safety": "string", "emergency": "string",
+        },
+        required=("transportation",),
+        is_list=False,
+        est_output_tokens=450,
+    ),
+    "daily_suggestions": SectionSpec(
+        name="daily_suggestions",
+        instructions="""Create {days} days of activity suggestions for {destination} from {start_date} to {end_date}:
+- For each day: day number and date, morning activity (9-12pm), afternoon activity (1-5pm), evening activity (6-10pm), walking/transport between activities, estimated costs
+- Balance landmarks, culture, food and neighborhoods for a first-time visitor""",
+        item_properties={
+            "day": "integer", "date": "string", "morning": "string", "afternoon": "string",
+            "evening": "string", "transport_notes": "string", "estimated_cost": "string",
+        },
+        required=("day",),
+        date_dependent=True,
+        est_output_tokens=300,  # per day
+    ),
+}
+
+# Per-request system prompt and JSON wrapper overhead that batching amortizes
+REQUEST_OVERHEAD_TOKENS = 120
+
+
+@dataclass(frozen=True)
+class SectionRequest:
+    """One section for one destination and date window"""
+    destination: str
+    start_date: str
+    end_date: str
+    section: str
+
+    @property
+    def key(self) -> str:
+        """JSON property name used for this section inside a batched response"""
+        return f"{_slug(self.destination)}__{_slug(self.start_date)}__{self.section}"
+
+    @property
+    def spec(self) -> SectionSpec:
+        return SECTION_SPECS[self.section]
+
+    def est_output_tokens(self) -> int:
+        if self.section == "daily_suggestions":
+            return self.spec.est_output_tokens * _days(self.start_date, self.end_date)
+        return self.spec.est_output_tokens
+
+
+@dataclass
+class PromptBatch:
+    """Section requests answered by a single structured-output call"""
+    requests: List[SectionRequest] = field(default_factory=list)
+
+    def est_output_tokens(self) -> int:
+        return sum(r.est_output_tokens() for r in self.requests)
+
+    def schema(self) -> Dict[str, Any]:
+        """Strict schema: one required property per section request"""
+        return {
+            "type": "object",
+            "properties": {r.key: r.spec.schema() for r in self.requests},
+            "required": [r.key for r in self.requests],
+        }
+
+    def response_format(self) -> Dict[str, Any]:
+        return {"type": "json_schema", "json_schema": {"schema": self.schema()}}
+
+    def prompt(self) -> str:
+        """Single prompt covering every section, keyed by JSON property name"""
+        if len(self.requests) == 1:
+            r = self.requests[0]
+            return r.spec.prompt(r.destination, r.start_date, r.end_date)
+        parts = ["Answer every task below. Return ONE JSON object whose properties are the task keys."]
+        for r in self.requests:
+            instructions = r.spec.instructions.format(
+                destination=r.destination, start_date=r.start_date,
+                end_date=r.end_date, days=_days(r.start_date, r.end_date)
+            )
+            keys = ", ".join(r.spec.item_properties)
+            shape = "array of objects" if r.spec.is_list else "object"
+            parts.append(f"### Task key: {r.key}\n{instructions}\nValue: {shape} with keys: {keys}")
+        return "\n\n".join(parts)
+
+
+class BatchPlanner:
+    """
+    Greedy bin packing of section requests into batches whose estimated
+    output fits the token budget. Requests for the same destination are
+    packed together first so a batch rarely straddles destinations.
+    """
+
+    def __init__(self, max_output_tokens: int = 3500, max_sections: int = 5):
+        self.max_output_tokens = max_output_tokens
+        self.max_sections = max_sections
+
+    def plan(self, requests: Iterable[SectionRequest]) -> List[PromptBatch]:
+        batches: List[PromptBatch] = []
+        ordered = sorted(requests, key=lambda r: (r.destination, r.start_date, -r.est_output_tokens()))
+        for request in ordered:
+            target = next(
+                (
+                    b for b in batches
+                    if len(b.requests) < self.max_sections
+                    and b.est_output_tokens() + request.est_output_tokens() <= self.max_output_tokens
+                ),
+                None
+            )
+            if target is None:
+                target = PromptBatch()
+                batches.append(target)
+            target.requests.append(request)
+        return batches
+
+    def max_tokens_for(self, batch: PromptBatch) -> int:
+        """Completion budget for a batch, with headroom for JSON punctuation"""
+        return min(int(batch.est_output_tokens() * 1.3) + 200, 8000)
+
+
+def guide_section_requests(
+    destination: str,
+    start_date: str,
+    end_date: str,
+    sections: Iterable[str] = tuple(SECTION_SPECS)
+) -> List[SectionRequest]:
+    return [SectionRequest(destination, start_date, end_date, section) for section in sections]
+
+
+def split_batch_response(batch: PromptBatch, content: str) -> Dict[SectionRequest, Optional[Any]]:
+    """
+    Split a batched response into per-request values. A request maps to None
+    when its property is missing or fails validation, so callers can refetch
+    just that section.
+    """
+    payload = _load_json_object(content)
+    if len(batch.requests) == 1 and payload is not None and batch.requests[0].key not in payload:
+        # Single-section batches may come back unwrapped
+        payload = {batch.requests[0].key: payload}
+    results: Dict[SectionRequest, Optional[Any]] = {}
+    for request in batch.requests:
+        value = payload.get(request.key) if isinstance(payload, dict) else None
+        results[request] = validate_section(request.spec, value)
+    return results
+
+
+def validate_section(spec: SectionSpec, value: Any) -> Optional[Any]:
+    """
+    Coerce a section value to its schema: drop list items missing required
+    keys and return None when nothing valid remains
+    """
+    if spec.is_list:
+        if isinstance(value, dict):
+            # Tolerate {"restaurants": [...]} style wrappers
+            value = next((v for v in value.values() if isinstance(v, list)), None)
+        if not isinstance(value, list):
+            return None
+        items = [_coerce_item(spec, item) for item in value if isinstance(item, dict)]
+        items = [item for item in items if item is not None]
+        return items or None
+    if not isinstance(value, dict):
+        return None
+    return _coerce_item(spec, value)
+
+
+def validate_item(spec: SectionSpec, item: Any) -> Optional[Dict[str, Any]]:
+    """One list item coerced to its section schema, or None when invalid"""
+    return _coerce_item(spec, item) if isinstance(item, dict) else None
+
+
+def _coerce_item(spec: SectionSpec, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if any(item.get(key) in (None, "") for key in spec.required):
+        return None
+    coerced = dict(item)
+    for key, kind in spec.item_properties.items():
+        value = coerced.get(key)
+        if value is None:
+            continue
+        if kind == "integer" and not isinstance(value, int):
+            match = re.search(r"\d+", str(value))
+            coerced[key] = int(match.group()) if match else None
+        elif kind == "string" and not isinstance(value, str):
+            coerced[key] = ", ".join(map(str, value)) if isinstance(value, list) else str(value)
+    return coerced
+
+
+def _load_json_object(content: str) -> Optional[Any]:
+    text = re.sub(r"\[\d+\]", "", content or "")
+    text = re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.MULTILINE).strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}") + 1
+        if 0 <= start < end:
+            try:
+                return json.loads(text[start:end])
+            except json.JSONDecodeError:
+                pass
+    logger.warning("Batched response was not valid JSON")
+    return None
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", (value or "").lower()).strip("_")
+
+
+def _days(start_date: str, end_date: str) -> int:
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        return max((end - start).days + 1, 1)
+    except (TypeError, ValueError):
+        return 1
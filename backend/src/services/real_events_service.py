@@ -6,8 +6,23 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+import numpy as np
+
+from .candidate_ranking import CandidateMatrix
+from ..core.upstream_metrics import upstream_trace_configs
+
 logger = logging.getLogger(__name__)
 
+# Extra event-type words that count as a match for common interests
+EVENT_INTEREST_KEYWORDS = {
+    "music": ("music", "concert", "band"),
+    "concerts": ("music", "concert", "band"),
+    "art": ("art", "museum", "gallery", "exhibition"),
+    "culture": ("art", "museum", "gallery", "exhibition"),
+    "sports": ("sports", "game", "match"),
+}
+
+
 class RealEventsService:
     """
     Service to fetch real, specific events happening during travel dates
@@ -80,7 +95,7 @@ class RealEventsService:
     async def _fetch_ticketmaster_events(self, destination: str, start_date: str, end_date: str) -> List[Dict]:
         """Fetch events from Ticketmaster API"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with aiohttp.ClientSession(timeout=self.timeout, trace_configs=upstream_trace_configs()) as session:
                 # Use destination as-is - no hardcoded city mappings
                 city = destination
                 
@@ -133,7 +148,7 @@ class RealEventsService:
     async def _fetch_eventbrite_events(self, destination: str, start_date: str, end_date: str) -> List[Dict]:
         """Fetch events from Eventbrite API"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with aiohttp.ClientSession(timeout=self.timeout, trace_configs=upstream_trace_configs()) as session:
                 # Eventbrite uses different date format
                 start_dt = datetime.strptime(start_date, "%Y-%m-%d")
                 end_dt = datetime.strptime(end_date, "%Y-%m-%d")
@@ -185,7 +200,7 @@ class RealEventsService:
     async def _fetch_seatgeek_events(self, destination: str, start_date: str, end_date: str) -> List[Dict]:
         """Fetch events from SeatGeek API"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with aiohttp.ClientSession(timeout=self.timeout, trace_configs=upstream_trace_configs()) as session:
                 url = "https://api.seatgeek.com/2/events"
                 params = {
                     "client_id": self.seatgeek_key,
@@ -258,7 +273,7 @@ Return as JSON array with keys: name, type, date, time, venue, address, price_ra
 
 IMPORTANT: Only include REAL events with specific dates during {start_date} to {end_date}."""
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with aiohttp.ClientSession(timeout=self.timeout, trace_configs=upstream_trace_configs()) as session:
                 headers = {
                     "Authorization": f"Bearer {self.perplexity_key}",
                     "Content-Type": "application/json"
@@ -319,31 +334,22 @@ IMPORTANT: Only include REAL events with specific dates during {start_date} to {
         if not interests:
             return events
         
-        # Score events based on interests
+        # One category column per interest; each match contributes 1 to the score
+        interests_lower = [interest.lower() for interest in interests]
+        keywords = {}
+        for interest_lower in interests_lower:
+            keywords[interest_lower] = (interest_lower,) + EVENT_INTEREST_KEYWORDS.get(interest_lower, ())
+        matrix = CandidateMatrix.from_candidates(events, keywords, text_fields=("type", "name"))
+        counts = np.array([interests_lower.count(name) for name in keywords], dtype=np.float32)
+        scores = matrix.categories @ counts
+
+        matched = np.flatnonzero(scores > 0)
+        ordered = matched[np.argsort(-scores[matched], kind="stable")]
         scored_events = []
-        for event in events:
-            score = 0
-            event_type = event.get("type", "").lower()
-            event_name = event.get("name", "").lower()
-            
-            # Score based on interests
-            for interest in interests:
-                interest_lower = interest.lower()
-                if interest_lower in event_type or interest_lower in event_name:
-                    score += 1
-                elif interest_lower in ["music", "concerts"] and any(word in event_type for word in ["music", "concert", "band"]):
-                    score += 1
-                elif interest_lower in ["art", "culture"] and any(word in event_type for word in ["art", "museum", "gallery", "exhibition"]):
-                    score += 1
-                elif interest_lower in ["sports"] and any(word in event_type for word in ["sports", "game", "match"]):
-                    score += 1
-            
-            if score > 0:
-                event["relevance_score"] = score
-                scored_events.append(event)
-        
-        # Sort by relevance score and return
-        scored_events.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+        for i in ordered:
+            event = events[i]
+            event["relevance_score"] = int(scores[i])
+            scored_events.append(event)
         return scored_events
     
     def _get_event_type(self, event: Dict) -> str:
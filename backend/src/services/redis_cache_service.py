@@ -13,6 +13,8 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from ..core import codec
+
 # Load environment
 root_dir = Path(__file__).parent.parent.parent.parent
 env_path = root_dir / ".env"
@@ -40,7 +42,11 @@ class RedisCacheService:
             "neighborhoods": 3600 * 24 * 7,     # 1 week for neighborhoods
             "events": 3600 * 12,                # 12 hours for events
             "complete_guide": 3600 * 2,         # 2 hours for complete guides
+            "candidate_pool": 3600 * 2,         # 2 hours for preference-neutral pools
         }
+        
+        # Values at least this large are stored compressed
+        self.compress_min_bytes = int(os.getenv("REDIS_COMPRESS_MIN_BYTES", 16 * 1024))
     
     async def connect(self):
         """Connect to Redis"""
@@ -53,7 +59,7 @@ class RedisCacheService:
                 port=self.redis_port,
                 db=self.redis_db,
                 password=self.redis_password,
-                decode_responses=True,
+                decode_responses=False,  # values may be compressed bytes
                 socket_connect_timeout=2,
                 socket_timeout=2
             )
@@ -96,7 +102,7 @@ class RedisCacheService:
             
             if data:
                 logger.info(f"Cache HIT: {key}")
-                return json.loads(data)
+                return codec.unpack(data)
             else:
                 logger.debug(f"Cache MISS: {key}")
                 return None
@@ -120,8 +126,8 @@ class RedisCacheService:
             if ttl is None:
                 ttl = self.ttls.get(prefix, 3600)  # Default 1 hour
             
-            # Store as JSON
-            json_data = json.dumps(data)
+            # Store as compact JSON, compressed when large
+            json_data = codec.pack(data, self.compress_min_bytes)
             
             # Set with expiration
             await self.redis_client.setex(
@@ -186,7 +192,7 @@ class RedisCacheService:
             memory = await self.redis_client.info("memory")
             
             # Count keys by pattern
-            patterns = ["perplexity_content", "weather", "neighborhoods", "complete_guide"]
+            patterns = ["perplexity_content", "weather", "neighborhoods", "complete_guide", "candidate_pool"]
             key_counts = {}
             
             for pattern in patterns:
@@ -0,0 +1,400 @@
+"""
+Route Planner
+Spatial grid index, cached travel-time matrix and nearest-neighbour + 2-opt
+day routing that clusters each day's stops around the traveler's hotel
+"""
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Callable, Sequence, Tuple
+
+import numpy as np
+
+from .candidate_ranking import DEFAULT_DAY_WINDOW, extract_coordinates, haversine_km, opening_window
+
+logger = logging.getLogger(__name__)
+
+
+KM_PER_DEGREE = 111.32
+
+# Batched Distance Matrix requests: at most 25 origins/destinations and 100 elements
+DISTANCE_MATRIX_BATCH = 10
+
+# (origins, destinations) -> minutes matrix, or None when the lookup failed
+TravelTimeProvider = Callable[[Sequence[Tuple[float, float]], Sequence[Tuple[float, float]]], Optional[np.ndarray]]
+
+
+class GridIndex:
+    """
+    Uniform lat/lng grid over places with coordinates. Cells are roughly
+    cell_km square, so a cell doubles as a walkable neighbourhood.
+    """
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, cell_km: float = 1.0):
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.cell_km = cell_km
+        located = np.isfinite(self.latitude) & np.isfinite(self.longitude)
+        self._lng_scale = math.cos(math.radians(float(np.mean(self.latitude[located])))) if located.any() else 1.0
+
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for i in np.flatnonzero(located):
+            self.cells.setdefault(self.cell_of(self.latitude[i], self.longitude[i]), []).append(int(i))
+
+    def cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        """Grid cell containing a coordinate"""
+        return (
+            int(math.floor(lat * KM_PER_DEGREE / self.cell_km)),
+            int(math.floor(lng * KM_PER_DEGREE * self._lng_scale / self.cell_km)),
+        )
+
+    def query_radius(self, lat: float, lng: float, radius_km: float) -> List[int]:
+        """Indices of places within radius_km, nearest first"""
+        row, col = self.cell_of(lat, lng)
+        reach = int(math.ceil(radius_km / self.cell_km))
+        nearby = [
+            i
+            for r in range(row - reach, row + reach + 1)
+            for c in range(col - reach, col + reach + 1)
+            for i in self.cells.get((r, c), ())
+        ]
+        if not nearby:
+            return []
+        idx = np.asarray(nearby)
+        distance = haversine_km(lat, lng, self.latitude[idx], self.longitude[idx])
+        inside = distance <= radius_km
+        return [int(i) for i in idx[inside][np.argsort(distance[inside], kind="stable")]]
+
+
+class TravelTimeMatrix:
+    """
+    Pairwise travel minutes between points. Haversine distance with a
+    street detour factor is the default; a provider (e.g. Google Distance
+    Matrix) may replace it in batches. Results are LRU-cached per point set.
+    A provider makes blocking network calls, so callers on the event loop
+    run minutes() in a worker thread; the cache is guarded for that.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[TravelTimeProvider] = None,
+        walk_kmh: float = 4.8,
+        transit_kmh: float = 18.0,
+        walk_limit_km: float = 1.5,
+        transit_overhead_min: float = 8.0,
+        detour_factor: float = 1.3,
+        max_entries: int = 128
+    ):
+        self.provider = provider
+        self.walk_kmh = walk_kmh
+        self.transit_kmh = transit_kmh
+        self.walk_limit_km = walk_limit_km
+        self.transit_overhead_min = transit_overhead_min
+        self.detour_factor = detour_factor
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def minutes(self, points: np.ndarray) -> np.ndarray:
+        """(n, n) travel-time matrix in minutes for (n, 2) lat/lng points"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        key = tuple(np.round(points, 5).ravel().tolist())
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        matrix = self.estimate(points)
+        if self.provider is not None:
+            matrix = self._apply_provider(self.provider, points, matrix)
+
+        with self._lock:
+            self._cache[key] = matrix
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return matrix
+
+    def estimate(self, points: np.ndarray) -> np.ndarray:
+        """Walk short hops, take transit for longer ones"""
+        lat, lng = points[:, 0], points[:, 1]
+        km = haversine_km(lat[:, None], lng[:, None], lat[None, :], lng[None, :]) * self.detour_factor
+        walking = km / self.walk_kmh * 60.0
+        transit = km / self.transit_kmh * 60.0 + self.transit_overhead_min
+        return np.where(km <= self.walk_limit_km, walking, np.minimum(walking, transit))
+
+    def _apply_provider(self, provider: TravelTimeProvider, points: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        coords = [tuple(p) for p in points.tolist()]
+        n = len(coords)
+        for row in range(0, n, DISTANCE_MATRIX_BATCH):
+            for col in range(0, n, DISTANCE_MATRIX_BATCH):
+                try:
+                    block = provider(
+                        coords[row:row + DISTANCE_MATRIX_BATCH],
+                        coords[col:col + DISTANCE_MATRIX_BATCH]
+                    )
+                except Exception as e:
+                    logger.warning(f"Travel time lookup failed, using estimates: {e}")
+                    return matrix
+                if block is not None:
+                    block = np.asarray(block, dtype=np.float64)
+                    target = matrix[row:row + block.shape[0], col:col + block.shape[1]]
+                    matrix[row:row + block.shape[0], col:col + block.shape[1]] = np.where(
+                        np.isfinite(block), block, target
+                    )
+        return matrix
+
+
+def google_distance_matrix_provider(client: Any, mode: str = "walking") -> TravelTimeProvider:
+    """Travel-time provider backed by a googlemaps.Client (blocking; call off the event loop)"""
+    def provider(origins, destinations) -> Optional[np.ndarray]:
+        response = client.distance_matrix(origins=list(origins), destinations=list(destinations), mode=mode)
+        block = np.full((len(origins), len(destinations)), np.nan)
+        for i, row in enumerate(response.get("rows", [])):
+            for j, element in enumerate(row.get("elements", [])):
+                if element.get("status") == "OK":
+                    block[i, j] = element["duration"]["value"] / 60.0
+        return block
+    return provider
+
+
+@dataclass
+class DayRoute:
+    """Ordered stops for one day, starting and ending at the hotel"""
+    day: int
+    stops: List[Dict[str, Any]] = field(default_factory=list)
+    travel_minutes: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "day": self.day,
+            "stops": [stop.get("name", "") for stop in self.stops],
+            "travel_minutes": round(self.travel_minutes),
+        }
+
+
+class RouteOptimizer:
+    """
+    Nearest-neighbour tour improved with 2-opt. Node 0 is the start (the
+    hotel); opening-hour windows turn late arrivals into a cost penalty.
+    """
+
+    def __init__(self, visit_minutes: float = 90.0, late_penalty: float = 10.0, max_passes: int = 20):
+        self.visit_minutes = visit_minutes
+        self.late_penalty = late_penalty
+        self.max_passes = max_passes
+
+    def order(
+        self,
+        minutes: np.ndarray,
+        windows: Optional[np.ndarray] = None,
+        day_start: float = DEFAULT_DAY_WINDOW[0],
+        round_trip: bool = True
+    ) -> Tuple[List[int], float]:
+        """Visit order for nodes 1..n-1 and its cost in minutes"""
+        n = len(minutes)
+        if n <= 2:
+            route = list(range(1, n))
+            return route, self.cost(minutes, route, windows, day_start, round_trip)
+
+        route = self._nearest_neighbour(minutes)
+        best = self.cost(minutes, route, windows, day_start, round_trip)
+        for _ in range(self.max_passes):
+            improved = False
+            for i in range(len(route) - 1):
+                for j in range(i + 1, len(route)):
+                    candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                    cost = self.cost(minutes, candidate, windows, day_start, round_trip)
+                    if cost < best - 1e-9:
+                        route, best, improved = candidate, cost, True
+            if not improved:
+                break
+        return route, best
+
+    def cost(
+        self,
+        minutes: np.ndarray,
+        route: Sequence[int],
+        windows: Optional[np.ndarray],
+        day_start: float,
+        round_trip: bool
+    ) -> float:
+        """Travel time plus waiting and lateness penalties for a visit order"""
+        path = [0] + list(route) + ([0] if round_trip else [])
+        legs = minutes[path[:-1], path[1:]]
+        total = float(legs.sum())
+        if windows is None:
+            return total
+
+        clock = day_start
+        for leg, node in zip(legs, path[1:]):
+            clock += leg
+            if node == 0:
+                break
+            opens, closes = windows[node]
+            if closes < opens:
+                closes += 1440  # open past midnight, e.g. 6 PM - 2 AM
+            if np.isfinite(opens) and clock < opens:
+                total += opens - clock
+                clock = opens
+            if np.isfinite(closes) and clock + self.visit_minutes > closes:
+                total += self.late_penalty * (clock + self.visit_minutes - closes)
+            clock += self.visit_minutes
+        return total
+
+    @staticmethod
+    def _nearest_neighbour(minutes: np.ndarray) -> List[int]:
+        unvisited = set(range(1, len(minutes)))
+        route, current = [], 0
+        while unvisited:
+            current = min(unvisited, key=lambda node: minutes[current, node])
+            route.append(current)
+            unvisited.remove(current)
+        return route
+
+
+class RoutePlanner:
+    """Splits places into per-day neighbourhood clusters and routes each day"""
+
+    def __init__(
+        self,
+        travel_times: Optional[TravelTimeMatrix] = None,
+        optimizer: Optional[RouteOptimizer] = None,
+        cell_km: float = 1.5
+    ):
+        self.travel_times = travel_times or TravelTimeMatrix()
+        self.optimizer = optimizer or RouteOptimizer()
+        self.cell_km = cell_km
+
+    def plan_days(
+        self,
+        places: Sequence[Dict[str, Any]],
+        num_days: int,
+        origin: Optional[Tuple[float, float]] = None,
+        stops_per_day: int = 3,
+        day_window: Tuple[int, int] = DEFAULT_DAY_WINDOW
+    ) -> List[DayRoute]:
+        """
+        Assign up to stops_per_day places to each day and order them. Grid
+        cells (neighbourhoods) are swept by bearing from the hotel and cut
+        into days, so each day stays in one part of town; places without
+        coordinates fill the gaps last.
+        """
+        days = [DayRoute(day=d + 1) for d in range(max(num_days, 0))]
+        if not days or not places:
+            return days
+
+        places = list(places)[:num_days * stops_per_day]
+        coords = np.array([extract_coordinates(p) for p in places], dtype=np.float64).reshape(-1, 2)
+        located = np.flatnonzero(np.isfinite(coords).all(axis=1))
+        unlocated = sorted(set(range(len(places))) - set(located.tolist()))
+        origin = origin if origin is not None else hotel_origin({}, coords[located])
+
+        if len(located) and origin is not None:
+            swept = located[self._sweep_order(coords[located], origin)]
+            per_day = max(1, math.ceil(len(swept) / len(days)))
+            for d, day in enumerate(days):
+                chunk = swept[d * per_day:(d + 1) * per_day]
+                if len(chunk):
+                    self._route_day(day, [places[i] for i in chunk], coords[chunk], origin, day_window)
+        else:
+            unlocated = list(range(len(places)))
+
+        for i in unlocated:
+            open_days = [day for day in days if len(day.stops) < stops_per_day] or days
+            min(open_days, key=lambda day: len(day.stops)).stops.append(places[i])
+        return days
+
+    def order_stops(
+        self,
+        places: Sequence[Dict[str, Any]],
+        origin: Optional[Tuple[float, float]] = None,
+        round_trip: bool = False,
+        day_window: Tuple[int, int] = DEFAULT_DAY_WINDOW
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """Order one set of stops; unlocated places are appended unchanged"""
+        places = list(places)
+        coords = np.array([extract_coordinates(p) for p in places], dtype=np.float64).reshape(-1, 2)
+        located = np.flatnonzero(np.isfinite(coords).all(axis=1))
+        if not len(located):
+            return places, 0.0
+        unlocated = sorted(set(range(len(places))) - set(located.tolist()))
+        start = origin if origin is not None else tuple(coords[located[0]])
+        day = DayRoute(day=1)
+        self._route_day(day, [places[i] for i in located], coords[located], start, day_window, round_trip)
+        return day.stops + [places[i] for i in unlocated], day.travel_minutes
+
+    def attach_routes(
+        self,
+        itinerary: List[Dict[str, Any]],
+        places: Sequence[Dict[str, Any]],
+        origin: Optional[Tuple[float, float]] = None,
+        stops_per_day: int = 3
+    ) -> List[Dict[str, Any]]:
+        """Copy of the itinerary with a "route" entry on each day"""
+        if not itinerary or not any(np.isfinite(extract_coordinates(p)).all() for p in places or []):
+            return itinerary
+        routes = self.plan_days(places, len(itinerary), origin, stops_per_day)
+        return [dict(day, route=route.to_dict()) for day, route in zip(itinerary, routes)]
+
+    def _sweep_order(self, coords: np.ndarray, origin: Tuple[float, float]) -> np.ndarray:
+        """Order places by the bearing of their grid cell from the hotel, nearest first within a cell"""
+        index = GridIndex(coords[:, 0], coords[:, 1], cell_km=self.cell_km)
+        cell_bearing = np.empty(len(coords))
+        for members in index.cells.values():
+            centre = coords[members].mean(axis=0)
+            cell_bearing[members] = np.arctan2(centre[1] - origin[1], centre[0] - origin[0])
+        distance = haversine_km(origin[0], origin[1], coords[:, 0], coords[:, 1])
+        return np.lexsort((distance, cell_bearing))
+
+    def _route_day(
+        self,
+        day: DayRoute,
+        stops: List[Dict[str, Any]],
+        coords: np.ndarray,
+        origin: Tuple[float, float],
+        day_window: Tuple[int, int],
+        round_trip: bool = True
+    ):
+        points = np.vstack([np.asarray(origin, dtype=np.float64)[None, :], coords])
+        windows = np.array([(math.nan, math.nan)] + [opening_window(
+            stop.get("opening_hours") or stop.get("hours")
+        ) for stop in stops], dtype=np.float64)
+        minutes = self.travel_times.minutes(points)
+        order, _ = self.optimizer.order(minutes, windows, day_start=day_window[0], round_trip=round_trip)
+        path = [0] + order + ([0] if round_trip else [])
+        day.stops = [stops[node - 1] for node in order]
+        day.travel_minutes = float(minutes[path[:-1], path[1:]].sum())
+
+
+def hotel_origin(hotel_info: Optional[Dict[str, Any]], coords: Optional[np.ndarray] = None) -> Optional[Tuple[float, float]]:
+    """
+    Hotel coordinates from extract_hotel_info output, else the median of
+    the candidate coordinates as a stand-in city centre
+    """
+    if hotel_info:
+        lat, lng = extract_coordinates(hotel_info)
+        if math.isfinite(lat) and math.isfinite(lng):
+            return lat, lng
+    if coords is not None and len(coords):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        coords = coords[np.isfinite(coords).all(axis=1)]
+        if len(coords):
+            return float(np.median(coords[:, 0])), float(np.median(coords[:, 1]))
+    return None
+
+
+def places_origin(hotel_info: Optional[Dict[str, Any]], places: Sequence[Dict[str, Any]]) -> Optional[Tuple[float, float]]:
+    """hotel_origin for a list of place dicts"""
+    coords = np.array([extract_coordinates(p) for p in places or []], dtype=np.float64).reshape(-1, 2)
+    return hotel_origin(hotel_info, coords)
+
+
+# Global instance shared by the guide services
+route_planner = RoutePlanner()
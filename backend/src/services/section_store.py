@@ -0,0 +1,268 @@
+"""
+Section Store
+Per-trip directory of independently stored and versioned JSON section blobs.
+A small manifest records each section's version, size and content hash, so
+an update writes only the sections that actually changed. Large sections are
+stored compressed. Each file is replaced atomically through a FileStore, the
+manifest last, and the manifest's trip version supports optimistic updates.
+"""
+import hashlib
+import logging
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable, Tuple, AsyncContextManager
+
+import aiofiles
+
+from ..core import codec
+from ..core.bounded_cache import BoundedCache
+from ..core.exceptions import ConflictError
+from .file_store import FileStore, KeyedLocks
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_FILE = "manifest.json"
+LAYOUT_VERSION = 2
+
+# Enhanced guide keys with dict/list values are stored as their own blobs
+GUIDE_SECTION_PREFIX = "guide."
+GUIDE_CORE_KEYS_FIELD = "_sections"
+
+
+def split_guide(guide: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(core with scalar fields and the blob index, {blob section name: value})"""
+    core: Dict[str, Any] = {}
+    blobs: Dict[str, Any] = {}
+    for key, value in guide.items():
+        if isinstance(value, (dict, list)):
+            blobs[GUIDE_SECTION_PREFIX + key] = value
+        else:
+            core[key] = value
+    core[GUIDE_CORE_KEYS_FIELD] = [name[len(GUIDE_SECTION_PREFIX):] for name in blobs]
+    return core, blobs
+
+
+def join_guide(core: Dict[str, Any], blobs: Dict[str, Any]) -> Dict[str, Any]:
+    guide = {key: value for key, value in core.items() if key != GUIDE_CORE_KEYS_FIELD}
+    for key in core.get(GUIDE_CORE_KEYS_FIELD, []):
+        guide[key] = blobs.get(GUIDE_SECTION_PREFIX + key)
+    return guide
+
+
+class SectionStore:
+    """
+    Layout: <root>/<trip_id>/manifest.json plus one <section>.json per
+    section. Recently used manifests are cached; section contents are not.
+    Sections of at least compress_min_bytes encoded are stored compressed
+    (None disables); the manifest size stays the uncompressed size.
+    Read-modify-write callers hold lock(trip_id) around the whole cycle.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_manifests: int = 10000,
+        compress_min_bytes: Optional[int] = codec.COMPRESS_MIN_BYTES,
+        files: Optional[FileStore] = None
+    ):
+        self.root = Path(root)
+        self.compress_min_bytes = compress_min_bytes
+        self.files = files or FileStore()
+        self.locks = KeyedLocks()
+        self._manifests: BoundedCache[Dict[str, Any]] = BoundedCache("manifests", max_entries=max_manifests)
+        self.stats = {"sections_written": 0, "sections_unchanged": 0, "sections_compressed": 0, "bytes_written": 0}
+
+    def lock(self, trip_id: str) -> AsyncContextManager[None]:
+        return self.locks.hold(trip_id)
+
+    def trip_dir(self, trip_id: str) -> Path:
+        return self.root / trip_id
+
+    def _section_file(self, trip_id: str, name: str) -> Path:
+        return self.trip_dir(trip_id) / f"{name}.json"
+
+    def exists(self, trip_id: str) -> bool:
+        return trip_id in self._manifests or (self.trip_dir(trip_id) / MANIFEST_FILE).exists()
+
+    def list_ids(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return [p.parent.name for p in self.root.glob(f"*/{MANIFEST_FILE}")]
+
+    async def read_manifest(self, trip_id: str) -> Optional[Dict[str, Any]]:
+        manifest = self._manifests.get(trip_id)
+        if manifest is None:
+            manifest_file = self.trip_dir(trip_id) / MANIFEST_FILE
+            if not manifest_file.exists():
+                return None
+            async with aiofiles.open(manifest_file, 'rb') as f:
+                manifest = codec.loads(await f.read())
+            self._manifests.put(trip_id, manifest)
+        return manifest
+
+    def section_names(self, trip_id: str) -> List[str]:
+        manifest = self._manifests.get(trip_id) or {}
+        return list(manifest.get("sections", {}))
+
+    def section_sizes(self, trip_id: str) -> Dict[str, int]:
+        """Stored bytes per section, from the cached manifest ({} if not cached)"""
+        manifest = self._manifests.get(trip_id) or {}
+        return {name: entry["size"] for name, entry in manifest.get("sections", {}).items()}
+
+    async def read_section(self, trip_id: str, name: str) -> Any:
+        section_file = self._section_file(trip_id, name)
+        if not section_file.exists():
+            return None
+        async with aiofiles.open(section_file, 'rb') as f:
+            return codec.unpack(await f.read())
+
+    def read_section_sync(self, trip_id: str, name: str) -> Any:
+        """Blocking read, for lazy attribute loads outside a coroutine"""
+        section_file = self._section_file(trip_id, name)
+        if not section_file.exists():
+            return None
+        return codec.unpack(section_file.read_bytes())
+
+    async def write_sections(
+        self,
+        trip_id: str,
+        sections: Dict[str, Any],
+        fields: Optional[Dict[str, Any]] = None,
+        remove: Iterable[str] = (),
+        expected_version: Optional[int] = None
+    ) -> List[str]:
+        """
+        Write sections whose content hash changed, drop `remove`, and save
+        the manifest with `fields` merged in and its version bumped. Each
+        file is replaced atomically and the manifest goes last, but the set
+        is not atomic: a crash midway leaves new blobs under the old
+        manifest, and a concurrent reader can pair the old manifest with a
+        new blob. Raises ConflictError if expected_version is given and the
+        trip is at another version. Returns the sections written.
+        """
+        current = await self.check_version(trip_id, expected_version)
+        existing = await self.read_manifest(trip_id)
+        # Work on a copy so a failed commit leaves the cached manifest intact
+        manifest: Dict[str, Any] = codec.loads(codec.dumps(existing)) if existing else {
+            "trip_id": trip_id, "layout": LAYOUT_VERSION, "fields": {}, "sections": {}
+        }
+        self.trip_dir(trip_id).mkdir(parents=True, exist_ok=True)
+        now = datetime.now().isoformat()
+        entries: Dict[str, Dict[str, Any]] = manifest["sections"]
+        written = []
+        files: List[Tuple[Path, bytes]] = []
+
+        for name, value in sections.items():
+            payload = codec.dumps(value)
+            digest = hashlib.md5(payload).hexdigest()
+            entry = entries.get(name)
+            if entry and entry.get("sha") == digest:
+                self.stats["sections_unchanged"] += 1
+                continue
+            stored = payload
+            if self.compress_min_bytes and len(payload) >= self.compress_min_bytes:
+                stored = codec.compress(payload)
+                if len(stored) < len(payload):
+                    self.stats["sections_compressed"] += 1
+                else:
+                    stored = payload
+            files.append((self._section_file(trip_id, name), stored))
+            entries[name] = {
+                "version": (entry or {}).get("version", 0) + 1,
+                "sha": digest,
+                "size": len(payload),
+                "stored_size": len(stored),
+                "updated_at": now,
+            }
+            written.append(name)
+            self.stats["sections_written"] += 1
+            self.stats["bytes_written"] += len(stored)
+
+        removed = [name for name in remove if entries.pop(name, None) is not None]
+        if fields:
+            manifest["fields"].update(fields)
+        manifest["version"] = current + 1
+
+        # The manifest goes last: until it is replaced, readers use the old one
+        files.append((self.trip_dir(trip_id) / MANIFEST_FILE, codec.dumps(manifest)))
+        await self.files.write_many(files)
+        self._manifests.put(trip_id, manifest)
+        for name in removed:
+            self._section_file(trip_id, name).unlink(missing_ok=True)
+        return written
+
+    def guide_sections(
+        self,
+        trip_id: str,
+        section: str,
+        guide: Optional[Dict[str, Any]],
+        changed_keys: Optional[Iterable[str]] = None
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        (sections to write, sections to remove) for storing a guide as a core
+        blob plus one blob per dict/list key. With changed_keys, only those
+        keys' blobs are offered for writing.
+        """
+        core: Optional[Dict[str, Any]] = None
+        blobs: Dict[str, Any] = {}
+        keep: Iterable[str] = ()
+        if guide is not None:
+            core, blobs = split_guide(guide)
+            keep = core[GUIDE_CORE_KEYS_FIELD]
+            if changed_keys is not None:
+                wanted = {GUIDE_SECTION_PREFIX + key for key in changed_keys}
+                blobs = {name: value for name, value in blobs.items() if name in wanted}
+        remove = [
+            name for name in self.section_names(trip_id)
+            if name.startswith(GUIDE_SECTION_PREFIX) and name[len(GUIDE_SECTION_PREFIX):] not in keep
+        ]
+        return {section: core, **blobs}, remove
+
+    async def read_guide(self, trip_id: str, section: str) -> Optional[Dict[str, Any]]:
+        core = await self.read_section(trip_id, section)
+        if core is None:
+            return None
+        blobs: Dict[str, Any] = {}
+        for key in core.get(GUIDE_CORE_KEYS_FIELD, []):
+            blobs[GUIDE_SECTION_PREFIX + key] = await self.read_section(trip_id, GUIDE_SECTION_PREFIX + key)
+        return join_guide(core, blobs)
+
+    def read_guide_sync(self, trip_id: str, section: str) -> Optional[Dict[str, Any]]:
+        core = self.read_section_sync(trip_id, section)
+        if core is None:
+            return None
+        blobs = {
+            GUIDE_SECTION_PREFIX + key: self.read_section_sync(trip_id, GUIDE_SECTION_PREFIX + key)
+            for key in core.get(GUIDE_CORE_KEYS_FIELD, [])
+        }
+        return join_guide(core, blobs)
+
+    async def version(self, trip_id: str) -> int:
+        """Trip version, bumped by every write_sections (0 if not stored)"""
+        manifest = await self.read_manifest(trip_id) or {}
+        return manifest.get("version", 0)
+
+    async def check_version(self, trip_id: str, expected_version: Optional[int]) -> int:
+        """Current trip version; raises ConflictError if it is not expected_version (when given)"""
+        current = await self.version(trip_id)
+        if expected_version is not None and expected_version != current:
+            raise ConflictError(
+                f"Trip {trip_id} is at version {current}, expected {expected_version}",
+                resource=trip_id, expected_version=expected_version, actual_version=current
+            )
+        return current
+
+    async def versions(self, trip_id: str) -> Dict[str, int]:
+        manifest = await self.read_manifest(trip_id) or {}
+        return {name: entry["version"] for name, entry in manifest.get("sections", {}).items()}
+
+    def delete(self, trip_id: str) -> None:
+        self._manifests.pop(trip_id, None)
+        trip_dir = self.trip_dir(trip_id)
+        if trip_dir.exists():
+            shutil.rmtree(trip_dir)
+
+    def modified_at(self, trip_id: str) -> float:
+        return (self.trip_dir(trip_id) / MANIFEST_FILE).stat().st_mtime
@@ -19,6 +19,7 @@ from .interfaces import (
 )
 from .enhanced_database_service import EnhancedDatabaseService
 from .enhanced_llm_service import EnhancedLLMService
+from .llm_router import LLMRouter, service_route
 from .google_weather_service import GoogleWeatherService
 from .enhanced_pdf_processor import EnhancedPDFProcessor
 from ..core.exceptions import ConfigurationError, ServiceError
@@ -44,6 +45,7 @@ class ServiceFactory:
     def __init__(self):
         self.settings = get_settings()
         self._service_configs: Dict[str, ServiceConfig] = {}
+        self._llm_router: Optional[LLMRouter] = None
         self._initialized = False
     
     async def initialize(self) -> None:
@@ -200,6 +202,17 @@ class ServiceFactory:
             return service
         return None
 
+    def get_llm_router(self) -> LLMRouter:
+        """Router over every registered LLM service, built on first use"""
+        if self._llm_router is None:
+            routes = []
+            for provider in LLMProvider:
+                service = self.get_llm_service(provider)
+                if isinstance(service, EnhancedLLMService):
+                    routes.append(service_route(service, service.default_model))
+            self._llm_router = LLMRouter(routes)
+        return self._llm_router
+
     def get_weather_service(self, service_name: str = "default") -> Optional[WeatherServiceInterface]:
         """Get a weather service"""
         service = service_registry.get(f"weather_{service_name}")
@@ -347,6 +360,10 @@ class ServiceFactory:
             return self.settings.services.anthropic_enabled and bool(self.settings.services.anthropic_api_key)
         elif provider == LLMProvider.PERPLEXITY:
             return self.settings.services.perplexity_enabled and bool(self.settings.services.perplexity_api_key)
+        elif provider == LLMProvider.XAI:
+            return self.settings.services.xai_enabled and bool(self.settings.services.xai_api_key)
+        elif provider == LLMProvider.SAMBANOVA:
+            return self.settings.services.sambanova_enabled and bool(self.settings.services.sambanova_api_key)
         else:
             return False
     
@@ -358,6 +375,10 @@ class ServiceFactory:
             return self.settings.services.anthropic_timeout
         elif provider == LLMProvider.PERPLEXITY:
             return self.settings.services.perplexity_timeout
+        elif provider == LLMProvider.XAI:
+            return self.settings.services.xai_timeout
+        elif provider == LLMProvider.SAMBANOVA:
+            return self.settings.services.sambanova_timeout
         else:
             return 60
     
@@ -390,6 +411,14 @@ async def get_llm_service(provider: Union[LLMProvider, str]) -> LLMServiceInterf
     return await service_factory.get_or_create_llm_service(provider)
 
 
+async def get_llm_router() -> LLMRouter:
+    """Get the latency/cost-aware router over all enabled LLM providers"""
+    if not service_factory._initialized:
+        await service_factory.initialize()
+
+    return service_factory.get_llm_router()
+
+
 async def get_weather_service(service_name: str = "default") -> WeatherServiceInterface:
     """Get weather service"""
     if not service_factory._initialized:
@@ -0,0 +1,171 @@
+"""
+Streaming JSON Parsing
+Incremental parser for JSON arriving in LLM token chunks. Objects inside the
+top-level array (or inside the arrays/objects held by a top-level object's
+properties) are emitted as soon as their closing brace arrives, so callers
+can store and forward restaurants, attractions and events while the rest of
+the response is still generating. Only the item currently open is buffered.
+"""
+import json
+import logging
+import re
+from typing import List, Optional, Any, AsyncIterator, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Characters that matter outside a string; before the root only openers do,
+# so prose and code fences ahead of the JSON are skipped
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_ROOT_START = re.compile(r'[{\[]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+# Perplexity citation markers that sometimes land between JSON values
+_CITATION = re.compile(r"\[\d+\]")
+
+JSONEvent = Tuple[Optional[str], Any]
+
+
+class JSONItemStream:
+    """
+    Feed text chunks, get (key, value) events back.
+
+    - Root array: every object element is emitted with key None.
+    - Root object: elements of array-valued properties are emitted with the
+      property name as key; object-valued properties are emitted whole.
+
+    Text around the root (markdown fences, prose, citation markers) is
+    ignored, and a new root is looked for once one closes. With
+    strip_citations, [n] markers are also removed inside items, matching
+    how buffered Perplexity responses are cleaned.
+    """
+
+    def __init__(self, strip_citations: bool = False):
+        self.strip_citations = strip_citations
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        # Property of the root object currently being read
+        self._key_parts: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        self._member_key: Optional[str] = None
+        # Item currently being captured
+        self._capture_parts: Optional[List[str]] = None
+        self._capture_depth = 0
+        self._capture_key: Optional[str] = None
+        self.items = 0
+        self.errors = 0
+
+    def feed(self, chunk: str) -> List[JSONEvent]:
+        """Consume one chunk and return the events it completed"""
+        events: List[JSONEvent] = []
+        capture_from = 0 if self._capture_parts is not None else None
+        key_from = 0 if self._key_parts is not None else None
+        i, n = 0, len(chunk)
+
+        while i < n:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(chunk, i)
+                if match is None:
+                    break
+                i = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                    continue
+                self._in_string = False
+                if key_from is not None and self._key_parts is not None:
+                    self._key_parts.append(chunk[key_from:i - 1])
+                    self._finish_key()
+                    key_from = None
+                continue
+
+            match = (_STRUCTURAL if self._stack else _ROOT_START).search(chunk, i)
+            if match is None:
+                break
+            char, start, i = match.group(), match.start(), match.end()
+
+            if char == '"':
+                self._in_string = True
+                if self._capture_parts is None and self._stack == ["{"]:
+                    self._key_parts = []
+                    key_from = i
+                continue
+
+            if char in "{[":
+                depth = len(self._stack)
+                if depth == 1 and self._stack[0] == "{":
+                    self._member_key = self._last_key
+                if self._capture_parts is None and char == "{" and self._captures(depth):
+                    self._capture_parts = []
+                    self._capture_depth = depth
+                    self._capture_key = None if self._stack == ["["] else self._member_key
+                    capture_from = start
+                self._stack.append(char)
+                continue
+
+            if not self._stack:
+                continue
+            self._stack.pop()
+            if self._capture_parts is not None and len(self._stack) == self._capture_depth:
+                self._capture_parts.append(chunk[capture_from:i])
+                event = self._finish_capture()
+                if event is not None:
+                    events.append(event)
+                capture_from = None
+            if not self._stack:
+                self._last_key = self._member_key = None
+
+        if capture_from is not None and self._capture_parts is not None:
+            self._capture_parts.append(chunk[capture_from:])
+        if key_from is not None and self._key_parts is not None:
+            self._key_parts.append(chunk[key_from:])
+        return events
+
+    def _captures(self, depth: int) -> bool:
+        """Whether an object opening at this depth is an item to emit"""
+        if depth == 1:
+            return True  # element of the root array or value of a root property
+        return depth == 2 and self._stack == ["{", "["]
+
+    def _finish_key(self) -> None:
+        raw = "".join(self._key_parts or [])
+        self._key_parts = None
+        try:
+            self._last_key = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            self._last_key = raw
+
+    def _finish_capture(self) -> Optional[JSONEvent]:
+        text = "".join(self._capture_parts or [])
+        self._capture_parts = None
+        if self.strip_citations:
+            text = _CITATION.sub("", text)
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            try:
+                value = json.loads(_CITATION.sub("", text))
+            except json.JSONDecodeError as e:
+                self.errors += 1
+                logger.debug(f"Skipping malformed streamed item ({e}): {text[:120]}")
+                return None
+        self.items += 1
+        return self._capture_key, value
+
+
+def parse_json_items(chunks: Iterable[str], strip_citations: bool = False) -> List[JSONEvent]:
+    """All events from an already-available sequence of chunks"""
+    stream = JSONItemStream(strip_citations)
+    return [event for chunk in chunks for event in stream.feed(chunk)]
+
+
+async def iter_json_items(chunks: AsyncIterator[str], strip_citations: bool = False) -> AsyncIterator[JSONEvent]:
+    """Async generator of events as an LLM token stream produces them"""
+    stream = JSONItemStream(strip_citations)
+    async for chunk in chunks:
+        for event in stream.feed(chunk):
+            yield event
@@ -4,14 +4,21 @@ Improved trip data management with better organization and retrieval
 """
 
 import os
-import json
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 import aiofiles
 import asyncio
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
+
+from ..core import codec
+from .section_store import SectionStore, GUIDE_SECTION_PREFIX
+from .file_store import FileStore, sweep_temp_files
+
+# Trip document keys that are not stored as sections
+TRIP_FIELDS = ("trip_id", "metadata")
+GUIDE_SECTION = "enhanced_guide"
 
 @dataclass
 class TripMetadata:
@@ -24,10 +31,11 @@ class TripMetadata:
     updated_at: str
     status: str  # "processing", "completed", "error"
     profile_id: Optional[str] = None
-    travelers: List[str] = None
-    tags: List[str] = None
+    travelers: List[str] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
     
     def __post_init__(self):
+        # Stored metadata may carry explicit nulls
         if self.travelers is None:
             self.travelers = []
         if self.tags is None:
@@ -37,7 +45,7 @@ class TripStorageService:
     """
     Manages trip data storage with improved organization:
     - Separate metadata for quick listing
-    - Full trip data stored separately
+    - Full trip data stored separately, one versioned blob per section
     - Profile associations
     - Better search and filtering
     """
@@ -53,6 +61,11 @@ class TripStorageService:
         self.data_path.mkdir(parents=True, exist_ok=True)
         self.uploads_path.mkdir(parents=True, exist_ok=True)
         
+        # Files are replaced atomically; writes to one trip are serialised
+        self.files = FileStore()
+        self.sections = SectionStore(self.data_path, files=self.files)
+        sweep_temp_files(self.base_path)
+        
         # Cache for metadata
         self._metadata_cache: Dict[str, TripMetadata] = {}
         self._load_metadata_cache()
@@ -61,8 +74,8 @@ class TripStorageService:
         """Load all metadata into cache for quick access"""
         try:
             for file in self.metadata_path.glob("*.json"):
-                with open(file, 'r') as f:
-                    data = json.load(f)
+                with open(file, 'rb') as f:
+                    data = codec.loads(f.read())
                     self._metadata_cache[data["trip_id"]] = TripMetadata(**data)
         except Exception as e:
             print(f"Error loading metadata cache: {e}")
@@ -108,21 +121,30 @@ class TripStorageService:
         """Save trip metadata"""
         metadata_file = self.metadata_path / f"{metadata.trip_id}.json"
         
-        async with aiofiles.open(metadata_file, 'w') as f:
-            await f.write(json.dumps(asdict(metadata), indent=2))
+        await self.files.write(metadata_file, codec.dumps(asdict(metadata)))
         
         # Update cache
         self._metadata_cache[metadata.trip_id] = metadata
     
     async def save_trip_data(self, trip_id: str, data: Dict):
-        """Save full trip data"""
-        data_file = self.data_path / f"{trip_id}.json"
-        
+        """Save full trip data; sections whose content is unchanged are not rewritten"""
+        async with self.sections.lock(trip_id):
+            await self._save_trip_data(trip_id, data)
+    
+    async def _save_trip_data(self, trip_id: str, data: Dict):
         # Update timestamp
         data["metadata"]["updated_at"] = datetime.now().isoformat()
         
-        async with aiofiles.open(data_file, 'w') as f:
-            await f.write(json.dumps(data, indent=2, default=str))
+        await self.sections.read_manifest(trip_id)
+        sections = {key: value for key, value in data.items() if key not in TRIP_FIELDS and key != GUIDE_SECTION}
+        remove: List[str] = []
+        if GUIDE_SECTION in data:
+            guide_sections, remove = self.sections.guide_sections(trip_id, GUIDE_SECTION, data[GUIDE_SECTION])
+            sections.update(guide_sections)
+        await self.sections.write_sections(trip_id, sections, remove=remove)
+        
+        # Trips stored as a single document migrate on first save
+        (self.data_path / f"{trip_id}.json").unlink(missing_ok=True)
         
         # Update metadata cache if metadata changed
         if "metadata" in data:
@@ -131,14 +153,26 @@ class TripStorageService:
     
     async def get_trip(self, trip_id: str) -> Optional[Dict]:
         """Get full trip data"""
-        data_file = self.data_path / f"{trip_id}.json"
-        
-        if not data_file.exists():
-            return None
+        manifest = await self.sections.read_manifest(trip_id)
+        if manifest is None:
+            data_file = self.data_path / f"{trip_id}.json"
+            if not data_file.exists():
+                return None
+            
+            async with aiofiles.open(data_file, 'rb') as f:
+                content = await f.read()
+                return codec.loads(content)
         
-        async with aiofiles.open(data_file, 'r') as f:
-            content = await f.read()
-            return json.loads(content)
+        trip: Dict[str, Any] = {"trip_id": trip_id}
+        metadata = self._metadata_cache.get(trip_id)
+        if metadata:
+            trip["metadata"] = asdict(metadata)
+        for section in self.sections.section_names(trip_id):
+            if section == GUIDE_SECTION:
+                trip[section] = await self.sections.read_guide(trip_id, section)
+            elif not section.startswith(GUIDE_SECTION_PREFIX):
+                trip[section] = await self.sections.read_section(trip_id, section)
+        return trip
     
     async def get_trip_metadata(self, trip_id: str) -> Optional[TripMetadata]:
         """Get trip metadata only (fast)"""
@@ -197,13 +231,22 @@ class TripStorageService:
             await self.save_metadata(metadata)
     
     async def add_to_trip(self, trip_id: str, section: str, data: Any):
-        """Add data to a specific section of the trip"""
-        trip = await self.get_trip(trip_id)
-        if not trip:
-            return False
-        
-        # Update the specific section
-        trip[section] = data
+        """Add data to a specific section of the trip, writing only that section"""
+        async with self.sections.lock(trip_id):
+            if await self.sections.read_manifest(trip_id) is None:
+                # Single-document trip: migrate it, then update the section
+                trip = await self.get_trip(trip_id)
+                if not trip:
+                    return False
+                await self._save_trip_data(trip_id, trip)
+            
+            # Update the specific section
+            remove: List[str] = []
+            if section == GUIDE_SECTION:
+                sections, remove = self.sections.guide_sections(trip_id, section, data)
+            else:
+                sections = {section: data}
+            await self.sections.write_sections(trip_id, sections, remove=remove)
         
         # If updating extracted data, update metadata
         if section == "extracted_data" and isinstance(data, dict):
@@ -217,9 +260,11 @@ class TripStorageService:
                     metadata.end_date = data["end_date"]
                 if "travelers" in data:
                     metadata.travelers = data.get("travelers", [])
-                await self.save_metadata(metadata)
         
-        await self.save_trip_data(trip_id, trip)
+        metadata = self._metadata_cache.get(trip_id)
+        if metadata:
+            metadata.updated_at = datetime.now().isoformat()
+            await self.save_metadata(metadata)
         return True
     
     async def delete_trip(self, trip_id: str) -> bool:
@@ -232,8 +277,10 @@ class TripStorageService:
             
             # Delete data
             data_file = self.data_path / f"{trip_id}.json"
-            if data_file.exists():
-                data_file.unlink()
+            async with self.sections.lock(trip_id):
+                if data_file.exists():
+                    data_file.unlink()
+                self.sections.delete(trip_id)
             
             # Delete uploads
             upload_dir = self.uploads_path / trip_id
@@ -272,8 +319,8 @@ class TripStorageService:
         """Get statistics about stored trips"""
         total_trips = len(self._metadata_cache)
         
-        status_counts = {}
-        destination_counts = {}
+        status_counts: Dict[str, int] = {}
+        destination_counts: Dict[str, int] = {}
         
         for metadata in self._metadata_cache.values():
             # Count by status
@@ -286,7 +333,7 @@ class TripStorageService:
         
         # Calculate storage size
         total_size = 0
-        for file in self.data_path.glob("*.json"):
+        for file in self.data_path.rglob("*.json"):
             total_size += file.stat().st_size
         
         return {
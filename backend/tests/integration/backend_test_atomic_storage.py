@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Test crash-safe file storage under concurrency: readers never see a partial
+document, concurrent guide updates to one trip are not lost, stale updates
+are rejected by version, fsyncs are group-committed and interrupted writes
+leave the previous file in place (no API keys needed)
+"""
+import os
+import sys
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = str(Path(_tmp.name) / "data")
+os.environ["DB_BACKUP_PATH"] = str(Path(_tmp.name) / "backups")
+os.environ["DB_FSYNC"] = "group"
+os.environ["DB_GROUP_COMMIT_MS"] = "5"
+
+from src.core import codec
+from src.models.database_models import TripData
+from src.services.enhanced_database_service import EnhancedDatabaseService
+from src.services.file_store import FileStore, KeyedLocks
+from src.services.trip_storage import TripStorageService
+
+
+async def make_service() -> EnhancedDatabaseService:
+    service = EnhancedDatabaseService()
+    await service.initialize()
+    return service
+
+
+async def test_readers_never_see_partial_files():
+    store = FileStore()
+    path = Path(_tmp.name) / "hot.json"
+    await store.write(path, codec.dumps({"rev": 0}))
+    documents = [codec.dumps({"rev": i, "places": ["x" * 200] * (500 + i % 7 * 300)}) for i in range(1, 60)]
+
+    torn = []
+    reads = [0]
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                codec.loads(path.read_bytes())
+                reads[0] += 1
+            except ValueError:
+                torn.append(1)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for document in documents:
+        await store.write(path, document)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not torn, f"{len(torn)} partial reads"
+    assert codec.loads(path.read_bytes())["rev"] == 59
+    assert not list(path.parent.glob(".hot.json.*")), "no temporary files left behind"
+    print(f"✅ {reads[0]} concurrent reads during {len(documents)} rewrites, none partial")
+
+
+async def test_concurrent_guide_updates_are_not_lost():
+    service = await make_service()
+    trip = TripData("busy-trip", itinerary={"trip_summary": {"destination": "Oslo"}},
+                    enhanced_guide={"destination": "Oslo", "weather": []})
+    assert (await service.save_trip_data(trip)).success
+
+    async def regenerate(i: int):
+        section = {f"section_{i}": [{"name": f"Item {i}"}], "section_meta": {f"section_{i}": {"fetched_at": i}}}
+        return await service.save_enhanced_guide_data("busy-trip", section, merge=True)
+
+    results = await asyncio.gather(*(regenerate(i) for i in range(25)))
+    assert all(r.success for r in results)
+    assert service.section_store.locks.contended > 0, "updates really overlapped"
+
+    service._trip_cache.clear()
+    service.section_store._manifests.clear()
+    guide = await service.get_enhanced_guide("busy-trip")
+    assert all(f"section_{i}" in guide for i in range(25)), "every concurrent section survived"
+    assert set(guide["section_meta"]) == {f"section_{i}" for i in range(25)}
+    assert len(service.section_store.locks) == 0, "trip locks are dropped when idle"
+    print(f"✅ 25 concurrent merges kept every section ({service.section_store.locks.contended} waited for the lock)")
+
+
+async def test_optimistic_versions():
+    service = await make_service()
+    version = await service.get_trip_version("busy-trip")
+    assert version and await service.get_trip_version("no-such-trip") is None
+
+    first = await service.update_trip_data("busy-trip", expected_version=version, itinerary={"notes": "first"})
+    assert first.success and first.data["version"] == version + 1
+
+    stale = await service.update_trip_data("busy-trip", expected_version=version, itinerary={"notes": "stale"})
+    assert not stale.success and stale.metadata["conflict"]
+    assert stale.metadata["actual_version"] == version + 1
+    assert (await service.get_trip_data("busy-trip")).itinerary == {"notes": "first"}, "a rejected update changes nothing"
+
+    unconditional = await service.update_trip_data("busy-trip", itinerary={"notes": "last"})
+    assert unconditional.success and unconditional.data["version"] == version + 2
+    print("✅ Updates carrying a stale version are rejected with a conflict")
+
+
+async def test_group_commit():
+    service = await make_service()
+    files = service.files
+    before = dict(files.stats)
+    trips = [TripData(f"group-{i}", itinerary={"trip_summary": {"destination": f"City {i}"}}) for i in range(40)]
+    results = await asyncio.gather(*(service.save_trip_data(trip) for trip in trips))
+    assert all(r.success for r in results)
+
+    commits = files.stats["commits"] - before["commits"]
+    batches = files.stats["batches"] - before["batches"]
+    assert commits >= 80 and batches < commits / 4, (commits, batches)
+    assert files.stats["largest_batch"] >= 10
+    stats = await service.get_storage_stats()
+    assert stats["file_commits"]["fsync"] == "group"
+    print(f"✅ {commits} commits (with fsync) shared {batches} group commits")
+
+
+async def test_interrupted_writes():
+    service = await make_service()
+    manifest_file = service.trips_path / "group-0" / "manifest.json"
+    before = manifest_file.read_bytes()
+
+    # A commit that fails part way (its second file cannot be written) changes nothing
+    store = FileStore(fsync="always")
+    try:
+        await store.write_many([(manifest_file, b'{"broken":'), (service.trips_path / "missing" / "x.json", b"{}")])
+        raise AssertionError("expected the commit to fail")
+    except FileNotFoundError:
+        pass
+    assert manifest_file.read_bytes() == before
+    assert not list(manifest_file.parent.glob(".*.tmp"))
+
+    # Temporary files of a crashed process are swept on startup
+    (manifest_file.parent / ".itinerary.json.0123456789ab.tmp").write_bytes(b'{"half')
+    await make_service()
+    assert not list(service.trips_path.rglob(".*.tmp"))
+    print("✅ Failed commits keep the previous files; crash leftovers are swept on startup")
+
+
+async def test_trip_storage_service():
+    storage = TripStorageService(str(Path(_tmp.name) / "trip_storage"))
+    trip_id = await storage.create_trip({"destination": "Lima", "itinerary": {"days": []}})
+    await asyncio.gather(*(
+        storage.add_to_trip(trip_id, f"notes_{i}", {"text": f"note {i}"}) for i in range(20)
+    ))
+    trip = await storage.get_trip(trip_id)
+    assert all(trip[f"notes_{i}"] == {"text": f"note {i}"} for i in range(20))
+    assert await storage.sections.version(trip_id) == 21
+
+    locks = KeyedLocks()
+    order = []
+
+    async def hold(tag: str):
+        async with locks.hold("k"):
+            order.append(f"{tag}+")
+            await asyncio.sleep(0.001)
+            order.append(f"{tag}-")
+
+    await asyncio.gather(hold("a"), hold("b"))
+    assert order == ["a+", "a-", "b+", "b-"] and len(locks) == 0
+    print("✅ TripStorageService serialises section updates per trip")
+
+
+async def main():
+    print("🔒 Testing atomic file storage\n" + "=" * 50)
+    try:
+        await test_readers_never_see_partial_files()
+        await test_concurrent_guide_updates_are_not_lost()
+        await test_optimistic_versions()
+        await test_group_commit()
+        await test_interrupted_writes()
+        await test_trip_storage_service()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All atomic storage checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
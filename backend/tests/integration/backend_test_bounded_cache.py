@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test the bounded caches behind EnhancedDatabaseService: LRU eviction by
+entries and estimated bytes, TTL expiry, invalidation on write/delete and
+the cache gauges in get_storage_stats (no API keys needed)
+"""
+import os
+import sys
+import asyncio
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = str(Path(_tmp.name) / "data")
+os.environ["DB_BACKUP_PATH"] = str(Path(_tmp.name) / "backups")
+os.environ["DB_TRIP_CACHE_BYTES"] = str(4 * 1024 * 1024)
+os.environ["DB_METADATA_CACHE_SIZE"] = "20"
+
+from src.core.bounded_cache import BoundedCache
+from src.models.database_models import TripData, ProcessingStatus
+from src.services.enhanced_database_service import EnhancedDatabaseService
+
+
+def test_lru_and_budgets():
+    cache = BoundedCache("demo", max_entries=3, max_bytes=100, sizer=len)
+    for key in "abc":
+        cache.put(key, "x" * 20)
+    cache.get("a")
+    cache.put("d", "x" * 20)
+    assert "b" not in cache and "a" in cache, "least recently used entry goes first"
+
+    cache.put("e", "x" * 70)
+    assert cache.bytes <= 100 and "e" in cache
+    cache.put("huge", "x" * 500)
+    assert "huge" not in cache and cache.stats()["rejected"] == 1
+
+    value = ["x" * 10]
+    cache.put("grows", value)
+    value.append("y" * 95)  # grows in place
+    cache.sizer = lambda v: sum(len(s) for s in v) if isinstance(v, list) else len(v)
+    cache.resize("grows")
+    assert "grows" not in cache and cache.bytes <= 100
+
+    ttl = BoundedCache("ttl", ttl_seconds=0.05)
+    ttl.put("k", 1)
+    assert ttl.get("k") == 1
+    time.sleep(0.06)
+    assert ttl.get("k") is None and ttl.stats()["expirations"] == 1
+    print("✅ LRU eviction by entries and bytes, oversize rejection, resize and TTL expiry")
+
+
+def guide(i: int) -> dict:
+    return {
+        "destination": f"City {i}",
+        "restaurants": [{"name": f"Place {j}", "description": "z" * 300} for j in range(300)],
+        "weather": [{"temp": 20}],
+    }
+
+
+async def test_service_stays_within_budget():
+    service = EnhancedDatabaseService()
+    await service.initialize()
+    budget = service._trip_cache.max_bytes
+
+    tracemalloc.start()
+    for i in range(60):
+        trip = TripData(
+            trip_id=f"trip-{i}",
+            itinerary={"trip_summary": {"destination": f"City {i}"}},
+            enhanced_guide=guide(i),
+        )
+        assert (await service.save_trip_data(trip)).success
+        for j in range(max(0, i - 5), i + 1):
+            await service.get_enhanced_guide(f"trip-{j}")
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    trips = service._trip_cache
+    assert trips.bytes <= budget, (trips.bytes, budget)
+    assert trips.evictions > 0 and len(trips) < 60
+    assert len(service._metadata_cache) <= 20
+
+    listed = await service.list_trips()
+    assert len(listed) == 60, "listing falls back to disk once metadata was evicted"
+
+    guide_again = await service.get_enhanced_guide("trip-0")
+    assert guide_again["destination"] == "City 0", "evicted trips are reloaded from disk"
+
+    stats = await service.get_storage_stats()
+    caches = stats["caches"]
+    assert set(caches) == {"trips", "metadata", "processing"}
+    assert caches["trips"]["bytes"] == trips.bytes and caches["trips"]["entries"] == len(trips)
+    print(f"✅ 60 trips served; trip cache holds {len(trips)} ({trips.bytes / 1e6:.1f}MB of "
+          f"{budget / 1e6:.1f}MB), traced memory {current / 1e6:.1f}MB (peak {peak / 1e6:.1f}MB)")
+
+
+async def test_invalidation():
+    service = EnhancedDatabaseService()
+    await service.initialize()
+    trip = await service.get_trip_data("trip-59", sections=("enhanced_guide",))
+    before = service._trip_cache.bytes
+
+    assert await service.save_enhanced_guide("trip-59", {"destination": "Renamed", "weather": []})
+    cached = service._trip_cache.get("trip-59")
+    assert cached is trip and trip.enhanced_guide["destination"] == "Renamed", "the cached trip is updated in place"
+    assert service._trip_cache.bytes < before, "cache accounting follows the smaller guide"
+
+    await service.delete_trip_data("trip-59")
+    assert "trip-59" not in service._trip_cache and "trip-59" not in service._metadata_cache
+    assert await service.get_trip_data("trip-59") is None
+
+    await service.create_processing_state("trip-58", "working")
+    await service.update_processing_state("trip-58", status=ProcessingStatus.COMPLETED)
+    assert "trip-58" in service._processing_cache
+    await service.delete_processing_state("trip-58")
+    assert "trip-58" not in service._processing_cache
+    print("✅ Writes update and deletes invalidate cached trips, metadata and processing states")
+
+
+async def main():
+    print("🧠 Testing bounded database caches\n" + "=" * 50)
+    try:
+        test_lru_and_budgets()
+        await test_service_stays_within_budget()
+        await test_invalidation()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All bounded cache checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test candidate ranking: opening-hours windows (including noon and midnight
+spelled as 12), category columns derived per vocabulary, and personalization
+of a cached pool reusing its feature matrix across travelers until the pool
+is refetched
+"""
+import asyncio
+import copy
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services import guide_personalization
+from src.services.candidate_ranking import CandidateMatrix, opening_window
+from src.services.guide_personalization import (
+    INTEREST_KEYWORDS, GuidePersonalizer, profile_from_preferences, restaurant_categories
+)
+
+CUISINES = ["Thai", "Italian", "Vegan", "Portuguese", "Japanese"]
+POOL = {
+    "restaurants": [
+        {
+            "name": f"Restaurant {i}",
+            "cuisine": CUISINES[i % len(CUISINES)],
+            "rating": 3.5 + (i % 15) / 10,
+            "review_count": 40 * i,
+            "price_range": "$" * (1 + i % 4),
+            "hours": "12-3pm" if i % 2 else "6:00 PM – 11:00 PM",
+            "latitude": 38.71 + i / 1000,
+            "longitude": -9.14 - i / 1000,
+        }
+        for i in range(40)
+    ],
+    "attractions": [
+        {"name": f"Site {i}", "type": ["museum", "park", "viewpoint"][i % 3], "rating": 4.0 + (i % 9) / 10}
+        for i in range(20)
+    ],
+    "events": [{"name": f"Concert {i}", "type": "music"} for i in range(6)],
+}
+
+
+def test_opening_windows():
+    cases = {
+        "12-3pm": (720, 900),
+        "12:30-2pm": (750, 840),
+        "12-3am": (0, 180),
+        "11-12pm": (660, 720),
+        "9am-12pm": (540, 720),
+        "9-5pm": (540, 1020),
+        "1-5pm": (780, 1020),
+        "11-2pm": (660, 840),
+        "6:00 PM – 2:00 AM": (1080, 120),
+        "Open 24 hours": (0, 1440),
+    }
+    for text, expected in cases.items():
+        assert opening_window(text) == expected, (text, opening_window(text))
+    assert all(np.isnan(opening_window("Closed")))
+    print(f"✅ {len(cases)} opening-hours ranges parse, 12 meaning noon before a pm close")
+
+
+def test_category_columns():
+    profile = profile_from_preferences({"cuisineTypes": ["Thai", "Vegan"]})
+    vocabulary = restaurant_categories(profile)
+    direct = CandidateMatrix.from_candidates(POOL["restaurants"], vocabulary)
+    base = CandidateMatrix.from_candidates(POOL["restaurants"])
+    derived = base.with_categories(vocabulary)
+    assert derived.category_names == direct.category_names
+    assert np.array_equal(derived.categories, direct.categories) and derived.categories.any()
+    assert base.categories.shape == (40, 0), "deriving columns leaves the base matrix alone"
+
+    columns = len(base.columns)
+    again = base.with_categories(vocabulary)
+    assert len(base.columns) == columns and np.array_equal(again.categories, direct.categories)
+    interests = base.with_categories(INTEREST_KEYWORDS)
+    assert interests.category_names == tuple(INTEREST_KEYWORDS) and len(base.columns) > columns
+    print("✅ Category columns derived from a base matrix match a direct extraction and are computed once")
+
+
+def test_cached_pool_matrix():
+    personalizer = GuidePersonalizer()
+    extractions = []
+    original = CandidateMatrix.__dict__["from_candidates"]
+
+    def counting(cls, candidates, *args, **kwargs):
+        extractions.append(len(candidates))
+        return original.__func__(cls, candidates, *args, **kwargs)
+
+    travelers = [
+        {"cuisineTypes": ["Thai"], "budget": "budget"},
+        {"cuisineTypes": ["Italian", "Vegan"], "budget": "luxury", "interests": {"art": True}},
+        {"cuisineTypes": ["Japanese"], "groupType": "family"},
+    ]
+    guide_personalization.CandidateMatrix.from_candidates = classmethod(counting)
+    try:
+        uncached = [personalizer.personalize_pool(POOL, t) for t in travelers]
+        extractions.clear()
+        cached = [personalizer.personalize_pool(POOL, t, pool_key=("test", "lisbon")) for t in travelers]
+        assert extractions == [40, 20, 6], f"one extraction per section for three travelers: {extractions}"
+        for a, b in zip(uncached, cached):
+            for section in ("restaurants", "attractions", "events"):
+                assert a[section] == b[section], section
+        assert cached[0]["restaurants"] != cached[1]["restaurants"], "each traveler is still scored separately"
+
+        extractions.clear()
+        refetched = copy.deepcopy(POOL)
+        personalizer.personalize_pool(refetched, travelers[0], pool_key=("test", "lisbon"))
+        assert extractions == [40, 20, 6], "a refetched pool under the same key is extracted again"
+    finally:
+        guide_personalization.CandidateMatrix.from_candidates = original
+    print(f"✅ A cached pool is extracted once and re-scored per traveler ({personalizer._matrices.stats()['hits']} hits)")
+
+
+async def main():
+    print("🍽️  Testing candidate ranking\n" + "=" * 50)
+    test_opening_windows()
+    test_category_columns()
+    test_cached_pool_matrix()
+    print("\n🎉 All candidate ranking checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
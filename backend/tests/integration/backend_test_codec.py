@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test the central codec: compact round trips of the storage models, reads of
+pretty-printed files written before it, compression of large section blobs
+and cache values, and the ORJSONResponse default (no API keys needed)
+"""
+import os
+import sys
+import asyncio
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = str(Path(_tmp.name) / "data")
+os.environ["DB_BACKUP_PATH"] = str(Path(_tmp.name) / "backups")
+os.environ["DB_COMPRESS_MIN_BYTES"] = "4096"
+
+from src.core import codec
+from src.models.database_models import TripData, TripMetadata, ProcessingState, ProcessingStatus
+from src.services.enhanced_database_service import EnhancedDatabaseService
+
+
+def guide() -> dict:
+    return {
+        "destination": "Kyoto",
+        "restaurants": [{"name": f"Izakaya {i}", "description": "Grilled skewers and sake " * 8} for i in range(200)],
+        "weather": [{"date": "2026-11-01", "temp": 14}],
+    }
+
+
+def test_round_trips():
+    value = {"text": "Café ☕", "when": datetime(2026, 11, 1, 9, 30), 7: "int key", "nested": [1.5, None, True]}
+    payload = codec.dumps(value)
+    assert b"\n" not in payload and b": " not in payload, "output is compact"
+    decoded = codec.loads(payload)
+    assert decoded["text"] == "Café ☕" and decoded["7"] == "int key"
+    assert decoded["when"].startswith("2026-11-01") and decoded["nested"] == [1.5, None, True]
+    assert codec.dumps({"b": 1, "a": 2}, sort_keys=True) == b'{"a":2,"b":1}'
+    assert codec.dumps(2 ** 70) == b"1180591620717411303424", "big ints fall back to the stdlib"
+
+    now = datetime.now()
+    state = ProcessingState("trip-1", ProcessingStatus.PROCESSING, 40, "Working", now, now,
+                            partial_results={"restaurants": [{"name": "A"}]})
+    assert codec.decode(codec.dumps(state.to_dict()), ProcessingState) == state
+    metadata = TripMetadata("trip-1", "default", "Kyoto - 2026-11-01", "Kyoto", "2026-11-01", "2026-11-05",
+                            "5 days", 2, 1, 1, "active", now.isoformat(), now.isoformat(), ["food"])
+    assert codec.decode(codec.dumps(metadata.to_dict()), TripMetadata) == metadata
+    legacy = json.dumps(metadata.to_dict(), indent=2)
+    assert codec.decode(legacy, TripMetadata) == metadata, "pretty-printed files still decode"
+    trip = codec.decode(codec.dumps(TripData("trip-1", enhanced_guide=guide()).to_dict()), TripData)
+    assert trip.enhanced_guide == guide()
+    print(f"✅ Compact {codec.BACKEND} round trips for TripData, TripMetadata and ProcessingState")
+
+
+def test_pack():
+    small = {"temp": 14}
+    assert codec.pack(small) == codec.dumps(small), "small payloads are stored as plain JSON"
+    packed = codec.pack(guide(), compress_min_bytes=1024)
+    assert codec.is_compressed(packed) and codec.unpack(packed) == guide()
+    assert codec.unpack(codec.dumps(guide()).decode()) == guide(), "str values (old cache entries) decode"
+    assert not codec.is_compressed(codec.pack(guide(), compress_min_bytes=None))
+    print(f"✅ {codec.COMPRESSION} packs a {len(codec.dumps(guide())):,} byte guide into {len(packed):,}")
+
+
+async def test_compressed_sections():
+    service = EnhancedDatabaseService()
+    await service.initialize()
+    assert (await service.save_trip_data(TripData("kyoto", itinerary={"trip_summary": {"destination": "Kyoto"}},
+                                                  enhanced_guide=guide()))).success
+    blob = (service.trips_path / "kyoto" / "guide.restaurants.json").read_bytes()
+    assert codec.is_compressed(blob), "large guide blobs are stored compressed"
+    assert not codec.is_compressed((service.trips_path / "kyoto" / "guide.weather.json").read_bytes())
+
+    manifest = await service.section_store.read_manifest("kyoto")
+    entry = manifest["sections"]["guide.restaurants"]
+    assert entry["stored_size"] < entry["size"] == len(codec.dumps(guide()["restaurants"]))
+
+    service._trip_cache.clear()
+    assert await service.get_enhanced_guide("kyoto") == guide()
+    written = (await service.save_enhanced_guide_data("kyoto", {"weather": []}, merge=True)).data["sections_written"]
+    assert "guide.restaurants" not in written, "unchanged compressed blobs are still skipped"
+
+    backup = await service.create_backup()
+    restored = EnhancedDatabaseService()
+    assert (await restored.restore_backup(backup.data["backup_path"])).metadata["restored_count"] == 1
+    print(f"✅ Guide blob stored in {entry['stored_size']:,} bytes instead of {entry['size']:,}; backups round-trip")
+
+
+async def test_response_class():
+    import httpx
+    from src.api.app_factory import create_app
+
+    app = create_app()
+    assert app.router.default_response_class.__name__ == ("ORJSONResponse" if codec.ORJSON_AVAILABLE else "JSONResponse")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.get("/api/health/event-loop")
+    assert response.status_code == 200 and response.headers["content-type"] == "application/json"
+    assert isinstance(response.json(), dict)
+    print(f"✅ Routes default to {app.router.default_response_class.__name__}")
+
+
+async def main():
+    print("📦 Testing the JSON codec\n" + "=" * 50)
+    try:
+        test_round_trips()
+        test_pack()
+        await test_compressed_sections()
+        await test_response_class()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All codec checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Test document routing: text-native pages go as text and scanned pages are
+rasterized at an adaptive resolution and quality within the payload budget,
+identical pages reuse their cached render, long PDFs split into page groups,
+and multi-document extraction fans out with bounded concurrency, sends each
+page group to the vision client as its own batch and merges results in file
+order (no API keys)
+"""
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+os.environ.pop("OPENAI_API_KEY", None)
+os.environ.pop("ANTHROPIC_API_KEY", None)
+
+from src.services import llm_multimodal_extractor
+from src.services.document_router import (
+    PAGE_GROUP_SIZE, SCANNED_LONG_SIDE_PX, SPARSE_LONG_SIDE_PX, TARGET_IMAGE_BYTES, DocumentRouter
+)
+
+BOOKING = (
+    "Booking confirmation ABC123. Passenger MR PETER WALKER. Flight TP1351 from London Heathrow (LHR) "
+    "to Lisbon (LIS) departing 02 Nov 26 at 07:45, arriving 10:20. Seat 12A, Economy. Hotel Avenida "
+    "Palace, Rua 1 de Dezembro 123, Lisbon. Check-in 02 Nov 26, check-out 04 Nov 26, confirmation 83313860."
+)
+
+
+def scan_png(seed: int) -> bytes:
+    """A noisy 'photographed' page with dark text-like bars and no text layer"""
+    rng = random.Random(seed)
+    image = Image.effect_noise((1240, 1754), 40).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for row in range(80, 1700, 36):
+        draw.rectangle((90, row, 90 + rng.randint(300, 1050), row + 14), fill=(20, 20, 20))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def write_pdf(path: Path, pages) -> str:
+    """pages: list of ("text", str) or ("scan", png bytes) or ("sparse", (png bytes, caption))"""
+    pdf = fitz.open()
+    for kind, content in pages:
+        page = pdf.new_page(width=595, height=842)
+        if kind == "text":
+            page.insert_textbox(fitz.Rect(50, 50, 545, 792), content, fontsize=11)
+        elif kind == "scan":
+            page.insert_image(page.rect, stream=content)
+        else:
+            png, caption = content
+            page.insert_image(fitz.Rect(0, 80, 595, 842), stream=png)
+            page.insert_text((50, 50), caption, fontsize=11)
+    pdf.save(str(path))
+    pdf.close()
+    return str(path)
+
+
+def test_routing(tmp: Path):
+    router = DocumentRouter()
+    text_pdf = write_pdf(tmp / "itinerary.pdf", [("text", BOOKING), ("text", BOOKING)])
+    routed = router.route_pdf(text_pdf)
+    assert [p.route for p in routed.pages] == ["text", "text"] and routed.images() == []
+    assert "TP1351" in routed.text_block() and router.route_name(routed) == "text"
+
+    scan = scan_png(1)
+    mixed_pdf = write_pdf(tmp / "mixed.pdf", [("text", BOOKING), ("scan", scan), ("sparse", (scan_png(2), "Boarding pass"))])
+    routed = router.route_pdf(mixed_pdf)
+    assert [p.route for p in routed.pages] == ["text", "vision", "vision"], [p.route for p in routed.pages]
+    assert router.route_name(routed) == "hybrid"
+    scanned, sparse = routed.images()
+    assert max(scanned.width, scanned.height) <= SCANNED_LONG_SIDE_PX, "dense scans render at scan resolution"
+    assert max(sparse.width, sparse.height) <= SPARSE_LONG_SIDE_PX < max(scanned.width, scanned.height)
+    assert all(len(image.data) <= TARGET_IMAGE_BYTES for image in routed.images())
+    assert routed.metadata()["vision_pages"] == [2, 3] and routed.estimated_tokens() > 0
+
+    forced = router.route_pdf(text_pdf, force_vision=True)
+    assert [p.route for p in forced.pages] == ["vision", "vision"] and len(forced.images()) == 2
+    print(f"✅ Text pages go as text, scans are rasterized within budget "
+          f"({len(scanned.data) // 1024} KB at {scanned.width}x{scanned.height}, sparse {sparse.width}x{sparse.height})")
+    return scan
+
+
+def test_quality_steps():
+    noise = Image.effect_noise((2400, 3200), 100).convert("RGB")
+    encoded = DocumentRouter._encode(noise)
+    assert len(encoded.data) <= TARGET_IMAGE_BYTES or max(encoded.width, encoded.height) <= SPARSE_LONG_SIDE_PX
+    assert max(encoded.width, encoded.height) < 3200, "an incompressible page steps down in resolution"
+    print(f"✅ Quality then resolution step down to meet the payload budget ({encoded.width}x{encoded.height})")
+
+
+def test_raster_cache(tmp: Path, scan: bytes):
+    router = DocumentRouter()
+    first = write_pdf(tmp / "scan_a.pdf", [("scan", scan)])
+    copy = write_pdf(tmp / "scan_b.pdf", [("text", BOOKING), ("scan", scan)])
+    other = write_pdf(tmp / "scan_c.pdf", [("scan", scan_png(3))])
+
+    a = router.route_pdf(first).images()[0]
+    b = router.route_pdf(copy).images()[0]
+    assert a is b, "an identical page in another document reuses the cached render"
+    assert router.get_stats() == {"raster_cache_misses": 1, "raster_cache_hits": 1}
+    router.route_pdf(other)
+    assert router.get_stats()["raster_cache_misses"] == 2
+
+    small = DocumentRouter(cache_bytes=len(a.data))
+    small.route_pdf(first)
+    small.route_pdf(other)
+    small.route_pdf(first)
+    assert small.get_stats()["raster_cache_misses"] == 3, "renders are evicted beyond the byte budget"
+    print("✅ Rasterizations are cached per page hash across documents and bounded by bytes")
+
+
+def test_page_groups(tmp: Path):
+    router = DocumentRouter()
+    short = write_pdf(tmp / "short.pdf", [("text", BOOKING)] * 3)
+    long = write_pdf(tmp / "long.pdf", [("text", f"Page {i}. {BOOKING}") for i in range(10)])
+    assert router.page_groups(short) == [None]
+    groups = router.page_groups(long)
+    assert groups == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]] and len(groups[0]) == PAGE_GROUP_SIZE
+    assert router.page_groups(str(tmp / "missing.pdf")) == [None]
+    routed = router.route_pdf(long, pages=groups[2])
+    assert [p.index for p in routed.pages] == [8, 9] and "--- Page 9 ---" in routed.text_block()
+    print(f"✅ Long PDFs split into page groups ({groups})")
+    return short, long
+
+
+async def test_fan_out(short: str, long: str):
+    extractor = llm_multimodal_extractor.MultimodalLLMExtractor()
+    in_flight, peak, calls = 0, 0, []
+    rng = random.Random(7)
+
+    async def fake_extract(file_path=None, image_bytes=None, pages=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        calls.append((Path(file_path).name, pages))
+        await asyncio.sleep(rng.uniform(0.01, 0.06))
+        in_flight -= 1
+        label = f"{Path(file_path).stem}:{pages[0] if pages else 0}"
+        return {
+            "flights": [{"flight_number": "TP1351", "departure_date": "2026-11-02"}, {"flight_number": label}],
+            "hotels": [],
+            "passengers": [{"first_name": "Peter", "last_name": "Walker"}],
+            "other": [],
+        }
+
+    extractor.extract_from_image = fake_extract
+    progress = []
+
+    async def on_progress(percent, message):
+        progress.append(percent)
+
+    result = await extractor.extract_from_multiple_files([long, short], progress_callback=on_progress)
+    assert len(calls) == 4, calls
+    assert peak <= llm_multimodal_extractor.MAX_CONCURRENT_EXTRACTIONS and peak > 1, peak
+    assert [f["flight_number"] for f in result["flights"]] == ["TP1351", "long:0", "long:4", "long:8", "short:0"], \
+        "results merge in file and page order, deduplicated"
+    assert len(result["passengers"]) == 1
+    assert progress == sorted(progress) and progress[-1] == 50 and len(progress) == 4
+    print(f"✅ Documents fan out with at most {peak} calls in flight and merge in file order")
+
+
+async def test_stubbed_client_batches(tmp: Path, short: str, long: str):
+    prompts = []
+
+    class Completions:
+        async def create(self, model, messages, **kwargs):
+            content = messages[1]["content"]
+            pages = [int(n) for n in re.findall(r"--- Page (\d+) ---", content[0]["text"])]
+            prompts.append((pages, len(content) - 1))
+            await asyncio.sleep(0.01 * (10 - pages[0]) if pages else 0)
+            answer = {
+                "flights": [{"flight_number": "TP1351", "departure_date": "2026-11-02"},
+                            {"flight_number": f"page-{pages[0] if pages else 0}"}],
+                "hotels": [],
+                "passengers": [{"first_name": "Peter", "last_name": "Walker"}],
+                "other": [],
+            }
+            message = SimpleNamespace(content=f"```json\n{json.dumps(answer)}\n```")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    extractor = llm_multimodal_extractor.MultimodalLLMExtractor()
+    extractor.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+    scanned = write_pdf(tmp / "scanned.pdf", [("scan", scan_png(4))])
+    result = await extractor.extract_from_multiple_files([long, short, scanned])
+
+    batches = sorted(pages for pages, _ in prompts if pages)
+    assert batches == [[1, 2, 3], [1, 2, 3, 4], [5, 6, 7, 8], [9, 10]], batches
+    assert sorted(images for _, images in prompts) == [0, 0, 0, 0, 1], "only the scanned page is sent as an image"
+    assert [f["flight_number"] for f in result["flights"]] == [
+        "TP1351", "page-1", "page-5", "page-9", "page-0"
+    ], "page groups merge in file and page order, the shared flight once"
+    assert len(result["passengers"]) == 1
+    print(f"✅ A stubbed vision client gets {len(prompts)} page batches; answers merge in document order")
+
+
+async def main():
+    print("📄 Testing document routing\n" + "=" * 50)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        scan = test_routing(tmp)
+        test_quality_steps()
+        test_raster_cache(tmp, scan)
+        short, long = test_page_groups(tmp)
+        await test_fan_out(short, long)
+        await test_stubbed_client_batches(tmp, short, long)
+    print("\n🎉 All document routing checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
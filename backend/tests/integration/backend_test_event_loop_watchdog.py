@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the event loop watchdog: blocking calls are detected with the stack
+captured while blocked, aggregated by call site and exposed through the
+health, debug and /metrics endpoints (no API keys needed)
+"""
+import sys
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import httpx
+from fastapi import FastAPI
+
+from src.core.metrics import MetricsRegistry
+from src.core.event_loop import EventLoopWatchdog, event_loop_watchdog
+from src.api.routes import health, debug, metrics
+
+
+def blocking_download():
+    time.sleep(0.15)  # stands in for urlretrieve / sync file I/O
+
+
+async def handler_with_sync_io():
+    blocking_download()
+
+
+async def test_blocking_attributed_to_call_site():
+    registry = MetricsRegistry()
+    watchdog = EventLoopWatchdog(interval=0.01, threshold_ms=50, registry=registry)
+    watchdog.start()
+    await asyncio.sleep(0.05)
+    for _ in range(2):
+        await handler_with_sync_io()
+        await asyncio.sleep(0.05)
+    time.sleep(0.08)
+    await asyncio.sleep(0.05)
+    await watchdog.stop()
+
+    offenders = watchdog.offenders()
+    top = offenders[0]
+    assert "in blocking_download" in top.site, top.site
+    assert top.count == 2, [s.to_dict() for s in offenders]
+    assert top.max_ms >= 100, top.max_ms
+    assert any("handler_with_sync_io" in frame for frame in top.stack), top.stack
+    assert len(offenders) == 2, "the second blocking site is tracked separately"
+    assert registry.get("event_loop.blocked_ms").histogram.count == 3
+    print(f"✅ Blocking call attributed to call site: {top.site} ({top.count}x, max {top.max_ms:.0f}ms)")
+
+
+async def test_fast_loop_not_flagged():
+    watchdog = EventLoopWatchdog(interval=0.005, threshold_ms=50, registry=MetricsRegistry())
+    watchdog.start()
+    for _ in range(50):
+        await asyncio.sleep(0.002)
+    await watchdog.stop()
+    assert not watchdog.offenders()
+    assert watchdog.report()["lag_ms"]["count"] > 0
+    print("✅ Healthy loop produces lag samples but no blocking reports")
+
+
+async def test_endpoints():
+    event_loop_watchdog.reset()
+    event_loop_watchdog.threshold_ms = 50
+    event_loop_watchdog.interval = 0.01
+    event_loop_watchdog.start()
+    await asyncio.sleep(0.03)
+    blocking_download()
+    await asyncio.sleep(0.05)
+    await event_loop_watchdog.stop()
+
+    app = FastAPI()
+    for module in (health, debug, metrics):
+        app.include_router(module.router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        report = (await client.get("/api/health/event-loop")).json()
+        detailed = (await client.get("/api/debug/blocking-calls")).json()
+        text = (await client.get("/api/debug/blocking-calls", params={"format": "text"})).text
+        exposition = (await client.get("/metrics")).text
+
+    assert report["blocking_episodes"] >= 1 and report["offenders"]
+    assert "stack" not in report["offenders"][0] and detailed["offenders"][0]["stack"]
+    assert "blocking_download" in text
+    assert "tripcraft_event_loop_blocking_calls_total{site=" in exposition
+    assert "tripcraft_event_loop_blocked_ms" not in exposition
+    print("✅ Offenders exposed via /api/health/event-loop, /api/debug/blocking-calls and /metrics")
+    print(event_loop_watchdog.format_report())
+
+
+async def test_probe_cost():
+    # A probe is one call_soon_threadsafe per interval; measure the loop-side cost
+    watchdog = EventLoopWatchdog(registry=MetricsRegistry())
+    done = threading.Event()
+    n = 20000
+    started = time.perf_counter()
+    for _ in range(n):
+        watchdog._probe(done)
+    print(f"✅ Probe callback costs {(time.perf_counter() - started) / n * 1e6:.2f}µs on the loop")
+
+
+async def main():
+    print("🐕 Testing event loop watchdog\n" + "=" * 50)
+    await test_blocking_attributed_to_call_site()
+    await test_fast_loop_not_flagged()
+    await test_endpoints()
+    await test_probe_cost()
+    print("\n🎉 All event loop watchdog checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
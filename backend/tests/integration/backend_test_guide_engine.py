@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Test the guide engine: profiles are validated DAGs, stages start as soon as
+their dependencies finish, failures, timeouts and the deadline yield each
+stage's fallback, results are cached by their declared inputs only and
+identical concurrent fetches share one call, and the optimized guide served
+twice from the upstream simulator reuses its stage results (no API keys)
+"""
+import os
+import sys
+import asyncio
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["LLM_CACHE_PATH"] = str(Path(_tmp.name) / "llm_cache.sqlite3")
+
+from src.services.guide_engine import (
+    CachePolicy, GuideEngine, GuideProfile, GuideRequest, SourceStage, StageTimeout, select
+)
+
+TRIP = ("Lisbon, Portugal", "2026-11-02", "2026-11-04")
+
+
+def sleeper(seconds: float, value):
+    async def fetch(request, deps):
+        await asyncio.sleep(seconds)
+        return value
+    return fetch
+
+
+def counting(calls: Counter, name: str, value, seconds: float = 0.0):
+    async def fetch(request, deps):
+        calls[name] += 1
+        await asyncio.sleep(seconds)
+        return value
+    return fetch
+
+
+def test_profile_validation():
+    noop = sleeper(0, None)
+    cases = {
+        "cycle": [SourceStage("a", noop, depends_on=("b",)), SourceStage("b", noop, depends_on=("a",))],
+        "unknown dependency": [SourceStage("a", noop, depends_on=("missing",))],
+        "duplicate": [SourceStage("a", noop), SourceStage("a", noop)],
+        "unknown input": [SourceStage("a", noop, cache=CachePolicy(("destination", "mood"), None))],
+    }
+    for case, stages in cases.items():
+        try:
+            GuideProfile("broken", stages)
+            raise AssertionError(f"{case} was accepted")
+        except ValueError:
+            pass
+    profile = GuideProfile("ok", [
+        SourceStage("summary", noop, depends_on=("attractions", "weather")),
+        SourceStage("attractions", noop, depends_on=("content",)),
+        SourceStage("content", noop),
+        SourceStage("weather", noop),
+    ])
+    assert profile.order.index("content") < profile.order.index("attractions") < profile.order.index("summary")
+    assert profile.closure(["attractions"]) == ["content", "attractions"]
+    print("✅ Cycles, unknown dependencies or inputs and duplicates are rejected; closures follow dependencies")
+
+
+async def test_dependency_scheduling():
+    starts = []
+    received = {}
+
+    async def combine(request, deps):
+        starts.append(time.perf_counter())
+        received.update(deps)
+        return len(deps["restaurants"]) + len(deps["attractions"])
+
+    profile = GuideProfile("dag", [
+        SourceStage("content", sleeper(0.1, {"restaurants": [1, 2], "attractions": [3]})),
+        select("restaurants", "content", default=[]),
+        select("attractions", "content", default=[]),
+        SourceStage("weather", sleeper(0.1, {"forecasts": []})),
+        SourceStage("count", combine, depends_on=("restaurants", "attractions")),
+    ])
+    started = time.perf_counter()
+    run = await GuideEngine(cache_enabled=False).run(profile, GuideRequest(*TRIP))
+    elapsed = time.perf_counter() - started
+    assert run["count"] == 3 and received == {"restaurants": [1, 2], "attractions": [3]}
+    assert starts[0] - started >= 0.09, "a stage waits for its dependencies"
+    assert elapsed < 0.18, f"independent stages run concurrently ({elapsed:.2f}s)"
+    assert {r.outcome for r in run.stages.values()} == {"fetched"}
+    print(f"✅ Stages run concurrently and start once their dependencies finish ({elapsed * 1000:.0f} ms)")
+
+
+async def test_fallbacks_and_deadline():
+    async def broken(request, deps):
+        raise RuntimeError("upstream down")
+
+    profile = GuideProfile("failing", [
+        SourceStage("weather", broken, fallback=lambda e: {"error": str(e)}),
+        SourceStage("events", sleeper(1.0, ["late"]), timeout=0.05, fallback=[]),
+        SourceStage("attractions", sleeper(1.0, ["late"]), fallback=[]),
+        SourceStage("summary", sleeper(0, "done"), depends_on=("attractions",), fallback="none"),
+        SourceStage("restaurants", sleeper(0.01, ["ok"]), fallback=[]),
+    ], deadline=0.2)
+    started = time.perf_counter()
+    run = await GuideEngine(cache_enabled=False).run(profile, GuideRequest(*TRIP))
+    elapsed = time.perf_counter() - started
+
+    assert run["weather"] == {"error": "upstream down"} and run.stages["weather"].outcome == "failed"
+    assert run["events"] == [] and run.stages["events"].outcome == "timeout"
+    assert isinstance(run.error("events"), StageTimeout)
+    assert run["attractions"] == [] and run["summary"] == "none", "the deadline cancels a stage and its dependents"
+    assert run.failed("attractions") and run.failed("summary") and not run.failed("restaurants")
+    assert run["restaurants"] == ["ok"]
+    assert elapsed < 0.4, f"the deadline bounds the run ({elapsed:.2f}s)"
+    print(f"✅ Failures, stage timeouts and the {profile.deadline}s deadline yield fallbacks ({elapsed * 1000:.0f} ms)")
+
+
+async def test_stage_cache():
+    calls = Counter()
+
+    async def flaky_weather(request, deps):
+        calls["weather"] += 1
+        return {"error": "rate limited"} if calls["weather"] == 1 else {"forecasts": [{"temp": 20}]}
+
+    profile = GuideProfile("cached", [
+        SourceStage("restaurants", counting(calls, "restaurants", [{"name": "Taberna"}]),
+                    cache=CachePolicy(("destination", "dining"), None)),
+        SourceStage("weather", flaky_weather, cache=CachePolicy(("destination", "dates"), None)),
+    ])
+    engine = GuideEngine(cache_enabled=True)
+    first = await engine.run(profile, GuideRequest(*TRIP))
+    assert first["weather"] == {"error": "rate limited"}
+
+    first["restaurants"].append({"name": "mutated by a caller"})
+    other_hotel = await engine.run(profile, GuideRequest(*TRIP, hotel_info={"name": "Another hotel"}))
+    assert other_hotel.stages["restaurants"].outcome == "cached", "undeclared inputs do not affect the key"
+    assert other_hotel["restaurants"] == [{"name": "Taberna"}], "callers get their own copy"
+    assert other_hotel.stages["weather"].outcome == "fetched", "error results are not cached"
+
+    later = await engine.run(profile, GuideRequest(TRIP[0], "2026-12-01", "2026-12-03"))
+    assert later.stages["restaurants"].outcome == "cached" and later.stages["weather"].outcome == "fetched"
+    await engine.run(profile, GuideRequest(*TRIP, preferences={"dining": {"dietaryRestrictions": ["vegan"]}}))
+    assert calls["restaurants"] == 2, "a declared input changing misses the cache"
+
+    refreshed = await engine.run(profile, GuideRequest(*TRIP), stages=["weather"], refresh=["weather"])
+    assert set(refreshed.stages) == {"weather"} and refreshed.stages["weather"].outcome == "fetched"
+    assert engine.stats["cached.restaurants"] == {"hits": 2, "misses": 2}
+    print(f"✅ Stage results are cached by declared inputs only ({dict(calls)} upstream calls over 5 runs)")
+
+
+async def test_coalescing():
+    calls = Counter()
+    profile = GuideProfile("shared", [
+        SourceStage("events", counting(calls, "events", ["Fado night"], seconds=0.1),
+                    cache=CachePolicy(("destination", "dates"), None)),
+    ])
+    engine = GuideEngine(cache_enabled=True)
+    runs = await asyncio.gather(*(engine.run(profile, GuideRequest(*TRIP)) for _ in range(5)))
+    assert calls["events"] == 1 and all(run["events"] == ["Fado night"] for run in runs)
+    assert Counter(run.stages["events"].outcome for run in runs) == {"fetched": 1, "coalesced": 4}
+
+    # A waiter whose leader is cancelled at its deadline fetches on its own
+    impatient = GuideProfile("shared", [profile.stages["events"]], deadline=0.02)
+    engine = GuideEngine(cache_enabled=True)
+    leader, waiter = await asyncio.gather(
+        engine.run(impatient, GuideRequest(*TRIP)), engine.run(profile, GuideRequest(*TRIP))
+    )
+    assert leader.stages["events"].outcome == "timeout" and waiter["events"] == ["Fado night"]
+    print("✅ Identical concurrent fetches share one call, and outlive a leader cut off by its deadline")
+
+
+async def test_optimized_guide_reuses_stages():
+    from upstream_simulator import UpstreamSimulator, redirect_upstreams
+    from src.services.optimized_guide_service import OptimizedGuideService
+    from src.services.guide_engine import guide_engine
+
+    assert guide_engine.cache_enabled
+    trip = dict(destination=TRIP[0], start_date=TRIP[1], end_date=TRIP[2],
+                hotel_info={"name": "Hotel Avenida Palace"}, preferences={}, extracted_data={})
+    simulator = UpstreamSimulator(time_scale=0.02, seed=3)
+    base_url = simulator.start_in_thread()
+    guides, calls = [], []
+    try:
+        with redirect_upstreams(base_url):
+            service = OptimizedGuideService()
+            for _ in range(2):
+                before = Counter(simulator.calls)
+                guides.append(await service.generate_optimized_guide(**trip))
+                calls.append(sum((Counter(simulator.calls) - before).values()))
+    finally:
+        simulator.stop_thread()
+
+    first, second = guides
+    assert first["restaurants"] and not first.get("error"), first.get("error")
+    for section in ("restaurants", "attractions", "events", "daily_itinerary", "weather"):
+        assert second.get(section) == first.get(section), section
+    stages = second["performance_stats"]["stages"]
+    assert {stages[name]["outcome"] for name in ("restaurants", "perplexity", "weather", "places_attractions")} \
+        == {"cached"}, stages
+    assert second["performance_stats"]["cache_used"] and calls[1] < calls[0], calls
+    print(f"✅ A repeated optimized guide reuses its stage results ({calls[0]} then {calls[1]} upstream calls)")
+
+
+async def main():
+    print("🧩 Testing the guide engine\n" + "=" * 50)
+    try:
+        test_profile_validation()
+        await test_dependency_scheduling()
+        await test_fallbacks_and_deadline()
+        await test_stage_cache()
+        await test_coalescing()
+        await test_optimized_guide_reuses_stages()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All guide engine checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
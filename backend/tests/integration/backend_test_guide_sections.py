@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test guide section tracking: stamped sections go stale only when their own
+inputs change or their TTL expires, regenerated sections merge over the
+stored guide without losing other sections' metadata, and a dining change
+re-ranks restaurants from the cached pool without upstream calls (no API keys)
+"""
+import os
+import sys
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["LLM_CACHE_PATH"] = str(Path(_tmp.name) / "llm_cache.sqlite3")
+
+from src.services.guide_sections import (
+    SECTION_INPUTS, IncrementalGuideRegenerator, merge_sections, section_inputs, stale_sections, stamp_sections
+)
+
+TRIP = ("Lisbon, Portugal", "2026-11-02", "2026-11-04")
+HOTEL = {"name": "Hotel Avenida Palace", "address": "R. 1º de Dezembro 123, Lisbon"}
+THAI = {"dining": {"cuisineTypes": ["Thai"]}}
+
+
+def test_stale_sections():
+    fetched = datetime(2026, 11, 1, 12, 0)
+    inputs = section_inputs(*TRIP, HOTEL, THAI)
+    guide = stamp_sections({"restaurants": []}, inputs, fetched_at=fetched)
+    assert set(guide["section_meta"]) == set(SECTION_INPUTS)
+    assert stale_sections(guide, inputs, now=fetched + timedelta(hours=1)) == {}
+    assert stale_sections({}, inputs) == {section: "missing" for section in SECTION_INPUTS}
+
+    italian = section_inputs(*TRIP, HOTEL, {"dining": {"cuisineTypes": ["Italian"]}})
+    assert stale_sections(guide, italian, now=fetched) == {"restaurants": "inputs"}
+    moved = section_inputs(*TRIP, {"name": "Memmo Alfama"}, THAI)
+    assert stale_sections(guide, moved, now=fetched) == {"attractions": "inputs", "daily_itinerary": "inputs"}
+    later = section_inputs(TRIP[0], "2026-12-01", "2026-12-03", HOTEL, THAI)
+    assert set(stale_sections(guide, later, now=fetched)) == {"weather", "events", "daily_itinerary"}
+
+    assert stale_sections(guide, inputs, now=fetched + timedelta(hours=7)) == {"weather": "expired"}
+    assert stale_sections(guide, inputs, now=fetched + timedelta(days=8)) == {
+        "weather": "expired", "events": "expired", "restaurants": "expired", "attractions": "expired"
+    }
+    guide["section_meta"]["events"]["fetched_at"] = "not a date"
+    assert stale_sections(guide, inputs, now=fetched)["events"] == "expired"
+    print("✅ Sections go stale on their own inputs or TTL only")
+
+
+def test_merge_sections():
+    inputs = section_inputs(*TRIP, HOTEL, THAI)
+    stored = stamp_sections({"restaurants": ["Old"], "weather": ["Sunny"], "summary": "old"}, inputs,
+                            fetched_at=datetime(2026, 11, 1))
+    updates = stamp_sections({"restaurants": ["New"], "summary": "new"}, inputs, ["restaurants"])
+    merged = merge_sections(stored, updates)
+    assert merged["restaurants"] == ["New"] and merged["weather"] == ["Sunny"] and merged["summary"] == "new"
+    assert merged["section_meta"]["weather"] == stored["section_meta"]["weather"]
+    assert merged["section_meta"]["restaurants"] == updates["section_meta"]["restaurants"]
+    assert stored["restaurants"] == ["Old"], "the stored guide is not mutated"
+    assert merge_sections(None, updates)["restaurants"] == ["New"]
+    print("✅ Regenerated sections merge over the stored guide, keeping other sections' metadata")
+
+
+async def test_incremental_regeneration():
+    from src.services.fast_guide_service import FastGuideService
+
+    service = FastGuideService()
+    pool = {
+        "destination": TRIP[0],
+        "restaurants": [
+            {"name": "Bangkok Garden", "cuisine": "Thai", "rating": 4.1},
+            {"name": "Trattoria Roma", "cuisine": "Italian", "rating": 4.6},
+        ],
+        "attractions": [{"name": "Jerónimos Monastery", "type": "museum", "rating": 4.7}],
+        "events": [],
+    }
+    service.destination_cache[f"{TRIP[0]}_{TRIP[1]}_{TRIP[2]}"] = pool
+    stored = stamp_sections(dict(pool, weather=[], daily_itinerary=[]), section_inputs(*TRIP, HOTEL, THAI))
+
+    italian = {"dining": {"cuisineTypes": ["Italian"]}}
+    updates, refreshed = await IncrementalGuideRegenerator(service).regenerate(stored, *TRIP, HOTEL, italian)
+    assert refreshed == ["restaurants"], refreshed
+    assert updates["restaurants"][0]["name"] == "Trattoria Roma"
+    assert set(updates["section_meta"]) == {"restaurants"}
+    assert stale_sections(merge_sections(stored, updates), section_inputs(*TRIP, HOTEL, italian)) == {}
+    assert await IncrementalGuideRegenerator(service).regenerate(stored, *TRIP, HOTEL, THAI) == ({}, [])
+    print("✅ A dining change re-ranks restaurants from the cached pool and leaves the rest alone")
+
+
+async def main():
+    print("🧾 Testing guide section tracking\n" + "=" * 50)
+    try:
+        test_stale_sections()
+        test_merge_sections()
+        await test_incremental_regeneration()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All guide section checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
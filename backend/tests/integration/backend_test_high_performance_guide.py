@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test the high-performance guide service's candidate pool: one fetched pool
+is cached, travelers with different preferences get different orderings
+from it, and its feature matrices are built once and reused per traveler
+(no API keys or Redis needed)
+"""
+import sys
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import codec
+from src.services import high_performance_guide_service as hp
+from src.services.guide_personalization import guide_personalizer, candidate_pool_key
+
+TRIP = ("Lisbon", "2026-11-02", "2026-11-04")
+ART_LOVER = {"interests": ["museums", "art"]}
+OUTDOORS = {"interests": ["hiking", "beach"]}
+
+
+class DictCache:
+    """Stands in for Redis: every hit decodes a fresh copy of the stored pool"""
+
+    connected = True
+
+    def __init__(self):
+        self.store: Dict[str, bytes] = {}
+        self.hits = 0
+
+    async def connect(self) -> bool:
+        return True
+
+    async def get(self, prefix: str, **kwargs) -> Optional[Dict[str, Any]]:
+        data = self.store.get(prefix + json.dumps(kwargs, sort_keys=True))
+        if data is None:
+            return None
+        self.hits += 1
+        return codec.loads(data)
+
+    async def set(self, prefix: str, data: Dict[str, Any], ttl: Optional[int] = None, **kwargs) -> bool:
+        self.store[prefix + json.dumps(kwargs, sort_keys=True)] = codec.dumps(data)
+        return True
+
+
+def pool() -> Dict[str, Any]:
+    names = [
+        "City Art Museum", "Mountain Hiking Trail", "Modern Gallery Exhibition", "Seaside Beach",
+        "Maritime Museum", "Coastal Trail Hike", "Contemporary Art Space", "Sunset Beach Walk",
+    ]
+    return {
+        "content": {
+            "restaurants": [{"name": f"Tasca {i}", "cuisine": "Portuguese", "rating": 4.5} for i in range(6)],
+            "attractions": [{"name": name, "rating": 4.5} for name in names],
+        },
+        "weather": {},
+        "events": {"events": [{"name": "Jazz Night"}, {"name": "Gallery Opening"}]},
+        "neighborhoods": [],
+    }
+
+
+class StubGuideService(hp.HighPerformanceGuideService):
+    def __init__(self):
+        super().__init__()
+        self.fetches = 0
+
+    async def _fetch_candidate_pool(self, destination, start_date, end_date, metrics):
+        self.fetches += 1
+        return pool()
+
+
+def attraction_names(guide: Dict[str, Any]) -> list:
+    return [a["name"] for a in guide["cultural_experiences"]["museums"]]
+
+
+async def test_profiles_share_one_pool():
+    service = StubGuideService()
+    memory_key = ("high_performance", tuple(sorted(candidate_pool_key(*TRIP).items())))
+
+    art = await service.generate_high_performance_guide(*TRIP, hotel_info={}, preferences=ART_LOVER)
+    matrix = guide_personalizer._matrices.get((memory_key, "attractions"))
+    built = guide_personalizer._matrices.misses
+    outdoors = await service.generate_high_performance_guide(*TRIP, hotel_info={}, preferences=OUTDOORS)
+
+    assert service.fetches == 1 and outdoors["from_cache"], "the second traveler reuses the cached pool"
+    assert matrix is not None and guide_personalizer._matrices.get((memory_key, "attractions")) is matrix
+    assert guide_personalizer._matrices.misses == built, "no feature matrix is rebuilt for the second traveler"
+
+    art_order, outdoor_order = attraction_names(art), attraction_names(outdoors)
+    assert art_order != outdoor_order and sorted(art_order) == sorted(outdoor_order)
+    assert "Museum" in art_order[0] or "Art" in art_order[0], art_order
+    assert "Trail" in outdoor_order[0] or "Beach" in outdoor_order[0], outdoor_order
+    print(f"✅ Two profiles ranked one cached pool: {art_order[0]!r} vs {outdoor_order[0]!r}")
+
+
+async def test_redis_pool_ranks_the_same(cache: DictCache):
+    first = StubGuideService()
+    restarted = StubGuideService()
+    art = await first.generate_high_performance_guide(*TRIP, hotel_info={}, preferences=ART_LOVER)
+    hits = cache.hits
+    again = await restarted.generate_high_performance_guide(*TRIP, hotel_info={}, preferences=ART_LOVER)
+    assert restarted.fetches == 0 and cache.hits == hits + 1, "a new worker takes the pool from the shared cache"
+    assert attraction_names(again) == attraction_names(art)
+    print("✅ A worker without the pool in memory ranks the shared cached pool identically")
+
+
+async def main():
+    print("🏎️  Testing high-performance guide pool reuse\n" + "=" * 50)
+    cache = DictCache()
+    hp.cache_service = cache
+    await test_profiles_share_one_pool()
+    await test_redis_pool_ranks_the_same(cache)
+    print("\n🎉 All high-performance guide checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
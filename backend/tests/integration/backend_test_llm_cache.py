@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test the LLM response cache: namespace TTLs, bypass and refresh, answers
+failing validation not being stored, identical concurrent calls sharing one
+upstream call (and surviving a cancelled leader), persistence across
+instances and the tokens/cost-saved accounting (no API keys)
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services.llm_cache import CachedCompletion, LLMResponseCache, is_json, model_price, normalize_prompt
+
+MESSAGES = [
+    {"role": "system", "content": "Extract the booking as JSON."},
+    {"role": "user", "content": "Flight TP1351 LHR -> LIS on 2026-11-02"},
+]
+USAGE = {"prompt_tokens": 1000, "completion_tokens": 500, "total_tokens": 1500}
+
+
+class Upstream:
+    """Counts calls and answers with a fixed completion after an optional delay"""
+
+    def __init__(self, content: str = '{"flights": [{"flight_number": "TP1351"}]}', delay: float = 0.0):
+        self.content = content
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> CachedCompletion:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return CachedCompletion(content=self.content, model="gpt-4o-mini", usage=dict(USAGE))
+
+
+def complete(cache: LLMResponseCache, upstream: Upstream, messages=MESSAGES, namespace="extraction", **kwargs):
+    return cache.complete(namespace, "openai", "gpt-4o-mini", messages, upstream,
+                          params={"temperature": 0.1}, **kwargs)
+
+
+def test_keys():
+    reindented = [dict(m, content=f"\n    {m['content']}   \n") for m in MESSAGES]
+    assert normalize_prompt("  a \t b\n\n\n\nc  ") == "a b\n\nc"
+    assert LLMResponseCache.cache_key("openai", "m", MESSAGES) == LLMResponseCache.cache_key("openai", "m", reindented)
+    base = LLMResponseCache.cache_key("openai", "m", MESSAGES, {"temperature": 0.1})
+    assert base != LLMResponseCache.cache_key("openai", "m", MESSAGES, {"temperature": 0.2})
+    assert base != LLMResponseCache.cache_key("openai", "m", MESSAGES, {"temperature": 0.1}, schema_version=2)
+    assert base != LLMResponseCache.cache_key("anthropic", "m", MESSAGES, {"temperature": 0.1})
+    assert is_json('```json\n{"a": 1}\n```') and not is_json("Sorry, I can't help")
+    assert model_price("gpt-4o-mini-2024-07-18") == (0.15, 0.60) and model_price("unknown") == (0.0, 0.0)
+    print("✅ Keys ignore indentation but not params, provider or schema version")
+
+
+async def test_hits_bypass_refresh(tmp: Path):
+    cache = LLMResponseCache(path=tmp / "hits.sqlite3", enabled=True)
+    upstream = Upstream()
+    first = await complete(cache, upstream)
+    second = await complete(cache, upstream)
+    assert not first.cached and second.cached and second.content == first.content and upstream.calls == 1
+
+    bypassed = await complete(cache, upstream, bypass=True)
+    assert not bypassed.cached and upstream.calls == 2
+    upstream.content = '{"flights": []}'
+    refreshed = await complete(cache, upstream, refresh=True)
+    assert not refreshed.cached and upstream.calls == 3
+    assert (await complete(cache, upstream)).content == '{"flights": []}', "refresh stores the fresh answer"
+    assert upstream.calls == 3
+
+    disabled = LLMResponseCache(path=tmp / "disabled.sqlite3", enabled=False)
+    await complete(disabled, upstream)
+    await complete(disabled, upstream)
+    assert upstream.calls == 5 and not (tmp / "disabled.sqlite3").exists()
+    counters = cache.get_stats()["namespaces"]["extraction"]
+    assert (counters["hits"], counters["misses"], counters["bypassed"], counters["stores"]) == (2, 1, 1, 2), counters
+    print("✅ Hits skip the upstream call; bypass skips the cache and refresh overwrites it")
+
+
+async def test_ttls(tmp: Path):
+    cache = LLMResponseCache(path=tmp / "ttl.sqlite3", enabled=True, ttls={"llm_response": 1})
+    assert cache.ttls["extraction"] == 3600 * 24 * 7 and cache.ttls["llm_response"] == 1
+    upstream = Upstream()
+    chat = [{"role": "user", "content": "Suggest a dinner spot in Alfama"}]
+    await complete(cache, upstream, messages=chat, namespace="llm_response")
+    await complete(cache, upstream, namespace="extraction")
+    chat_key = cache.cache_key("openai", "gpt-4o-mini", chat, {"temperature": 0.1})
+    key = cache.cache_key("openai", "gpt-4o-mini", MESSAGES, {"temperature": 0.1})
+    later = time.time() + 2
+    assert cache.store.get(chat_key) is not None
+    assert cache.store.get(chat_key, now=later) is None, "a 1s namespace TTL has expired 2s later"
+    assert cache.store.get(key, now=later) is not None, "a week-long namespace TTL has not"
+
+    await complete(cache, upstream, messages=MESSAGES[:1], ttl=1)
+    short_key = cache.cache_key("openai", "gpt-4o-mini", MESSAGES[:1], {"temperature": 0.1})
+    assert cache.store.get(short_key, now=later) is None, "a per-call TTL overrides the namespace"
+    assert cache.store.purge_expired() == 0 and cache.store.count() == 3
+    assert await cache.clear_namespace("extraction") == 2 and cache.store.count() == 1
+    print("✅ Entries expire after their namespace or per-call TTL")
+
+
+async def test_validation(tmp: Path):
+    cache = LLMResponseCache(path=tmp / "validate.sqlite3", enabled=True)
+    refusal = Upstream(content="I cannot read this document.")
+    for _ in range(2):
+        answer = await complete(cache, refusal, validate=is_json)
+        assert answer.content == refusal.content and not answer.cached
+    assert refusal.calls == 2 and cache.store.count() == 0, "answers failing validation are returned, not stored"
+    empty = Upstream(content="")
+    await complete(cache, empty)
+    assert cache.store.count() == 0, "empty answers are not stored"
+    print("✅ Invalid or empty answers are returned but never stored")
+
+
+async def test_coalescing(tmp: Path):
+    cache = LLMResponseCache(path=tmp / "coalesce.sqlite3", enabled=True)
+    upstream = Upstream(delay=0.1)
+    answers = await asyncio.gather(*(complete(cache, upstream) for _ in range(5)))
+    assert upstream.calls == 1 and all(a.content == answers[0].content for a in answers)
+    assert sum(a.cached for a in answers) == 4
+    assert cache.stats["extraction"]["coalesced"] == 4
+
+    # A cancelled leader must not cancel the callers waiting on it
+    cache = LLMResponseCache(path=tmp / "cancelled.sqlite3", enabled=True)
+    upstream = Upstream(delay=0.1)
+    leader = asyncio.create_task(complete(cache, upstream))
+    await asyncio.sleep(0.02)
+    followers = [asyncio.create_task(complete(cache, upstream)) for _ in range(3)]
+    await asyncio.sleep(0.02)
+    leader.cancel()
+    answers = await asyncio.gather(*followers)
+    assert leader.cancelled() and all(a.content == upstream.content for a in answers)
+    assert upstream.calls == 2, f"one follower calls again, the others share it ({upstream.calls} calls)"
+
+    # A failing leader fails its waiters too
+    cache = LLMResponseCache(path=tmp / "failing.sqlite3", enabled=True)
+
+    async def broken():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("rate limited")
+    results = await asyncio.gather(*(complete(cache, broken) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results) and not cache._inflight
+    print("✅ Identical concurrent calls share one upstream call and outlive a cancelled leader")
+
+
+async def test_persistence_and_savings(tmp: Path):
+    path = tmp / "shared.sqlite3"
+    upstream = Upstream()
+    await complete(LLMResponseCache(path=path, enabled=True), upstream)
+    reopened = LLMResponseCache(path=path, enabled=True)
+    answer = await complete(reopened, upstream)
+    assert answer.cached and answer.usage == USAGE and upstream.calls == 1, "entries survive a new instance"
+
+    await complete(reopened, upstream)
+    totals = reopened.get_stats()["totals"]
+    assert totals["prompt_tokens_saved"] == 2000 and totals["completion_tokens_saved"] == 1000
+    expected = 2 * (1000 * 0.15 + 500 * 0.60) / 1e6
+    assert abs(totals["cost_saved_usd"] - round(expected, 6)) < 1e-9 and totals["hit_rate"] == 1.0
+    print(f"✅ Entries persist across instances; hits are credited ${totals['cost_saved_usd']:.6f} saved")
+
+
+async def main():
+    print("♻️  Testing the LLM response cache\n" + "=" * 50)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        test_keys()
+        await test_hits_bypass_refresh(tmp)
+        await test_ttls(tmp)
+        await test_validation(tmp)
+        await test_coalescing(tmp)
+        await test_persistence_and_savings(tmp)
+    print("\n🎉 All LLM cache checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test the LLM provider router with stub providers (no API keys needed):
+ranking by latency/cost, fallback on errors, hedging at p90 and
+per-provider concurrency limits
+"""
+import sys
+import asyncio
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services.interfaces import LLMRequest, LLMResponse, LLMProvider, LLMCapability
+from src.services.llm_router import LLMRouter, ProviderRoute
+
+
+class StubProvider:
+    """Answers after a fixed delay; optionally fails or records concurrency"""
+
+    def __init__(self, provider: LLMProvider, delay: float, fail: bool = False):
+        self.provider = provider
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, request: LLMRequest) -> LLMResponse:
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError(f"{self.provider.value} unavailable")
+            return LLMResponse(content=f"answer from {self.provider.value}", provider=self.provider, model=request.model)
+        finally:
+            self.active -= 1
+
+
+def route(stub: StubProvider, model: str, **kwargs) -> ProviderRoute:
+    return ProviderRoute(stub.provider, model, stub.generate, **kwargs)
+
+
+async def warm(router: LLMRouter, n: int = 6):
+    for _ in range(n):
+        for r in router.routes:
+            await router._call(r, LLMRequest(prompt="warm-up"))
+
+
+async def test_prefers_fast_route():
+    slow = StubProvider(LLMProvider.ANTHROPIC, 0.05)
+    fast = StubProvider(LLMProvider.SAMBANOVA, 0.01)
+    router = LLMRouter([route(slow, "claude-3-haiku"), route(fast, "Meta-Llama-3.1-8B-Instruct")], hedge=False)
+    await warm(router)
+    response = await router.generate(LLMRequest(prompt="hi"))
+    assert response.provider == LLMProvider.SAMBANOVA, response
+    print("✅ Fastest route chosen once latencies are known")
+
+
+async def test_falls_back_on_error():
+    broken = StubProvider(LLMProvider.OPENAI, 0.0, fail=True)
+    backup = StubProvider(LLMProvider.XAI, 0.01)
+    # Without cost or latency data the ranking keeps registration order
+    router = LLMRouter([route(broken, "gpt-4o-mini"), route(backup, "grok-beta")], cost_weight=0, hedge=False)
+    response = await router.generate(LLMRequest(prompt="hi"))
+    assert response.is_success and response.provider == LLMProvider.XAI, response
+    assert broken.calls == 1 and router.routes[0].stats.error_rate == 1.0
+    print("✅ Failed route falls back to the next candidate")
+
+
+async def test_hedges_after_p90():
+    primary = StubProvider(LLMProvider.OPENAI, 0.02)
+    secondary = StubProvider(LLMProvider.ANTHROPIC, 0.02)
+    router = LLMRouter([route(primary, "gpt-4o-mini"), route(secondary, "claude-3-haiku")])
+    await warm(router)
+    primary.delay = 1.0  # primary degrades well past its p90
+    started = time.perf_counter()
+    response = await router.generate(LLMRequest(prompt="hi"))
+    elapsed = time.perf_counter() - started
+    assert response.provider == LLMProvider.ANTHROPIC, response
+    assert elapsed < 0.5, elapsed
+    assert router.routes[1].stats.hedges_won == 1
+    print(f"✅ Hedged request answered in {elapsed * 1000:.0f}ms instead of 1000ms")
+
+
+async def test_capability_filter():
+    text_only = StubProvider(LLMProvider.PERPLEXITY, 0.0)
+    vision = StubProvider(LLMProvider.OPENAI, 0.0)
+    router = LLMRouter([
+        route(text_only, "sonar"),
+        route(vision, "gpt-4o", capabilities=(LLMCapability.TEXT_GENERATION, LLMCapability.VISION)),
+    ])
+    response = await router.generate(LLMRequest(prompt="read this", images=["aGVsbG8="]))
+    assert response.provider == LLMProvider.OPENAI and text_only.calls == 0
+    print("✅ Vision requests only go to vision-capable routes")
+
+
+async def test_concurrency_limit():
+    stub = StubProvider(LLMProvider.SAMBANOVA, 0.02)
+    router = LLMRouter([route(stub, "Meta-Llama-3.1-8B-Instruct", max_concurrency=2)], hedge=False)
+    await asyncio.gather(*(router.generate(LLMRequest(prompt=str(i))) for i in range(10)))
+    assert stub.peak <= 2, stub.peak
+    print(f"✅ Peak concurrency held at {stub.peak} (limit 2)")
+
+
+async def main():
+    print("🔀 Testing LLM provider router\n" + "=" * 50)
+    await test_prefers_fast_route()
+    await test_falls_back_on_error()
+    await test_hedges_after_p90()
+    await test_capability_filter()
+    await test_concurrency_limit()
+    print("\n🎉 All router checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
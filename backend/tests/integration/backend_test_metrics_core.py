@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the metrics core: bounded ring buffers, counters, streaming histogram
+accuracy against exact percentiles, per-tag series and O(1) recording cost
+"""
+import sys
+import random
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.metrics import (
+    MetricsRegistry,
+    MetricType,
+    RingBuffer,
+    StreamingHistogram,
+    WindowedMean,
+    RELATIVE_ACCURACY
+)
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_ring_buffer_is_bounded():
+    ring = RingBuffer(4)
+    evicted = [ring.append(v) for v in range(10)]
+    assert ring.values() == [6, 7, 8, 9] and len(ring) == 4, ring.values()
+    assert evicted[:4] == [None] * 4 and evicted[4:] == [0, 1, 2, 3, 4, 5]
+    assert ring.oldest() == 6 and ring.latest() == 9
+    window = WindowedMean(3)
+    for v in (10, 20, 30, 40):
+        window.add(v)
+    assert window.mean == 30, window.mean
+    print("✅ Ring buffer overwrites the oldest value; windowed mean stays exact")
+
+
+def test_histogram_accuracy():
+    rng = random.Random(1)
+    for name, values in (
+        ("lognormal latencies", [rng.lognormvariate(4, 1.2) for _ in range(50_000)]),
+        ("uniform", [rng.uniform(0, 1000) for _ in range(50_000)]),
+        ("bimodal", [rng.choice((5.0, 5000.0)) * rng.uniform(0.9, 1.1) for _ in range(50_000)]),
+    ):
+        histogram = StreamingHistogram()
+        for value in values:
+            histogram.add(value)
+        for q in (0.5, 0.9, 0.99, 0.999):
+            estimate, exact = histogram.quantile(q), exact_quantile(values, q)
+            assert abs(estimate - exact) <= exact * RELATIVE_ACCURACY * 1.01, (name, q, estimate, exact)
+        assert histogram.count == len(values) and histogram.max == max(values)
+    print(f"✅ Histogram quantiles within {RELATIVE_ACCURACY:.0%} of exact on three distributions")
+
+
+def test_registry_series_and_summary():
+    registry = MetricsRegistry(window=8)
+    for i in range(20):
+        registry.increment("requests", tags={"route": "/api/upload"})
+        registry.observe("latency_ms", float(i + 1), tags={"route": "/api/upload"})
+    registry.record("system.cpu_percent", 42.0)
+    with registry.timer("guide.generate_ms", tags={"mode": "batched"}):
+        time.sleep(0.01)
+
+    requests = registry.get("requests", {"route": "/api/upload"})
+    assert requests.last == 20 and requests.metric_type == MetricType.COUNTER
+    assert len(requests.recent) == 8, "recent window must stay bounded"
+    summary = registry.summary()
+    latency = summary["metric_summaries"]["latency_ms{route=/api/upload}"]
+    assert latency["count"] == 20 and latency["max"] == 20 and 9.5 <= latency["p50"] <= 10.5, latency
+    timer = summary["metric_summaries"]["guide.generate_ms{mode=batched}"]
+    assert timer["type"] == "timer" and timer["latest"] >= 10, timer
+    assert summary["time_range"]["start"] and summary["total_metrics"] == 42
+    print("✅ Series are keyed by name and tags; summaries include percentiles")
+
+
+def test_recording_cost():
+    registry = MetricsRegistry()
+    series = registry.series("latency_ms", MetricType.HISTOGRAM)
+    n = 200_000
+    started = time.perf_counter()
+    for i in range(n):
+        series.record(1 + (i % 5000) * 0.37)
+    per_record_us = (time.perf_counter() - started) / n * 1e6
+    started = time.perf_counter()
+    for _ in range(1000):
+        series.histogram.quantile(0.99)
+    per_query_us = (time.perf_counter() - started) / 1000 * 1e6
+    assert per_record_us < 20, per_record_us
+    print(f"✅ {per_record_us:.2f}µs per record, {per_query_us:.0f}µs per p99 query over {n:,} samples")
+
+
+def main():
+    print("📈 Testing metrics core\n" + "=" * 50)
+    test_ring_buffer_is_bounded()
+    test_histogram_accuracy()
+    test_registry_series_and_summary()
+    test_recording_cost()
+    print("\n🎉 All metrics checks passed")
+
+
+if __name__ == "__main__":
+    main()
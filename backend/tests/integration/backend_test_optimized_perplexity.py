@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test the optimized Perplexity fan-out: sections are fetched concurrently,
+a failed or cancelled sub-query leaves only its own section empty, and in
+batched mode a failed batch is refetched section by section instead of
+losing the guide (no API keys)
+"""
+import sys
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services.optimized_perplexity_service import OptimizedPerplexityService
+from src.services.prompt_batching import SECTION_SPECS, PromptBatch, SectionRequest, guide_section_requests
+
+TRIP = ("Lisbon, Portugal", "2026-11-02", "2026-11-04")
+DELAY_S = 0.05
+
+
+def canned(request: SectionRequest) -> Any:
+    spec = request.spec
+    item = {key: (1 if kind == "integer" else f"{request.section} value") for key, kind in spec.item_properties.items()}
+    if not spec.is_list:
+        return item
+    return [dict(item, name=f"{request.section} {i}") for i in range(3)]
+
+
+class StubService(OptimizedPerplexityService):
+    """Answers every section after a fixed delay; `failures` maps a section to what it raises"""
+
+    def __init__(self, batch_mode: bool = False, failures: Optional[Dict[str, BaseException]] = None):
+        super().__init__()
+        self.config.api_key = "stub"
+        self.config.stream = False
+        self.config.batch_mode = batch_mode
+        self.failures = failures or {}
+        self.section_calls = []
+        self.batch_calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _timed(self, sections):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(DELAY_S)
+        finally:
+            self.in_flight -= 1
+        for section in sections:
+            if section in self.failures:
+                raise self.failures[section]
+
+    async def _fetch_section(self, request: SectionRequest, item_callback=None) -> Any:
+        self.section_calls.append(request.section)
+        await self._timed([request.section])
+        return canned(request)
+
+    async def _fetch_batch(self, batch: PromptBatch, item_callback=None) -> Dict[SectionRequest, Optional[Any]]:
+        self.batch_calls += 1
+        await self._timed([r.section for r in batch.requests])
+        return {r: canned(r) for r in batch.requests}
+
+
+async def test_concurrent_fan_out():
+    service = StubService(failures={"events": RuntimeError("rate limited"), "attractions": asyncio.CancelledError()})
+    started = time.perf_counter()
+    sections = await service._fetch_sections_concurrently(guide_section_requests(*TRIP))
+    elapsed = time.perf_counter() - started
+
+    assert service.peak == len(SECTION_SPECS), f"all sections in flight at once ({service.peak})"
+    assert elapsed < DELAY_S * 3, f"sections run concurrently ({elapsed:.3f}s)"
+    assert sections["events"] is None and sections["attractions"] is None
+    assert len(sections["restaurants"]) == 3 and sections["practical_info"]["transportation"]
+    print(f"✅ {len(sections)} sections fetched concurrently in {elapsed * 1000:.0f}ms; failures stay per section")
+
+
+async def test_partial_failure_keeps_guide():
+    service = StubService(failures={"attractions": asyncio.CancelledError()})
+    guide = await service.generate_complete_guide_data(*TRIP, preferences={"cuisineTypes": ["Portuguese"]})
+    assert "error" not in guide, guide.get("error")
+    assert guide["attractions"] == [] and len(guide["restaurants"]) == 3
+    print("✅ A cancelled sub-query leaves its section empty instead of failing the guide")
+
+
+async def test_failed_batch_refetched():
+    requests = guide_section_requests(*TRIP)
+    service = StubService(batch_mode=True)
+    baseline = await service._fetch_sections_batched(requests)
+    assert service.section_calls == [] and all(baseline.values())
+
+    service = StubService(batch_mode=True, failures={"restaurants": asyncio.CancelledError()})
+    sections = await service._fetch_sections_batched(requests)
+    assert service.section_calls, "sections of the failed batch are refetched individually"
+    assert set(service.section_calls) <= set(SECTION_SPECS) and "restaurants" in service.section_calls
+    assert sections["restaurants"] is None, "a section failing on refetch too is left empty"
+    assert all(sections[name] for name in SECTION_SPECS if name != "restaurants"), sections
+    print(f"✅ A failed batch of {service.batch_calls} is refetched per section "
+          f"({len(service.section_calls)} refetches) without losing the rest")
+
+
+async def main():
+    print("🧭 Testing the optimized Perplexity fan-out\n" + "=" * 50)
+    await test_concurrent_fan_out()
+    await test_partial_failure_keeps_guide()
+    await test_failed_batch_refetched()
+    print("\n🎉 All optimized Perplexity checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
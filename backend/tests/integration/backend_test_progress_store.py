@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test the write-coalescing progress store: progress updates are folded into
+few snapshot writes, status changes are written through, the journal
+restores unflushed updates after a crash, journal appends run off the event
+loop and status reads stay in memory (no API keys needed)
+"""
+import os
+import sys
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = str(Path(_tmp.name) / "data")
+os.environ["DB_BACKUP_PATH"] = str(Path(_tmp.name) / "backups")
+os.environ["DB_PROCESSING_FLUSH_MS"] = "50"
+
+from src.models.database_models import ProcessingStatus
+from src.services.enhanced_database_service import EnhancedDatabaseService
+from src.services import file_store
+from src.services.progress_store import ProgressStore
+
+
+def snapshot(service: EnhancedDatabaseService, trip_id: str) -> dict:
+    return json.loads((service.processing_path / f"{trip_id}.json").read_text())
+
+
+async def test_progress_updates_coalesce():
+    service = EnhancedDatabaseService()
+    await service.initialize()
+    store = service.progress_store
+
+    await service.create_processing_state("trip-a", "Starting")
+    written = store.stats["snapshots_written"]
+    for progress in range(1, 101):
+        await service.update_processing_state("trip-a", progress=progress, message=f"Step {progress}")
+    assert store.stats["snapshots_written"] == written, "progress updates are not written through"
+    assert snapshot(service, "trip-a")["progress"] == 0
+
+    await asyncio.sleep(0.1)
+    assert snapshot(service, "trip-a")["progress"] == 100
+    assert store.stats["snapshots_written"] - written == 1, store.stats
+    assert not store.journal_path.exists(), "journal is truncated once every state is flushed"
+
+    await service.update_processing_state("trip-a", status=ProcessingStatus.COMPLETED, progress=100, message="Done")
+    assert snapshot(service, "trip-a")["status"] == "completed", "terminal states are written through"
+    assert "trip-a" not in store and (await service.get_processing_state("trip-a")).status == ProcessingStatus.COMPLETED
+    print(f"✅ 100 progress updates cost 1 snapshot write ({store.stats['coalesced']} coalesced)")
+
+
+async def test_crash_recovery():
+    path = Path(_tmp.name) / "crash"
+    crashed = ProgressStore(path, flush_interval_ms=60_000)
+    service = EnhancedDatabaseService()
+    service.processing_path = path
+    service.progress_store = crashed
+    path.mkdir(parents=True)
+
+    await service.create_processing_state("trip-b", "Starting")
+    for progress in (10, 20, 30):
+        await service.update_processing_state(
+            "trip-b", progress=progress, partial_results={"restaurants": [{"name": f"R{progress}"}]}
+        )
+    assert json.loads((path / "trip-b.json").read_text())["progress"] == 0
+    # Simulate a crash: the pending flush never runs
+    crashed._flush_task.cancel()
+
+    restarted = ProgressStore(path)
+    recovered = await restarted.recover()
+    state = restarted.get("trip-b")
+    assert recovered == ["trip-b"] and state.progress == 30
+    assert state.partial_results == {"restaurants": [{"name": "R30"}]}
+    assert json.loads((path / "trip-b.json").read_text())["progress"] == 30
+    assert not restarted.journal_path.exists()
+    print("✅ Journal replay restores updates that were never snapshotted")
+
+
+async def test_journal_appends_off_loop():
+    path = Path(_tmp.name) / "journal"
+    store = ProgressStore(path, flush_interval_ms=60_000)
+    service = EnhancedDatabaseService()
+    service.processing_path = path
+    service.progress_store = store
+    path.mkdir(parents=True)
+    threads = []
+    append = file_store._append
+    file_store._append = lambda *args: threads.append(threading.get_ident()) or append(*args)
+    try:
+        await service.create_processing_state("trip-j", "Starting")
+        for progress in range(1, 51):
+            await service.update_processing_state("trip-j", progress=progress)
+        await store._journal_task
+    finally:
+        file_store._append = append
+        store._flush_task.cancel()
+
+    assert threads and threading.get_ident() not in threads, "journal appends run in the executor"
+    assert len(threads) < store.stats["journal_records"], "records buffered during an append share the next one"
+    assert len(store.journal_path.read_bytes().splitlines()) == store.stats["journal_records"] == 51
+    print(f"✅ {store.stats['journal_records']} journal records took {len(threads)} appends off the event loop")
+
+
+async def test_read_latency():
+    service = EnhancedDatabaseService()
+    await service.initialize()
+    await service.create_processing_state("trip-c", "Running")
+    await service.update_processing_state("trip-c", progress=42)
+
+    n = 5000
+    started = time.perf_counter()
+    for _ in range(n):
+        state = await service.get_processing_state("trip-c")
+    per_read = (time.perf_counter() - started) / n * 1e6
+    assert state.progress == 42 and per_read < 1000, per_read
+
+    n = 500
+    started = time.perf_counter()
+    for i in range(n):
+        await service.update_processing_state("trip-c", progress=i % 100)
+    per_update = (time.perf_counter() - started) / n * 1e6
+    await service.cleanup()
+    assert snapshot(service, "trip-c")["progress"] == (n - 1) % 100, "cleanup flushes pending updates"
+    print(f"✅ Status reads take {per_read:.1f}µs; progress updates {per_update:.1f}µs")
+
+
+async def test_guide_route_progress_coalesces():
+    from fastapi import BackgroundTasks
+    from src.api.routes.enhanced_guide import GenerateGuideRequest, generate_enhanced_guide
+
+    service = EnhancedDatabaseService()
+    await service.initialize()
+    store = service.progress_store
+    seen = []
+
+    class StubGuideService:
+        async def generate_optimized_guide(self, progress_callback=None, **kwargs):
+            for step in range(1, 21):
+                await progress_callback(step * 5, f"Step {step}")
+                state = store.active()[-1]
+                seen.append((state.status, state.progress, state.message))
+            return {"destination": kwargs["destination"], "restaurants": [], "attractions": []}
+
+    written, coalesced = store.stats["snapshots_written"], store.stats["coalesced"]
+    request = GenerateGuideRequest(
+        destination="Lisbon", start_date="2026-11-02", end_date="2026-11-04", hotel_info={}, preferences={}
+    )
+    result = await generate_enhanced_guide(
+        request, BackgroundTasks(), service, None, None, StubGuideService()
+    )
+    assert result["status"] == "success", result
+    assert all(status == ProcessingStatus.PROCESSING for status, _, _ in seen), seen[:3]
+    assert seen[-1][1:] == (100, "Step 20")
+    assert store.stats["coalesced"] - coalesced == 19, "the route's progress callbacks coalesce"
+    # One snapshot when the state is created, one when it completes
+    assert store.stats["snapshots_written"] - written == 2, store.stats
+    final = await service.get_processing_state(result["trip_id"])
+    assert final.status == ProcessingStatus.COMPLETED and final.message == "Guide generation complete"
+    print("✅ The guide route's 20 progress callbacks coalesce into the final write")
+
+
+async def main():
+    print("⏱️  Testing progress store\n" + "=" * 50)
+    try:
+        await test_progress_updates_coalesce()
+        await test_crash_recovery()
+        await test_journal_appends_off_loop()
+        await test_read_latency()
+        await test_guide_route_progress_coalesces()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All progress store checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
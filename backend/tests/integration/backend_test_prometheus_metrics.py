@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test the /metrics Prometheus exposition: per-route request histograms,
+upstream call metrics from aiohttp tracing, cache hit ratios, event-loop
+lag and the job gauge (no API keys or Redis needed)
+"""
+import sys
+import asyncio
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import aiohttp
+import httpx
+from aiohttp import web
+from fastapi import FastAPI
+
+from src.core.metrics import MetricsRegistry, MetricType, metrics_registry
+from src.core.middleware import MetricsMiddleware
+from src.core.prometheus import PrometheusExporter, LATENCY_BUCKETS
+from src.core.event_loop import EventLoopWatchdog
+from src.core.upstream_metrics import upstream_call, upstream_trace_configs, UPSTREAM_HOSTS
+from src.services.enhanced_redis_cache import cache_manager
+from src.api.routes import metrics
+
+
+def parse_exposition(text: str) -> dict:
+    """sample line -> value, skipping comments"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_buckets():
+    registry = MetricsRegistry()
+    series = registry.series("demo.duration_ms", MetricType.TIMER)
+    values = [i * 0.37 for i in range(1, 5001)]  # 0.37ms .. 1.85s
+    for v in values:
+        series.record(v)
+    samples = parse_exposition(PrometheusExporter(registry).render())
+
+    previous = 0
+    for bound in LATENCY_BUCKETS:
+        count = samples[f'tripcraft_demo_duration_seconds_bucket{{le="{bound!r}"}}']
+        exact = sum(1 for v in values if v <= bound * 1000)
+        assert count >= previous, "buckets must be cumulative"
+        assert abs(count - exact) <= max(2, exact * 0.02), (bound, count, exact)
+        previous = count
+    assert samples['tripcraft_demo_duration_seconds_bucket{le="+Inf"}'] == len(values)
+    assert abs(samples["tripcraft_demo_duration_seconds_sum"] - sum(values) / 1000) < 1e-6
+    print("✅ Histogram buckets derived from the sketch match exact counts within 2%")
+
+
+async def test_route_templates_and_caches():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
+
+    @app.get("/api/trip/{trip_id}")
+    async def trip(trip_id: str):
+        return {"trip_id": trip_id}
+
+    cache_manager._count("enhanced_guide", "hits")
+    cache_manager._count("enhanced_guide", "hits")
+    cache_manager._count("enhanced_guide", "misses")
+    metrics_registry.record("jobs.in_progress", 3)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        for i in range(5):
+            assert (await client.get(f"/api/trip/{i}")).status_code == 200
+        assert (await client.get("/nowhere")).status_code == 404
+        response = await client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = parse_exposition(response.text)
+    ok_route = 'tripcraft_http_server_duration_seconds_count{method="GET",route="/api/trip/{trip_id}",status="2xx"}'
+    assert samples[ok_route] == 5, samples.get(ok_route)
+    assert samples['tripcraft_http_server_duration_seconds_count{method="GET",route="unmatched",status="4xx"}'] == 1
+    ratio = samples['tripcraft_cache_hit_ratio{cache="redis",namespace="enhanced_guide"}']
+    assert abs(ratio - 2 / 3) < 1e-9, ratio
+    assert samples["tripcraft_jobs_in_progress"] == 3
+    print("✅ Requests grouped by route template; cache hit ratios and job gauge exported")
+
+
+async def test_upstream_tracing():
+    async def ok(request):
+        return web.json_response({"ok": True})
+
+    async def broken(request):
+        return web.Response(status=503)
+
+    server_app = web.Application()
+    server_app.router.add_get("/ok", ok)
+    server_app.router.add_get("/broken", broken)
+    runner = web.AppRunner(server_app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    UPSTREAM_HOSTS["127.0.0.1"] = "test_upstream"
+    try:
+        async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
+            for _ in range(3):
+                async with session.get(f"http://127.0.0.1:{port}/ok") as response:
+                    await response.read()
+            async with session.get(f"http://127.0.0.1:{port}/broken") as response:
+                await response.read()
+    finally:
+        del UPSTREAM_HOSTS["127.0.0.1"]
+        await runner.cleanup()
+
+    try:
+        with upstream_call("test_llm"):
+            raise RuntimeError("provider down")
+    except RuntimeError:
+        pass
+
+    samples = parse_exposition(PrometheusExporter().render())
+    assert samples['tripcraft_upstream_requests_total{outcome="ok",provider="test_upstream"}'] == 3
+    assert samples['tripcraft_upstream_requests_total{outcome="error",provider="test_upstream"}'] == 1
+    assert samples['tripcraft_upstream_duration_seconds_count{provider="test_upstream"}'] == 4
+    assert samples['tripcraft_upstream_requests_total{outcome="error",provider="test_llm"}'] == 1
+    print("✅ Upstream latency and outcomes recorded per provider")
+
+
+async def test_event_loop_lag():
+    registry = MetricsRegistry()
+    monitor = EventLoopWatchdog(interval=0.01, registry=registry)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.1)  # block the loop
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    lag = registry.get("event_loop.lag_ms").histogram
+    assert lag.max >= 50, lag.max
+    print(f"✅ Event loop lag recorded (max {lag.max:.0f}ms while blocked for 100ms)")
+
+
+def test_render_cost():
+    registry = MetricsRegistry()
+    for route in range(40):
+        series = registry.series("http.server.duration_ms", MetricType.TIMER, {"route": f"/r/{route}"})
+        for i in range(2000):
+            series.record(1 + (i * 7919) % 5000)
+    exporter = PrometheusExporter(registry)
+    started = time.perf_counter()
+    for _ in range(10):
+        exporter.render()
+    per_scrape = (time.perf_counter() - started) / 10 * 1000
+    print(f"✅ Scrape of 40 route histograms renders in {per_scrape:.2f}ms")
+
+
+def main():
+    print("📈 Testing Prometheus metrics exposition\n" + "=" * 50)
+    test_histogram_buckets()
+    asyncio.run(test_route_templates_and_caches())
+    asyncio.run(test_upstream_tracing())
+    asyncio.run(test_event_loop_lag())
+    test_render_cost()
+    print("\n🎉 All metrics exposition checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the route planner: grid radius queries, nearest-neighbour + 2-opt
+ordering, opening-hour windows (including ones past midnight), per-day
+neighbourhood clustering around the hotel, and Distance Matrix lookups kept
+off the event loop (no API keys)
+"""
+import asyncio
+import itertools
+import math
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services.route_planner import (
+    GridIndex, RouteOptimizer, RoutePlanner, TravelTimeMatrix, google_distance_matrix_provider
+)
+
+HOTEL = (38.7100, -9.1400)
+
+
+def place(name, lat, lng, hours=None):
+    return {"name": name, "latitude": lat, "longitude": lng, "hours": hours}
+
+
+def test_grid_index():
+    lat = np.array([38.7100, 38.7105, 38.7200, 38.8000, math.nan])
+    lng = np.array([-9.1400, -9.1400, -9.1400, -9.1400, -9.1400])
+    index = GridIndex(lat, lng, cell_km=0.5)
+    assert sum(len(members) for members in index.cells.values()) == 4, "unlocated places are not indexed"
+    assert index.query_radius(38.7101, -9.1400, 0.2) == [0, 1], "nearest first, within the radius"
+    assert index.query_radius(38.7101, -9.1400, 1.5) == [0, 1, 2]
+    assert index.query_radius(38.7600, -9.1400, 0.5) == []
+    print("✅ Grid radius queries return places within reach, nearest first")
+
+
+def test_two_opt():
+    # Eight stops on a circle around the hotel in shuffled order
+    angles = np.linspace(0, 2 * math.pi, 8, endpoint=False)[[0, 4, 2, 6, 1, 5, 3, 7]]
+    points = np.vstack([[HOTEL], np.column_stack([HOTEL[0] + 0.02 * np.cos(angles), HOTEL[1] + 0.02 * np.sin(angles)])])
+    minutes = TravelTimeMatrix().minutes(points)
+    optimizer = RouteOptimizer()
+    route, cost = optimizer.order(minutes)
+    best = min(
+        optimizer.cost(minutes, list(p), None, 0, True) for p in itertools.permutations(range(1, 9))
+    )
+    assert sorted(route) == list(range(1, 9)) and cost <= best * 1.05, (cost, best)
+    print(f"✅ Nearest neighbour + 2-opt is within 5% of the optimal tour ({cost:.0f} vs {best:.0f} min)")
+
+
+def test_opening_windows():
+    optimizer = RouteOptimizer(visit_minutes=60)
+    minutes = np.full((3, 3), 10.0)
+    np.fill_diagonal(minutes, 0)
+
+    night = np.array([[math.nan, math.nan], [1080, 120], [540, 720]])  # bar 6 PM - 2 AM, museum 9 - noon
+    route, cost = optimizer.order(minutes, night, day_start=540)
+    assert route == [2, 1], "the morning-only museum comes first"
+    assert optimizer.cost(minutes, [2, 1], night, 540, True) < optimizer.cost(minutes, [1, 2], night, 540, True)
+    # Arriving at the bar at 7 PM is on time, not twenty hours late
+    waiting = optimizer.cost(minutes, [1], night[:2], 1130, False)
+    assert waiting == 10.0, waiting
+
+    late = np.array([[math.nan, math.nan], [540, 600], [540, 1200]])
+    assert optimizer.cost(minutes, [1], late[:2], 660, False) > 600, "a visit past closing time is penalized"
+    print("✅ Opening-hour windows order stops, past-midnight closing times included")
+
+
+def test_plan_days():
+    west = [place(f"West {i}", 38.7100 + i * 0.002, -9.2000 - i * 0.002, "9:00 AM – 6:00 PM") for i in range(3)]
+    east = [place(f"East {i}", 38.7100 + i * 0.002, -9.0800 + i * 0.002) for i in range(3)]
+    unlocated = [{"name": "Walking tour"}]
+    days = RoutePlanner().plan_days(west + east + unlocated, num_days=2, origin=HOTEL, stops_per_day=4)
+
+    assert [day.day for day in days] == [1, 2]
+    areas = [{stop["name"].split()[0] for stop in day.stops if "latitude" in stop} for day in days]
+    assert all(len(area) <= 1 for area in areas), f"each day stays in one neighbourhood: {areas}"
+    names = [stop["name"] for day in days for stop in day.stops]
+    assert sorted(names) == sorted(p["name"] for p in west + east + unlocated)
+    assert all(len(day.stops) <= 4 for day in days) and all(day.travel_minutes > 0 for day in days)
+    assert RoutePlanner().plan_days([], 2, HOTEL)[0].stops == []
+
+    itinerary = [{"day": 1}, {"day": 2}]
+    routed = RoutePlanner().attach_routes(itinerary, west + east, HOTEL)
+    assert [day["route"]["day"] for day in routed] == [1, 2] and "route" not in itinerary[0]
+    print(f"✅ Days are clustered by neighbourhood around the hotel ({[len(d.stops) for d in days]} stops)")
+
+
+async def test_distance_matrix_off_loop():
+    from src.services.google_places_enhancer import GooglePlacesEnhancer
+
+    loop_thread = threading.get_ident()
+    calls = []
+
+    class FakeClient:
+        def distance_matrix(self, origins, destinations, mode):
+            calls.append(threading.get_ident())
+            return {"rows": [
+                {"elements": [{"status": "OK", "duration": {"value": 0 if o == d else 600}} for d in destinations]}
+                for o in origins
+            ]}
+
+    enhancer = GooglePlacesEnhancer.__new__(GooglePlacesEnhancer)
+    enhancer.client = FakeClient()
+    enhancer.route_planner = RoutePlanner(TravelTimeMatrix(provider=google_distance_matrix_provider(enhancer.client)))
+    attractions = [
+        {"name": f"Stop {i}", "coordinates": {"lat": HOTEL[0] + i * 0.01, "lng": HOTEL[1]}} for i in range(4)
+    ]
+    route = await enhancer.create_attraction_route(attractions)
+    assert "error" not in route, route
+    assert calls and loop_thread not in calls, "Distance Matrix calls run in a worker thread"
+    assert route["estimated_travel_minutes"] == 30, "three legs of ten provider minutes"
+    print(f"✅ Distance Matrix lookups run off the event loop ({len(calls)} batched call)")
+
+
+async def main():
+    print("🗺️  Testing the route planner\n" + "=" * 50)
+    test_grid_index()
+    test_two_opt()
+    test_opening_windows()
+    test_plan_days()
+    await test_distance_matrix_off_loop()
+    print("\n🎉 All route planner checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
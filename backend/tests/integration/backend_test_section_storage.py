@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test section-split trip storage: sections are versioned and written
+independently, TripData loads sections lazily, guide section updates touch
+only their own blobs and single-document trips migrate on save (no API keys)
+"""
+import os
+import sys
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = str(Path(_tmp.name) / "data")
+os.environ["DB_BACKUP_PATH"] = str(Path(_tmp.name) / "backups")
+
+from src.models.database_models import TripData
+from src.services.enhanced_database_service import EnhancedDatabaseService
+from src.services.trip_storage import TripStorageService
+
+
+def big_guide() -> dict:
+    return {
+        "destination": "Paris",
+        "generated_at": "2026-10-01T10:00:00",
+        "weather": [{"date": f"2026-10-{d:02d}", "temp": 18} for d in range(1, 8)],
+        "restaurants": [{"name": f"Bistro {i}", "description": "x" * 400} for i in range(600)],
+        "attractions": [{"name": f"Museum {i}", "description": "y" * 400} for i in range(400)],
+        "section_meta": {"weather": {"fetched_at": "2026-10-01T10:00:00"}},
+    }
+
+
+async def make_service() -> EnhancedDatabaseService:
+    service = EnhancedDatabaseService()
+    await service.initialize()
+    return service
+
+
+async def test_lazy_loading():
+    service = await make_service()
+    trip = TripData(
+        trip_id="lazy-trip",
+        itinerary={"trip_summary": {"destination": "Paris", "start_date": "2026-10-01"}},
+        extracted_data={"flights": []},
+        enhanced_guide=big_guide(),
+    )
+    assert (await service.save_trip_data(trip)).success
+
+    service._trip_cache.clear()
+    loaded = await service.get_trip_data("lazy-trip")
+    assert loaded.loaded_sections() == [], "no section is read until it is used"
+    assert loaded.itinerary["trip_summary"]["destination"] == "Paris"
+    assert loaded.loaded_sections() == ["itinerary"]
+
+    prefetched = await service.get_trip_data("lazy-trip", sections=("enhanced_guide",))
+    assert "enhanced_guide" in prefetched.loaded_sections()
+    assert prefetched.enhanced_guide == big_guide()
+    print("✅ TripData reads sections lazily; requested sections are prefetched")
+
+
+async def test_weather_refresh_touches_only_its_blob():
+    service = await make_service()
+    trip_dir = service.trips_path / "lazy-trip"
+    before = {p.name: p.stat().st_mtime_ns for p in trip_dir.glob("*.json")}
+    versions = await service.section_store.versions("lazy-trip")
+    time.sleep(0.01)
+
+    updates = {"weather": [{"date": "2026-10-01", "temp": 12}], "section_meta": {"weather": {"fetched_at": "now"}}}
+    result = await service.save_enhanced_guide_data("lazy-trip", updates, merge=True)
+    assert result.success
+    written = result.data["sections_written"]
+    assert set(written) == {"guide.weather", "guide.section_meta"}, written
+
+    after = {p.name: p.stat().st_mtime_ns for p in trip_dir.glob("*.json")}
+    assert after["guide.restaurants.json"] == before["guide.restaurants.json"]
+    assert after["itinerary.json"] == before["itinerary.json"]
+    new_versions = await service.section_store.versions("lazy-trip")
+    assert new_versions["guide.weather"] == versions["guide.weather"] + 1
+    assert new_versions["guide.restaurants"] == versions["guide.restaurants"]
+
+    service._trip_cache.clear()
+    guide = await service.get_enhanced_guide("lazy-trip")
+    assert guide["weather"][0]["temp"] == 12 and len(guide["restaurants"]) == 600
+    size = (trip_dir / "guide.restaurants.json").stat().st_size
+    print(f"✅ Weather refresh wrote {len(written)} small blobs; the {size // 1024}KB restaurant blob was untouched")
+
+
+async def test_unchanged_sections_skipped():
+    service = await make_service()
+    trip = await service.get_trip_data("lazy-trip")
+    trip.itinerary = dict(trip.itinerary, notes="window seat")
+    trip.extracted_data  # loaded but unchanged
+    result = await service.update_trip_data("lazy-trip", itinerary=trip.itinerary)
+    assert result.data["sections_written"] == ["itinerary"], result.data
+    metadata = (await service.list_trips())[0]
+    assert metadata.destination == "Paris"
+    print("✅ Saving a trip rewrites only sections whose content changed")
+
+
+async def test_async_paths_skip_sync_reads():
+    service = await make_service()
+    store = service.section_store
+    sync_reads = []
+    read_section, read_guide = store.read_section_sync, store.read_guide_sync
+    store.read_section_sync = lambda *args: sync_reads.append(args) or read_section(*args)
+    store.read_guide_sync = lambda *args: sync_reads.append(args) or read_guide(*args)
+
+    trip = await service.get_trip_data("lazy-trip", sections=("itinerary", "preferences", "enhanced_guide"))
+    assert trip.itinerary["trip_summary"]["destination"] == "Paris" and trip.enhanced_guide
+    service._trip_cache.clear()
+    service._metadata_cache.clear()
+    assert (await service.update_trip_data("lazy-trip", preferences={"pace": "slow"})).success
+    assert sync_reads == [], f"async callers read sections without blocking the loop: {sync_reads}"
+    print("✅ Prefetched sections and saves of a lazy trip never read on the event loop")
+
+
+async def test_legacy_trip_migrates():
+    service = await make_service()
+    legacy = TripData(trip_id="legacy-trip", itinerary={"trip_summary": {"destination": "Rome"}},
+                      enhanced_guide={"destination": "Rome", "weather": []})
+    (service.trips_path / "legacy-trip.json").write_text(json.dumps(legacy.to_dict(), indent=2))
+
+    trip = await service.get_trip_data("legacy-trip")
+    assert trip.enhanced_guide["destination"] == "Rome"
+    assert await service.save_enhanced_guide("legacy-trip", {"destination": "Rome", "weather": [{"temp": 20}]})
+    assert not (service.trips_path / "legacy-trip.json").exists()
+    assert (service.trips_path / "legacy-trip" / "manifest.json").exists()
+
+    service._trip_cache.clear()
+    migrated = await service.get_trip_data("legacy-trip")
+    assert migrated.itinerary["trip_summary"]["destination"] == "Rome"
+    assert migrated.enhanced_guide["weather"] == [{"temp": 20}]
+    assert (await service.execute_query("count_trips")).data["count"] == 2
+
+    backup = await service.create_backup()
+    assert backup.metadata["trip_count"] == 2
+    print("✅ Single-document trips are read as before and migrate on first save")
+
+
+async def test_trip_storage_service():
+    storage = TripStorageService(str(Path(_tmp.name) / "trip_storage"))
+    trip_id = await storage.create_trip({
+        "destination": "Lisbon",
+        "enhanced_guide": big_guide(),
+        "itinerary": {"days": [1, 2, 3]},
+    })
+    guide_file = storage.data_path / trip_id / "guide.restaurants.json"
+    guide_mtime = guide_file.stat().st_mtime_ns
+    time.sleep(0.01)
+
+    assert await storage.add_to_trip(trip_id, "extracted_data", {"destination": "Porto"})
+    assert guide_file.stat().st_mtime_ns == guide_mtime
+    trip = await storage.get_trip(trip_id)
+    assert trip["extracted_data"]["destination"] == "Porto"
+    assert trip["enhanced_guide"] == big_guide()
+    assert (await storage.get_trip_metadata(trip_id)).destination == "Porto"
+    print("✅ TripStorageService.add_to_trip writes only the updated section")
+
+
+async def main():
+    print("🗂️  Testing section-split trip storage\n" + "=" * 50)
+    try:
+        await test_lazy_loading()
+        await test_weather_refresh_touches_only_its_blob()
+        await test_unchanged_sections_skipped()
+        await test_async_paths_skip_sync_reads()
+        await test_legacy_trip_migrates()
+        await test_trip_storage_service()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All section storage checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
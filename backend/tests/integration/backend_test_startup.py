@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test worker cold start: importing the app loads no heavy client library,
+services are built on first use or by the background warm-up, the readiness
+probe answers 503 until warm-up has completed, a required service that
+fails keeps the worker unready, and the startup profile times imports,
+phases and service construction (no API keys needed)
+"""
+import os
+import sys
+import asyncio
+import json
+import subprocess
+import tempfile
+import uuid
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(BACKEND))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = str(Path(_tmp.name) / "data")
+os.environ["DB_BACKUP_PATH"] = str(Path(_tmp.name) / "backups")
+os.environ["LLM_CACHE_PATH"] = str(Path(_tmp.name) / "llm_cache.sqlite3")
+
+HEAVY_MODULES = ("openai", "anthropic", "reportlab", "fitz", "PIL", "googlemaps", "jinja2")
+
+
+def run_fresh(code: str, **env: str) -> dict:
+    """Run `code` in a new interpreter (nothing imported yet) and return the JSON it prints last"""
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=_tmp.name, capture_output=True, text=True, timeout=120,
+        env={**os.environ, "PYTHONPATH": str(BACKEND), **env}
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_loads_no_heavy_library():
+    loaded = run_fresh(
+        "import sys, json; import src.api.app_factory; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    assert loaded == [], f"imported at startup: {loaded}"
+    print("✅ Importing the app loads none of " + ", ".join(HEAVY_MODULES))
+
+
+def test_import_profile():
+    report = run_fresh(
+        "import json; import src.api.app_factory; from src.core.startup_profiler import startup_profiler; "
+        "print(json.dumps(startup_profiler.report(limit=50)))",
+        STARTUP_PROFILE="1"
+    )
+    assert report["import_timing"] and report["modules_imported"] > 100
+    assert report["slowest_packages_ms"].get("aiohttp", 0) > 0, report["slowest_packages_ms"]
+    modules = {entry["module"]: entry for entry in report["slowest_modules"]}
+    assert all(0 <= entry["self_ms"] <= entry["total_ms"] + 0.01 for entry in modules.values())
+    assert report["phases_ms"]["create_app"] > 0 and not report["services_ms"]
+    slowest = ", ".join(f"{name} {ms:.0f}ms" for name, ms in list(report["slowest_packages_ms"].items())[:3])
+    print(f"✅ Import profile covers {report['modules_imported']} modules (slowest: {slowest})")
+
+
+async def test_readiness_after_warm_up():
+    import httpx
+    from src.api.app_factory import create_app
+    from src.api.dependencies.container import container
+    from src.core.startup_profiler import startup_profiler
+
+    startup_profiler.reset()
+    app = create_app()
+    assert not container._services, "nothing is built when the app is created"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        assert (await client.get("/api/health/ready")).status_code == 503
+        await app.router.startup()
+        try:
+            assert (await client.get("/api/health/ready")).status_code == 503, "warm-up runs in the background"
+            assert (await client.get(f"/api/preferences/{uuid.uuid4()}")).status_code == 404, \
+                "requests are served before warm-up, building what they need"
+            assert await app.state.warm_up_task
+            ready = await client.get("/api/health/ready")
+            assert ready.status_code == 200 and ready.json()["ready"]
+            report = (await client.get("/api/health/startup")).json()
+        finally:
+            await app.router.shutdown()
+
+    assert set(report["services_ms"]) == set(container._providers), report["services_ms"]
+    assert {"create_app", "startup", "warm_up"} <= set(report["phases_ms"])
+    assert container.get_database_service()._cache_loaded, "warm-up awaited the database initialize()"
+    print(f"✅ Ready after a {report['phases_ms']['warm_up']:.0f} ms warm-up building "
+          f"{len(report['services_ms'])} services (slowest: {next(iter(report['services_ms']))})")
+
+
+async def test_failed_service_keeps_worker_unready():
+    from types import SimpleNamespace
+    from src.api.dependencies.container import ServiceContainer, ServiceProvider
+    from src.core.startup_profiler import startup_profiler
+    from src.utils.error_handling import ConfigurationError
+
+    startup_profiler.reset()
+    services = ServiceContainer()
+    services.initialize(SimpleNamespace(UPLOAD_DIR=_tmp.name, OUTPUT_DIR=_tmp.name))
+    services._providers = {
+        "cleanup_service": services._providers["cleanup_service"],
+        "missing_optional": ServiceProvider("...services.no_such_module", "Missing", optional=True),
+    }
+    assert await services.warm_up() and startup_profiler.ready
+    assert services.get_service("missing_optional") is None
+    assert "missing_optional" in startup_profiler.report()["service_errors"]
+
+    startup_profiler.reset()
+    services._providers["missing_required"] = ServiceProvider("...services.no_such_module", "Missing")
+    assert not await services.warm_up() and not startup_profiler.ready
+    try:
+        services.get_service("missing_required")
+        raise AssertionError("a required service that fails to build raises")
+    except ConfigurationError:
+        pass
+    print("✅ A failing optional service is unavailable; a failing required one keeps the worker unready")
+
+
+async def main():
+    print("🚀 Testing worker cold start\n" + "=" * 50)
+    try:
+        test_import_loads_no_heavy_library()
+        test_import_profile()
+        await test_readiness_after_warm_up()
+        await test_failed_service_keeps_worker_unready()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All startup checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
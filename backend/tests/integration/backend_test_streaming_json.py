@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test incremental parsing of streamed LLM JSON (no API keys needed): items
+are emitted as soon as they close, independent of chunk boundaries, and the
+streamed Perplexity path assembles the same sections as the buffered one
+while delivering its first item long before the response completes
+"""
+import sys
+import json
+import random
+import asyncio
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services.streaming_json import JSONItemStream, parse_json_items
+from src.services.optimized_perplexity_service import OptimizedPerplexityService
+from src.services.prompt_batching import PromptBatch, guide_section_requests, split_batch_response
+
+CHUNK_DELAY_S = 0.005
+
+
+def sample_batch_content(batch: PromptBatch) -> str:
+    body: Dict[str, Any] = {}
+    for r in batch.requests:
+        if r.spec.is_list:
+            body[r.key] = [
+                {key: (i if kind == "integer" else f"{r.section} {i} {{\"quoted\"}} [{i}]")
+                 for key, kind in r.spec.item_properties.items()}
+                for i in range(8)
+            ]
+        else:
+            body[r.key] = {key: "info" for key in r.spec.item_properties}
+    return "```json\n" + json.dumps(body, indent=2) + "\n```"
+
+
+class StreamingStubService(OptimizedPerplexityService):
+    """Serves one canned response, streamed in small chunks"""
+
+    def __init__(self, content: str):
+        super().__init__()
+        self.config.api_key = "stub"
+        self.config.stream = True
+        self.content = content
+
+    async def _make_api_request(self, prompt: str, max_tokens: Optional[int] = None, response_format=None) -> str:
+        await asyncio.sleep(CHUNK_DELAY_S * len(self.content) / 40)
+        return self.content
+
+    async def _stream_api_request(self, prompt: str, max_tokens: Optional[int] = None, response_format=None):
+        for start in range(0, len(self.content), 40):
+            await asyncio.sleep(CHUNK_DELAY_S)
+            yield self.content[start:start + 40]
+
+
+def test_chunk_boundaries():
+    text = 'Sure! [1]\n```json\n{"a__restaurants": [{"name": "Caf\\u00e9 \\"{[\\"", "tags": [{"x": 1}]}, {"name": "B"}],' \
+           ' "a__practical_info": {"currency": "EUR"}, "note": "done"}\n```'
+    expected = parse_json_items([text])
+    assert [key for key, _ in expected] == ["a__restaurants", "a__restaurants", "a__practical_info"], expected
+    assert expected[0][1]["name"] == 'Café "{["'
+    for _ in range(500):
+        cuts = sorted(random.sample(range(1, len(text)), random.randint(1, 25)))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert parse_json_items(chunks) == expected
+    print("✅ Same items for every chunking of the stream")
+
+
+def test_bad_item_skipped():
+    stream = JSONItemStream()
+    events = stream.feed('[{"name": "a"}, {"name": }, {"name": "b" [2]}]')
+    assert [value["name"] for _, value in events] == ["a", "b"] and stream.errors == 1, events
+    print("✅ Malformed items are skipped, citation markers stripped")
+
+
+async def test_streamed_sections_match_buffered():
+    batch = PromptBatch(guide_section_requests("Paris, France", "2026-11-01", "2026-11-03"))
+    content = sample_batch_content(batch)
+    service = StreamingStubService(content)
+
+    arrivals = []
+    started = time.perf_counter()
+
+    async def on_item(section: str, item: Dict[str, Any]) -> None:
+        arrivals.append((time.perf_counter() - started, section))
+
+    streamed = await service._fetch_batch(batch, on_item)
+    total = time.perf_counter() - started
+    assert streamed == split_batch_response(batch, content), "streamed sections differ from buffered split"
+    list_items = sum(len(v) for r, v in streamed.items() if r.spec.is_list)
+    assert len(arrivals) == list_items, (len(arrivals), list_items)
+    first = arrivals[0][0]
+    assert first < total / 4, (first, total)
+    print(f"✅ Streamed sections equal buffered ones; first item after {first * 1000:.0f}ms of {total * 1000:.0f}ms")
+
+
+async def main():
+    print("🌊 Testing streaming JSON parsing\n" + "=" * 50)
+    test_chunk_boundaries()
+    test_bad_item_skipped()
+    await test_streamed_sections_match_buffered()
+    print("\n🎉 All streaming checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
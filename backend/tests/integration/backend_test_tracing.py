@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Test request tracing: span nesting across asyncio tasks and executor
+threads, latency-based sampling, aiohttp client spans, W3C traceparent
+propagation and the OTLP JSON file exporter (no API keys needed)
+"""
+import sys
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import aiohttp
+import httpx
+from aiohttp import web
+from fastapi import FastAPI
+
+from src.core.tracing import (
+    tracer, Tracer, InMemorySpanExporter, FileSpanExporter, SpanKind, StatusCode,
+    current_span, wrap_context, run_in_executor
+)
+from src.core.middleware import TracingMiddleware
+from src.core.upstream_metrics import upstream_trace_configs
+
+
+def by_name(spans):
+    return {span.name: span for span in spans}
+
+
+async def test_nesting_across_tasks_and_threads():
+    exporter = InMemorySpanExporter()
+    local = Tracer(exporter, sample_rate=1.0)
+
+    def blocking_work():
+        with local.span("thread.work"):
+            time.sleep(0.001)
+
+    async def subtask(name: str):
+        with local.span(name):
+            await asyncio.sleep(0.01)
+
+    with local.span("guide.generate") as root:
+        await asyncio.gather(local.wrap("fetch.a", subtask("a.inner")), subtask("b"))
+        await asyncio.get_running_loop().run_in_executor(None, wrap_context(blocking_work))
+        await run_in_executor(None, blocking_work)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            await asyncio.wrap_future(pool.submit(wrap_context(blocking_work)))
+
+    spans = exporter.get_finished_spans()
+    names = by_name(spans)
+    assert len({s.trace_id for s in spans}) == 1, "all spans belong to one trace"
+    assert names["fetch.a"].parent_id == root.span_id
+    assert names["a.inner"].parent_id == names["fetch.a"].span_id
+    assert names["b"].parent_id == root.span_id
+    thread_spans = [s for s in spans if s.name == "thread.work"]
+    assert len(thread_spans) == 3 and all(s.parent_id == root.span_id for s in thread_spans)
+    print(f"✅ {len(spans)} spans nested correctly across gather(), run_in_executor and a thread pool")
+
+
+async def test_latency_sampling():
+    exporter = InMemorySpanExporter()
+    local = Tracer(exporter, sample_rate=0.0, slow_threshold_ms=50)
+
+    with local.span("fast"):
+        await asyncio.sleep(0.001)
+    with local.span("slow"):
+        with local.span("slow.child"):
+            await asyncio.sleep(0.06)
+    try:
+        with local.span("failing"):
+            raise ValueError("upstream exploded")
+    except ValueError:
+        pass
+
+    names = by_name(exporter.get_finished_spans())
+    assert "fast" not in names, "fast, unsampled traces are dropped"
+    assert "slow" in names and "slow.child" in names, "slow traces are always kept"
+    assert names["failing"].status == StatusCode.ERROR
+    assert local.stats["traces_exported"] == 2
+    print("✅ Fast traces dropped; slow and failed traces always exported")
+
+
+async def test_http_client_spans():
+    async def ok(request):
+        return web.json_response({"ok": True})
+
+    server_app = web.Application()
+    server_app.router.add_get("/places", ok)
+    runner = web.AppRunner(server_app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    exporter = InMemorySpanExporter()
+    tracer.configure(exporter=exporter, enabled=True, sample_rate=1.0)
+    try:
+        with tracer.span("guide.fetch.places") as parent:
+            async with aiohttp.ClientSession(trace_configs=upstream_trace_configs()) as session:
+                async with session.get(f"http://127.0.0.1:{port}/places?key=secret") as response:
+                    await response.read()
+    finally:
+        await runner.cleanup()
+
+    client = [s for s in exporter.get_finished_spans() if s.kind == SpanKind.CLIENT][0]
+    assert client.parent_id == parent.span_id
+    assert client.attributes["http.status_code"] == 200
+    assert "secret" not in client.attributes["http.url"], "query strings (API keys) are not recorded"
+    print(f"✅ Outbound HTTP call traced as a child span: {client.attributes['http.url']}")
+
+
+async def test_traceparent_propagation():
+    exporter = InMemorySpanExporter()
+    tracer.configure(exporter=exporter, enabled=True, sample_rate=0.0)
+
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/api/trip/{trip_id}")
+    async def trip(trip_id: str):
+        with tracer.span("storage.get_trip_data"):
+            return {"trace_id": current_span().trace_id}
+
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    headers = {"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.get("/api/trip/abc", headers=headers)
+
+    assert response.json()["trace_id"] == trace_id
+    assert response.headers["X-Trace-ID"] == trace_id
+    names = by_name(exporter.get_finished_spans())
+    server = names["HTTP GET /api/trip/{trip_id}"]
+    assert server.parent_id == "00f067aa0ba902b7" and server.kind == SpanKind.SERVER
+    assert names["storage.get_trip_data"].parent_id == server.span_id
+    print("✅ Incoming traceparent continued; sampled flag honoured")
+
+
+def test_file_exporter():
+    writers = []
+
+    class SlowDisk(FileSpanExporter):
+        def _write(self, lines):
+            writers.append(threading.get_ident())
+            time.sleep(0.2)
+            super()._write(lines)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "traces.jsonl"
+        exporter = SlowDisk(path)
+        local = Tracer(exporter, sample_rate=1.0)
+        started = time.perf_counter()
+        with local.span("pdf.build", {"renderer": "html", "pages": 12}):
+            with local.span("storage.save_trip_data"):
+                pass
+        with local.span("pdf.cached"):
+            pass
+        assert time.perf_counter() - started < 0.1, "ending a root span does not wait for the disk"
+        exporter.flush()
+        assert writers and threading.get_ident() not in writers
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2, lines
+        payload = json.loads(lines[0])
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert {s["name"] for s in spans} == {"pdf.build", "storage.save_trip_data"}
+        root = next(s for s in spans if s["name"] == "pdf.build")
+        assert {"key": "pages", "value": {"intValue": "12"}} in root["attributes"]
+
+        with local.span("after.flush"):
+            pass
+        local.shutdown()
+        assert "after.flush" in path.read_text().splitlines()[-1], "shutdown writes what is still queued"
+    print(f"✅ File exporter writes OTLP JSON lines from a background thread ({len(writers)} writes)")
+
+
+async def test_overhead():
+    local = Tracer(InMemorySpanExporter(), sample_rate=0.0, slow_threshold_ms=1e9)
+    disabled = Tracer(None)
+    n = 20000
+    for label, t in (("enabled", local), ("disabled", disabled)):
+        started = time.perf_counter()
+        with t.span("root"):
+            for _ in range(n):
+                with t.span("child"):
+                    pass
+        per_span = (time.perf_counter() - started) / n * 1e6
+        print(f"   {label}: {per_span:.2f}µs per span")
+    print("✅ Span overhead measured")
+
+
+async def main():
+    print("🔎 Testing tracing\n" + "=" * 50)
+    await test_nesting_across_tasks_and_threads()
+    await test_latency_sampling()
+    await test_http_client_spans()
+    await test_traceparent_propagation()
+    test_file_exporter()
+    await test_overhead()
+    print("\n🎉 All tracing checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
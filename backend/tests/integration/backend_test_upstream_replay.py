@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test record-and-replay of upstream responses: requests are keyed without
+credentials, streamed answers replay with their recorded pacing (or scaled),
+unrecorded requests fall back per endpoint, and a guide generated from a
+replayed cassette matches the recorded run (no API keys needed)
+"""
+import os
+import sys
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["GUIDE_STAGE_CACHE_ENABLED"] = "false"
+
+import aiohttp
+
+from upstream_recorder import UpstreamRecorder, load_cassette, request_key
+from upstream_simulator import SIMULATED_ENV, LatencyProfile, UpstreamSimulator, redirect_upstreams
+
+_tmp = tempfile.TemporaryDirectory()
+CHAT_PATH = "/api.openai.com/v1/chat/completions"
+CHAT = {"model": "gpt-4o-mini", "stream": True, "messages": [{"role": "user", "content": (
+    "Extract the booking.\nText to parse:\nDestination: Lisbon, Portugal\nCheck-in: 2026-11-02\nCheck-out: 2026-11-04\n"
+)}]}
+
+
+def test_request_keys():
+    body = json.dumps({"b": 1, "a": [1, 2]}).encode()
+    key = request_key("GET", "maps.googleapis.com", "/maps/api/geocode/json", "address=Lisbon&key=AIzaOne", body)
+    assert key == request_key("get", "maps.googleapis.com", "/maps/api/geocode/json", "key=AIzaTwo&address=Lisbon",
+                              b'{"a": [1, 2],\n "b": 1}')
+    assert key != request_key("GET", "maps.googleapis.com", "/maps/api/geocode/json", "address=Porto", body)
+    print("✅ Requests are keyed without credentials, parameter order or JSON formatting")
+
+
+async def test_streamed_pacing():
+    simulator = UpstreamSimulator({"openai": LatencyProfile(200, tokens_per_second=400)}, seed=1)
+    upstream = await simulator.start()
+    cassette = Path(_tmp.name) / "stream.jsonl"
+    recorder = UpstreamRecorder(cassette, "record", upstream=upstream)
+    base_url = await recorder.start()
+    url = f"{base_url}{CHAT_PATH}"
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=CHAT, headers={"Authorization": "Bearer sk-secret"}) as response:
+            recorded_body = await response.read()
+        async with session.get(f"{base_url}/maps.googleapis.com/maps/api/geocode/json?address=Lisbon&key=AIzaSecret") as r:
+            assert r.status == 200
+    await recorder.stop()
+    recorder.save()
+    await simulator.stop()
+
+    text = cassette.read_text()
+    assert "secret" not in text.lower(), "credentials never reach the cassette"
+    chat, geocode = load_cassette(cassette)
+    assert geocode.query == "address=Lisbon" and chat.chunks and len(chat.chunks) > 2
+    assert recorded_body.endswith(b"data: [DONE]\n\n")
+
+    timings = {}
+    for scale in (1.0, 0.5, 0.0):
+        replay = UpstreamRecorder(cassette, "replay", time_scale=scale)
+        base_url = await replay.start()
+        async with aiohttp.ClientSession() as session:
+            started = time.perf_counter()
+            async with session.post(f"{base_url}{CHAT_PATH}", json=CHAT) as response:
+                assert await response.read() == recorded_body
+            timings[scale] = (time.perf_counter() - started) * 1000
+        await replay.stop()
+        assert replay.outcomes == {"replayed": 1}
+
+    assert abs(timings[1.0] - chat.elapsed_ms) < chat.elapsed_ms * 0.3 + 30, (timings, chat.elapsed_ms)
+    assert timings[0.5] < timings[1.0] * 0.75 and timings[0.0] < 50
+    print(f"✅ Stream recorded in {chat.elapsed_ms:.0f} ms ({len(chat.chunks)} chunks) replays in "
+          f"{timings[1.0]:.0f} / {timings[0.5]:.0f} / {timings[0.0]:.0f} ms at scale 1 / 0.5 / 0")
+
+
+async def test_fallback_and_misses():
+    replay = UpstreamRecorder(Path(_tmp.name) / "stream.jsonl", "replay", time_scale=0)
+    base_url = await replay.start()
+    other_prompt = {**CHAT, "stream": False, "messages": [{"role": "user", "content": "Hello"}]}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}{CHAT_PATH}", json=other_prompt) as response:
+            assert response.status == 200
+        async with session.post(f"{base_url}{CHAT_PATH}", json=other_prompt) as response:
+            assert response.status == 404, "each recording is used once as a fallback"
+        async with session.get(f"{base_url}/api.openweathermap.org/data/2.5/forecast") as response:
+            assert response.status == 404
+    await replay.stop()
+    assert replay.outcomes == {"fallback": 1, "missed": 2}, replay.outcomes
+    print("✅ Unrecorded requests take the next recording of their endpoint, then miss")
+
+
+async def test_guide_replays_identically():
+    from src.services.optimized_guide_service import OptimizedGuideService
+
+    trip = dict(destination="Lisbon, Portugal", start_date="2026-11-02", end_date="2026-11-04",
+                hotel_info={"name": "Hotel Avenida Palace"}, preferences={}, extracted_data={})
+    cassette = Path(_tmp.name) / "optimized.jsonl"
+    simulator = UpstreamSimulator(time_scale=0.02, seed=3)
+    upstream = simulator.start_in_thread()
+    guides = {}
+    try:
+        for mode in ("record", "replay"):
+            recorder = UpstreamRecorder(cassette, mode, time_scale=0, upstream=upstream)
+            base_url = recorder.start_in_thread()
+            if mode == "replay":
+                simulator.reset()
+            try:
+                with redirect_upstreams(base_url):
+                    guides[mode] = await OptimizedGuideService().generate_optimized_guide(**trip)
+            finally:
+                recorder.stop_thread()
+            outcomes = recorder.outcomes
+    finally:
+        simulator.stop_thread()
+
+    assert not simulator.calls, "the replay never reached the simulator"
+    assert outcomes["replayed"] == len(load_cassette(cassette)) and set(outcomes) == {"replayed"}, outcomes
+    for section in ("restaurants", "attractions", "events", "daily_itinerary", "weather"):
+        assert guides["replay"].get(section) == guides["record"].get(section), section
+    assert guides["record"]["restaurants"], "the recorded guide has content"
+    assert not any(key in cassette.read_text() for key in SIMULATED_ENV.values() if len(key) > 9)
+    print(f"✅ Optimized guide replayed from {outcomes['replayed']} recorded responses matches the recorded run")
+
+
+async def main():
+    print("📼 Testing upstream record and replay\n" + "=" * 50)
+    try:
+        test_request_keys()
+        await test_streamed_pacing()
+        await test_fallback_and_misses()
+        await test_guide_replays_identically()
+    finally:
+        _tmp.cleanup()
+    print("\n🎉 All upstream replay checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Candidate Ranking Benchmark
+Times the vectorized ranking engine against the per-dict loops it replaced
+on a synthetic 10k-candidate pool
+"""
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Any
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services.candidate_ranking import CandidateMatrix, candidate_ranker
+from src.services.guide_personalization import (
+    guide_personalizer,
+    profile_from_preferences,
+    restaurant_categories,
+)
+
+CUISINES = ["Italian", "French", "Japanese", "Thai", "Mexican", "Indian", "Local Cuisine", "Vegan"]
+HOURS = ["Monday: 9:00 AM – 5:00 PM", "11-2pm", "Open 24 hours", "Monday: 6:00 PM – 11:00 PM", None]
+
+
+def make_candidates(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Synthetic restaurant pool around central Paris"""
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"Restaurant {i % (count // 2 or 1)}",
+            "cuisine": rng.choice(CUISINES),
+            "price_range": "$" * rng.randint(1, 4),
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "review_count": rng.randint(0, 20000),
+            "coordinates": {"lat": 48.85 + rng.uniform(-0.1, 0.1), "lng": 2.35 + rng.uniform(-0.1, 0.1)},
+            "hours": rng.choice(HOURS),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_rank(candidates: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """The sort-and-dedupe loop the services used before the engine"""
+    ordered = sorted(candidates, key=lambda x: (x.get("rating", 0), x.get("review_count", 0)), reverse=True)
+    seen, unique = set(), []
+    for candidate in ordered:
+        if candidate["name"] not in seen:
+            seen.add(candidate["name"])
+            unique.append(candidate)
+    return unique[:limit]
+
+
+def timed(label: str, func: Callable[[], Any], iterations: int = 5) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    median = statistics.median(samples)
+    print(f"  {label:<40} {median:8.2f} ms (median of {iterations})")
+    return median
+
+
+def main(count: int = 10000):
+    candidates = make_candidates(count)
+    profile = profile_from_preferences({"cuisineTypes": ["Thai", "Vegan"], "budget": "moderate"})
+    vocabulary = restaurant_categories(profile)
+
+    print(f"\n📊 Candidate ranking benchmark ({count:,} candidates)")
+    print("-" * 60)
+    timed("legacy sort + name dedupe", lambda: legacy_rank(candidates, 10))
+    extract = timed("feature extraction", lambda: CandidateMatrix.from_candidates(candidates, vocabulary))
+    matrix = CandidateMatrix.from_candidates(candidates, vocabulary)
+    score = timed("vectorized score", lambda: candidate_ranker.score(matrix, preferred_prices=[2, 3], origin=(48.86, 2.34)))
+    timed("score + dedupe + top-k", lambda: candidate_ranker.rank(matrix, 10, preferred_prices=[2, 3]))
+    timed("score + dedupe + diverse top-k", lambda: candidate_ranker.rank(matrix, 10, diversity=0.4))
+    timed("full personalization (rank_restaurants)", lambda: guide_personalizer.rank_restaurants(candidates, profile))
+    pool_key = ("benchmark", count)
+    guide_personalizer.rank_restaurants(candidates, profile, pool_key=pool_key)
+    cached = timed(
+        "personalization, cached pool matrix",
+        lambda: guide_personalizer.rank_restaurants(candidates, profile, pool_key=pool_key)
+    )
+    print("-" * 60)
+    print(f"  extraction is {extract / max(score, 1e-6):.0f}x the cost of scoring; "
+          f"a cached pool personalizes in {cached:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
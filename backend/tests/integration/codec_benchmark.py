@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+JSON Codec Benchmark
+Compares the previous storage encoding (stdlib json.dumps(..., indent=2))
+with the codec's compact encoding and with pack() compression, on trip,
+guide, metadata and processing-state payloads: stored size and CPU time
+to encode and decode. Exits non-zero if any payload does not round-trip.
+
+    python tests/integration/codec_benchmark.py
+"""
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import codec
+from src.models.database_models import TripData, TripMetadata, ProcessingState, ProcessingStatus
+
+TIMING_SECONDS = 0.3
+
+
+def sample_guide(places: int = 150) -> Dict[str, Any]:
+    def place(kind: str, i: int) -> Dict[str, Any]:
+        return {
+            "name": f"{kind} {i}",
+            "address": f"{i} Rue de Rivoli, 75001 Paris",
+            "description": f"A well-reviewed {kind.lower()} near the Louvre, number {i} on the list, "
+                           f"known for seasonal dishes and a terrace facing the gardens.",
+            "rating": 4.0 + (i % 10) / 10,
+            "price_level": "$" * (1 + i % 4),
+            "coordinates": {"lat": 48.86 + i / 10000, "lng": 2.33 + i / 10000},
+            "tags": ["local", "popular", "walkable"],
+            "citations": [f"https://example.com/{kind.lower()}/{i}"],
+        }
+
+    return {
+        "destination": "Paris, France",
+        "generated_at": "2026-10-01T10:00:00",
+        "summary": "Five days in Paris with museums, food markets and evening walks along the Seine.",
+        "restaurants": [place("Restaurant", i) for i in range(places)],
+        "attractions": [place("Museum", i) for i in range(places // 2)],
+        "events": [place("Concert", i) for i in range(places // 5)],
+        "weather": [{"date": f"2026-10-{d:02d}", "high": 18, "low": 11, "conditions": "Partly cloudy"}
+                    for d in range(1, 6)],
+        "daily_itinerary": [{"day": d, "activities": [f"Activity {d}.{i}" for i in range(8)]} for d in range(1, 6)],
+    }
+
+
+def payloads() -> Dict[str, Any]:
+    now = datetime(2026, 10, 1, 10, 0)
+    trip = TripData(
+        trip_id="bench-trip",
+        itinerary={"trip_summary": {"destination": "Paris", "start_date": "2026-10-01", "end_date": "2026-10-05"},
+                   "flights": [{"number": "AF123", "from": "JFK", "to": "CDG"}]},
+        extracted_data={"passengers": [{"name": "Alex"}], "hotels": [{"name": "Hotel Lutetia"}]},
+        enhanced_guide=sample_guide(),
+    )
+    state = ProcessingState("bench-trip", ProcessingStatus.PROCESSING, 60, "Generating guide", now, now,
+                            partial_results={"restaurants": sample_guide(20)["restaurants"]})
+    return {
+        "trip": trip.to_dict(),
+        "guide": sample_guide(),
+        "metadata": TripMetadata.from_trip_data(trip).to_dict(),
+        "processing_state": state.to_dict(),
+    }
+
+
+def per_call_us(fn: Callable[[], Any]) -> float:
+    runs, started = 0, time.perf_counter()
+    while time.perf_counter() - started < TIMING_SECONDS:
+        fn()
+        runs += 1
+    return (time.perf_counter() - started) / runs * 1e6
+
+
+def main() -> int:
+    print(f"\n📦 JSON codec ({codec.BACKEND}, {codec.COMPRESSION} compression) vs json.dumps(indent=2)")
+    print("-" * 98)
+    print(f"  {'payload':<18}{'encoding':<10}{'bytes':>11}{'size':>8}{'encode µs':>12}{'decode µs':>12}"
+          f"{'enc speedup':>13}{'dec speedup':>13}")
+    for name, value in payloads().items():
+        before = json.dumps(value, indent=2)
+        compact = codec.dumps(value)
+        packed = codec.pack(value, compress_min_bytes=1)
+        if codec.loads(compact) != json.loads(before) or codec.unpack(packed) != json.loads(before):
+            print(f"  ❌ {name} does not round-trip")
+            return 1
+
+        baseline_enc = per_call_us(lambda: json.dumps(value, indent=2))
+        baseline_dec = per_call_us(lambda: json.loads(before))
+        rows = [
+            ("indent=2", len(before.encode()), baseline_enc, baseline_dec),
+            ("compact", len(compact), per_call_us(lambda: codec.dumps(value)),
+             per_call_us(lambda: codec.loads(compact))),
+            ("packed", len(packed), per_call_us(lambda: codec.pack(value, compress_min_bytes=1)),
+             per_call_us(lambda: codec.unpack(packed))),
+        ]
+        for label, size, enc, dec in rows:
+            print(f"  {name:<18}{label:<10}{size:>11,}{size / rows[0][1]:>8.0%}{enc:>12.1f}{dec:>12.1f}"
+                  f"{baseline_enc / enc:>12.1f}x{baseline_dec / dec:>12.1f}x")
+    print("-" * 98)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Guide Generation Replay Benchmark
+Runs the optimized, luxury, enhanced and fast guide services end to end on
+the same trip, with their upstream calls recorded once and replayed from
+cassettes afterwards, so timings can be compared offline on identical data.
+Record against the real providers (API keys from the environment) or, to
+try it without keys, against the upstream simulator. Replays use the
+recorded latencies, scaled ones (--time-scale) or none (--time-scale 0,
+leaving only the services' own work). The LLM response cache and the
+guide stage cache are disabled so every run reaches the upstreams. Exits
+non-zero if a service fails or a replayed request is missing from its
+cassette.
+
+    python tests/integration/guide_replay_benchmark.py --record                   # live providers
+    python tests/integration/guide_replay_benchmark.py --record --from-simulator  # no keys needed
+    python tests/integration/guide_replay_benchmark.py --runs 3                   # replay as recorded
+    python tests/integration/guide_replay_benchmark.py --time-scale 0 --services optimized,fast
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["GUIDE_STAGE_CACHE_ENABLED"] = "false"
+
+from upstream_recorder import UpstreamRecorder
+from upstream_simulator import UpstreamSimulator, redirect_upstreams
+
+CASSETTES_DIR = Path(__file__).parent / "upstream_cassettes"
+SERVICES = ("optimized", "luxury", "enhanced", "fast")
+
+
+def default_trip() -> Dict[str, Any]:
+    """A short trip starting next week, inside the weather forecast window when recorded"""
+    start = date.today() + timedelta(days=7)
+    return {
+        "destination": "Lisbon, Portugal",
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=3)).isoformat(),
+        "hotel_info": {"name": "Hotel Avenida Palace", "address": "Rua 1º de Dezembro 123, Lisbon", "city": "Lisbon"},
+        "preferences": {"interests": ["food", "history", "architecture"], "pace": "moderate", "budget": "moderate"},
+    }
+
+
+def runner(name: str) -> Callable[[Dict[str, Any]], Any]:
+    """A coroutine function generating `name`'s guide for the trip; the service is built inside the redirect"""
+    trip_args = ("destination", "start_date", "end_date", "hotel_info", "preferences")
+
+    async def run(trip: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = {key: trip[key] for key in trip_args}
+        if name == "optimized":
+            from src.services.optimized_guide_service import OptimizedGuideService
+            return await OptimizedGuideService().generate_optimized_guide(**kwargs, extracted_data={})
+        if name == "luxury":
+            from src.services.luxury_guide_service import LuxuryGuideService
+            return await LuxuryGuideService().generate_luxury_guide(**kwargs, extracted_data={})
+        if name == "enhanced":
+            from src.services.enhanced_guide_service import EnhancedGuideService
+            return await EnhancedGuideService().generate_enhanced_guide(**kwargs, extracted_data={})
+        from src.services.fast_guide_service import FastGuideService
+        return await FastGuideService().generate_fast_guide(**kwargs)
+
+    return run
+
+
+def guide_shape(guide: Dict[str, Any]) -> str:
+    if not isinstance(guide, dict):
+        return type(guide).__name__
+    if guide.get("error"):
+        return f"error: {str(guide['error'])[:60]}"
+    counts = {key: len(guide[key]) for key in ("restaurants", "attractions", "events", "daily_itinerary")
+              if isinstance(guide.get(key), list)}
+    return ", ".join(f"{count} {key}" for key, count in counts.items()) or "no sections"
+
+
+async def run_service(name: str, recorder: UpstreamRecorder, trip: Dict[str, Any], runs: int) -> Dict[str, Any]:
+    seconds: List[float] = []
+    outcomes: Counter = Counter()
+    shape, error = "", ""
+    for _ in range(runs):
+        recorder.rewind()
+        started = time.perf_counter()
+        try:
+            guide = await runner(name)(trip)
+            shape = guide_shape(guide)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        seconds.append(time.perf_counter() - started)
+        outcomes.update(recorder.outcomes)
+    return {
+        "service": name,
+        "seconds": seconds,
+        "calls": dict(recorder.calls),  # the last run's; rewind() resets them
+        "outcomes": outcomes,
+        "shape": shape,
+        "error": error,
+    }
+
+
+def print_result(result: Dict[str, Any], out=sys.stdout) -> None:
+    seconds = result["seconds"]
+    calls = ", ".join(f"{provider} {count}" for provider, count in sorted(result["calls"].items())) or "none"
+    outcomes = ", ".join(f"{count} {outcome}" for outcome, count in sorted(result["outcomes"].items()))
+    print(f"  {result['service']:<11}{min(seconds):>9.2f}{statistics.median(seconds):>9.2f}{max(seconds):>9.2f}"
+          f"   {calls}", file=out)
+    print(f"  {'':<38}{outcomes}; guide: {result['error'] or result['shape']}", file=out)
+
+
+async def main(args: argparse.Namespace) -> int:
+    names = [name.strip() for name in args.services.split(",")]
+    unknown = set(names) - set(SERVICES)
+    if unknown:
+        print(f"  ❌ Unknown services: {', '.join(sorted(unknown))} (choose from {', '.join(SERVICES)})")
+        return 1
+    trip_file = args.cassettes / "trip.json"
+    if args.record:
+        trip = default_trip()
+        args.cassettes.mkdir(parents=True, exist_ok=True)
+        trip_file.write_text(json.dumps(trip, indent=2) + "\n", encoding="utf-8")
+    elif trip_file.exists():
+        trip = json.loads(trip_file.read_text(encoding="utf-8"))
+    else:
+        print(f"  ❌ No recording in {args.cassettes}; record one with --record (add --from-simulator without keys)")
+        return 1
+
+    simulator = None
+    upstream = None
+    if args.record and args.from_simulator:
+        simulator = UpstreamSimulator(time_scale=args.simulator_time_scale, seed=7)
+        upstream = simulator.start_in_thread()
+
+    out = sys.stdout
+    mode = "record" if args.record else "replay"
+    runs = 1 if args.record else args.runs
+    print(f"\n📼 Guide generation, {mode} ({'simulator' if simulator else 'live providers' if args.record else f'time scale {args.time_scale}'}):"
+          f" {trip['destination']} {trip['start_date']} → {trip['end_date']}, {runs} run(s) per service", file=out)
+    print("-" * 96, file=out)
+    print(f"  {'service':<11}{'min s':>9}{'median s':>9}{'max s':>9}   upstream calls per run", file=out)
+    results = []
+    try:
+        for name in names:
+            recorder = UpstreamRecorder(args.cassettes / f"{name}.jsonl", mode, args.time_scale, upstream)
+            if mode == "replay" and not recorder.interactions:
+                print(f"  {name:<11}   no cassette at {recorder.cassette}", file=out)
+                continue
+            base_url = recorder.start_in_thread()
+            try:
+                # Live recordings keep the real keys; the recorder forwards them without storing them
+                with redirect_upstreams(base_url, simulated_keys=bool(simulator) or mode == "replay"), \
+                        contextlib.ExitStack() as quiet:
+                    if not args.verbose:
+                        logging.disable(logging.CRITICAL)
+                        quiet.callback(logging.disable, logging.NOTSET)
+                        quiet.enter_context(contextlib.redirect_stdout(quiet.enter_context(open(os.devnull, "w"))))
+                    result = await run_service(name, recorder, trip, runs)
+            finally:
+                recorder.stop_thread()
+            results.append(result)
+            print_result(result, out)
+    finally:
+        if simulator:
+            simulator.stop_thread()
+    print("-" * 96, file=out)
+
+    if args.record:
+        print(f"  💾 Cassettes in {args.cassettes}", file=out)
+    failed = [r["service"] for r in results if r["error"]]
+    missed = [r["service"] for r in results if r["outcomes"].get("missed")]
+    if failed:
+        print(f"  ❌ Failed: {', '.join(failed)}", file=out)
+    if missed:
+        print(f"  ❌ Requests missing from the cassettes of: {', '.join(missed)}; record them again", file=out)
+    return 1 if failed or missed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the guide services on recorded upstream responses")
+    parser.add_argument("--record", action="store_true", help="record new cassettes instead of replaying")
+    parser.add_argument("--from-simulator", action="store_true", help="record from the upstream simulator")
+    parser.add_argument("--simulator-time-scale", type=float, default=0.1, help="simulator delays when recording from it")
+    parser.add_argument("--services", default=",".join(SERVICES), help="comma-separated subset of " + ", ".join(SERVICES))
+    parser.add_argument("--runs", type=int, default=1, help="replayed runs per service")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiplier for replayed latencies (0: none)")
+    parser.add_argument("--cassettes", type=Path, default=CASSETTES_DIR)
+    parser.add_argument("--verbose", action="store_true", help="keep the services' logging")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+End-to-end Load Test
+Ramps concurrent trips through upload → generate-guide → PDF against the app
+served in-process, with every upstream provider answered by the upstream
+simulator (no API keys, no network, nothing billed). For each concurrency
+step it reports throughput, p50/p95/p99 per stage and the upstream calls
+made per trip. Exits non-zero if a trip fails while no upstream errors are
+injected, or if a call reached an endpoint the simulator does not emulate.
+
+    python tests/integration/load_test.py                                  # ramp 1, 2, 4, 8
+    python tests/integration/load_test.py --steps 4,16 --trips-per-step 32 --time-scale 1
+    python tests/integration/load_test.py --error-rate 0.05 --latency perplexity=4000/12000
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.core.metrics import StreamingHistogram
+from upstream_simulator import UpstreamSimulator, parse_profile_overrides, redirect_upstreams
+
+STAGES = ("upload", "generate_guide", "pdf")
+DESTINATIONS = [
+    "Paris, France", "Lisbon, Portugal", "Kyoto, Japan", "Oslo, Norway",
+    "Lima, Peru", "Cape Town, South Africa", "Montreal, Canada", "Vienna, Austria",
+]
+
+
+@dataclass
+class TripResult:
+    durations: Dict[str, float] = field(default_factory=dict)  # stage -> seconds
+    failed_stage: Optional[str] = None
+    error: str = ""
+
+
+def booking_document(index: int) -> Tuple[str, str]:
+    """
+    A plain-text booking confirmation. Destinations and dates rotate so
+    trips differ in the per-destination caches, as distinct users would;
+    check-in stays inside the five-day weather forecast window.
+    """
+    destination = DESTINATIONS[index % len(DESTINATIONS)]
+    check_in = date.today() + timedelta(days=1 + index // len(DESTINATIONS) % 3)
+    check_out = check_in + timedelta(days=2)
+    reference = f"LT{index:05d}"
+    return f"booking_{reference}.txt", (
+        f"BOOKING CONFIRMATION\nReference: {reference}\nDestination: {destination}\n"
+        f"Hotel: Grand Hotel {destination.split(',')[0]}\n"
+        f"Check-in: {check_in.isoformat()}\nCheck-out: {check_out.isoformat()}\n"
+        f"Guests: 2 adults\nFlights: outbound {check_in.isoformat()} 08:40, return {check_out.isoformat()} 18:10\n"
+    )
+
+
+async def run_trip(client, index: int) -> TripResult:
+    result = TripResult()
+    filename, document = booking_document(index)
+    trip_id = None
+    for stage in STAGES:
+        started = time.perf_counter()
+        try:
+            if stage == "upload":
+                response = await client.post("/api/upload", files={"file": (filename, document.encode(), "text/plain")})
+                trip_id = response.json().get("trip_id") if response.status_code == 200 else None
+            elif stage == "generate_guide":
+                response = await client.post(f"/api/generate-guide/{trip_id}")
+            else:
+                response = await client.post(f"/api/generate-pdf/{trip_id}")
+            if response.status_code != 200 or (stage == "pdf" and not response.content.startswith(b"%PDF")):
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        except Exception as e:
+            result.failed_stage, result.error = stage, str(e) or type(e).__name__
+            return result
+        result.durations[stage] = time.perf_counter() - started
+    return result
+
+
+async def run_step(client, simulator: UpstreamSimulator, concurrency: int, trips: int, first_index: int) -> Dict:
+    """Run `trips` trips with `concurrency` in flight at a time"""
+    calls_before = Counter(simulator.calls)
+    errors_before = Counter(simulator.errors)
+    pending = iter(range(first_index, first_index + trips))
+    results: List[TripResult] = []
+
+    async def worker():
+        for index in pending:
+            results.append(await run_trip(client, index))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    histograms = {stage: StreamingHistogram() for stage in (*STAGES, "total")}
+    for result in results:
+        for stage, seconds in result.durations.items():
+            histograms[stage].add(seconds * 1000)
+        if result.failed_stage is None:
+            histograms["total"].add(sum(result.durations.values()) * 1000)
+
+    calls: Counter = Counter()
+    for (provider, endpoint), count in (Counter(simulator.calls) - calls_before).items():
+        calls[provider] += count
+    return {
+        "concurrency": concurrency,
+        "trips": len(results),
+        "completed": sum(1 for r in results if r.failed_stage is None),
+        "failures": Counter(r.failed_stage for r in results if r.failed_stage),
+        "first_error": next((f"{r.failed_stage}: {r.error}" for r in results if r.failed_stage), ""),
+        "seconds": elapsed,
+        "histograms": histograms,
+        "upstream_calls": calls,
+        "upstream_errors": sum((Counter(simulator.errors) - errors_before).values()),
+    }
+
+
+def print_step(report: Dict, out=sys.stdout) -> None:
+    throughput = report["completed"] / report["seconds"] if report["seconds"] else 0.0
+    first = True
+    for stage, histogram in report["histograms"].items():
+        prefix = (
+            f"  {report['concurrency']:>5}{report['trips']:>7}{report['completed']:>6}{throughput:>10.2f}"
+            if first else " " * 30
+        )
+        first = False
+        if not histogram.count:
+            print(f"{prefix}   {stage:<16}{'-':>10}{'-':>10}{'-':>10}", file=out)
+            continue
+        p50, p95, p99 = (histogram.quantile(q) for q in (0.5, 0.95, 0.99))
+        print(f"{prefix}   {stage:<16}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}", file=out)
+    per_trip = ", ".join(
+        f"{provider} {count / max(report['trips'], 1):.1f}" for provider, count in sorted(report["upstream_calls"].items())
+    )
+    print(f"{'':>30}   upstream calls per trip: {per_trip or 'none'}"
+          f" ({report['upstream_errors']} failed)", file=out)
+    if report["failures"]:
+        failed = ", ".join(f"{count} at {stage}" for stage, count in report["failures"].items())
+        print(f"{'':>30}   ❌ {failed}; first: {report['first_error'][:120]}", file=out)
+
+
+async def main(args: argparse.Namespace) -> int:
+    steps = [int(step) for step in args.steps.split(",")]
+    workdir = tempfile.TemporaryDirectory()
+    # The app writes uploads/ and output/ relative to the working directory
+    os.chdir(workdir.name)
+    os.environ["DB_PATH"] = str(Path(workdir.name) / "data")
+    os.environ["DB_BACKUP_PATH"] = str(Path(workdir.name) / "backups")
+    os.environ["LLM_CACHE_PATH"] = str(Path(workdir.name) / "llm_cache.sqlite3")
+
+    simulator = UpstreamSimulator(parse_profile_overrides(args.latency, args.error_rate), args.time_scale, args.seed)
+    base_url = simulator.start_in_thread()
+    out = sys.stdout
+    reports = []
+    try:
+        with redirect_upstreams(base_url), contextlib.ExitStack() as quiet:
+            if not args.verbose:
+                # Failures are summarised per step; the app's logs and prints would drown the table
+                logging.disable(logging.CRITICAL)
+                quiet.callback(logging.disable, logging.NOTSET)
+                quiet.enter_context(contextlib.redirect_stdout(quiet.enter_context(open(os.devnull, "w"))))
+            import httpx
+            from src.api.app_factory import create_app  # importing it builds the module-level app too
+
+            app = create_app()
+            await app.router.startup()
+            transport = httpx.ASGITransport(app=app)
+            try:
+                async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=None) as client:
+                    print(f"\n📈 Load test: upload → generate-guide → PDF, simulated upstreams at {base_url}"
+                          f" (time scale {args.time_scale}, error rate {args.error_rate or 0:.0%})", file=out)
+                    print("-" * 84, file=out)
+                    print(f"  {'conc':>5}{'trips':>7}{'ok':>6}{'trips/s':>10}   {'stage':<16}"
+                          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}", file=out)
+                    first_index = 0
+                    for concurrency in steps:
+                        trips = args.trips_per_step or concurrency * 2
+                        report = await run_step(client, simulator, concurrency, trips, first_index)
+                        first_index += trips
+                        reports.append(report)
+                        print_step(report, out)
+                    print("-" * 84, file=out)
+            finally:
+                await app.router.shutdown()
+    finally:
+        simulator.stop_thread()
+        os.chdir(Path(__file__).parent)
+        workdir.cleanup()
+
+    unmatched = {provider: stats["endpoints"]["unmatched"]
+                 for provider, stats in simulator.stats().items() if "unmatched" in stats["endpoints"]}
+    if unmatched:
+        print(f"  ❌ Calls to endpoints the simulator does not emulate: {unmatched}")
+        return 1
+    if not args.error_rate and any(report["failures"] for report in reports):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ramp simulated trips through the backend")
+    parser.add_argument("--steps", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--trips-per-step", type=int, help="trips per step (default: twice the concurrency)")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="multiplier for simulated upstream delays")
+    parser.add_argument("--latency", action="append", metavar="PROVIDER=MEDIAN[/P95]", help="override a latency profile (ms)")
+    parser.add_argument("--error-rate", type=float, help="fraction of upstream calls failing, for every provider")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="keep the app's logging")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Perplexity Markdown Parser Benchmark
+Checks the single-pass tokenizer against the reference per-section parsers
+on every captured response (and shuffled/merged variants of them), then
+compares parse throughput. Exits non-zero on any output difference.
+
+    python tests/integration/markdown_parser_benchmark.py
+    python tests/integration/markdown_parser_benchmark.py --variants 2000
+"""
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Any
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.services.perplexity_markdown import (
+    parse_markdown,
+    parse_restaurants_loose,
+    parse_attractions_loose,
+    parse_guide_markdown
+)
+from reference_markdown_parsers import (
+    PerplexityResponseParser as Reference,
+    GuideContentParser,
+    parse_restaurants_simple,
+    parse_attractions_simple
+)
+
+RESPONSES_DIR = Path(__file__).parent / "perplexity_responses"
+THROUGHPUT_SECONDS = 0.5
+
+
+def reference_all(text: str) -> Dict[str, Any]:
+    """What callers had to do before: one full scan per section"""
+    return {
+        "restaurants": Reference.parse_restaurants(text),
+        "attractions": Reference.parse_attractions(text),
+        "events": Reference.parse_events(text),
+        "daily_itinerary": Reference.parse_daily_itinerary(text),
+        "local_insights": Reference.parse_local_insights(text),
+    }
+
+
+PAIRS: List[Tuple[str, Callable[[str], Any], Callable[[str], Any]]] = [
+    ("sections", reference_all, parse_markdown),
+    ("restaurants_simple", parse_restaurants_simple, parse_restaurants_loose),
+    ("attractions_simple", parse_attractions_simple, parse_attractions_loose),
+    ("guide_sections", lambda t: GuideContentParser()._parse_guide_content(t, []),
+     lambda t: parse_guide_markdown(t, [])),
+]
+
+
+def load_responses() -> Dict[str, str]:
+    return {path.stem: path.read_text(encoding="utf-8") for path in sorted(RESPONSES_DIR.glob("*.md"))}
+
+
+def variants(responses: Dict[str, str], count: int, seed: int = 7) -> List[str]:
+    """Shuffled, merged, re-indented and truncated versions of the captures"""
+    rng = random.Random(seed)
+    texts = list(responses.values())
+    out = []
+    for _ in range(count):
+        lines = rng.choice(texts).split("\n")
+        op = rng.randrange(5)
+        if op == 0:
+            rng.shuffle(lines)
+        elif op == 1:
+            lines = lines + rng.choice(texts).split("\n")
+        elif op == 2:
+            lines = [(" " * rng.randrange(4)) + line + ("\r" if rng.random() < 0.1 else "") for line in lines]
+        elif op == 3:
+            lines = lines[rng.randrange(len(lines)):]
+        else:
+            lines = [line for line in lines if rng.random() > 0.3]
+        out.append("\n".join(lines))
+    return out
+
+
+def check_equivalence(texts: List[Tuple[str, str]]) -> int:
+    failures = 0
+    for label, text in texts:
+        for name, reference, fast in PAIRS:
+            if reference(text) != fast(text):
+                failures += 1
+                if failures <= 5:
+                    print(f"  ❌ {name} differs on {label}")
+    return failures
+
+
+def throughput(parse: Callable[[str], Any], text: str) -> float:
+    """MB/s over repeated parses of text"""
+    runs, started = 0, time.perf_counter()
+    while time.perf_counter() - started < THROUGHPUT_SECONDS:
+        parse(text)
+        runs += 1
+    return runs * len(text.encode("utf-8")) / (time.perf_counter() - started) / 1e6
+
+
+def main(variant_count: int = 500) -> int:
+    responses = load_responses()
+    print(f"\n🧾 Perplexity markdown parser ({len(responses)} captured responses, {variant_count} variants)")
+
+    texts = list(responses.items()) + [(f"variant {i}", t) for i, t in enumerate(variants(responses, variant_count))]
+    failures = check_equivalence(texts)
+    if failures:
+        print(f"  ❌ {failures} parser outputs differ from the reference implementations")
+        return 1
+    print(f"  ✅ Identical output for {len(texts)} inputs x {len(PAIRS)} parsers")
+
+    corpus = "\n\n".join(responses.values())
+    print("-" * 66)
+    print(f"  {'workload':<22}{'reference MB/s':>16}{'single-pass MB/s':>18}{'speedup':>10}")
+    for name, reference, fast in PAIRS:
+        before, after = throughput(reference, corpus), throughput(fast, corpus)
+        print(f"  {name:<22}{before:>16.2f}{after:>18.2f}{after / before:>9.1f}x")
+    print("-" * 66)
+    return 0
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[sys.argv.index("--variants") + 1]) if "--variants" in sys.argv else 500
+    sys.exit(main(count))
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Hot Path Microbenchmarks
+Times the pure-Python hot paths (Perplexity and guide parsers, JSON
+cleaning, frontend formatters, guide validation, PDF story building and
+cache operations) on realistic fixtures at three sizes, and compares them
+with the stored baselines. Every sample is paired with one of a fixed
+calibration loop and baselines store the ratio, so they carry over to
+other machines and survive a machine that is busy part of the time. With
+--compare the script exits non-zero when any benchmark is slower than its
+baseline by more than the threshold.
+
+    python tests/integration/microbenchmarks.py                     # run, show deltas
+    python tests/integration/microbenchmarks.py --compare           # regression gate
+    python tests/integration/microbenchmarks.py --save              # record new baselines
+    python tests/integration/microbenchmarks.py --filter pdf --repeats 15
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.bounded_cache import BoundedCache
+from src.services.guide_parser import GuideParser
+from src.services.guide_validator import GuideValidator
+from src.services.llm_cache import LLMResponseCache
+from src.services.optimized_guide_service import OptimizedGuideService
+from src.services.pdf_generator import TravelPackGenerator
+from src.services.perplexity_response_parser import PerplexityResponseParser
+from src.validators.json_validator import JSONValidator
+
+RESPONSES_DIR = Path(__file__).parent / "perplexity_responses"
+BASELINE_PATH = Path(__file__).parent / "benchmark_baselines.json"
+SIZES = {"small": 1, "medium": 4, "large": 16}
+SAMPLE_SECONDS = 0.02
+DEFAULT_THRESHOLD = 0.25
+
+CUISINES = ["Italian", "Portuguese", "Japanese", "French", "Seafood", "Vegetarian", "Bakery", "Wine bar"]
+REVIEW_TEXTS = [
+    "Romantic candlelit dinner, the grilled octopus and the homemade pasta were outstanding.",
+    "Lively and noisy on a Friday night but the tapas were fresh and the staff friendly.",
+    "Elegant room, attentive service, a little pricey. Try the tasting menu and the local wine.",
+    "Cozy family-run place, generous portions, the custard tarts are the best in town.",
+    "Quick lunch spot, casual, good value. The sardines and the salad were simple and perfect.",
+]
+
+
+def perplexity_text(scale: int) -> str:
+    """The captured responses, repeated to reach the size of a long multi-section answer"""
+    captures = [path.read_text(encoding="utf-8") for path in sorted(RESPONSES_DIR.glob("*.md"))]
+    return "\n\n".join(captures * scale)
+
+
+def extraction_json(scale: int) -> str:
+    """A GPT extraction answer with the defects clean_json_string repairs"""
+    passengers = ", ".join(f"{{name: 'Traveller {i}', type: 'adult', seat: '{12 + i}A',}}" for i in range(2 * scale))
+    hotels = ", ".join(
+        f"{{'name': 'Hotel {i}', 'city': 'Lisbon', check_in: '2026-11-0{1 + i % 8}', "
+        f"'address': 'Rua Augusta {i}, Lisbon', 'rooms': [{{type: 'double', guests: 2,}}],}}"
+        for i in range(scale)
+    )
+    flights = ", ".join(
+        f"{{flight_number: 'TP{100 + i}', 'departure': 'JFK', arrival: 'LIS', 'date': '2026-11-01',}}"
+        for i in range(2 * scale)
+    )
+    return f"""
+    {{"passengers": [[{passengers}]], 'hotels': [{hotels}], flights: [{flights}],
+      trip_details: {{destination: 'Lisbon, Portugal', 'start_date': '2026-11-01', end_date: '2026-11-05',}},}}
+    """
+
+
+def restaurants(count: int) -> List[Dict[str, Any]]:
+    """Google Places restaurant records as the guide service receives them"""
+    return [
+        {
+            "name": f"Restaurant {i}",
+            "cuisine": CUISINES[i % len(CUISINES)],
+            "address": f"Rua da Prata {i}, 1100-420 Lisboa",
+            "rating": 4.0 + (i % 10) / 10,
+            "review_count": 120 + i * 7,
+            "price_level": "$" * (1 + i % 4),
+            "price_level_numeric": 1 + i % 4,
+            "phone": f"+351 21 000 {i:04d}",
+            "website": f"https://restaurant-{i}.example.com",
+            "google_maps_url": f"https://maps.google.com/?cid={1000 + i}",
+            "photos": [f"https://example.com/photos/{i}/{n}.jpg" for n in range(3)],
+            "reviews": [{"text": REVIEW_TEXTS[(i + n) % len(REVIEW_TEXTS)], "rating": 4 + n % 2} for n in range(5)],
+            "types": ["restaurant", "food", "point_of_interest"],
+            "source": "google_places",
+        }
+        for i in range(count)
+    ]
+
+
+def daily_suggestions(days: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "day": d,
+            "date": f"2026-11-{1 + d % 28:02d}",
+            "morning": f"Walk the Alfama viewpoints and visit the cathedral (day {d})",
+            "afternoon": "Tram 28 to Estrela, then the Gulbenkian museum and gardens",
+            "evening": "Fado dinner in Bairro Alto",
+            "transport_notes": "Buy a Viva Viagem card; trams get crowded after 10am",
+            "estimated_cost": "€60-90 per person",
+        }
+        for d in range(1, days + 1)
+    ]
+
+
+def guide(scale: int) -> Dict[str, Any]:
+    """A complete generated guide, as stored and rendered to PDF"""
+    places = restaurants(10 * scale)
+    for place in places:
+        place.pop("photos")  # the PDF builder would download them
+    return {
+        "destination": "Lisbon, Portugal",
+        "summary": "\n".join(
+            f"Day {d}: a relaxed mix of viewpoints, tiled churches, long lunches and riverside walks in Lisbon."
+            for d in range(1, 3 * scale + 1)
+        ),
+        "destination_insights": "Lisbon is hilly and best explored on foot & by tram; <book> popular restaurants ahead.",
+        "daily_itinerary": [
+            {"day": d["day"], "date": d["date"], "activities": [d["morning"], d["afternoon"], d["evening"]]}
+            for d in daily_suggestions(3 * scale)
+        ],
+        "restaurants": [{**place, "description": REVIEW_TEXTS[i % len(REVIEW_TEXTS)],
+                         "details": [place["address"], place["phone"], place["price_level"]]}
+                        for i, place in enumerate(places)],
+        "attractions": [{"name": f"Attraction {i}", "description": "A landmark with river views.",
+                         "address": f"Largo {i}, Lisboa", "website": f"https://attraction-{i}.example.com"}
+                        for i in range(8 * scale)],
+        "events": [{"name": f"Concert {i}", "date": "2026-11-02", "venue": "Coliseu"} for i in range(3 * scale)],
+        "weather": [{"date": f"2026-11-0{d}", "temp_high": 19, "temp_low": 12, "condition": "Partly cloudy"}
+                    for d in range(1, 6)],
+        "practical_info": {
+            f"topic {n}": [f"Tip {n}.{i}: carry cash for small cafés & kiosks" for i in range(6)]
+            for n in range(4 * scale)
+        },
+    }
+
+
+def itinerary(scale: int) -> Dict[str, Any]:
+    return {
+        "trip_summary": {"destination": "Lisbon, Portugal", "duration": f"{3 * scale} days",
+                         "start_date": "2026-11-01", "end_date": "2026-11-05", "total_passengers": 2},
+        "daily_schedule": [
+            {"day": d, "date": f"2026-11-{d:02d}",
+             "activities": [{"time": f"{9 + 3 * i}:00", "description": f"Activity {d}.{i} <with> markup & notes"}
+                            for i in range(4)]}
+            for d in range(1, 3 * scale + 1)
+        ],
+        "important_info": {f"note_{i}": f"Keep passports & tickets handy ({i})" for i in range(5 * scale)},
+    }
+
+
+def pdf_story(generator: TravelPackGenerator, trip: Dict, content: Dict) -> List:
+    """Every synchronous section builder the travel pack runs (no downloads)"""
+    story = generator._create_trip_overview(trip)
+    story += generator._create_guide_summary(content)
+    story += generator._create_weather_section(content["weather"])
+    story += generator._create_daily_schedule(trip["daily_schedule"])
+    story += generator._create_restaurant_section(content["restaurants"])
+    story += generator._create_attractions_section(content["attractions"])
+    story += generator._create_practical_info(content["practical_info"])
+    story += generator._create_important_info(trip["important_info"])
+    return story
+
+
+def cache_workload(operations: int) -> Callable[[], Any]:
+    """A hit-heavy mix of gets and puts on a cache that keeps evicting"""
+    keys = [("Lisbon", "restaurants", i % (operations // 2)) for i in range(operations)]
+
+    def run():
+        cache: BoundedCache = BoundedCache("bench", max_entries=operations // 4, max_bytes=1 << 20, sizer=len)
+        for key in keys:
+            if cache.get(key) is None:
+                cache.put(key, f"{key}")
+        return cache
+
+    return run
+
+
+def llm_messages(scale: int) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "You are a travel expert. Return JSON only.  " * scale},
+        {"role": "user", "content": perplexity_text(1)[: 1500 * scale]},
+    ]
+
+
+def benchmarks() -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, zero-argument callable) for every benchmark at every size"""
+    # The formatters only use their arguments; skip constructing the upstream clients
+    service = OptimizedGuideService.__new__(OptimizedGuideService)
+    generator = TravelPackGenerator()
+    context = {"trip_duration_days": 5, "start_date": "2026-11-01", "destination": "Lisbon"}
+    cases: List[Tuple[str, Callable[[], Any]]] = []
+    for size, scale in SIZES.items():
+        text = perplexity_text(scale)
+        dirty_json = extraction_json(scale)
+        places = restaurants(10 * scale)
+        days = daily_suggestions(3 * scale)
+        content = guide(scale)
+        trip = itinerary(scale)
+        messages = llm_messages(scale)
+        cases += [
+            (f"parse.perplexity_parse_all[{size}]", lambda t=text: PerplexityResponseParser.parse_all(t)),
+            (f"parse.perplexity_restaurants[{size}]", lambda t=text: PerplexityResponseParser.parse_restaurants(t)),
+            (f"parse.comprehensive_guide[{size}]", lambda t=text: GuideParser().parse_comprehensive_guide(t)),
+            (f"parse.clean_json_string[{size}]", lambda s=dirty_json: JSONValidator.clean_json_string(s)),
+            (f"format.restaurants[{size}]", lambda p=places: service._format_restaurants_for_frontend(p)),
+            (f"format.daily_itinerary[{size}]", lambda d=days: service._format_daily_itinerary(d, context)),
+            (f"validate.guide[{size}]", lambda g=content: GuideValidator.validate_guide(g)),
+            (f"pdf.story[{size}]", lambda t=trip, g=content: pdf_story(generator, t, g)),
+            (f"cache.bounded_get_put[{size}]", cache_workload(200 * scale)),
+            (f"cache.llm_key[{size}]", lambda m=messages: LLMResponseCache.cache_key("openai", "gpt-4o-mini", m)),
+        ]
+    return cases
+
+
+def calibration() -> Callable[[], Any]:
+    """A fixed mix of dict, string and list work: the unit benchmarks are expressed in"""
+    words = [f"word{i}" for i in range(200)]
+
+    def run():
+        counts: Dict[str, int] = {}
+        for word in words:
+            key = word.upper().strip("W")
+            counts[key] = counts.get(key, 0) + len(word)
+        return sorted(counts.items(), key=lambda item: item[1])
+
+    return run
+
+
+def loops_for(fn: Callable[[], Any]) -> int:
+    """Calls per sample, so that one sample swamps the timer overhead"""
+    fn()  # warm caches and lazy imports
+    started = time.perf_counter()
+    fn()
+    once = time.perf_counter() - started
+    return max(1, int(SAMPLE_SECONDS / once)) if once > 0 else 1000
+
+
+def sample_us(fn: Callable[[], Any], loops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return (time.perf_counter() - started) / loops * 1e6
+
+
+def measure(fn: Callable[[], Any], reference: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """
+    Per-call µs over `repeats` samples, each followed by a sample of the
+    calibration loop. The cost relative to the calibration loop is taken
+    pairwise, so a machine that speeds up or slows down mid-run (frequency
+    scaling, noisy neighbours) cancels out of the comparison.
+    """
+    loops, reference_loops = loops_for(fn), loops_for(reference)
+    samples, ratios = [], []
+    for _ in range(repeats):
+        elapsed = sample_us(fn, loops)
+        samples.append(elapsed)
+        ratios.append(elapsed / sample_us(reference, reference_loops))
+    return {"min_us": min(samples), "median_us": statistics.median(samples), "relative": statistics.median(ratios)}
+
+
+def load_baselines(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def main(args: argparse.Namespace) -> int:
+    baselines = load_baselines(args.baseline).get("benchmarks", {})
+    cases = [(name, fn) for name, fn in benchmarks() if not args.filter or args.filter in name]
+    if not cases:
+        print(f"  ❌ No benchmark matches {args.filter!r}")
+        return 1
+    reference = calibration()
+
+    print(f"\n⏱️  Hot path microbenchmarks (Python {platform.python_version()}, {args.repeats} repeats)")
+    print("-" * 92)
+    print(f"  {'benchmark':<40}{'min µs':>12}{'median µs':>12}{'baseline µs':>13}{'change':>10}")
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+    for name, fn in cases:
+        result = results[name] = measure(fn, reference, args.repeats)
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"  {name:<40}{result['min_us']:>12.1f}{result['median_us']:>12.1f}{'-':>13}{'new':>10}")
+            continue
+        # Baselines are kept in calibration units, so they carry over to faster or slower machines
+        change = result["relative"] / baseline["relative"] - 1
+        expected = result["median_us"] / (1 + change)
+        flag = ""
+        if change > args.threshold:
+            regressions.append((name, change))
+            flag = " ❌"
+        print(f"  {name:<40}{result['min_us']:>12.1f}{result['median_us']:>12.1f}{expected:>13.1f}"
+              f"{change:>+10.0%}{flag}")
+    print("-" * 92)
+
+    if args.save:
+        saved = {**baselines} if args.filter else {}
+        saved.update({name: {key: round(value, 4) for key, value in result.items()} for name, result in results.items()})
+        args.baseline.write_text(json.dumps({
+            "python": platform.python_version(),
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+            "benchmarks": dict(sorted(saved.items())),
+        }, indent=2) + "\n", encoding="utf-8")
+        print(f"  💾 Saved {len(results)} baselines to {args.baseline}")
+
+    if args.compare:
+        if not baselines:
+            print(f"  ❌ No baselines at {args.baseline}; record them with --save")
+            return 1
+        if regressions:
+            for name, change in regressions:
+                print(f"  ❌ {name} is {change:.0%} slower than its baseline (threshold {args.threshold:.0%})")
+            return 1
+        print(f"  ✅ No benchmark regressed by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the hot CPU paths and compare with stored baselines")
+    parser.add_argument("--compare", action="store_true", help="exit non-zero if a benchmark regressed")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before --compare fails (0.25 = 25%%)")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    sys.exit(main(parser.parse_args()))
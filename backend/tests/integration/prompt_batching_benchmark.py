@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Prompt Batching Benchmark
+Compares per-section and batched Perplexity modes on request count, tokens,
+estimated cost and wall-clock latency.
+
+    python tests/integration/prompt_batching_benchmark.py          # simulated upstream
+    python tests/integration/prompt_batching_benchmark.py --live   # real API (uses PERPLEXITY_API_KEY)
+"""
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services.optimized_perplexity_service import OptimizedPerplexityService
+from src.services.prompt_batching import REQUEST_OVERHEAD_TOKENS, SECTION_SPECS
+
+# Sonar list pricing (USD): per 1M tokens each way plus a per-request search fee
+PRICE_PER_M_INPUT = 1.0
+PRICE_PER_M_OUTPUT = 1.0
+PRICE_PER_REQUEST = 0.005
+
+# Simulated upstream: fixed search/queue latency plus generation throughput
+SIM_REQUEST_LATENCY_S = 1.5
+SIM_TOKENS_PER_SECOND = 120.0
+SIM_TIME_SCALE = 0.02  # sleep 2% of simulated time so the run stays quick
+
+TRIPS = [
+    ("Paris, France", "2026-11-01", "2026-11-04"),
+    ("Lisbon, Portugal", "2026-11-05", "2026-11-07"),
+    ("Tokyo, Japan", "2026-12-01", "2026-12-05"),
+]
+
+
+class SimulatedPerplexityService(OptimizedPerplexityService):
+    """Answers with schema-shaped JSON and a latency/token model instead of the API"""
+
+    def __init__(self, batch_mode: bool):
+        super().__init__()
+        self.config.api_key = self.config.api_key or "simulated"
+        self.config.batch_mode = batch_mode
+
+    async def _make_api_request(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
+        async with self._semaphore:
+            if response_format:
+                schema = response_format["json_schema"]["schema"]
+                body = {key: _sample(value) for key, value in schema["properties"].items()}
+            else:
+                spec = next(s for s in SECTION_SPECS.values() if ", ".join(s.item_properties) in prompt)
+                body = _sample(spec.schema())
+            content = json.dumps(body)
+            prompt_tokens = REQUEST_OVERHEAD_TOKENS + len(prompt) // 4
+            completion_tokens = len(content) // 4
+            seconds = SIM_REQUEST_LATENCY_S + completion_tokens / SIM_TOKENS_PER_SECOND
+            await asyncio.sleep(seconds * SIM_TIME_SCALE)
+            self._record_usage({"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}, seconds)
+            return content
+
+    async def _stream_api_request(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None
+    ):
+        content = await self._make_api_request(prompt, max_tokens, response_format)
+        for start in range(0, len(content), 64):
+            yield content[start:start + 64]
+
+
+def _sample(schema: Dict[str, Any], items: int = 6) -> Any:
+    if schema["type"] == "array":
+        return [_sample(schema["items"]) for _ in range(items)]
+    if schema["type"] == "object":
+        return {key: _sample(value) for key, value in schema["properties"].items()}
+    if schema["type"] == "integer":
+        return 1
+    return "sample text for benchmarking purposes"
+
+
+def estimated_cost(usage: Dict[str, Any]) -> float:
+    return (
+        usage["prompt_tokens"] / 1e6 * PRICE_PER_M_INPUT
+        + usage["completion_tokens"] / 1e6 * PRICE_PER_M_OUTPUT
+        + usage["requests"] * PRICE_PER_REQUEST
+    )
+
+
+async def run_mode(batch_mode: bool, live: bool) -> Tuple[Dict[str, Any], float]:
+    service = OptimizedPerplexityService() if live else SimulatedPerplexityService(batch_mode)
+    service.config.batch_mode = batch_mode
+    started = time.perf_counter()
+    if batch_mode:
+        await service.warm_cache(TRIPS)
+    else:
+        await asyncio.gather(*(
+            service.generate_complete_guide_data(destination, start, end, {})
+            for destination, start, end in TRIPS
+        ))
+    elapsed = time.perf_counter() - started
+    if not live:
+        elapsed = elapsed / SIM_TIME_SCALE
+    return service.usage, elapsed
+
+
+async def main(live: bool = False):
+    print(f"\n📊 Prompt batching comparison ({len(TRIPS)} trips, {'live' if live else 'simulated'} upstream)")
+    print("-" * 78)
+    print(f"  {'mode':<14}{'requests':>10}{'in tokens':>12}{'out tokens':>12}{'cost $':>10}{'wall s':>10}")
+    rows: List[Tuple[str, Dict[str, Any], float]] = []
+    for label, batch_mode in (("per-section", False), ("batched", True)):
+        usage, elapsed = await run_mode(batch_mode, live)
+        rows.append((label, usage, elapsed))
+        print(
+            f"  {label:<14}{usage['requests']:>10}{usage['prompt_tokens']:>12}"
+            f"{usage['completion_tokens']:>12}{estimated_cost(usage):>10.4f}{elapsed:>10.1f}"
+        )
+    print("-" * 78)
+    (_, per_section, per_section_s), (_, batched, batched_s) = rows
+    saving = 1 - estimated_cost(batched) / max(estimated_cost(per_section), 1e-9)
+    print(f"  batched mode: {saving:.0%} cheaper, {batched_s - per_section_s:+.1f}s wall clock")
+    print("  Choose with PERPLEXITY_BATCH_MODE=true|false per deployment.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(live="--live" in sys.argv))
@@ -0,0 +1,613 @@
+"""
+Reference Perplexity Markdown Parsers
+Verbatim copies of the per-section parsers that perplexity_markdown replaced
+(PerplexityResponseParser, simple_parser and the EnhancedGuideService
+_parse_* helpers). The markdown parser benchmark checks the single-pass
+parser against these line for line; do not "fix" them.
+"""
+import re
+from typing import List, Dict
+
+
+class PerplexityResponseParser:
+    """Parse real Perplexity responses into structured data"""
+    
+    @staticmethod
+    def parse_restaurants(response: str) -> List[Dict]:
+        """
+        Parse restaurant recommendations from Perplexity response
+        
+        Handles multiple formats:
+        1. **Restaurant Name** - Address. Description
+        2. **Restaurant Name**
+           - **Address:** 123 Street
+        """
+        restaurants = []
+        current_restaurant = None
+        
+        lines = response.split('\n')
+        
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Check for numbered restaurant with inline format: "1. **Name** - Address"
+            inline_match = re.match(r'^(\d+)\.\s+\*\*(.+?)\*\*\s*[-–]\s*(.+)', line)
+            if inline_match:
+                # Save previous restaurant if exists
+                if current_restaurant:
+                    restaurants.append(current_restaurant)
+                
+                # Extract name and rest of line
+                name = inline_match.group(2).strip()
+                rest = inline_match.group(3).strip()
+                
+                # The rest often contains address followed by description
+                # Try to extract address (usually ends with ZIP code)
+                address_match = re.match(r'^([^.]+(?:NY|New York)\s+\d{5})', rest)
+                if address_match:
+                    address = address_match.group(1).strip()
+                    description = rest[address_match.end():].strip('. ')
+                else:
+                    # If no clear address pattern, take everything before first period
+                    parts = rest.split('. ', 1)
+                    address = parts[0] if parts else rest
+                    description = parts[1] if len(parts) > 1 else ''
+                
+                current_restaurant = {
+                    'name': name,
+                    'address': address,
+                    'description': description,
+                    'raw_text': [line]
+                }
+                continue
+            
+            # Check for numbered restaurant without inline (e.g., "1. **Restaurant Name**")
+            numbered_match = re.match(r'^(\d+)\.\s+\*\*(.+?)\*\*', line)
+            if numbered_match:
+                # Save previous restaurant if exists
+                if current_restaurant:
+                    restaurants.append(current_restaurant)
+                
+                # Start new restaurant
+                current_restaurant = {
+                    'name': numbered_match.group(2).strip(),
+                    'raw_text': []
+                }
+                continue
+            
+            # If we're in a restaurant section, parse details
+            if current_restaurant:
+                # Check for address
+                if '**Address:**' in line or '**address:**' in line:
+                    address = re.sub(r'\*\*[Aa]ddress:\*\*\s*', '', line)
+                    address = address.strip('- ').strip()
+                    current_restaurant['address'] = address
+                
+                # Check for why it's great / description
+                elif '**Why it' in line or '**why it' in line:
+                    desc = line.split(':', 1)[1].strip() if ':' in line else line
+                    desc = re.sub(r'\*\*.*?\*\*\s*', '', desc).strip('- ')
+                    current_restaurant['description'] = desc
+                
+                # Check for price
+                elif '**Price' in line or '**price' in line:
+                    price = line.split(':', 1)[1].strip() if ':' in line else line
+                    price = re.sub(r'\*\*.*?\*\*\s*', '', price).strip('- ')
+                    # Extract just the $ symbols if present
+                    if '$' in price:
+                        dollar_match = re.search(r'(\$+)', price)
+                        if dollar_match:
+                            current_restaurant['price'] = dollar_match.group(1)
+                        else:
+                            current_restaurant['price'] = price
+                    else:
+                        current_restaurant['price'] = price
+                
+                # Check for cuisine type
+                elif '**Cuisine' in line or '**cuisine' in line:
+                    cuisine = line.split(':', 1)[1].strip() if ':' in line else line
+                    cuisine = re.sub(r'\*\*.*?\*\*\s*', '', cuisine).strip('- ')
+                    current_restaurant['cuisine'] = cuisine
+                
+                # Check for hours
+                elif '**Hours' in line or '**Open' in line:
+                    hours = line.split(':', 1)[1].strip() if ':' in line else line
+                    hours = re.sub(r'\*\*.*?\*\*\s*', '', hours).strip('- ')
+                    current_restaurant['hours'] = hours
+                
+                # Store raw text for reference
+                current_restaurant['raw_text'].append(line)
+        
+        # Don't forget the last restaurant
+        if current_restaurant:
+            restaurants.append(current_restaurant)
+        
+        # Clean up the results
+        for restaurant in restaurants:
+            # Join raw text for any missing description
+            if 'description' not in restaurant and restaurant.get('raw_text'):
+                # Look for descriptive text that's not a labeled field
+                desc_lines = []
+                for line in restaurant['raw_text']:
+                    if not line.startswith('-') and '**' not in line and len(line) > 20:
+                        desc_lines.append(line)
+                if desc_lines:
+                    restaurant['description'] = ' '.join(desc_lines)
+            
+            # Remove raw_text from final output
+            restaurant.pop('raw_text', None)
+        
+        return restaurants
+    
+    @staticmethod
+    def parse_attractions(response: str) -> List[Dict]:
+        """Parse attractions from Perplexity response"""
+        attractions = []
+        current_attraction = None
+        
+        lines = response.split('\n')
+        
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Check for numbered attraction
+            numbered_match = re.match(r'^(\d+)\.\s+\*\*(.+?)\*\*', line)
+            if numbered_match:
+                if current_attraction:
+                    attractions.append(current_attraction)
+                
+                current_attraction = {
+                    'name': numbered_match.group(2).strip(),
+                    'details': []
+                }
+                continue
+            
+            if current_attraction:
+                # Parse address
+                if '**Address:**' in line or 'Address:' in line:
+                    address = re.sub(r'(\*\*)?[Aa]ddress:(\*\*)?\s*', '', line).strip('- ')
+                    current_attraction['address'] = address
+                
+                # Parse hours
+                elif 'Hours:' in line or 'Open:' in line:
+                    hours = line.split(':', 1)[1].strip() if ':' in line else ''
+                    current_attraction['hours'] = hours.strip('- ')
+                
+                # Parse price/admission
+                elif any(word in line.lower() for word in ['price:', 'admission:', 'tickets:', 'cost:']):
+                    price = line.split(':', 1)[1].strip() if ':' in line else line
+                    current_attraction['price'] = re.sub(r'\*\*.*?\*\*\s*', '', price).strip('- ')
+                
+                # Parse why it's recommended
+                elif 'Why' in line or 'Description:' in line:
+                    desc = line.split(':', 1)[1].strip() if ':' in line else line
+                    current_attraction['description'] = re.sub(r'\*\*.*?\*\*\s*', '', desc).strip('- ')
+                
+                # Collect other details
+                elif line.startswith('-'):
+                    current_attraction['details'].append(line.strip('- '))
+        
+        if current_attraction:
+            attractions.append(current_attraction)
+        
+        return attractions
+    
+    @staticmethod
+    def parse_daily_itinerary(response: str) -> Dict:
+        """Parse a daily itinerary from Perplexity response"""
+        itinerary = {
+            "morning": [],
+            "lunch": [],
+            "afternoon": [],
+            "evening": [],
+            "tips": []
+        }
+        
+        current_section = None
+        
+        for line in response.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Detect sections
+            line_lower = line.lower()
+            if 'morning' in line_lower or '8:00' in line or '9:00' in line:
+                current_section = 'morning'
+            elif 'lunch' in line_lower or '12:00' in line or '1:00' in line:
+                current_section = 'lunch'
+            elif 'afternoon' in line_lower or '2:00' in line or '3:00' in line:
+                current_section = 'afternoon'
+            elif 'evening' in line_lower or 'dinner' in line_lower or '6:00' in line or '7:00' in line:
+                current_section = 'evening'
+            elif 'tip' in line_lower or 'note' in line_lower:
+                current_section = 'tips'
+            elif current_section:
+                # Clean up the line
+                cleaned = re.sub(r'\*\*.*?\*\*:', '', line)  # Remove bold labels
+                cleaned = cleaned.strip('- ').strip()
+                
+                # Only add substantial content
+                if len(cleaned) > 10 and not cleaned.lower().startswith(('morning', 'afternoon', 'evening', 'lunch')):
+                    itinerary[current_section].append(cleaned)
+        
+        return itinerary
+    
+    @staticmethod
+    def parse_events(response: str) -> List[Dict]:
+        """Parse events from Perplexity response"""
+        events = []
+        current_event = None
+        
+        for line in response.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Look for numbered events or bold titles
+            if re.match(r'^\d+\.', line) or '**' in line:
+                if current_event and current_event.get('name'):
+                    events.append(current_event)
+                
+                # Extract event name
+                name = re.sub(r'^\d+\.\s*', '', line)
+                name = re.sub(r'\*\*', '', name).strip()
+                
+                current_event = {
+                    'name': name,
+                    'details': []
+                }
+            elif current_event:
+                # Parse event details
+                if any(word in line.lower() for word in ['date:', 'when:', 'dates:']):
+                    date = line.split(':', 1)[1].strip() if ':' in line else line
+                    current_event['date'] = date
+                elif any(word in line.lower() for word in ['venue:', 'location:', 'where:']):
+                    venue = line.split(':', 1)[1].strip() if ':' in line else line
+                    current_event['venue'] = venue
+                elif any(word in line.lower() for word in ['price:', 'tickets:', 'cost:']):
+                    price = line.split(':', 1)[1].strip() if ':' in line else line
+                    current_event['price'] = price
+                elif line.startswith('-'):
+                    current_event['details'].append(line.strip('- '))
+                elif len(line) > 20:
+                    if 'description' not in current_event:
+                        current_event['description'] = line
+        
+        if current_event and current_event.get('name'):
+            events.append(current_event)
+        
+        return events
+    
+    @staticmethod
+    def parse_local_insights(response: str) -> Dict:
+        """Parse local insights and tips from Perplexity response"""
+        insights = {
+            "weather": [],
+            "transportation": [],
+            "money": [],
+            "cultural": [],
+            "safety": [],
+            "tips": []
+        }
+        
+        current_section = 'tips'
+        
+        for line in response.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            
+            # Detect section headers
+            line_lower = line.lower()
+            if 'weather' in line_lower or 'climate' in line_lower:
+                current_section = 'weather'
+            elif 'transport' in line_lower or 'getting around' in line_lower:
+                current_section = 'transportation'
+            elif 'money' in line_lower or 'currency' in line_lower or 'cost' in line_lower:
+                current_section = 'money'
+            elif 'cultur' in line_lower or 'custom' in line_lower or 'etiquette' in line_lower:
+                current_section = 'cultural'
+            elif 'safety' in line_lower or 'security' in line_lower:
+                current_section = 'safety'
+            else:
+                # Add content to current section
+                cleaned = re.sub(r'\*\*.*?\*\*:', '', line)
+                cleaned = cleaned.strip('- •').strip()
+                
+                if len(cleaned) > 10 and not any(cleaned.lower().startswith(word) for word in 
+                    ['weather', 'transport', 'money', 'cultur', 'safety']):
+                    insights[current_section].append(cleaned)
+        
+        return insights
+
+def parse_restaurants_simple(response: str) -> List[Dict]:
+    """
+    Simple parser that handles real Perplexity formats:
+    1. **Name** - Address
+    2. **Name**
+       Address on next line
+    3. **Name**
+       - Address: ...
+    """
+    restaurants = []
+    lines = response.split('\n')
+    i = 0
+    
+    while i < len(lines):
+        line = lines[i].strip()
+        
+        # Look for restaurant name in bold
+        if '**' in line:
+            # Extract name
+            name_match = re.search(r'\*\*(.+?)\*\*', line)
+            if name_match:
+                name = name_match.group(1).strip()
+                
+                # Check if address is on same line after dash
+                rest_of_line = line[name_match.end():].strip()
+                if rest_of_line.startswith(('-', '–', '—')):
+                    # Address is inline
+                    address = rest_of_line.strip('-–— ').strip()
+                    # Remove trailing description if present
+                    if '. ' in address:
+                        address = address.split('. ', 1)[0]
+                    
+                    restaurant = {'name': name, 'address': address}
+                    
+                    # Look for description on next line
+                    if i + 1 < len(lines):
+                        next_line = lines[i + 1].strip()
+                        if next_line and not next_line.startswith(('**', '-', '1.', '2.', '3.')):
+                            restaurant['description'] = next_line
+                            i += 1
+                else:
+                    # Address might be on next line
+                    restaurant = {'name': name}
+                    
+                    # Check next few lines for address
+                    for j in range(1, 4):
+                        if i + j < len(lines):
+                            next_line = lines[i + j].strip()
+                            
+                            # Skip empty lines
+                            if not next_line:
+                                continue
+                            
+                            # Stop if we hit another restaurant
+                            if '**' in next_line or re.match(r'^\d+\.', next_line):
+                                break
+                            
+                            # Check if this looks like an address
+                            if any(marker in next_line for marker in 
+                                   ['Street', 'St', 'Ave', 'Avenue', 'Road', 'NY', 'New York']):
+                                restaurant['address'] = next_line.strip('- ')
+                                # Description might be after address
+                                if i + j + 1 < len(lines):
+                                    desc_line = lines[i + j + 1].strip()
+                                    if desc_line and not desc_line.startswith(('**', '-', '1.', '2.')):
+                                        restaurant['description'] = desc_line
+                                i = i + j
+                                break
+                            # Check for labeled address
+                            elif 'Address:' in next_line:
+                                restaurant['address'] = next_line.split(':', 1)[1].strip()
+                                i = i + j
+                                break
+                            # If no address markers, might be description
+                            elif not restaurant.get('description'):
+                                restaurant['description'] = next_line
+                
+                restaurants.append(restaurant)
+        
+        i += 1
+    
+    return restaurants
+
+def parse_attractions_simple(response: str) -> List[Dict]:
+    """Simple parser for attractions"""
+    # Similar logic to restaurants
+    attractions = []
+    lines = response.split('\n')
+    i = 0
+    
+    while i < len(lines):
+        line = lines[i].strip()
+        
+        # Look for attraction name in bold
+        if '**' in line and not any(skip in line.lower() for skip in ['address:', 'price:', 'hours:']):
+            name_match = re.search(r'\*\*(.+?)\*\*', line)
+            if name_match:
+                name = name_match.group(1).strip()
+                attraction = {'name': name}
+                
+                # Look for details in next few lines
+                for j in range(1, 6):
+                    if i + j < len(lines):
+                        detail_line = lines[i + j].strip()
+                        
+                        if not detail_line:
+                            continue
+                        
+                        if '**' in detail_line or re.match(r'^\d+\.', detail_line):
+                            break
+                        
+                        # Parse different types of information
+                        if any(marker in detail_line for marker in ['Street', 'St', 'Ave', 'Avenue', 'NY']):
+                            if 'address' not in attraction:
+                                attraction['address'] = detail_line.strip('- ')
+                        elif 'Price:' in detail_line or 'Admission:' in detail_line:
+                            attraction['price'] = detail_line.split(':', 1)[1].strip()
+                        elif 'Hours:' in detail_line or 'Open:' in detail_line:
+                            attraction['hours'] = detail_line.split(':', 1)[1].strip()
+                        elif not attraction.get('description') and len(detail_line) > 20:
+                            attraction['description'] = detail_line
+                
+                if attraction.get('name'):
+                    attractions.append(attraction)
+        
+        i += 1
+    
+    return attractions
+
+class GuideContentParser:
+    """EnhancedGuideService._parse_guide_content and its helpers"""
+
+    def _parse_guide_content(self, content: str, citations: List) -> Dict:
+        """Parse LLM response into structured guide format"""
+        
+        # Initialize guide structure
+        guide = {
+            "summary": "",
+            "destination_insights": "",
+            "weather": {},
+            "daily_itinerary": [],
+            "restaurants": [],
+            "attractions": [],
+            "events": [],
+            "neighborhoods": [],
+            "practical_info": {},
+            "hidden_gems": [],
+            "citations": citations,
+            "raw_content": content
+        }
+        
+        # Parse sections from the content
+        sections = (content or "").split("\n## ")
+        
+        for section in sections:
+            lines = section.split("\n")
+            if not lines:
+                continue
+                
+            first = lines[0] if lines else ""
+            title = str(first or "").strip("#").strip().lower()
+            content = "\n".join(lines[1:]).strip()
+            
+            if "summary" in title:
+                guide["summary"] = content
+            elif "insight" in title or "destination" in title:
+                guide["destination_insights"] = content
+            elif "itinerary" in title:
+                guide["daily_itinerary"] = self._parse_itinerary(content)
+            elif "dining" in title or "restaurant" in title:
+                guide["restaurants"] = self._parse_restaurants(content)
+            elif "cultural" in title or "entertainment" in title or "event" in title:
+                guide["events"] = self._parse_events(content)
+            elif "neighborhood" in title:
+                guide["neighborhoods"] = self._parse_neighborhoods(content)
+            elif "practical" in title:
+                guide["practical_info"] = self._parse_practical_info(content)
+            elif "hidden" in title or "secret" in title:
+                guide["hidden_gems"] = self._parse_hidden_gems(content)
+        
+        return guide
+    
+    def _parse_itinerary(self, content: str) -> List[Dict]:
+        """Parse daily itinerary from content"""
+        days = []
+        current_day = None
+        
+        for line in content.split("\n"):
+            if line.startswith("### Day") or line.startswith("**Day"):
+                if current_day:
+                    days.append(current_day)
+                current_day = {
+                    "day": len(days) + 1,
+                    "title": line.strip("#*").strip(),
+                    "activities": []
+                }
+            elif current_day and line.strip():
+                current_day["activities"].append(line.strip("- ").strip())
+        
+        if current_day:
+            days.append(current_day)
+        
+        return days
+    
+    def _parse_restaurants(self, content: str) -> List[Dict]:
+        """Parse restaurant recommendations from content"""
+        restaurants = []
+        current_restaurant = None
+        
+        for line in content.split("\n"):
+            if line.startswith("### ") or line.startswith("**"):
+                if current_restaurant:
+                    restaurants.append(current_restaurant)
+                current_restaurant = {
+                    "name": line.strip("#*").strip(),
+                    "description": "",
+                    "details": []
+                }
+            elif current_restaurant:
+                if line.strip():
+                    if not current_restaurant["description"]:
+                        current_restaurant["description"] = line.strip()
+                    else:
+                        current_restaurant["details"].append(line.strip("- ").strip())
+        
+        if current_restaurant:
+            restaurants.append(current_restaurant)
+        
+        return restaurants
+    
+    def _parse_events(self, content: str) -> List[Dict]:
+        """Parse events from content"""
+        events = []
+        for line in content.split("\n"):
+            if line.strip() and not line.startswith("#"):
+                events.append({"description": line.strip("- ").strip()})
+        return events
+    
+    def _parse_neighborhoods(self, content: str) -> List[Dict]:
+        """Parse neighborhood information"""
+        neighborhoods = []
+        current_area = None
+        
+        for line in content.split("\n"):
+            if line.startswith("### ") or line.startswith("**"):
+                if current_area:
+                    neighborhoods.append(current_area)
+                current_area = {
+                    "name": line.strip("#*").strip(),
+                    "description": "",
+                    "highlights": []
+                }
+            elif current_area and line.strip():
+                if not current_area["description"]:
+                    current_area["description"] = line.strip()
+                else:
+                    current_area["highlights"].append(line.strip("- ").strip())
+        
+        if current_area:
+            neighborhoods.append(current_area)
+        
+        return neighborhoods
+    
+    def _parse_practical_info(self, content: str) -> Dict:
+        """Parse practical information"""
+        info = {}
+        current_category = "general"
+        
+        for line in content.split("\n"):
+            if line.startswith("### ") or line.startswith("**"):
+                current_category = (line or "").strip("#*").strip().lower()
+                info[current_category] = []
+            elif line.strip():
+                if current_category not in info:
+                    info[current_category] = []
+                info[current_category].append(line.strip("- ").strip())
+        
+        return info
+    
+    def _parse_hidden_gems(self, content: str) -> List[Dict]:
+        """Parse hidden gems and local secrets"""
+        gems = []
+        for line in content.split("\n"):
+            if line.strip() and not line.startswith("#"):
+                gems.append({"description": line.strip("- ").strip()})
+        return gems
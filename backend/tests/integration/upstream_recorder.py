@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Upstream Recorder
+Record-and-replay stand-in for the external providers, addressed like the
+upstream simulator (/<upstream host>/<path>) and wired in with the same
+redirect_upstreams(). In record mode every request is forwarded to the real
+provider (or to another local upstream, such as the simulator) and the
+response is captured with its timing: time to headers, total time and, for
+server-sent events, the offset of every chunk. In replay mode the cassette
+answers instead, with the original latencies, scaled ones or none, so guide
+generation can be profiled offline with identical upstream data.
+
+Cassettes are JSON lines, one interaction per line. API keys never reach
+them: request headers are not stored and key-like query parameters are
+dropped before the request is keyed.
+
+    python tests/integration/upstream_recorder.py --cassette trip.jsonl --port 8766
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.core.upstream_metrics import provider_for_host
+from upstream_simulator import LocalUpstream, passthrough
+
+MODES = ("record", "replay")
+SECRET_PARAMS = {"key", "apikey", "api_key", "appid", "token", "access_token", "client_id", "client_secret", "signature"}
+SKIPPED_REQUEST_HEADERS = {"host", "content-length", "accept-encoding", "connection", "transfer-encoding"}
+
+
+@dataclass
+class Interaction:
+    key: str
+    method: str
+    host: str
+    path: str
+    query: str                     # without SECRET_PARAMS
+    status: int
+    content_type: str
+    ttfb_ms: float                 # request sent -> response headers
+    elapsed_ms: float              # request sent -> last byte
+    body: str = ""
+    body_base64: bool = False
+    chunks: Optional[List[Tuple[float, str]]] = None  # streamed bodies: (ms since request, text)
+
+    def body_bytes(self) -> bytes:
+        return base64.b64decode(self.body) if self.body_base64 else self.body.encode()
+
+
+def public_query(query: str) -> str:
+    """The query string without credentials, in a stable order"""
+    pairs = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k.lower() not in SECRET_PARAMS]
+    return urlencode(sorted(pairs))
+
+
+def request_key(method: str, host: str, path: str, query: str, body: bytes) -> str:
+    """Requests that differ only in credentials, parameter order or JSON formatting share a key"""
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode() if body else b""
+    except ValueError:
+        canonical = body
+    digest = hashlib.sha256(f"{method.upper()} {host}{path}?{public_query(query)}\n".encode())
+    digest.update(canonical)
+    return digest.hexdigest()[:32]
+
+
+def load_cassette(path: Path) -> List[Interaction]:
+    if not path.exists():
+        return []
+    interactions = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            entry = json.loads(line)
+            if entry.get("chunks") is not None:
+                entry["chunks"] = [tuple(chunk) for chunk in entry["chunks"]]
+            interactions.append(Interaction(**entry))
+    return interactions
+
+
+def save_cassette(path: Path, interactions: List[Interaction]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [json.dumps(asdict(interaction), ensure_ascii=False) for interaction in interactions]
+    path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+
+
+class UpstreamRecorder(LocalUpstream):
+    """
+    Records to or replays from one cassette. Replay serves identical
+    requests in the order they were recorded; a request that was never
+    recorded gets the next unused response of the same endpoint (counted as
+    a fallback, e.g. a prompt that embeds today's date) or, failing that,
+    a 404 (counted as a miss).
+    """
+
+    def __init__(self, cassette: Path, mode: str = "replay", time_scale: float = 1.0, upstream: Optional[str] = None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.cassette = Path(cassette)
+        self.mode = mode
+        self.time_scale = time_scale
+        self.upstream = upstream.rstrip("/") if upstream else None  # record from here instead of https://<host>
+        self.interactions = load_cassette(self.cassette) if mode == "replay" else []
+        self.calls: Counter = Counter()     # provider -> requests
+        self.outcomes: Counter = Counter()  # recorded / replayed / fallback / missed
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.rewind()
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_get("/_recorder/stats", self._stats_handler)
+        app.router.add_route("*", "/{host}/{path:.*}", self._handle)
+        app.on_cleanup.append(self._close_session)
+        return app
+
+    def stop_thread(self) -> None:
+        super().stop_thread()
+        if self.mode == "record":
+            self.save()
+
+    def save(self) -> None:
+        save_cassette(self.cassette, self.interactions)
+
+    def rewind(self) -> None:
+        """Serve the cassette from the start again (before each replayed run)"""
+        self._unused = list(range(len(self.interactions)))
+        self.calls.clear()
+        self.outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "interactions": len(self.interactions),
+                "calls": dict(self.calls), "outcomes": dict(self.outcomes)}
+
+    async def _stats_handler(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def _close_session(self, app: web.Application) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        host = request.match_info["host"]
+        path = "/" + request.match_info["path"]
+        body = await request.read()
+        key = request_key(request.method, host, path, request.query_string, body)
+        self.calls[provider_for_host(host)] += 1
+        if self.mode == "record":
+            return await self._record(request, key, host, path, body)
+        return await self._replay(request, key, host, path)
+
+    # Record
+
+    async def _record(self, request: web.Request, key: str, host: str, path: str, body: bytes) -> web.StreamResponse:
+        target = f"{self.upstream}/{host}{path}" if self.upstream else f"https://{host}{path}"
+        if request.query_string:
+            target = f"{target}?{request.query_string}"
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in SKIPPED_REQUEST_HEADERS}
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300))
+        interaction = Interaction(key, request.method, host, path, public_query(request.query_string),
+                                  status=502, content_type="application/json", ttfb_ms=0.0, elapsed_ms=0.0)
+        started = time.perf_counter()
+        try:
+            with passthrough():
+                async with self._session.request(request.method, target, headers=headers, data=body or None) as upstream:
+                    interaction.status = upstream.status
+                    interaction.content_type = upstream.headers.get("Content-Type", "application/octet-stream")
+                    interaction.ttfb_ms = (time.perf_counter() - started) * 1000
+                    if interaction.content_type.startswith("text/event-stream"):
+                        response = await self._record_stream(request, upstream, interaction, started)
+                    else:
+                        payload = await upstream.read()
+                        self._set_body(interaction, payload)
+                        response = web.Response(status=interaction.status, body=payload,
+                                                headers={"Content-Type": interaction.content_type})
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            payload = json.dumps({"error": f"{type(e).__name__}: {e}"}).encode()
+            self._set_body(interaction, payload)
+            response = web.Response(status=502, body=payload, headers={"Content-Type": interaction.content_type})
+        interaction.elapsed_ms = (time.perf_counter() - started) * 1000
+        self.interactions.append(interaction)
+        self.outcomes["recorded"] += 1
+        return response
+
+    async def _record_stream(
+        self,
+        request: web.Request,
+        upstream: aiohttp.ClientResponse,
+        interaction: Interaction,
+        started: float
+    ) -> web.StreamResponse:
+        """Relay the events as they arrive, noting when each one did"""
+        response = web.StreamResponse(status=upstream.status, headers={"Content-Type": interaction.content_type})
+        await response.prepare(request)
+        chunks: List[Tuple[float, str]] = []
+        async for data in upstream.content.iter_any():
+            chunks.append((round((time.perf_counter() - started) * 1000, 3), data.decode("utf-8", "replace")))
+            await response.write(data)
+        await response.write_eof()
+        interaction.chunks = chunks
+        return response
+
+    @staticmethod
+    def _set_body(interaction: Interaction, payload: bytes) -> None:
+        try:
+            interaction.body = payload.decode("utf-8")
+        except UnicodeDecodeError:
+            interaction.body = base64.b64encode(payload).decode()
+            interaction.body_base64 = True
+
+    # Replay
+
+    def _take(self, key: str, host: str, path: str, method: str) -> Tuple[Optional[Interaction], str]:
+        for position, index in enumerate(self._unused):
+            if self.interactions[index].key == key:
+                return self.interactions[self._unused.pop(position)], "replayed"
+        # Identical request repeated more often than recorded: serve its last recording again
+        for interaction in reversed(self.interactions):
+            if interaction.key == key:
+                return interaction, "replayed"
+        for position, index in enumerate(self._unused):
+            candidate = self.interactions[index]
+            if (candidate.method, candidate.host, candidate.path) == (method, host, path):
+                return self.interactions[self._unused.pop(position)], "fallback"
+        return None, "missed"
+
+    async def _replay(self, request: web.Request, key: str, host: str, path: str) -> web.StreamResponse:
+        interaction, outcome = self._take(key, host, path, request.method)
+        self.outcomes[outcome] += 1
+        if interaction is None:
+            return web.json_response({"error": f"{request.method} {host}{path} is not in {self.cassette.name}"},
+                                     status=404)
+        headers = {"Content-Type": interaction.content_type}
+        if interaction.chunks is None:
+            await self._sleep(interaction.elapsed_ms)
+            return web.Response(status=interaction.status, body=interaction.body_bytes(), headers=headers)
+
+        await self._sleep(interaction.ttfb_ms)
+        response = web.StreamResponse(status=interaction.status, headers=headers)
+        await response.prepare(request)
+        loop = asyncio.get_running_loop()
+        headers_at = loop.time()
+        for offset_ms, text in interaction.chunks:
+            due = headers_at + (offset_ms - interaction.ttfb_ms) / 1000 * self.time_scale
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+            await response.write(text.encode())
+        await response.write_eof()
+        return response
+
+    async def _sleep(self, ms: float) -> None:
+        if ms > 0 and self.time_scale > 0:
+            await asyncio.sleep(ms / 1000 * self.time_scale)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    recorder = UpstreamRecorder(args.cassette, args.mode, args.time_scale, args.upstream)
+    base_url = await recorder.start(args.host, args.port)
+    print(f"📼 Upstream recorder ({args.mode}, {len(recorder.interactions)} interactions) on {base_url};"
+          f" counters at {base_url}/_recorder/stats")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await recorder.stop()
+        if args.mode == "record":
+            recorder.save()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay upstream provider responses")
+    parser.add_argument("--cassette", type=Path, required=True)
+    parser.add_argument("--mode", choices=MODES, default="replay")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiplier for replayed latencies (0: none)")
+    parser.add_argument("--upstream", help="record from this base URL instead of the real providers")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+"""
+Upstream Simulator
+Local aiohttp app standing in for the external providers the backend calls:
+Perplexity chat completions, Google Geocoding/Places/Photos, OpenWeather,
+Ticketmaster/Eventbrite/SeatGeek and the OpenAI/Anthropic APIs. Requests are
+addressed as /<upstream host>/<path>, answered from the recorded payloads in
+upstream_fixtures/ after a latency drawn from the provider's profile, and fail
+at the profile's error rate. redirect_upstreams() points the aiohttp,
+requests, urllib and OpenAI/Anthropic SDK clients of this process at it.
+
+    python tests/integration/upstream_simulator.py --port 8765 --time-scale 0.1
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import struct
+import sys
+import threading
+import time
+import urllib.request
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from pathlib import Path
+from string import Template
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.upstream_metrics import provider_for_host
+
+FIXTURES_DIR = Path(__file__).parent / "upstream_fixtures"
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1", "testserver"}
+STREAM_CHUNK_CHARS = 48
+_passthrough: ContextVar[bool] = ContextVar("upstream_passthrough", default=False)
+
+# Keys handed to the services while redirected, so no real key leaves the process
+# (googlemaps rejects keys that do not look like Google ones)
+SIMULATED_ENV = {
+    "PERPLEXITY_API_KEY": "pplx-simulated",
+    "GOOGLE_MAPS_API_KEY": "AIzaSimulatedUpstreamKey",
+    "OPENWEATHER_API_KEY": "simulated",
+    "TICKETMASTER_API_KEY": "simulated",
+    "EVENTBRITE_API_KEY": "simulated",
+    "SEATGEEK_API_KEY": "simulated",
+    "OPENAI_API_KEY": "sk-simulated",
+    "ANTHROPIC_API_KEY": "sk-ant-simulated",
+}
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Response time and failure model for one provider. Latency is lognormal
+    with the given median and p95 (fixed at the median without a p95);
+    LLM providers add generation time at tokens_per_second, streamed
+    responses spreading it over their chunks.
+    """
+    median_ms: float
+    p95_ms: Optional[float] = None
+    error_rate: float = 0.0
+    error_status: int = 503
+    tokens_per_second: Optional[float] = None
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if not self.p95_ms or self.p95_ms <= self.median_ms:
+            return self.median_ms
+        sigma = math.log(self.p95_ms / self.median_ms) / 1.645
+        return rng.lognormvariate(math.log(self.median_ms), sigma)
+
+
+DEFAULT_PROFILES: Dict[str, LatencyProfile] = {
+    "perplexity": LatencyProfile(2500, 7000, tokens_per_second=90),
+    "google_places": LatencyProfile(90, 250),
+    "weather": LatencyProfile(120, 350),
+    "events": LatencyProfile(180, 600),
+    "openai": LatencyProfile(900, 2500, tokens_per_second=150),
+    "anthropic": LatencyProfile(1100, 3000, tokens_per_second=120),
+    "other": LatencyProfile(50),
+}
+
+
+def _png(width: int = 64, height: int = 48, rgb: Tuple[int, int, int] = (96, 140, 180)) -> bytes:
+    """A solid-colour PNG for photo and static map responses"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + bytes(rgb) * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _json_text(value: Any) -> str:
+    """value escaped for substitution inside a JSON string literal"""
+    return json.dumps(str(value))[1:-1]
+
+
+def _coordinates(city: str) -> Tuple[float, float]:
+    digest = int(hashlib.md5(city.lower().encode()).hexdigest(), 16)
+    return round(-50 + digest % 10000 / 100, 4), round(-170 + (digest >> 16) % 34000 / 100, 4)
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")
+
+
+_PROMPT_CITY = re.compile(r"\b(?:in|for) ([A-Z][^:\n]*?)(?: between | from |:|\n|$)")
+_DOCUMENT_FIELDS = {
+    "city": re.compile(r"Destination:\s*(.+)"),
+    "start_date": re.compile(r"Check-in:\s*(\d{4}-\d{2}-\d{2})"),
+    "end_date": re.compile(r"Check-out:\s*(\d{4}-\d{2}-\d{2})"),
+    "reference": re.compile(r"Reference:\s*(\w+)"),
+}
+
+
+class LocalUpstream:
+    """
+    Serves app() on localhost. Run it with start() on the current loop, or
+    with start_in_thread() when the code under test makes blocking calls
+    (googlemaps, urllib) from the event loop.
+    """
+
+    base_url: Optional[str] = None
+    _runner: Optional[web.AppRunner] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+
+    def app(self) -> web.Application:
+        raise NotImplementedError
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve from a background thread with its own event loop"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start(host, port))
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.base_url
+
+    def stop_thread(self) -> None:
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+
+class UpstreamSimulator(LocalUpstream):
+    """The simulator app plus its call counters"""
+
+    def __init__(
+        self,
+        profiles: Optional[Dict[str, LatencyProfile]] = None,
+        time_scale: float = 1.0,
+        seed: Optional[int] = None,
+        fixtures_dir: Path = FIXTURES_DIR
+    ):
+        self.profiles = {name: replace(profile) for name, profile in DEFAULT_PROFILES.items()}
+        self.profiles.update(profiles or {})
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.fixtures = {path.stem: path.read_text() for path in fixtures_dir.glob("*.json")}
+        self.calls: Counter = Counter()   # (provider, endpoint) -> requests
+        self.errors: Counter = Counter()  # (provider, endpoint) -> injected or unmatched failures
+        self._places: Dict[str, Tuple[str, str]] = {}       # place_id -> (name, city)
+        self._cities: Dict[Tuple[float, float], str] = {}   # geocoded coordinates -> city
+        self._photo = _png()
+        self._map = _png(320, 200, (200, 214, 190))
+        self._routes: Dict[Tuple[str, str], Tuple[str, Callable]] = {
+            ("api.perplexity.ai", "/chat/completions"): ("chat", self._perplexity),
+            ("maps.googleapis.com", "/maps/api/geocode/json"): ("geocode", self._geocode),
+            ("maps.googleapis.com", "/maps/api/place/nearbysearch/json"): ("nearbysearch", self._nearby_search),
+            ("maps.googleapis.com", "/maps/api/place/textsearch/json"): ("textsearch", self._text_search),
+            ("maps.googleapis.com", "/maps/api/place/findplacefromtext/json"): ("findplace", self._find_place),
+            ("maps.googleapis.com", "/maps/api/place/details/json"): ("details", self._place_details),
+            ("maps.googleapis.com", "/maps/api/place/photo"): ("photo", self._image(self._photo)),
+            ("maps.googleapis.com", "/maps/api/staticmap"): ("staticmap", self._image(self._map)),
+            ("api.openweathermap.org", "/data/2.5/forecast"): ("forecast", self._weather_forecast),
+            ("app.ticketmaster.com", "/discovery/v2/events"): ("ticketmaster", self._ticketmaster),
+            ("app.ticketmaster.com", "/discovery/v2/events.json"): ("ticketmaster", self._ticketmaster),
+            ("www.eventbriteapi.com", "/v3/events/search/"): ("eventbrite", self._eventbrite),
+            ("api.seatgeek.com", "/2/events"): ("seatgeek", self._seatgeek),
+            ("api.openai.com", "/v1/chat/completions"): ("chat", self._openai),
+            ("api.anthropic.com", "/v1/messages"): ("messages", self._anthropic),
+        }
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_get("/_simulator/stats", self._stats_handler)
+        app.router.add_post("/_simulator/reset", self._reset_handler)
+        app.router.add_route("*", "/{host}/{path:.*}", self._handle)
+        return app
+
+    # Counters
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Calls and errors per provider, with per-endpoint call counts"""
+        providers: Dict[str, Dict[str, Any]] = {}
+        for (provider, endpoint), count in sorted(self.calls.items()):
+            entry = providers.setdefault(provider, {"calls": 0, "errors": 0, "endpoints": {}})
+            entry["calls"] += count
+            entry["errors"] += self.errors[(provider, endpoint)]
+            entry["endpoints"][endpoint] = count
+        return providers
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.errors.clear()
+
+    async def _stats_handler(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def _reset_handler(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response({"status": "reset"})
+
+    # Dispatch
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        host = request.match_info["host"]
+        path = "/" + request.match_info["path"]
+        provider = provider_for_host(host)
+        endpoint, handler = self._routes.get((host, path), ("unmatched", None))
+        self.calls[(provider, endpoint)] += 1
+        if handler is None:
+            self.errors[(provider, endpoint)] += 1
+            return web.json_response({"error": f"{host}{path} is not simulated"}, status=404)
+
+        profile = self.profiles.get(provider, self.profiles["other"])
+        await self._sleep(profile.sample_ms(self.rng))
+        if self.rng.random() < profile.error_rate:
+            self.errors[(provider, endpoint)] += 1
+            return web.json_response(
+                {"error": {"message": "Simulated upstream failure", "code": profile.error_status}},
+                status=profile.error_status
+            )
+        return await handler(request, profile)
+
+    async def _sleep(self, ms: float) -> None:
+        if ms > 0 and self.time_scale > 0:
+            await asyncio.sleep(ms / 1000 * self.time_scale)
+
+    def _fixture(self, fixture: str, **values: Any) -> Any:
+        text = Template(self.fixtures[fixture]).safe_substitute({k: _json_text(v) for k, v in values.items()})
+        return json.loads(text)
+
+    def _city_values(self, city: str) -> Dict[str, Any]:
+        lat, lng = _coordinates(city)
+        return {"city": city, "city_slug": _slug(city), "lat": lat, "lng": lng}
+
+    def _city_near(self, location: str) -> str:
+        try:
+            lat, lng = (round(float(part), 4) for part in location.split(","))
+        except ValueError:
+            return "the city"
+        return self._cities.get((lat, lng), "the city")
+
+    def _image(self, payload: bytes) -> Callable:
+        async def handler(request: web.Request, profile: LatencyProfile) -> web.Response:
+            return web.Response(body=payload, content_type="image/png")
+        return handler
+
+    # Google
+
+    async def _geocode(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        city = request.query.get("address") or request.query.get("components") or "the city"
+        values = self._city_values(city)
+        self._cities[(values["lat"], values["lng"])] = city
+        return web.json_response(self._fixture("google_geocode", **values))
+
+    def _register_places(self, results: list, city: str) -> None:
+        for place in results:
+            self._places[place["place_id"]] = (place.get("name", ""), city)
+
+    async def _nearby_search(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        city = self._city_near(request.query.get("location", ""))
+        body = self._fixture("google_nearbysearch", type=request.query.get("type", "restaurant"), **self._city_values(city))
+        for place in body["results"]:
+            place["place_id"] = f"{place['place_id']}-{_slug(city)}"
+        self._register_places(body["results"], city)
+        return web.json_response(body)
+
+    async def _text_search(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        query = request.query.get("query", "")
+        city = query.split(" in ")[-1] if " in " in query else request.query.get("location", "the city")
+        body = self._fixture("google_textsearch", **self._city_values(city))
+        self._register_places(body["results"], city)
+        return web.json_response(body)
+
+    async def _find_place(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        name = request.query.get("input", "Simulated Place")
+        city = name.rsplit(",", 1)[-1].strip() if "," in name else "the city"
+        body = self._fixture("google_findplacefromtext", name=name, **self._city_values(city))
+        self._register_places(body["candidates"], city)
+        return web.json_response(body)
+
+    async def _place_details(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        place_id = request.query.get("place_id") or request.query.get("placeid", "")
+        name, city = self._places.get(place_id, ("Simulated Place", "the city"))
+        number = sum(place_id.encode()) % 90 + 10
+        return web.json_response(self._fixture(
+            "google_place_details", name=name, number=number, place_id=place_id, **self._city_values(city)
+        ))
+
+    # Weather and events
+
+    async def _weather_forecast(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        body = self._fixture("openweather_forecast", city="", lat=request.query.get("lat", 0), lng=request.query.get("lon", 0))
+        day = body.pop("list")
+        count = min(int(request.query.get("cnt", 40)), 40)
+        first = int(time.time()) // 10800 * 10800
+        body["list"] = []
+        for i in range(count):
+            entry = copy.deepcopy(day[i % len(day)])
+            entry["dt"] = first + i * 10800
+            entry["dt_txt"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(entry["dt"]))
+            body["list"].append(entry)
+        body["cnt"] = count
+        return web.json_response(body)
+
+    async def _ticketmaster(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        query = request.query
+        return web.json_response(self._fixture(
+            "ticketmaster_events", city=query.get("city", ""),
+            start_date=query.get("startDateTime", "")[:10], end_date=query.get("endDateTime", "")[:10]
+        ))
+
+    async def _eventbrite(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        query = request.query
+        return web.json_response(self._fixture(
+            "eventbrite_events", city=query.get("location.address", ""),
+            start_date=query.get("start_date.range_start", "")[:10], end_date=query.get("start_date.range_end", "")[:10]
+        ))
+
+    async def _seatgeek(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        query = request.query
+        return web.json_response(self._fixture(
+            "seatgeek_events", city=query.get("venue.city", ""),
+            start_date=query.get("datetime_utc.gte", "")[:10], end_date=query.get("datetime_utc.lte", "")[:10]
+        ))
+
+    # LLMs
+
+    def _section_answer(self, prompt: str, response_format: Optional[Dict[str, Any]]) -> str:
+        """
+        Perplexity content for a guide prompt: batched structured-output
+        requests get every schema property filled, single-section prompts
+        the section whose keys they list, anything else an empty answer
+        """
+        match = _PROMPT_CITY.search(prompt)
+        city = match.group(1).strip() if match else "the city"
+        dates = re.findall(r"\d{4}-\d{2}-\d{2}", prompt)
+        sections = self._fixture(
+            "perplexity_sections", city=city,
+            start_date=dates[0] if dates else "", end_date=dates[-1] if dates else ""
+        )
+        if response_format:
+            properties = response_format.get("json_schema", {}).get("schema", {}).get("properties", {})
+            return json.dumps({key: sections.get(key.rsplit("__", 1)[-1], []) for key in properties})
+        for value in sections.values():
+            keys = ", ".join(value[0] if isinstance(value, list) else value)
+            if keys in prompt:
+                return json.dumps(value)
+        return "[]" if "JSON array" in prompt else "{}"
+
+    def _extraction_answer(self, text: str) -> str:
+        """Booking extraction for the documents the load test uploads"""
+        values = {"city": "London", "start_date": "", "end_date": "", "reference": "SIM000"}
+        for key, pattern in _DOCUMENT_FIELDS.items():
+            match = pattern.search(text)
+            if match:
+                values[key] = match.group(1).strip()
+        values["number"] = sum(values["reference"].encode()) % 900 + 100
+        return json.dumps(self._fixture("openai_extraction", **values))
+
+    async def _completion(
+        self,
+        request: web.Request,
+        profile: LatencyProfile,
+        prompt: str,
+        content: str,
+        stream: bool,
+        model: str
+    ) -> web.StreamResponse:
+        """OpenAI-style chat completion, as one body or as server-sent events"""
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        created = int(time.time())
+        completion_id = f"sim-{self.rng.getrandbits(48):012x}"
+        generation_ms = (usage["completion_tokens"] / profile.tokens_per_second * 1000) if profile.tokens_per_second else 0
+
+        if not stream:
+            await self._sleep(generation_ms)
+            return web.json_response({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        for chunk in chunks:
+            await self._sleep(generation_ms / len(chunks))
+            event = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+            }
+            await response.write(b"data: " + json.dumps(event).encode() + b"\n\n")
+        final = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage,
+        }
+        await response.write(b"data: " + json.dumps(final).encode() + b"\n\ndata: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _perplexity(self, request: web.Request, profile: LatencyProfile) -> web.StreamResponse:
+        payload = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages", []))
+        content = self._section_answer(prompt, payload.get("response_format"))
+        return await self._completion(request, profile, prompt, content, bool(payload.get("stream")), payload.get("model", "sonar"))
+
+    async def _openai(self, request: web.Request, profile: LatencyProfile) -> web.StreamResponse:
+        payload = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages", []))
+        content = self._extraction_answer(prompt) if "Text to parse:" in prompt else "{}"
+        return await self._completion(request, profile, prompt, content, bool(payload.get("stream")), payload.get("model", "gpt-4o-mini"))
+
+    async def _anthropic(self, request: web.Request, profile: LatencyProfile) -> web.Response:
+        payload = await request.json()
+        prompt = "\n".join(
+            m["content"] if isinstance(m.get("content"), str)
+            else " ".join(part.get("text", "") for part in m.get("content", []))
+            for m in payload.get("messages", [])
+        )
+        content = self._extraction_answer(prompt) if "Text to parse:" in prompt else "{}"
+        output_tokens = len(content) // 4
+        if profile.tokens_per_second:
+            await self._sleep(output_tokens / profile.tokens_per_second * 1000)
+        return web.json_response({
+            "id": f"msg_sim{self.rng.getrandbits(48):012x}", "type": "message", "role": "assistant",
+            "model": payload.get("model", "claude-3-haiku-20240307"),
+            "content": [{"type": "text", "text": content}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": output_tokens},
+        })
+
+
+@contextmanager
+def passthrough() -> Iterator[None]:
+    """Calls made inside are not redirected (a recorder forwarding to the real upstreams)"""
+    token = _passthrough.set(True)
+    try:
+        yield
+    finally:
+        _passthrough.reset(token)
+
+
+def redirect_url(url: Any, base_url: str) -> Any:
+    """http://<simulator>/<host><path>?<query> for any non-local absolute URL"""
+    parts = urlsplit(str(url))
+    if _passthrough.get() or not parts.hostname or parts.hostname in LOCAL_HOSTS:
+        return url
+    redirected = f"{base_url}/{parts.hostname}{parts.path or '/'}"
+    return f"{redirected}?{parts.query}" if parts.query else redirected
+
+
+@contextmanager
+def redirect_upstreams(base_url: str, simulated_keys: bool = True) -> Iterator[None]:
+    """
+    Send every outbound call of this process to the simulator: aiohttp
+    sessions, requests (googlemaps), urllib (PDF images) and the OpenAI and
+    Anthropic SDKs, which read their base URLs from the environment when
+    constructed. API keys are replaced with simulated ones for the duration,
+    unless simulated_keys is False (recording against the real providers).
+    """
+    original_aiohttp = aiohttp.ClientSession._request
+    original_requests = requests.Session.request
+    original_urlopen = urllib.request.urlopen
+
+    async def aiohttp_request(session, method, str_or_url, *args, **kwargs):
+        return await original_aiohttp(session, method, redirect_url(str_or_url, base_url), *args, **kwargs)
+
+    def requests_request(session, method, url, *args, **kwargs):
+        return original_requests(session, method, redirect_url(url, base_url), *args, **kwargs)
+
+    def urlopen(url, *args, **kwargs):
+        if isinstance(url, urllib.request.Request):
+            url.full_url = redirect_url(url.full_url, base_url)
+        else:
+            url = redirect_url(url, base_url)
+        return original_urlopen(url, *args, **kwargs)
+
+    env = {
+        **(SIMULATED_ENV if simulated_keys else {}),
+        "OPENAI_BASE_URL": f"{base_url}/api.openai.com/v1",
+        "ANTHROPIC_BASE_URL": f"{base_url}/api.anthropic.com",
+    }
+    saved_env = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    aiohttp.ClientSession._request = aiohttp_request
+    requests.Session.request = requests_request
+    urllib.request.urlopen = urlopen
+    try:
+        yield
+    finally:
+        aiohttp.ClientSession._request = original_aiohttp
+        requests.Session.request = original_requests
+        urllib.request.urlopen = original_urlopen
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def parse_profile_overrides(specs: Any, error_rate: Optional[float] = None) -> Dict[str, LatencyProfile]:
+    """
+    Profiles from "provider=median_ms[/p95_ms]" specs, e.g. perplexity=800/2000,
+    with error_rate (if given) applied to every provider
+    """
+    profiles = {name: replace(profile) for name, profile in DEFAULT_PROFILES.items()}
+    for spec in specs or []:
+        provider, _, latency = spec.partition("=")
+        median, _, p95 = latency.partition("/")
+        profile = profiles.setdefault(provider, replace(DEFAULT_PROFILES["other"]))
+        profile.median_ms = float(median)
+        profile.p95_ms = float(p95) if p95 else None
+    if error_rate is not None:
+        for profile in profiles.values():
+            profile.error_rate = error_rate
+    return profiles
+
+
+async def serve(args: argparse.Namespace) -> None:
+    simulator = UpstreamSimulator(parse_profile_overrides(args.latency, args.error_rate), args.time_scale, args.seed)
+    base_url = await simulator.start(args.host, args.port)
+    print(f"🛰️  Upstream simulator on {base_url} (time scale {args.time_scale}); counters at {base_url}/_simulator/stats")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve simulated upstream providers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiplier for every simulated delay")
+    parser.add_argument("--latency", action="append", metavar="PROVIDER=MEDIAN[/P95]", help="override a latency profile (ms)")
+    parser.add_argument("--error-rate", type=float, help="fraction of calls failing, for every provider")
+    parser.add_argument("--seed", type=int)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass